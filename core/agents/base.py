@@ -1,8 +1,11 @@
 import logging
 from abc import ABC, abstractmethod
-from collections.abc import Callable
+from collections.abc import Callable, Iterable
+from typing import Any
 
 from core.clients.llm import LLMService
+from core.clients.llm_dispatcher import LLMDispatcher, get_llm_dispatcher
+from core.clients.llm_telemetry import llm_caller
 from core.errors import CancelledError
 from core.pipeline.state import PipelineState
 
@@ -10,11 +13,16 @@ logger = logging.getLogger(__name__)
 
 
 class BaseAgent(ABC):
+    # LLM task class (see core.clients.llm_routing); picks the model for this agent's calls.
+    task: str | None = None
+
     def __init__(self, llm_service: LLMService):
         self.llm = llm_service
         self.name = self.__class__.__name__
         self.log_callback = None
         self.cancel_checker: Callable[[], bool] | None = None
+        # None: the shared dispatcher (LLM_MAX_PARALLEL)
+        self.dispatcher: LLMDispatcher | None = None
 
     def set_log_callback(self, callback):
         self.log_callback = callback
@@ -32,6 +40,15 @@ class BaseAgent(ABC):
             self.log(msg)
             raise CancelledError(msg)
 
+    def _fan_out(self, fn: Callable[[Any], Any], items: Iterable[Any], where: str = "") -> list[Any]:
+        """Runs independent LLM calls through the dispatcher; results keep input order."""
+        dispatcher = self.dispatcher or get_llm_dispatcher()
+        try:
+            return dispatcher.map(fn, items, cancel_checker=self._is_cancelled)
+        except CancelledError:
+            self.log(f"Cancelled{f' ({where})' if where else ''}.")
+            raise
+
     def process(self, state: PipelineState) -> PipelineState:
         """
         Main entry point for the agent.
@@ -44,7 +61,9 @@ class BaseAgent(ABC):
         self.log(f"Starting process. Input State: {state.to_dict()}")
 
         try:
-            updated_state = self._execute(state)
+            # LLM telemetry tags this agent's calls (also those fanned out to the dispatcher).
+            with llm_caller(self.name):
+                updated_state = self._execute(state)
         except Exception:
             logger.exception("Agent failed: %s", self.name)
             raise
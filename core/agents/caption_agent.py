@@ -5,6 +5,8 @@ from core.pipeline.state import PipelineState
 
 
 class CaptionAgent(BaseAgent):
+    task = "caption"
+
     def _execute(self, state: PipelineState) -> PipelineState:
         if not state.safe_news_items:
             return state
@@ -34,7 +36,7 @@ class CaptionAgent(BaseAgent):
         Predict engagement score for each.
         """
 
-        result = self.llm.generate_response(prompt, schema=schema)
+        result = self.llm.generate_response(prompt, schema=schema, task=self.task)
         try:
             candidates = result.get("captions", [])
             state.caption_candidates = candidates
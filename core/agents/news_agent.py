@@ -5,14 +5,19 @@ from typing import Any
 import feedparser
 
 from core.agents.base import BaseAgent
+from core.agents.risk_agent import RISK_CHECKLIST, RISK_SCHEMA
 from core.clients.llm import LLMService
 from core.content.news_fetcher import RSS_SOURCES
 from core.content.news_memory import get_used_title_set, normalize_title, prune_expired
+from core.errors import LLMResponseError
 from core.pipeline.state import PipelineState
-from core.runtime.config import USED_NEWS_TTL_DAYS
+from core.runtime.config import NEWS_ANALYSIS_MODE, NEWS_SCORE_BATCH_SIZE, NEWS_SCORING_MODE, USED_NEWS_TTL_DAYS
 
 logger = logging.getLogger(__name__)
 
+# Schema for LLM validation
+SCORE_SCHEMA = {"emotional_score": "integer (0-10)", "viral_potential": "integer (0-10)", "reason": "string"}
+
 
 def _find_keyword_hit(text: str, keywords: list[str]) -> str | None:
     haystack = str(text or "").lower()
@@ -24,10 +29,24 @@ def _find_keyword_hit(text: str, keywords: list[str]) -> str | None:
 
 
 class NewsAgent(BaseAgent):
-    def __init__(self, llm_service: LLMService, rss_urls: list[str] | None = None):
+    task = "scoring"
+
+    def __init__(
+        self,
+        llm_service: LLMService,
+        rss_urls: list[str] | None = None,
+        scoring_mode: str | None = None,
+        batch_size: int | None = None,
+        analysis_mode: str | None = None,
+    ):
         super().__init__(llm_service)
         # Default RSS list if none provided (single source of truth)
         self.rss_urls = rss_urls or list(RSS_SOURCES)
+        # "single": one LLM call per headline; "batch": chunks of candidates per call
+        self.scoring_mode = scoring_mode or NEWS_SCORING_MODE
+        self.batch_size = max(1, batch_size or NEWS_SCORE_BATCH_SIZE)
+        # "separate": RiskAgent asks the LLM again; "combined": risk comes back with the scores
+        self.analysis_mode = analysis_mode or NEWS_ANALYSIS_MODE
 
     def _execute(self, state: PipelineState) -> PipelineState:
         raw_news = self._fetch_news()
@@ -95,13 +114,18 @@ class NewsAgent(BaseAgent):
         return items
 
     def _score_news(self, items: list[dict[str, str]]) -> list[dict[str, Any]]:
-        scored_items = []
-        # Schema for LLM validation
-        score_schema = {"emotional_score": "integer (0-10)", "viral_potential": "integer (0-10)", "reason": "string"}
-
-        for item in items:
-            self._cancel_guard("score_news")
-            prompt = f"""
+        if self.scoring_mode == "batch" and len(items) > 1:
+            return self._score_news_batched(items)
+        # Headlines are independent: scored in parallel up to LLM_MAX_PARALLEL.
+        return [scored for scored in self._fan_out(self._score_single, items, "score_news") if scored is not None]
+
+    @property
+    def _combined(self) -> bool:
+        return self.analysis_mode == "combined"
+
+    def _score_single(self, item: dict[str, str]) -> dict[str, Any] | None:
+        score_schema = {**SCORE_SCHEMA, **RISK_SCHEMA} if self._combined else SCORE_SCHEMA
+        prompt = f"""
             Analyze this news item for social media potential.
             Title: {item["title"]}
             Summary: {item["summary"]}
@@ -110,31 +134,120 @@ class NewsAgent(BaseAgent):
             - Emotional Impact (how likely to trigger emotion)
             - Viral Potential (how likely to be shared)
             """
-
+        if self._combined:
+            prompt += f"Also assess Instagram Brand Safety.{RISK_CHECKLIST}"
+
+        try:
+            # LLM provides ANALYSIS (Scores)
+            analysis = self.llm.generate_response(prompt, schema=score_schema, task=self.task)
+            return _apply_scores(item, analysis, with_risk=self._combined)
+        except (KeyError, TypeError, ValueError) as exc:
+            logger.warning("Skipping malformed score for %r", item.get("title", "")[:40], exc_info=True)
+            self.log(f"Skipping item '{item.get('title', '')[:20]}...' due to scoring error: {exc}")
+            return None
+
+    def _score_news_batched(self, items: list[dict[str, str]]) -> list[dict[str, Any]]:
+        """
+        Scores candidates NEWS_SCORE_BATCH_SIZE at a time in one call each.
+        Items missing from a reply (or with unusable scores) fall back to the
+        single-item prompt, so a partial answer never drops a headline.
+        """
+        chunks = [
+            (offset, items[offset : offset + self.batch_size]) for offset in range(0, len(items), self.batch_size)
+        ]
+        scored_by_index: dict[int, dict[str, Any]] = {}
+        for chunk_scores in self._fan_out(self._score_chunk, chunks, "score_news"):
+            scored_by_index.update(chunk_scores)
+
+        missing = [index for index in range(len(items)) if index not in scored_by_index]
+        if missing:
+            self.log(f"Batch scoring missed {len(missing)} item(s); scoring them individually.")
+        rescored = self._fan_out(self._score_single, [items[index] for index in missing], "score_news")
+        for index, scored in zip(missing, rescored, strict=True):
+            if scored is not None:
+                scored_by_index[index] = scored
+
+        return [scored_by_index[index] for index in sorted(scored_by_index)]
+
+    def _score_chunk(self, chunk_at: tuple[int, list[dict[str, str]]]) -> dict[int, dict[str, Any]]:
+        """One batch call; returns the scored items keyed by their index in the full list."""
+        offset, chunk = chunk_at
+        batch_schema = {
+            "items": [
+                {
+                    "id": "integer (the item id given above)",
+                    **SCORE_SCHEMA,
+                    **(RISK_SCHEMA if self._combined else {}),
+                }
+            ]
+        }
+        listing = "\n".join(
+            f"[{number}] Title: {item['title']}\n    Summary: {item['summary']}"
+            for number, item in enumerate(chunk, start=1)
+        )
+        prompt = f"""
+            Analyze each news item below for social media potential.
+            {listing}
+
+            For EVERY item, rate on 0-10 scale:
+            - Emotional Impact (how likely to trigger emotion)
+            - Viral Potential (how likely to be shared)
+            Return one entry per item in "items", using the item's number as "id".
+            """
+        if self._combined:
+            prompt += f"Also assess each item's Instagram Brand Safety.{RISK_CHECKLIST}"
+
+        try:
+            analysis = self.llm.generate_response(prompt, schema=batch_schema, task=self.task)
+            entries = analysis.get("items", [])
+            if not isinstance(entries, list):
+                raise TypeError("batch score 'items' is not a list")
+        except (KeyError, TypeError, ValueError, AttributeError, LLMResponseError):
+            logger.warning("Batch scoring failed for %s items; scoring them one by one", len(chunk), exc_info=True)
+            entries = []
+
+        scored: dict[int, dict[str, Any]] = {}
+        for entry in entries:
             try:
-                # LLM provides ANALYSIS (Scores)
-                analysis = self.llm.generate_response(prompt, schema=score_schema)
-
-                emotional = int(analysis.get("emotional_score", 0))
-                viral = int(analysis.get("viral_potential", 0))
-
-                # Python provides DECISION (Weighted Score)
-                # Formula: 60% Viral + 40% Emotional
-                final_score = (viral * 0.6) + (emotional * 0.4)
-
-                item_data = item.copy()
-                item_data.update(
-                    {
-                        "emotional_score": emotional,
-                        "viral_potential": viral,
-                        "final_score": final_score,
-                        "analysis_reason": analysis.get("reason", ""),
-                    }
-                )
-                scored_items.append(item_data)
-
-            except (KeyError, TypeError, ValueError) as exc:
-                logger.warning("Skipping malformed score for %r", item.get("title", "")[:40], exc_info=True)
-                self.log(f"Skipping item '{item.get('title', '')[:20]}...' due to scoring error: {exc}")
-
-        return scored_items
+                number = int(entry["id"])
+                if 1 <= number <= len(chunk) and offset + number - 1 not in scored:
+                    scored[offset + number - 1] = _apply_scores(chunk[number - 1], entry, with_risk=self._combined)
+            except (KeyError, TypeError, ValueError):
+                logger.debug("Ignoring malformed batch score entry: %r", entry)
+        return scored
+
+
+def _apply_scores(item: dict[str, str], analysis: dict[str, Any], *, with_risk: bool = False) -> dict[str, Any]:
+    emotional = int(analysis.get("emotional_score", 0))
+    viral = int(analysis.get("viral_potential", 0))
+
+    # Python provides DECISION (Weighted Score)
+    # Formula: 60% Viral + 40% Emotional
+    final_score = (viral * 0.6) + (emotional * 0.4)
+
+    item_data = item.copy()
+    item_data.update(
+        {
+            "emotional_score": emotional,
+            "viral_potential": viral,
+            "final_score": final_score,
+            "analysis_reason": analysis.get("reason", ""),
+        }
+    )
+    risk = _risk_fields(analysis) if with_risk else None
+    if risk is not None:
+        # RiskAgent only applies thresholds to this; no second LLM call.
+        item_data["risk_analysis"] = risk
+    return item_data
+
+
+def _risk_fields(analysis: dict[str, Any]) -> dict[str, Any] | None:
+    """Risk part of a combined answer; None leaves the item to RiskAgent's own LLM check."""
+    categories = analysis.get("categories", [])
+    if "risk_score" not in analysis or not isinstance(categories, list):
+        return None
+    try:
+        risk_score = int(analysis["risk_score"])
+    except (TypeError, ValueError):
+        return None
+    return {"risk_score": risk_score, "categories": categories}
@@ -1,5 +1,6 @@
 import logging
 import re
+from typing import Any
 
 from core.agents.base import BaseAgent
 from core.pipeline.state import PipelineState
@@ -13,50 +14,16 @@ from core.runtime.config import (
 
 logger = logging.getLogger(__name__)
 
+RISK_SCHEMA = {
+    "risk_score": "integer (0-10, 0=Safe, 10=Dangerous)",
+    "categories": [
+        "list of strings from: violence, hate_speech, adult, sexual, politics, political_bias, misinformation, drugs"
+    ],
+    "safe_to_post": "boolean",
+}
 
-def _find_keyword_hit(text: str, keywords: list[str]) -> str | None:
-    haystack = str(text or "").lower()
-    for kw in keywords:
-        # Match whole words to avoid false positives like "war" inside "water".
-        pattern = rf"\b{re.escape(str(kw).lower())}\b"
-        if re.search(pattern, haystack):
-            return kw
-    return None
-
-
-class RiskAgent(BaseAgent):
-    def _execute(self, state: PipelineState) -> PipelineState:
-        safe_items = []
-        risk_report = {}
-
-        risk_schema = {
-            "risk_score": "integer (0-10, 0=Safe, 10=Dangerous)",
-            "categories": [
-                "list of strings from: violence, hate_speech, adult, sexual, politics, political_bias, misinformation, drugs"
-            ],
-            "safe_to_post": "boolean",
-        }
-
-        for item in state.news_items:
-            self._cancel_guard("risk_loop")
-            title = item.get("title", "")
-            summary = item.get("summary", "")
-            combined = f"{title} {summary}"
-
-            # Hard blacklist: immediate block
-            blacklisted_kw = _find_keyword_hit(combined, RISK_BLACKLIST_KEYWORDS)
-            if blacklisted_kw:
-                risk_report[title] = {"score": 10, "reason": [f"blacklist_hit:{blacklisted_kw}"]}
-                self.log(f"Blocked item (blacklist:{blacklisted_kw}): {title}")
-                continue
-
-            whitelist_hit = _find_keyword_hit(combined, RISK_WHITELIST_KEYWORDS) is not None
-
-            prompt = f"""
-            Analyze this news item for Instagram Brand Safety.
-            Title: {title}
-            Summary: {summary}
-            
+# Shared with NewsAgent's combined analysis prompt.
+RISK_CHECKLIST = """
             Check for:
             1. Violence / Gore
             2. Hate Speech
@@ -69,40 +36,85 @@ class RiskAgent(BaseAgent):
             Use only the category labels provided in the schema.
             """
 
-            try:
-                # LLM provides ANALYSIS
-                analysis = self.llm.generate_response(prompt, schema=risk_schema)
-
-                risk_score = int(analysis.get("risk_score", 10))  # Default to high risk on error
-                categories = analysis.get("categories", [])
-                categories = [str(c).strip().lower().replace(" ", "_") for c in categories]
 
-                # Category-based thresholding
-                threshold = RISK_DEFAULT_THRESHOLD
-                for c in categories:
-                    if c in RISK_CATEGORY_THRESHOLDS:
-                        threshold = min(threshold, RISK_CATEGORY_THRESHOLDS[c])
+def _find_keyword_hit(text: str, keywords: list[str]) -> str | None:
+    haystack = str(text or "").lower()
+    for kw in keywords:
+        # Match whole words to avoid false positives like "war" inside "water".
+        pattern = rf"\b{re.escape(str(kw).lower())}\b"
+        if re.search(pattern, haystack):
+            return kw
+    return None
 
-                # Whitelist soft-pass (still respects a max score)
-                if whitelist_hit and risk_score <= RISK_WHITELIST_MAX_SCORE:
-                    is_safe = True
-                else:
-                    is_safe = risk_score <= threshold
 
-                risk_report[item["title"]] = {"score": risk_score, "reason": categories}
+class RiskAgent(BaseAgent):
+    task = "risk"
 
-                if is_safe:
-                    safe_items.append(item)
-                else:
-                    self.log(f"Blocked item: {item['title']} (Score: {risk_score})")
+    def _execute(self, state: PipelineState) -> PipelineState:
+        safe_items = []
+        risk_report = {}
 
-            except (KeyError, TypeError, ValueError) as exc:
-                logger.warning("Risk response was invalid for %r", title[:40], exc_info=True)
-                self.log(f"Risk check failed for item '{title[:20]}...'. default BLOCK.")
-                risk_report[title] = {"error": str(exc)}
+        # Items are independent: checked in parallel up to LLM_MAX_PARALLEL, reported in order.
+        for item, (title, report, is_safe) in zip(
+            state.news_items, self._fan_out(self._check_item, state.news_items, "risk_loop"), strict=True
+        ):
+            risk_report[title] = report
+            if is_safe:
+                safe_items.append(item)
 
         state.safe_news_items = safe_items
         state.risk_analysis = risk_report
 
         self.log(f"Risk Filter: {len(state.news_items)} -> {len(safe_items)} safe items.")
         return state
+
+    def _check_item(self, item: dict[str, Any]) -> tuple[str, dict[str, Any], bool]:
+        """(title, risk report entry, is_safe) for one news item."""
+        title = item.get("title", "")
+        summary = item.get("summary", "")
+        combined = f"{title} {summary}"
+
+        # Hard blacklist: immediate block
+        blacklisted_kw = _find_keyword_hit(combined, RISK_BLACKLIST_KEYWORDS)
+        if blacklisted_kw:
+            self.log(f"Blocked item (blacklist:{blacklisted_kw}): {title}")
+            return title, {"score": 10, "reason": [f"blacklist_hit:{blacklisted_kw}"]}, False
+
+        whitelist_hit = _find_keyword_hit(combined, RISK_WHITELIST_KEYWORDS) is not None
+
+        try:
+            # NewsAgent's combined mode already analysed risk in the scoring call.
+            analysis = item.get("risk_analysis")
+            if not isinstance(analysis, dict):
+                prompt = f"""
+            Analyze this news item for Instagram Brand Safety.
+            Title: {title}
+            Summary: {summary}
+            {RISK_CHECKLIST}"""
+                # LLM provides ANALYSIS
+                analysis = self.llm.generate_response(prompt, schema=RISK_SCHEMA, task=self.task)
+
+            risk_score = int(analysis.get("risk_score", 10))  # Default to high risk on error
+            categories = analysis.get("categories", [])
+            categories = [str(c).strip().lower().replace(" ", "_") for c in categories]
+
+            # Category-based thresholding
+            threshold = RISK_DEFAULT_THRESHOLD
+            for c in categories:
+                if c in RISK_CATEGORY_THRESHOLDS:
+                    threshold = min(threshold, RISK_CATEGORY_THRESHOLDS[c])
+
+            # Whitelist soft-pass (still respects a max score)
+            if whitelist_hit and risk_score <= RISK_WHITELIST_MAX_SCORE:
+                is_safe = True
+            else:
+                is_safe = risk_score <= threshold
+
+            if not is_safe:
+                self.log(f"Blocked item: {item['title']} (Score: {risk_score})")
+            return item["title"], {"score": risk_score, "reason": categories}, is_safe
+
+        except (KeyError, TypeError, ValueError) as exc:
+            logger.warning("Risk response was invalid for %r", title[:40], exc_info=True)
+            self.log(f"Risk check failed for item '{title[:20]}...'. default BLOCK.")
+            return title, {"error": str(exc)}, False
@@ -1,12 +1,14 @@
-import time
 from typing import Any
 
 from core.agents.base import BaseAgent
-from core.clients.llm import unload_ollama
+from core.clients.gpu_residency import get_gpu_residency
+from core.clients.llm import LLMService
 from core.pipeline.state import PipelineState
+from core.runtime.config import SD_DRAFT_FIRST
 
 
 class VisualDirectorAgent(BaseAgent):
+    task = "prompt"
     DEFAULT_STYLE = "cinematic documentary realism"
     PROMPT_MAX_CHARS = 520
 
@@ -19,6 +21,11 @@ class VisualDirectorAgent(BaseAgent):
         "overexposed, underexposed"
     )
 
+    def __init__(self, llm_service: LLMService, *, draft_first: bool = SD_DRAFT_FIRST):
+        super().__init__(llm_service)
+        # Draft first: a quick low-res render is checked before paying for full quality.
+        self.draft_first = draft_first
+
     def _build_prompt_request(self, target_news: dict[str, Any]) -> str:
         title = str(target_news.get("title", "")).strip()
         summary = str(target_news.get("summary", "")).strip()
@@ -88,6 +95,47 @@ class VisualDirectorAgent(BaseAgent):
             "realistic hands, no text, no watermark"
         )
 
+    def _render(self, prompt: str):
+        from core.clients.render_profile import DRAFT_PROFILE
+        from core.clients.render_watchdog import inspect_image
+        from core.clients.sd_client import discard_draft, finalize_draft, resim_ciz, seed_for
+
+        seed = seed_for(prompt)
+        if not self.draft_first:
+            return resim_ciz(
+                prompt,
+                negative_prompt=self.SD_NEGATIVE_PROMPT,
+                cancel_checker=self.cancel_checker,
+                seed=seed,
+            )
+
+        success, draft_path, _ = resim_ciz(
+            prompt,
+            negative_prompt=self.SD_NEGATIVE_PROMPT,
+            cancel_checker=self.cancel_checker,
+            seed=seed,
+            profile=DRAFT_PROFILE,
+        )
+        if not success or not draft_path:
+            return False, None, None
+        reason = inspect_image(draft_path)
+        if reason:
+            self.log(f"Draft rejected ({reason}); skipping full-quality render.")
+            discard_draft(draft_path)
+            return False, None, None
+
+        self._cancel_guard("before_sd_finalize")
+        try:
+            return finalize_draft(
+                draft_path,
+                prompt,
+                seed=seed,
+                negative_prompt=self.SD_NEGATIVE_PROMPT,
+                cancel_checker=self.cancel_checker,
+            )
+        finally:
+            discard_draft(draft_path)
+
     def _execute(self, state: PipelineState) -> PipelineState:
         if not state.safe_news_items:
             self.log("No safe news items to visualize.")
@@ -97,7 +145,7 @@ class VisualDirectorAgent(BaseAgent):
         self._cancel_guard("before_visual_prompt")
 
         prompt_req = self._build_prompt_request(target_news)
-        llm_prompt = self.llm.ask_english(prompt_req, timeout=60, retries=2)
+        llm_prompt = self.llm.ask_english(prompt_req, timeout=60, retries=2, task=self.task)
         final_prompt = self._normalize_prompt(llm_prompt, target_news)
 
         state.visual_style = self.DEFAULT_STYLE
@@ -105,19 +153,10 @@ class VisualDirectorAgent(BaseAgent):
         self.log(f"Generated Prompt: {final_prompt[:120]}...")
 
         self._cancel_guard("before_sd_vram_cleanup")
-        unload_ollama()
-        for _ in range(6):
-            self._cancel_guard("sd_vram_cooldown")
-            time.sleep(0.25)
+        get_gpu_residency().acquire_for_sd(cancel_checker=self._is_cancelled)
 
         self._cancel_guard("before_sd_generation")
-        from core.clients.sd_client import resim_ciz
-
-        success, image_path, _ = resim_ciz(
-            final_prompt,
-            negative_prompt=self.SD_NEGATIVE_PROMPT,
-            cancel_checker=self.cancel_checker,
-        )
+        success, image_path, _ = self._render(final_prompt)
         self._cancel_guard("after_sd_generation")
 
         if not success:
@@ -125,11 +164,7 @@ class VisualDirectorAgent(BaseAgent):
             retry_prompt = self._fallback_retry_prompt(target_news)
             state.visual_prompts.append(retry_prompt)
             self.log("First SD attempt failed. Retrying with fallback prompt.")
-            success, image_path, _ = resim_ciz(
-                retry_prompt,
-                negative_prompt=self.SD_NEGATIVE_PROMPT,
-                cancel_checker=self.cancel_checker,
-            )
+            success, image_path, _ = self._render(retry_prompt)
             self._cancel_guard("after_sd_retry")
 
         if success and image_path:
@@ -0,0 +1,321 @@
+"""
+Forge API'sini taklit eden kucuk yerel sunucu (GPU'suz yuk testi ve gelistirme).
+
+Onceden sd_client yalnizca gercek Forge'a konusabiliyordu; GPU'suz bir
+makinede carousel/video akislarini ya da yuk altindaki davranisi denemek
+mumkun degildi.
+
+FakeForgeServer standart kutuphane HTTP sunucusudur ve sd_client'in
+kullandigi uclari cevaplar:
+
+- POST /sdapi/v1/txt2img, /img2img  -> prompt + seed + boyuttan deterministik
+  PNG (prompt listesi script'inde satir basina bir gorsel)
+- POST /sdapi/v1/extra-single-image -> `upscaling_resize` kadar buyutulmus PNG
+- POST /sdapi/v1/interrupt, GET /sdapi/v1/progress
+- yetenek uclari (options, scripts, upscalers, ...)
+
+Forge gibi ayni anda tek render calisir; digerleri sirada bekler.
+Gecikme ve hatalar FakeForgeConfig ile ayarlanir:
+
+- latency + latency_per_step x adim x megapiksel, +- jitter
+- errors: {500: 0.05, 503: 0.02} gibi durum kodu -> olasilik
+- seed'li RNG: ayni istek sirasi ayni gecikme/hata dizisini uretir
+
+Bagimsiz calistirma:
+    python -m core.clients.fake_forge --port 7860 --latency 2 --errors 500:0.05
+"""
+
+import argparse
+import base64
+import hashlib
+import io
+import json
+import logging
+import random
+import shlex
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+FAKE_CHECKPOINT = "fake-forge.safetensors"
+PROMPT_LIST_SCRIPT = "prompts from file or textbox"
+
+_CAPABILITIES: dict[str, Any] = {
+    "/sdapi/v1/options": {"sd_model_checkpoint": FAKE_CHECKPOINT},
+    "/sdapi/v1/sd-models": [{"title": FAKE_CHECKPOINT, "model_name": "fake-forge"}],
+    "/sdapi/v1/samplers": [{"name": "DPM++ 2M Karras"}, {"name": "Euler a"}],
+    "/sdapi/v1/upscalers": [{"name": "Latent (antialiased)"}, {"name": "4x-UltraSharp"}],
+    "/sdapi/v1/face-restorers": [{"name": "GFPGAN"}],
+    "/sdapi/v1/scripts": {"txt2img": [PROMPT_LIST_SCRIPT], "img2img": []},
+    "/sdapi/v1/extensions": [],
+    "/controlnet/model_list": {"model_list": []},
+    # Bytes, shaped like Forge's torch.cuda.mem_get_info based report.
+    "/sdapi/v1/memory": {"cuda": {"system": {"free": 8 << 30, "used": 4 << 30, "total": 12 << 30}}},
+}
+
+
+@dataclass
+class FakeForgeConfig:
+    latency: float = 0.5
+    latency_per_step: float = 0.0
+    jitter: float = 0.0
+    errors: dict[int, float] = field(default_factory=dict)
+    seed: int = 0
+
+
+def parse_errors(text: str) -> dict[int, float]:
+    """ "500:0.05,503:0.02" -> {500: 0.05, 503: 0.02}; bozuk parcalar atlanir."""
+    errors: dict[int, float] = {}
+    for part in (text or "").split(","):
+        code, _, rate = part.partition(":")
+        try:
+            errors[int(code)] = max(0.0, float(rate))
+        except ValueError:
+            continue
+    return errors
+
+
+def render_png(prompt: str, seed: int, width: int, height: int) -> bytes:
+    """Ayni girdiye hep ayni PNG; duz renk degil (taslak onayindan gecsin diye)."""
+    from PIL import Image, ImageDraw, ImageOps
+
+    digest = hashlib.sha256(f"{prompt}\x1f{seed}\x1f{width}x{height}".encode()).digest()
+
+    def color(offset: int) -> tuple[int, int, int]:
+        return tuple(60 + digest[offset + i] % 160 for i in range(3))
+
+    image = ImageOps.colorize(Image.linear_gradient("L").resize((width, height)), color(0), color(3))
+    draw = ImageDraw.Draw(image)
+    for i in range(3):
+        x, y = digest[6 + i] * width // 512, digest[9 + i] * height // 512
+        draw.rectangle((x, y, x + width // 4, y + height // 4), fill=color(12 + 3 * i))
+    out = io.BytesIO()
+    image.save(out, format="PNG", compress_level=1)
+    return out.getvalue()
+
+
+def _scale_png(image_b64: str, factor: float) -> bytes:
+    from PIL import Image
+
+    with Image.open(io.BytesIO(base64.b64decode(image_b64))) as image:
+        size = (max(1, round(image.width * factor)), max(1, round(image.height * factor)))
+        out = io.BytesIO()
+        image.convert("RGB").resize(size).save(out, format="PNG", compress_level=1)
+    return out.getvalue()
+
+
+def _prompt_list_jobs(payload: dict[str, Any]) -> list[tuple[str, int]]:
+    """Prompt listesi script'inin "--prompt ... --seed ..." satirlari."""
+    args = payload.get("script_args") or []
+    text = args[3] if len(args) > 3 and isinstance(args[3], str) else ""
+    jobs = []
+    for line in text.splitlines():
+        tokens = shlex.split(line)
+        options = dict(zip(tokens[::2], tokens[1::2], strict=False))
+        jobs.append((options.get("--prompt", ""), int(options.get("--seed", payload.get("seed") or 0))))
+    return jobs
+
+
+class FakeForgeServer:
+    """Thread'de calisan sahte Forge; `with FakeForgeServer() as server:` ile de kullanilir."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, *, config: FakeForgeConfig | None = None):
+        self.config = config or FakeForgeConfig()
+        self._rng = random.Random(self.config.seed)
+        self._rng_lock = threading.Lock()
+        self._gpu = threading.Lock()
+        self._state_lock = threading.Lock()
+        self._interrupted = threading.Event()
+        self._job: tuple[float, float, int] | None = None  # (baslangic, sure, adim)
+        self._counts: Counter[str] = Counter()
+        self._httpd = ThreadingHTTPServer((host, port), _make_handler(self))
+        self._httpd.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeForgeServer":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._httpd.serve_forever, name="fake-forge", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._interrupted.set()
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def serve_forever(self) -> None:
+        """Cagiran thread'de calisir (komut satiri icin); Ctrl+C ile durur."""
+        try:
+            self._httpd.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._httpd.server_close()
+
+    def __enter__(self) -> "FakeForgeServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def stats(self) -> dict[str, int]:
+        with self._state_lock:
+            return dict(self._counts)
+
+    def _count(self, key: str) -> None:
+        with self._state_lock:
+            self._counts[key] += 1
+
+    def _draw(self) -> tuple[float, int | None]:
+        """Bu istek icin (ek gecikme, hata kodu)."""
+        with self._rng_lock:
+            jitter = self._rng.uniform(-self.config.jitter, self.config.jitter) if self.config.jitter else 0.0
+            roll = self._rng.random()
+        for code, rate in self.config.errors.items():
+            if roll < rate:
+                return jitter, code
+            roll -= rate
+        return jitter, None
+
+    def _delay(self, payload: dict[str, Any], images: int) -> float:
+        steps = int(payload.get("steps") or 0)
+        megapixels = int(payload.get("width") or 0) * int(payload.get("height") or 0) / 1_000_000
+        return self.config.latency + self.config.latency_per_step * steps * megapixels * max(1, images)
+
+    def generate(self, payload: dict[str, Any]) -> tuple[int, dict[str, Any]]:
+        jobs = (
+            _prompt_list_jobs(payload)
+            if str(payload.get("script_name") or "").lower() == PROMPT_LIST_SCRIPT
+            else [(str(payload.get("prompt") or ""), int(payload.get("seed") or 0))]
+        )
+        jitter, error = self._draw()
+        delay = max(0.0, self._delay(payload, len(jobs)) + jitter)
+        with self._gpu:
+            self._interrupted.clear()
+            with self._state_lock:
+                self._job = (time.monotonic(), delay, int(payload.get("steps") or 0))
+            try:
+                self._interrupted.wait(delay)
+            finally:
+                with self._state_lock:
+                    self._job = None
+        if error is not None:
+            self._count(f"error_{error}")
+            return error, {"error": "FakeForgeError", "detail": f"Simulated HTTP {error}"}
+        width, height = int(payload.get("width") or 512), int(payload.get("height") or 512)
+        images = [base64.b64encode(render_png(prompt, seed, width, height)).decode() for prompt, seed in jobs]
+        info = {"seed": jobs[0][1], "all_seeds": [seed for _, seed in jobs], "sd_model_name": FAKE_CHECKPOINT}
+        return 200, {"images": images, "parameters": {}, "info": json.dumps(info)}
+
+    def upscale(self, payload: dict[str, Any]) -> tuple[int, dict[str, Any]]:
+        try:
+            image = _scale_png(payload["image"], float(payload.get("upscaling_resize") or 1.0))
+        except (KeyError, ValueError, OSError):
+            return 422, {"error": "ValidationError", "detail": "image could not be decoded"}
+        return 200, {"image": base64.b64encode(image).decode(), "html_info": ""}
+
+    def interrupt(self) -> None:
+        self._interrupted.set()
+
+    def progress(self) -> dict[str, Any]:
+        with self._state_lock:
+            job = self._job
+        if job is None:
+            return {"progress": 0, "eta_relative": 0, "state": {}, "current_image": None}
+        started, duration, steps = job
+        fraction = min(1.0, (time.monotonic() - started) / duration) if duration > 0 else 1.0
+        return {
+            "progress": round(fraction, 3),
+            "eta_relative": round(max(0.0, duration * (1 - fraction)), 2),
+            "state": {"sampling_step": int(steps * fraction), "sampling_steps": steps, "job_no": 0, "job_count": 1},
+            "current_image": None,
+        }
+
+
+def _make_handler(fake: FakeForgeServer) -> type[BaseHTTPRequestHandler]:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):  # noqa: A002 - BaseHTTPRequestHandler imzasi
+            logger.debug("fake-forge: " + format, *args)
+
+        def _send(self, status: int, body: Any) -> None:
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):  # noqa: N802
+            path = self.path.split("?", 1)[0]
+            fake._count(path)
+            if path == "/sdapi/v1/progress":
+                self._send(200, fake.progress())
+            elif path in _CAPABILITIES:
+                self._send(200, _CAPABILITIES[path])
+            else:
+                self._send(404, {"detail": "Not Found"})
+
+        def do_POST(self):  # noqa: N802
+            path = self.path.split("?", 1)[0]
+            fake._count(path)
+            length = int(self.headers.get("Content-Length") or 0)
+            try:
+                payload = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError:
+                self._send(422, {"detail": "Invalid JSON"})
+                return
+            if path in ("/sdapi/v1/txt2img", "/sdapi/v1/img2img"):
+                self._send(*fake.generate(payload))
+            elif path == "/sdapi/v1/extra-single-image":
+                self._send(*fake.upscale(payload))
+            elif path == "/sdapi/v1/interrupt":
+                fake.interrupt()
+                self._send(200, {})
+            elif path in ("/sdapi/v1/unload-checkpoint", "/sdapi/v1/reload-checkpoint"):
+                self._send(200, {})
+            else:
+                self._send(404, {"detail": "Not Found"})
+
+    return Handler
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Forge API'sini taklit eden yerel sunucu")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7860)
+    parser.add_argument("--latency", type=float, default=0.5, help="render basina sabit sure (sn)")
+    parser.add_argument("--latency-per-step", type=float, default=0.0, help="adim x megapiksel basina sure (sn)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="gecikmeye eklenen +- rastgele sure (sn)")
+    parser.add_argument("--errors", default="", help='durum kodu olasiliklari, ornek "500:0.05,503:0.02"')
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    config = FakeForgeConfig(
+        latency=args.latency,
+        latency_per_step=args.latency_per_step,
+        jitter=args.jitter,
+        errors=parse_errors(args.errors),
+        seed=args.seed,
+    )
+    server = FakeForgeServer(args.host, args.port, config=config)
+    print(f"Fake Forge listening on {server.url}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
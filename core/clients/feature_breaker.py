@@ -0,0 +1,152 @@
+"""
+Forge eklentileri (ADetailer, ControlNet) icin ozellik bazli devre kesici.
+
+Onceden resim_ciz her render'da once "enhanced" payload'i (alwayson script'ler
+dahil) deniyor, hata alinca base payload'a dusuyordu. Bir eklenti bozuksa her
+render once basarisiz olacagi bilinen bir istegin bedelini oduyordu.
+
+FeatureBreaker her ozellik icin son hatalari hatirlar:
+
+- closed     -> ozellik kullanilir
+- open       -> art arda `threshold` hata; `cooldown` saniye boyunca atlanir
+- half_open  -> bekleme bitti; yalnizca bir render deneme yapar (paralel
+                render'lar sonucu beklerken atlar), basarirsa kapanir,
+                basarisiz olursa tekrar acilir. Sonucu hic bildirilmeyen
+                deneme (iptal, Forge kesintisi) `cooldown` sonra dusurulur.
+
+Durum `/api/sd/features` ile gorulebilir: hangi ozellik neden, ne zamana
+kadar atlaniyor.
+"""
+
+import threading
+import time
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from typing import Any
+
+from core.runtime.config import SD_FEATURE_BREAKER_COOLDOWN, SD_FEATURE_BREAKER_THRESHOLD
+
+
+@dataclass
+class FeatureState:
+    failures: int = 0
+    opened_until: float = 0.0
+    last_error: str | None = None
+    last_failure_at: float | None = None
+    last_success_at: float | None = None
+    skipped: int = 0
+    # half_open denemesinin baslangici; None = devam eden deneme yok.
+    trial_started_at: float | None = None
+
+
+class FeatureBreaker:
+    """Thread-safe; resim_ciz paralel thread'lerden cagrilabilir."""
+
+    def __init__(
+        self,
+        *,
+        threshold: int = SD_FEATURE_BREAKER_THRESHOLD,
+        cooldown: float = SD_FEATURE_BREAKER_COOLDOWN,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.threshold = max(1, int(threshold))
+        self.cooldown = max(0.0, float(cooldown))
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._features: dict[str, FeatureState] = {}
+
+    def _state(self, feature: str) -> FeatureState:
+        return self._features.setdefault(feature, FeatureState())
+
+    def _status(self, state: FeatureState, now: float) -> str:
+        if state.failures < self.threshold:
+            return "closed"
+        return "open" if now < state.opened_until else "half_open"
+
+    def allow(self, feature: str) -> bool:
+        """
+        Ozellik bu render'da kullanilabilir mi? half_open'da yalnizca ilk
+        cagiran deneme hakki alir. Atlanirsa sayaci arttirir.
+        """
+        now = self._clock()
+        with self._lock:
+            state = self._features.get(feature)
+            status = "closed" if state is None else self._status(state, now)
+            if status == "closed":
+                return True
+            if status == "half_open" and not self._trial_in_flight(state, now):
+                state.trial_started_at = now
+                return True
+            state.skipped += 1
+            return False
+
+    def _trial_in_flight(self, state: FeatureState, now: float) -> bool:
+        return state.trial_started_at is not None and now - state.trial_started_at < self.cooldown
+
+    def record_failure(self, features: Iterable[str], error: str | None = None) -> None:
+        now = self._clock()
+        with self._lock:
+            for feature in features:
+                state = self._state(feature)
+                state.failures += 1
+                state.last_error = (error or "")[:300] or None
+                state.last_failure_at = now
+                state.trial_started_at = None
+                if state.failures >= self.threshold:
+                    state.opened_until = now + self.cooldown
+
+    def record_success(self, features: Iterable[str]) -> None:
+        now = self._clock()
+        with self._lock:
+            for feature in features:
+                state = self._state(feature)
+                state.failures = 0
+                state.opened_until = 0.0
+                state.last_success_at = now
+                state.trial_started_at = None
+
+    def reset(self, feature: str | None = None) -> None:
+        """Elle kapatma (operator eklentiyi duzelttiginde)."""
+        with self._lock:
+            if feature is None:
+                self._features.clear()
+            else:
+                self._features.pop(feature, None)
+
+    def snapshot(self) -> dict[str, Any]:
+        now = self._clock()
+        with self._lock:
+            features = {
+                name: {
+                    "status": self._status(state, now),
+                    "failures": state.failures,
+                    "retry_in": round(max(0.0, state.opened_until - now), 1) if state.opened_until else 0.0,
+                    "last_error": state.last_error,
+                    "last_failure_at": state.last_failure_at,
+                    "last_success_at": state.last_success_at,
+                    "skipped": state.skipped,
+                    "trial_in_flight": self._trial_in_flight(state, now),
+                }
+                for name, state in sorted(self._features.items())
+            }
+        return {"threshold": self.threshold, "cooldown": self.cooldown, "features": features}
+
+
+_DEFAULT_BREAKER: FeatureBreaker | None = None
+_DEFAULT_BREAKER_LOCK = threading.Lock()
+
+
+def get_feature_breaker() -> FeatureBreaker:
+    """Uygulama genelinde tek devre kesici."""
+    global _DEFAULT_BREAKER
+    with _DEFAULT_BREAKER_LOCK:
+        if _DEFAULT_BREAKER is None:
+            _DEFAULT_BREAKER = FeatureBreaker()
+        return _DEFAULT_BREAKER
+
+
+def reset_feature_breaker() -> None:
+    """Testler ve ayar degisikligi icin tekil nesneyi birakir."""
+    global _DEFAULT_BREAKER
+    with _DEFAULT_BREAKER_LOCK:
+        _DEFAULT_BREAKER = None
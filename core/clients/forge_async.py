@@ -0,0 +1,255 @@
+"""
+Forge icin asyncio tabanli istemci ve senkron cephe.
+
+Onceden `_post_with_cancel` her Forge cagrisi icin bir daemon thread aciyor ve
+iptal kontrolunu 200 ms'de bir yokluyordu. Iptal edilen cagrinin thread'i ve
+soketi, istek bitene ya da timeout dolana kadar arkada calismaya devam
+ediyordu.
+
+AsyncForgeClient httpx.AsyncClient uzerinde calisir; istekler await edilen
+coroutine'lerdir. Task iptal edilince httpx baglantiyi kapatir.
+
+SyncForgeFacade mevcut senkron cagiranlar icin ince bir cephedir:
+
+- tek bir arka plan event loop thread'i ("forge-async-loop"); istek basina
+  thread acilmaz
+- `post_stream()` cevabi requests'in stream=True cevabi gibi doner
+  (`iter_content()` / `close()`), forge_stream.stream_images degismeden calisir
+- iptal kontrolu cagiranin thread'inde CANCEL_POLL_SECONDS araliklarla yapilir;
+  iptal gorulunce task iptal edilir (baglanti kapanir) ve
+  `/sdapi/v1/interrupt` gonderilir
+- httpx hatalari requests karsiliklarina cevrilir; sd_client'in hata yakalama
+  yollari degismez
+"""
+
+import asyncio
+import concurrent.futures
+import logging
+import threading
+from collections.abc import AsyncIterator, Callable, Coroutine, Iterator
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import Any, TypeVar
+
+import httpx
+import requests
+
+from core.errors import CancelledError
+from core.runtime.config import SD_API_URL, SD_HTTP_CONNECT_TIMEOUT, SD_HTTP_POOL_SIZE
+
+logger = logging.getLogger(__name__)
+
+CANCEL_POLL_SECONDS = 0.05
+
+T = TypeVar("T")
+
+
+def _as_requests_error(exc: httpx.HTTPError) -> requests.RequestException:
+    if isinstance(exc, httpx.TimeoutException):
+        return requests.Timeout(str(exc))
+    if isinstance(exc, httpx.HTTPStatusError):
+        return requests.HTTPError(str(exc))
+    if isinstance(exc, httpx.TransportError):
+        return requests.ConnectionError(str(exc))
+    return requests.RequestException(str(exc))
+
+
+class AsyncForgeClient:
+    """Havuzlanmis httpx.AsyncClient uzerinden Forge API'si; tek bir event loop'ta kullanilir."""
+
+    def __init__(
+        self,
+        base_url: str | None = None,
+        *,
+        pool_size: int = SD_HTTP_POOL_SIZE,
+        connect_timeout: float = SD_HTTP_CONNECT_TIMEOUT,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ):
+        self.base_url = (base_url or SD_API_URL).rstrip("/")
+        self.connect_timeout = connect_timeout
+        pool_size = max(1, int(pool_size))
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            transport=transport,
+        )
+
+    def _timeout(self, read_timeout: float) -> httpx.Timeout:
+        return httpx.Timeout(read_timeout, connect=min(self.connect_timeout, read_timeout))
+
+    @asynccontextmanager
+    async def stream(self, path: str, *, json: Any = None, timeout: float) -> AsyncIterator[httpx.Response]:
+        """POST; govde okunmadan cevap verilir. Blok bitince (ya da iptalde) baglanti kapanir."""
+        async with self._client.stream("POST", path, json=json, timeout=self._timeout(timeout)) as response:
+            response.raise_for_status()
+            yield response
+
+    async def post(self, path: str, *, json: Any = None, timeout: float) -> httpx.Response:
+        response = await self._client.post(path, json=json, timeout=self._timeout(timeout))
+        response.raise_for_status()
+        return response
+
+    async def interrupt(self, *, timeout: float = 2) -> bool:
+        """Devam eden cizimi en iyi cabayla durdurur."""
+        try:
+            await self.post("/sdapi/v1/interrupt", timeout=timeout)
+            return True
+        except httpx.HTTPError:
+            logger.warning("Stable Diffusion interrupt request failed", exc_info=True)
+            return False
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+
+async def _next_chunk(chunks) -> bytes | None:
+    try:
+        return await chunks.__anext__()
+    except StopAsyncIteration:
+        return None
+
+
+class StreamedResponse:
+    """requests'in stream=True cevabi gibi: `iter_content()` ve `close()`."""
+
+    def __init__(
+        self,
+        facade: "SyncForgeFacade",
+        stack: AsyncExitStack,
+        response: httpx.Response,
+        cancel_checker: Callable[[], bool] | None,
+    ):
+        self._facade = facade
+        self._stack = stack
+        self._response = response
+        self._cancel_checker = cancel_checker
+        self._chunks = None
+        self.status_code = response.status_code
+        self.closed = False
+
+    def iter_content(self, chunk_size: int | None = None) -> Iterator[bytes]:
+        self._chunks = self._response.aiter_bytes(chunk_size)
+        while True:
+            chunk = self._facade.wait(_next_chunk(self._chunks), self._cancel_checker)
+            if chunk is None:
+                return
+            yield chunk
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        chunks, stack = self._chunks, self._stack
+
+        async def _close() -> None:
+            if chunks is not None:
+                await chunks.aclose()
+            await stack.aclose()
+
+        try:
+            self._facade.run(_close(), timeout=5)
+        except Exception:
+            logger.warning("Stable Diffusion response could not be closed cleanly", exc_info=True)
+
+
+class SyncForgeFacade:
+    """AsyncForgeClient'i tek bir arka plan loop'unda calistirir; senkron cagiranlar icin."""
+
+    def __init__(self, client_factory: Callable[[], AsyncForgeClient] = AsyncForgeClient):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="forge-async-loop", daemon=True)
+        self._thread.start()
+        self.client = client_factory()
+
+    def run(self, coro: Coroutine[Any, Any, T], *, timeout: float | None = None) -> T:
+        """Coroutine'i loop'ta calistirip sonucunu bekler (iptal kontrolu yok)."""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result(timeout)
+
+    def wait(
+        self,
+        coro: Coroutine[Any, Any, T],
+        cancel_checker: Callable[[], bool] | None,
+        *,
+        on_abandon: Callable[[T], Any] | None = None,
+    ) -> T:
+        """
+        Coroutine'i bekler; iptal istenirse task'i iptal eder, interrupt gonderir
+        ve CancelledError firlatir. Task iptalden hemen once bittiyse sonucu
+        `on_abandon` ile temizlenir.
+        """
+        future = asyncio.run_coroutine_threadsafe(coro, self._loop)
+        while True:
+            try:
+                return future.result(CANCEL_POLL_SECONDS if cancel_checker else None)
+            except concurrent.futures.TimeoutError:
+                if not cancel_checker():
+                    continue
+            except httpx.HTTPError as exc:
+                raise _as_requests_error(exc) from exc
+            if not future.cancel() and on_abandon is not None:
+                future.add_done_callback(lambda done: done.exception() is None and on_abandon(done.result()))
+            self.interrupt()
+            raise CancelledError("Cancelled during SD generation")
+
+    def post_stream(
+        self,
+        path: str,
+        *,
+        json: Any = None,
+        timeout: float,
+        cancel_checker: Callable[[], bool] | None = None,
+    ) -> StreamedResponse:
+        """Basliklar gelince doner; govde `iter_content()` ile okunur."""
+
+        async def _open() -> tuple[AsyncExitStack, httpx.Response]:
+            stack = AsyncExitStack()
+            try:
+                response = await stack.enter_async_context(self.client.stream(path, json=json, timeout=timeout))
+            except BaseException:
+                await stack.aclose()
+                raise
+            return stack, response
+
+        def _abandon(opened: tuple[AsyncExitStack, httpx.Response]) -> None:
+            asyncio.run_coroutine_threadsafe(opened[0].aclose(), self._loop)
+
+        stack, response = self.wait(_open(), cancel_checker, on_abandon=_abandon)
+        return StreamedResponse(self, stack, response, cancel_checker)
+
+    def interrupt(self, *, timeout: float = 2) -> bool:
+        try:
+            return self.run(self.client.interrupt(timeout=timeout), timeout=timeout + 1)
+        except concurrent.futures.TimeoutError:
+            logger.warning("Stable Diffusion interrupt request timed out")
+            return False
+
+    def close(self) -> None:
+        try:
+            self.run(self.client.aclose(), timeout=5)
+        except Exception:
+            logger.warning("Async Forge client could not be closed cleanly", exc_info=True)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        if not self._thread.is_alive():
+            self._loop.close()
+
+
+_DEFAULT_FACADE: SyncForgeFacade | None = None
+_DEFAULT_FACADE_LOCK = threading.Lock()
+
+
+def get_forge_facade() -> SyncForgeFacade:
+    """Uygulama genelinde tek loop thread'i ve baglanti havuzu."""
+    global _DEFAULT_FACADE
+    with _DEFAULT_FACADE_LOCK:
+        if _DEFAULT_FACADE is None:
+            _DEFAULT_FACADE = SyncForgeFacade()
+        return _DEFAULT_FACADE
+
+
+def reset_forge_facade() -> None:
+    """Loop'u ve istemciyi kapatir; bir sonraki cagri yenisini kurar."""
+    global _DEFAULT_FACADE
+    with _DEFAULT_FACADE_LOCK:
+        if _DEFAULT_FACADE is not None:
+            _DEFAULT_FACADE.close()
+        _DEFAULT_FACADE = None
@@ -0,0 +1,151 @@
+"""
+Forge (Stable Diffusion WebUI) HTTP istemcisi.
+
+Onceki tasarimda sd_client.py her cagrida ciplak `requests.get/post`
+kullaniyordu; her istek yeni bir TCP baglantisi aciyordu ve tek bir carousel
+kosusu onlarca baglanti kurup kapatiyordu. Adres de `127.0.0.1:7860` olarak
+koda gomuluydu.
+
+ForgeClient tek bir havuzlanmis `requests.Session` tutar:
+
+- keep-alive baglantilar, `SD_HTTP_POOL_SIZE` ile sinirli havuz
+- yalnizca GET istekleri icin retry (txt2img gibi pahali POST'lar TEKRARLANMAZ)
+- baglanti timeout'u tek yerden (`SD_HTTP_CONNECT_TIMEOUT`)
+- taban adres `SD_API_URL` ortam degiskeninden
+"""
+
+import logging
+import threading
+from typing import Any
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from core.runtime.config import (
+    SD_API_URL,
+    SD_HTTP_BACKOFF,
+    SD_HTTP_CONNECT_TIMEOUT,
+    SD_HTTP_POOL_SIZE,
+    SD_HTTP_RETRIES,
+)
+
+logger = logging.getLogger(__name__)
+
+# Forge yeniden baslarken ya da model yuklerken bu kodlari donebiliyor.
+RETRY_STATUS_CODES = (502, 503, 504)
+
+# Forge kapaliyken UI'nin cokmemesi icin dondurulen bos ilerleme cevabi.
+IDLE_PROGRESS: dict[str, Any] = {"progress": 0, "state": {}}
+
+
+class ForgeClient:
+    """Havuzlanmis oturum uzerinden Forge API'sine erisim."""
+
+    def __init__(
+        self,
+        base_url: str | None = None,
+        *,
+        pool_size: int = SD_HTTP_POOL_SIZE,
+        retries: int = SD_HTTP_RETRIES,
+        backoff: float = SD_HTTP_BACKOFF,
+        connect_timeout: float = SD_HTTP_CONNECT_TIMEOUT,
+        session: requests.Session | None = None,
+    ):
+        self.base_url = (base_url or SD_API_URL).rstrip("/")
+        self.pool_size = max(1, int(pool_size))
+        self.retries = max(0, int(retries))
+        self.backoff = max(0.0, float(backoff))
+        self.connect_timeout = connect_timeout
+        self._session = session or self._build_session()
+
+    def _build_session(self) -> requests.Session:
+        retry = Retry(
+            total=self.retries,
+            connect=self.retries,
+            read=self.retries,
+            status=self.retries,
+            backoff_factor=self.backoff,
+            status_forcelist=RETRY_STATUS_CODES,
+            allowed_methods=frozenset({"GET"}),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_size,
+            pool_maxsize=self.pool_size,
+            max_retries=retry,
+        )
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def url(self, path: str) -> str:
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def _timeout(self, read_timeout: float) -> tuple[float, float]:
+        return (min(self.connect_timeout, read_timeout), read_timeout)
+
+    def get(self, path: str, *, timeout: float, **kwargs) -> requests.Response:
+        return self._session.get(self.url(path), timeout=self._timeout(timeout), **kwargs)
+
+    def post(self, path: str, *, json: Any = None, timeout: float, **kwargs) -> requests.Response:
+        return self._session.post(self.url(path), json=json, timeout=self._timeout(timeout), **kwargs)
+
+    def get_json(self, path: str, *, timeout: float = 3) -> Any | None:
+        """Basarisiz ya da JSON olmayan cevapta None doner (yetenek sorgulari icin)."""
+        try:
+            response = self.get(path, timeout=timeout)
+            if not response.ok:
+                return None
+            return response.json()
+        except (requests.RequestException, ValueError):
+            logger.warning("Stable Diffusion request failed: %s", self.url(path), exc_info=True)
+            return None
+
+    def interrupt(self, *, timeout: float = 2) -> bool:
+        """Devam eden cizimi en iyi cabayla durdurur."""
+        try:
+            self.post("/sdapi/v1/interrupt", timeout=timeout)
+            return True
+        except requests.RequestException:
+            logger.warning("Stable Diffusion interrupt request failed", exc_info=True)
+            return False
+
+    def progress(self, *, timeout: float = 2, skip_current_image: bool = False) -> dict[str, Any]:
+        """`/sdapi/v1/progress` cevabi; Forge erisilemezse bos ilerleme."""
+        params = {"skip_current_image": "true"} if skip_current_image else None
+        try:
+            response = self.get("/sdapi/v1/progress", timeout=timeout, params=params)
+            if response.status_code == 200:
+                data = response.json()
+                if isinstance(data, dict):
+                    return data
+        except (requests.RequestException, ValueError):
+            logger.warning("Stable Diffusion progress request failed", exc_info=True)
+        return dict(IDLE_PROGRESS)
+
+    def close(self) -> None:
+        self._session.close()
+
+
+_DEFAULT_CLIENT: ForgeClient | None = None
+_DEFAULT_CLIENT_LOCK = threading.Lock()
+
+
+def get_forge_client() -> ForgeClient:
+    """Uygulama genelinde paylasilan istemci (havuz tek olsun diye)."""
+    global _DEFAULT_CLIENT
+    with _DEFAULT_CLIENT_LOCK:
+        if _DEFAULT_CLIENT is None:
+            _DEFAULT_CLIENT = ForgeClient()
+        return _DEFAULT_CLIENT
+
+
+def reset_forge_client() -> None:
+    """Paylasilan istemciyi kapatir; bir sonraki cagri yenisini kurar."""
+    global _DEFAULT_CLIENT
+    with _DEFAULT_CLIENT_LOCK:
+        if _DEFAULT_CLIENT is not None:
+            _DEFAULT_CLIENT.close()
+        _DEFAULT_CLIENT = None
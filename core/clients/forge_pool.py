@@ -0,0 +1,404 @@
+"""
+Birden fazla Forge host'u uzerinde yuk dengeleyen gorsel backend'i.
+
+Onceden sd_client tek bir Forge adresine (SD_API_URL) konusuyordu ve
+JobRegistry ayni anda tek GPU isine izin veriyordu; birden fazla GPU makinesi
+olsa da carousel/video render'lari tek makinede sirayla calisiyordu.
+
+ForgePool SD_API_URLS'deki her host icin ayri bir ForgeClient ve async cephe
+(kendi baglanti havuzu ve event loop'u) tutar:
+
+- saglik kontrolu: arka planda SD_POOL_HEALTH_INTERVAL saniyede bir options,
+  scripts ve sd-models sorgulanir; cevaplar host basina saklanir (yuklu
+  checkpoint, script'ler, checkpoint listesi)
+- dagitim: `lease(payload)` en az isi olan uygun host'u secer; payload'in
+  checkpoint'i o host'ta yoksa ya da alwayson script'i kurulu degilse host
+  atlanir, esitlikte checkpoint'i zaten yuklu olan host tercih edilir
+- failover: baglanti kurulamayan host SD_POOL_FAILURE_COOLDOWN boyunca
+  atlanir ve istek (Forge'a hic ulasmadigi icin) baska bir host'ta denenir;
+  timeout gibi yari kalmis istekler tekrarlanmaz
+- yetenek sorgulari (GET) tum hostlara gider ve ortak kume doner; payload'a
+  yalnizca her host'ta bulunan upscaler/script/model girer
+
+Lease suresince post_stream, interrupt ve progress kiralanan host'a gider
+(ContextVar ile; cagiran thread'e baglidir). ProgressSampler ve render
+gozcusu lease nesnesinin kendisini kullanir; boylece her render yalnizca
+kendi host'unun ilerlemesini gorur ve yalnizca kendi host'unu keser. Lease
+disindaki interrupt yalnizca iptal istenmis islerin host'larini hedefler;
+hedef yoksa hicbir host kesilmez.
+"""
+
+import contextvars
+import logging
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any
+
+import httpx
+import requests
+
+from core.clients.forge_async import AsyncForgeClient, StreamedResponse, SyncForgeFacade
+from core.clients.forge_client import IDLE_PROGRESS, ForgeClient
+from core.runtime.config import SD_POOL_FAILURE_COOLDOWN, SD_POOL_HEALTH_INTERVAL
+from core.runtime.jobs import Job, current_job
+
+logger = logging.getLogger(__name__)
+
+# Saglik kontrolunde host basina saklanan cevaplar.
+_HEALTH_PROBES = ("/sdapi/v1/options", "/sdapi/v1/scripts", "/sdapi/v1/sd-models")
+
+
+def _names(items: list[Any]) -> list[str] | None:
+    """`[{"name": ...}, ...]` ya da duz metin listesi; baska bir sekilse None."""
+    names = []
+    for item in items:
+        if isinstance(item, dict) and item.get("name"):
+            names.append(str(item["name"]))
+        elif isinstance(item, str):
+            names.append(item)
+        else:
+            return None
+    return names
+
+
+def common_capabilities(answers: list[Any]) -> Any:
+    """
+    Hostlarin ayni uca verdigi cevaplarin ortak kumesi: listelerde her
+    host'ta bulunan ogeler, sozluklerde liste degerleri icin ayni kural;
+    diger degerler ilk cevaptan alinir.
+    """
+    answers = [answer for answer in answers if answer is not None]
+    if not answers:
+        return None
+    first = answers[0]
+    if isinstance(first, list) and all(isinstance(answer, list) for answer in answers):
+        names = [_names(answer) for answer in answers]
+        if any(n is None for n in names):
+            return first
+        shared = set.intersection(*(set(n) for n in names))
+        return [item for item, name in zip(first, names[0], strict=True) if name in shared]
+    if isinstance(first, dict) and all(isinstance(answer, dict) for answer in answers):
+        merged = dict(first)
+        for key, value in first.items():
+            if isinstance(value, list):
+                merged[key] = common_capabilities([answer.get(key) or [] for answer in answers])
+        return merged
+    return first
+
+
+@dataclass
+class ForgeHost:
+    url: str
+    client: ForgeClient
+    facade: SyncForgeFacade
+    in_flight: int = 0
+    healthy: bool = True
+    down_until: float = 0.0
+    failures: int = 0
+    renders: int = 0
+    # Son saglik kontrolunde okunanlar; None = bilinmiyor (host her is icin uygun sayilir).
+    loaded_checkpoint: str | None = None
+    scripts: frozenset[str] | None = None
+    checkpoints: frozenset[str] | None = None
+    capabilities: dict[str, Any] = field(default_factory=dict)
+
+    def close(self) -> None:
+        self.client.close()
+        self.facade.close()
+
+
+@dataclass(eq=False)
+class PoolLease:
+    """Kiralanan host; failover'da `host` degisebilir."""
+
+    pool: "ForgePool"
+    host: ForgeHost
+    owner: Job | None
+    started: float
+
+    @property
+    def base_url(self) -> str:
+        return self.host.url
+
+    def interrupt(self, *, timeout: float = 2) -> bool:
+        return self.host.client.interrupt(timeout=timeout)
+
+    def progress(self, *, timeout: float = 2, skip_current_image: bool = False) -> dict[str, Any]:
+        return self.host.client.progress(timeout=timeout, skip_current_image=skip_current_image)
+
+
+_CURRENT_LEASE: contextvars.ContextVar[PoolLease | None] = contextvars.ContextVar("forge_pool_lease", default=None)
+
+
+def _required_scripts(payload: dict[str, Any]) -> set[str]:
+    scripts = {str(name).lower() for name in payload.get("alwayson_scripts") or {}}
+    if payload.get("script_name"):
+        scripts.add(str(payload["script_name"]).lower())
+    return scripts
+
+
+def _requested_checkpoint(payload: dict[str, Any]) -> str:
+    return str((payload.get("override_settings") or {}).get("sd_model_checkpoint") or "")
+
+
+def _never_reached_host(exc: requests.RequestException) -> bool:
+    # forge_async httpx hatalarini requests'e cevirir; asil sebep __cause__'da.
+    return isinstance(exc.__cause__, (httpx.ConnectError, httpx.ConnectTimeout))
+
+
+class ForgePool:
+    """Thread-safe; her host icin ayri istemci, lease basina tek host."""
+
+    name = "pool"
+
+    def __init__(
+        self,
+        urls: list[str],
+        *,
+        health_interval: float = SD_POOL_HEALTH_INTERVAL,
+        failure_cooldown: float = SD_POOL_FAILURE_COOLDOWN,
+        host_factory: Callable[[str], ForgeHost] | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if not urls:
+            raise ValueError("ForgePool needs at least one host URL")
+        factory = host_factory or self._default_host
+        self.hosts = [factory(url.rstrip("/")) for url in urls]
+        self.failure_cooldown = max(0.0, float(failure_cooldown))
+        self._clock = clock
+        self._lock = threading.RLock()
+        self._leases: list[PoolLease] = []
+        self._stop = threading.Event()
+        self._health_thread: threading.Thread | None = None
+        if health_interval > 0:
+            self._health_thread = threading.Thread(
+                target=self._health_loop, args=(float(health_interval),), name="forge-pool-health", daemon=True
+            )
+            self._health_thread.start()
+
+    @staticmethod
+    def _default_host(url: str) -> ForgeHost:
+        return ForgeHost(url, ForgeClient(url), SyncForgeFacade(lambda: AsyncForgeClient(url)))
+
+    @property
+    def capacity(self) -> int:
+        return len(self.hosts)
+
+    @property
+    def base_url(self) -> str:
+        return self._available()[0].url
+
+    # -- saglik --
+
+    def _is_available(self, host: ForgeHost, now: float) -> bool:
+        return host.healthy or now >= host.down_until
+
+    def _available(self) -> list[ForgeHost]:
+        """Kullanilabilir hostlar; hepsi dusukse en erken geri donecek olan."""
+        now = self._clock()
+        with self._lock:
+            available = [host for host in self.hosts if self._is_available(host, now)]
+            return available or [min(self.hosts, key=lambda host: host.down_until)]
+
+    def mark_down(self, host: ForgeHost, reason: str) -> None:
+        with self._lock:
+            host.healthy = False
+            host.failures += 1
+            host.down_until = self._clock() + self.failure_cooldown
+        logger.warning("Forge host %s marked down for %.0fs: %s", host.url, self.failure_cooldown, reason)
+
+    def _mark_up(self, host: ForgeHost) -> None:
+        with self._lock:
+            was_down = not host.healthy
+            host.healthy = True
+            host.down_until = 0.0
+        if was_down:
+            logger.info("Forge host %s is back", host.url)
+
+    def check_health(self) -> int:
+        """Tum hostlari sorgular, host basina yetenekleri gunceller; saglikli host sayisini dondurur."""
+        healthy = 0
+        for host in self.hosts:
+            answers = {path: host.client.get_json(path, timeout=3) for path in _HEALTH_PROBES}
+            options = answers["/sdapi/v1/options"]
+            if not isinstance(options, dict):
+                self.mark_down(host, "health check failed")
+                continue
+            scripts = answers["/sdapi/v1/scripts"]
+            models = answers["/sdapi/v1/sd-models"]
+            with self._lock:
+                host.capabilities.update({path: data for path, data in answers.items() if data is not None})
+                host.loaded_checkpoint = str(options.get("sd_model_checkpoint") or "") or None
+                if isinstance(scripts, dict):
+                    host.scripts = frozenset(
+                        str(name).lower() for values in scripts.values() if isinstance(values, list) for name in values
+                    )
+                if isinstance(models, list):
+                    host.checkpoints = frozenset(
+                        str(model.get(key))
+                        for model in models
+                        if isinstance(model, dict)
+                        for key in ("title", "model_name")
+                        if model.get(key)
+                    )
+            self._mark_up(host)
+            healthy += 1
+        return healthy
+
+    def _health_loop(self, interval: float) -> None:
+        while not self._stop.is_set():
+            try:
+                self.check_health()
+            except Exception:  # Saglik dongusu asla durmamali.
+                logger.exception("Forge pool health check failed")
+            self._stop.wait(interval)
+
+    # -- dagitim --
+
+    def _eligible(self, host: ForgeHost, payload: dict[str, Any]) -> bool:
+        checkpoint = _requested_checkpoint(payload)
+        if checkpoint and host.checkpoints is not None and checkpoint not in host.checkpoints:
+            return False
+        scripts = _required_scripts(payload)
+        return not scripts or host.scripts is None or scripts <= host.scripts
+
+    def _select(self, payload: dict[str, Any], *, exclude: tuple[ForgeHost, ...] = ()) -> ForgeHost:
+        candidates = [host for host in self._available() if host not in exclude] or [
+            host for host in self.hosts if host not in exclude
+        ]
+        if not candidates:
+            raise requests.ConnectionError("No Forge host left to try")
+        with self._lock:
+            eligible = [host for host in candidates if self._eligible(host, payload)] or candidates
+            checkpoint = _requested_checkpoint(payload)
+            return min(
+                eligible,
+                key=lambda host: (
+                    host.in_flight,
+                    bool(checkpoint) and host.loaded_checkpoint != checkpoint,
+                    self.hosts.index(host),
+                ),
+            )
+
+    def _move(self, lease: PoolLease, host: ForgeHost) -> None:
+        with self._lock:
+            lease.host.in_flight -= 1
+            host.in_flight += 1
+            lease.host = host
+
+    @contextmanager
+    def lease(self, payload: dict[str, Any] | None = None) -> Iterator[PoolLease]:
+        """Blok suresince bir host'u bu thread'e baglar; en az yuklu uygun host secilir."""
+        current = _CURRENT_LEASE.get()
+        if current is not None and current.pool is self:
+            # Ic ice lease (render icinde upscale gibi) ayni host'ta kalir.
+            yield current
+            return
+        with self._lock:
+            host = self._select(payload or {})
+            host.in_flight += 1
+            host.renders += 1
+            lease = PoolLease(self, host, current_job(), self._clock())
+            self._leases.append(lease)
+        token = _CURRENT_LEASE.set(lease)
+        try:
+            yield lease
+        finally:
+            _CURRENT_LEASE.reset(token)
+            with self._lock:
+                lease.host.in_flight -= 1
+                self._leases.remove(lease)
+
+    # -- ImageBackend --
+
+    def get_json(self, path: str, *, timeout: float = 3) -> Any | None:
+        """Lease icinde kiralanan host'a; disinda tum hostlara sorup ortak cevabi dondurur."""
+        lease = _CURRENT_LEASE.get()
+        if lease is not None and lease.pool is self:
+            return lease.host.client.get_json(path, timeout=timeout)
+        answers = []
+        for host in self._available():
+            data = host.client.get_json(path, timeout=timeout)
+            if data is not None:
+                with self._lock:
+                    host.capabilities[path] = data
+            answers.append(data)
+        return common_capabilities(answers)
+
+    def post_stream(
+        self,
+        path: str,
+        *,
+        json: Any = None,
+        timeout: float,
+        cancel_checker: Callable[[], bool] | None = None,
+    ) -> StreamedResponse:
+        with self.lease(json if isinstance(json, dict) else None) as lease:
+            tried: tuple[ForgeHost, ...] = ()
+            while True:
+                try:
+                    return lease.host.facade.post_stream(
+                        path, json=json, timeout=timeout, cancel_checker=cancel_checker
+                    )
+                except requests.RequestException as exc:
+                    if not _never_reached_host(exc):
+                        raise
+                    self.mark_down(lease.host, str(exc))
+                    tried += (lease.host,)
+                    try:
+                        fallback = self._select(json if isinstance(json, dict) else {}, exclude=tried)
+                    except requests.ConnectionError:
+                        raise exc from None
+                    logger.warning("Retrying %s on Forge host %s", path, fallback.url)
+                    self._move(lease, fallback)
+
+    def interrupt(self, *, timeout: float = 2) -> bool:
+        """Lease icinde o host; disinda yalnizca iptal istenmis islerin hostlari (yoksa hicbiri)."""
+        lease = _CURRENT_LEASE.get()
+        if lease is not None and lease.pool is self:
+            return lease.interrupt(timeout=timeout)
+        with self._lock:
+            targets = {
+                id(lease.host): lease.host
+                for lease in self._leases
+                if lease.owner is not None and lease.owner.cancel_requested
+            }
+        if not targets:
+            return False
+        return all([host.client.interrupt(timeout=timeout) for host in targets.values()])
+
+    def progress(self, *, timeout: float = 2, skip_current_image: bool = False) -> dict[str, Any]:
+        """Lease icinde o host; disinda en eski aktif render'in host'u (sampler lease'i kullanir)."""
+        lease = _CURRENT_LEASE.get()
+        if lease is None or lease.pool is not self:
+            with self._lock:
+                lease = min(self._leases, key=lambda item: item.started, default=None)
+        if lease is None:
+            return dict(IDLE_PROGRESS)
+        return lease.host.client.progress(timeout=timeout, skip_current_image=skip_current_image)
+
+    def snapshot(self) -> dict[str, Any]:
+        now = self._clock()
+        with self._lock:
+            hosts = [
+                {
+                    "url": host.url,
+                    "healthy": self._is_available(host, now),
+                    "in_flight": host.in_flight,
+                    "renders": host.renders,
+                    "failures": host.failures,
+                    "loaded_checkpoint": host.loaded_checkpoint,
+                }
+                for host in self.hosts
+            ]
+        return {"backend": self.name, "capacity": self.capacity, "hosts": hosts}
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._health_thread is not None:
+            self._health_thread.join(timeout=5)
+        for host in self.hosts:
+            host.close()
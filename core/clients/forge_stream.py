@@ -0,0 +1,274 @@
+"""
+Forge cevaplarindaki base64 gorselleri akista dosyaya cozen okuyucu.
+
+Onceden `resim_ciz` cok megabaytlik govdeyi `response.json()` ile bellege
+aliyor, base64 dizgisini upscale icin tekrar Forge'a yolluyor, donen yeni
+dizgiyi de `save_image_base64` icinde tek seferde cozuyordu. 1024x1024 +
+upscale'de her render icin gorselin birkac tam kopyasi ayni anda bellekte
+duruyordu.
+
+ForgeImageStream govdeyi parca parca okur:
+
+- ust seviyedeki `"images": [...]` dizisindeki ve `"image": "..."`
+  alanindaki base64 dizgileri cozulerek dogrudan hedef dosyaya yazilir
+- geri kalan her sey (info, parameters, error...) gorsel dizgileri `""`
+  ile degistirilmis kucuk bir "iskelet" JSON olarak saklanir ve sonunda
+  normal sekilde parse edilir
+- bozuk bir gorsel sadece kendi dosyasini kaybeder; digerleri etkilenmez
+"""
+
+import binascii
+import json
+import logging
+import os
+from collections.abc import Callable, Iterable
+from typing import Any, BinaryIO
+
+logger = logging.getLogger(__name__)
+
+IMAGE_KEYS = ("images", "image")
+STREAM_CHUNK_SIZE = 64 * 1024
+
+_STRUCT, _STRING, _IMAGE = range(3)
+_QUOTE = ord('"')
+_BACKSLASH = ord("\\")
+_LBRACKET = ord("[")
+_OPENERS = b"{["
+_CLOSERS = b"}]"
+
+
+class ForgeImageStream:
+    """
+    Artimli JSON okuyucu. `path_for(index)` her gorsel icin hedef dosya yolunu
+    verir; None donerse o gorsel atlanir (yazilmaz).
+    """
+
+    def __init__(self, path_for: Callable[[int], str | None], *, image_keys: Iterable[str] = IMAGE_KEYS):
+        self._path_for = path_for
+        self._image_keys = frozenset(image_keys)
+        self.paths: list[str | None] = []
+        self._skeleton = bytearray()
+        self._stack = bytearray()
+        self._key: str | None = None
+        self._expect_value = False
+        self._in_image_array = False
+        self._mode = _STRUCT
+        self._string = bytearray()
+        self._string_is_key = False
+        self._sink: BinaryIO | None = None
+        self._carry = b""
+        self._written = 0
+
+    # ------------------------------------------------------------------ feed
+    def feed(self, chunk: bytes) -> None:
+        i = 0
+        n = len(chunk)
+        while i < n:
+            if self._mode == _IMAGE:
+                # base64 icinde tirnak olamaz; ilk tirnak dizgiyi bitirir.
+                j = chunk.find(b'"', i)
+                self._write_image(chunk[i : n if j < 0 else j])
+                if j < 0:
+                    return
+                self._end_image()
+                i = j + 1
+                continue
+
+            if self._mode == _STRING:
+                j = self._find_string_end(chunk, i)
+                if j < 0:
+                    self._string += chunk[i:]
+                    return
+                self._string += chunk[i:j]
+                self._end_string()
+                i = j + 1
+                continue
+
+            c = chunk[i]
+            i += 1
+            if c == _QUOTE:
+                if self._at_image_value():
+                    self._start_image()
+                else:
+                    self._mode = _STRING
+                    self._string = bytearray()
+                    self._string_is_key = self._stack == b"{" and not self._expect_value
+                continue
+
+            self._skeleton.append(c)
+            if c in _OPENERS:
+                if c == _LBRACKET and self._stack == b"{" and self._expect_value:
+                    self._in_image_array = self._key in self._image_keys
+                self._stack.append(c)
+                self._expect_value = c == _LBRACKET
+            elif c in _CLOSERS:
+                if not self._stack:
+                    raise ValueError("Unbalanced JSON in Forge response")
+                self._stack.pop()
+                if len(self._stack) < 2:
+                    self._in_image_array = False
+                self._expect_value = False
+            elif c == ord(":"):
+                self._expect_value = True
+            elif c == ord(","):
+                self._expect_value = self._stack[-1:] == b"["
+
+    def close(self) -> dict[str, Any]:
+        """Akis bitti; iskelet JSON'u dondurur. Yarim kalan govde ValueError."""
+        if self._mode != _STRUCT or self._stack:
+            self._abort_image()
+            raise ValueError("Truncated Forge response")
+        result = json.loads(bytes(self._skeleton))
+        if not isinstance(result, dict):
+            raise ValueError(f"Forge returned a non-object response: {type(result).__name__}")
+        return result
+
+    # --------------------------------------------------------------- strings
+    def _find_string_end(self, chunk: bytes, start: int) -> int:
+        j = chunk.find(b'"', start)
+        while j >= 0:
+            backslashes = 0
+            k = j - 1
+            while k >= start and chunk[k] == _BACKSLASH:
+                backslashes += 1
+                k -= 1
+            if k < start:
+                # Kacis dizisi onceki parcadan devam ediyor olabilir.
+                tail = len(self._string) - 1
+                while tail >= 0 and self._string[tail] == _BACKSLASH:
+                    backslashes += 1
+                    tail -= 1
+            if backslashes % 2 == 0:
+                return j
+            j = chunk.find(b'"', j + 1)
+        return -1
+
+    def _end_string(self) -> None:
+        raw = b'"' + bytes(self._string) + b'"'
+        self._skeleton += raw
+        if self._string_is_key:
+            self._key = json.loads(raw)
+        self._string = bytearray()
+        self._mode = _STRUCT
+
+    # ---------------------------------------------------------------- images
+    def _at_image_value(self) -> bool:
+        if self._stack == b"{":
+            return self._expect_value and self._key in self._image_keys
+        return self._in_image_array and self._stack == b"{["
+
+    def _start_image(self) -> None:
+        self._skeleton += b'""'
+        self._mode = _IMAGE
+        self._carry = b""
+        self._written = 0
+        path = self._path_for(len(self.paths))
+        self.paths.append(path)
+        if path is None:
+            return
+        try:
+            self._sink = open(path, "wb")
+        except OSError:
+            logger.exception("Could not open %s for a streamed Forge image", path)
+            self.paths[-1] = None
+
+    def _write_image(self, segment: bytes) -> None:
+        if self._sink is None:
+            return
+        data = self._carry + segment
+        # JSON "/" kacisini ("\/") coz; parca sonundaki ters bolu bekletilir.
+        tail = b"\\" if data.endswith(b"\\") else b""
+        if tail:
+            data = data[:-1]
+        if b"\\" in data:
+            data = data.replace(b"\\/", b"/")
+        usable = len(data) - len(data) % 4
+        self._carry = data[usable:] + tail
+        if not usable:
+            return
+        try:
+            decoded = binascii.a2b_base64(data[:usable])
+            self._sink.write(decoded)
+            self._written += len(decoded)
+        except (binascii.Error, OSError):
+            logger.exception("Streamed Forge image %s could not be decoded", len(self.paths))
+            self._abort_image()
+
+    def _end_image(self) -> None:
+        self._mode = _STRUCT
+        if self._sink is None:
+            return
+        try:
+            if self._carry:
+                decoded = binascii.a2b_base64(self._carry)
+                self._sink.write(decoded)
+                self._written += len(decoded)
+            self._sink.close()
+        except (binascii.Error, OSError):
+            logger.exception("Streamed Forge image %s could not be decoded", len(self.paths))
+            self._abort_image()
+            return
+        self._sink = None
+        if not self._written:
+            logger.error("Forge returned an empty image at index %s", len(self.paths) - 1)
+            self._discard_last()
+
+    def discard(self) -> None:
+        """Yazilmis butun dosyalari siler (gecersiz cevap sonrasi temizlik)."""
+        self._abort_image()
+        for index, path in enumerate(self.paths):
+            if path:
+                remove_quietly(path)
+                self.paths[index] = None
+
+    def _abort_image(self) -> None:
+        if self._sink is None:
+            return
+        try:
+            self._sink.close()
+        except OSError:
+            pass
+        self._sink = None
+        self._discard_last()
+
+    def _discard_last(self) -> None:
+        path = self.paths[-1]
+        self.paths[-1] = None
+        if path:
+            remove_quietly(path)
+
+
+def remove_quietly(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except OSError:
+        logger.warning("Could not remove image %s", path, exc_info=True)
+
+
+def stream_images(
+    response,
+    path_for: Callable[[int], str | None],
+    *,
+    chunk_size: int = STREAM_CHUNK_SIZE,
+) -> tuple[dict[str, Any], list[str | None]]:
+    """
+    `stream=True` ile alinmis bir cevabi tuketir. (iskelet sonuc, dosya
+    yollari) dondurur; yollar cevaptaki gorsel sirasiyla eslesir, cozulemeyen
+    gorsel icin None. Gecersiz ya da yarim JSON ValueError firlatir; akis
+    hangi sebeple yarida kalirsa kalsin (baglanti hatasi, iptal, gozcu
+    interrupt'i) o ana kadar ayrilmis ve yazilmis dosyalar silinir.
+    """
+    decoder = ForgeImageStream(path_for)
+    try:
+        for chunk in response.iter_content(chunk_size=chunk_size):
+            if chunk:
+                decoder.feed(chunk)
+        return decoder.close(), decoder.paths
+    except BaseException:
+        # Yarim dosyalar diger kod tarafindan bitmis gorsel sanilmamali.
+        decoder.discard()
+        raise
+    finally:
+        response.close()
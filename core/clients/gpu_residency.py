@@ -0,0 +1,308 @@
+"""
+Ollama <-> Forge VRAM devri.
+
+Onceden devir her yerde elle yapiliyordu: VisualDirectorAgent, carousel ve
+gunluk video `unload_ollama()` cagirip 1.5 sn uyuyordu; caption oncesi "GPU
+sogumasi" icin 4 sn, `llm_answer` denemeleri arasinda 5 sn bekleniyordu. Model
+zaten bosalmis ya da iki model ayni anda sigiyor olsa bile ayni bedel
+odeniyordu; bosaltma 1.5 sn'den uzun surerse de Forge yer bulamiyordu.
+
+GpuResidencyManager GPU'da kimin oldugunu sorar, tahmin etmez:
+
+- Ollama: `/api/ps` hangi modellerin yuklu oldugunu ve VRAM payini verir.
+- Forge: `/sdapi/v1/memory` bos VRAM'i verir (tek host'ta; havuzda hostlar
+  baska makinelerde olabilecegi icin olculmez).
+
+`acquire_for_sd` Ollama'yi yalnizca Forge'un bos VRAM'i `GPU_SD_REQUIRED_MB`'nin
+altindaysa bosaltir, sonra sabit sure yerine `/api/ps` bos diyene ve Forge'da
+yer acilana kadar (en fazla `GPU_HANDOFF_TIMEOUT` sn) bekler.
+
+`acquire_for_llm` ters yondeki devirdir. GPU Forge'dan LLM'e gecerken (ilk
+LLM cagrisinda bir kez) Forge bostaysa, Ollama modeli yuklu degilse ve bos
+VRAM `GPU_LLM_REQUIRED_MB`'nin altindaysa Forge'un checkpoint'i
+`/sdapi/v1/unload-checkpoint` ile birakilir. Siradaki `acquire_for_sd`
+Ollama'yi bosaltir ve checkpoint'i `/sdapi/v1/reload-checkpoint` ile geri
+yukler. Ollama modeli ilk istekte kendisi yukler. `wait_until_llm_ready`
+ise LLM yeniden denemelerinden once sunucu cevap verene kadar bekler.
+
+Forge VRAM'i yalnizca tek host'ta olculur ve birakilir; havuzdaki hostlar
+baska makinelerde olabilir.
+"""
+
+import logging
+import threading
+import time
+from collections.abc import Callable
+from typing import Any
+
+import requests
+
+from core.clients.image_backend import ImageBackend, get_image_backend
+from core.clients.render_progress import get_progress_sampler
+from core.errors import CancelledError
+from core.runtime.config import (
+    GPU_HANDOFF_TIMEOUT,
+    GPU_LLM_REQUIRED_MB,
+    GPU_SD_REQUIRED_MB,
+    GPU_SHARED,
+    OLLAMA_API_HOST,
+)
+
+logger = logging.getLogger(__name__)
+
+_MB = 1024 * 1024
+
+# Checkpoint yukleme diskten okuma icerir; birakmaktan cok daha uzun surer.
+_FORGE_UNLOAD_TIMEOUT = 30
+_FORGE_RELOAD_TIMEOUT = 120
+
+
+def _sd_rendering() -> bool:
+    return get_progress_sampler().active
+
+
+class GpuResidencyManager:
+    """Ollama ile Forge arasinda GPU'yu ihtiyac aninda devreder."""
+
+    def __init__(
+        self,
+        ollama_host: str = OLLAMA_API_HOST,
+        *,
+        backend: Callable[[], ImageBackend] = get_image_backend,
+        shared: bool = GPU_SHARED,
+        sd_required_mb: int = GPU_SD_REQUIRED_MB,
+        llm_required_mb: int = GPU_LLM_REQUIRED_MB,
+        timeout: float = GPU_HANDOFF_TIMEOUT,
+        poll_interval: float = 0.25,
+        sd_busy: Callable[[], bool] = _sd_rendering,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.ollama_host = ollama_host.rstrip("/")
+        self._backend = backend
+        self.shared = bool(shared)
+        self.sd_required_mb = max(0, int(sd_required_mb))
+        self.llm_required_mb = max(0, int(llm_required_mb))
+        self.timeout = max(0.0, float(timeout))
+        self.poll_interval = poll_interval
+        self._sd_busy = sd_busy
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        # Devirler sirayla: LLM cagrilari Forge birakilirken/geri yuklenirken bekler.
+        self._handoff = threading.Lock()
+        self.holder: str | None = None
+        # Forge'un checkpoint'i LLM icin birakildi; siradaki render geri yukler.
+        self.forge_released = False
+        self._stats = {
+            "sd_handoffs": 0,
+            "unloads": 0,
+            "unloads_skipped": 0,
+            "wait_seconds": 0.0,
+            "timeouts": 0,
+            "forge_releases": 0,
+            "forge_reloads": 0,
+        }
+
+    # -- probes -----------------------------------------------------------
+    def ollama_models(self) -> list[dict[str, Any]] | None:
+        """Ollama'da yuklu modeller; sunucuya ulasilamazsa None."""
+        try:
+            response = requests.get(f"{self.ollama_host}/api/ps", timeout=2)
+            response.raise_for_status()
+            models = response.json().get("models") or []
+        except (requests.RequestException, ValueError, AttributeError):
+            return None
+        return [model for model in models if isinstance(model, dict)]
+
+    def ollama_vram_mb(self) -> float | None:
+        models = self.ollama_models()
+        if models is None:
+            return None
+        return sum(float(model.get("size_vram") or 0) for model in models) / _MB
+
+    def forge_free_mb(self) -> float | None:
+        """Forge'un gordugu bos VRAM; olculemiyorsa None."""
+        backend = self._backend()
+        if backend.capacity != 1:
+            return None
+        memory = backend.get_json("/sdapi/v1/memory", timeout=2)
+        try:
+            return float(memory["cuda"]["system"]["free"]) / _MB
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    # -- handoffs ---------------------------------------------------------
+    def acquire_for_sd(self, *, cancel_checker: Callable[[], bool] | None = None) -> dict[str, Any]:
+        """
+        Forge render'indan once cagrilir. Ollama yalnizca yer gerekiyorsa
+        bosaltilir; LLM icin birakilmis checkpoint geri yuklenir. Donen
+        sozluk kararin nedenini tasir.
+        """
+        with self._handoff:
+            with self._lock:
+                self.holder = "sd"
+                self._stats["sd_handoffs"] += 1
+            result = self._make_room_for_sd(cancel_checker)
+            if self.forge_released:
+                result["reloaded"] = self._reload_forge()
+            return result
+
+    def _make_room_for_sd(self, cancel_checker: Callable[[], bool] | None) -> dict[str, Any]:
+        if not self.shared:
+            return self._skip("separate_gpus")
+
+        models = self.ollama_models()
+        resident = [model for model in models or [] if float(model.get("size_vram") or 0) > 0]
+        if not resident:
+            return self._skip("no_llm_resident" if models is not None else "ollama_unreachable")
+
+        # Checkpoint birakildiysa olculen bos VRAM onun yerini de icerir; ikisi
+        # birlikte sigmadigi icin birakilmisti, Ollama her durumda bosaltilir.
+        free_mb = self.forge_free_mb()
+        if not self.forge_released and free_mb is not None and free_mb >= self.sd_required_mb:
+            return self._skip("fits", free_mb=round(free_mb))
+
+        for model in resident:
+            self._unload(str(model.get("name") or model.get("model") or ""))
+        ready, waited = self._wait(lambda: self._sd_ready(), cancel_checker)
+        with self._lock:
+            self._stats["unloads"] += 1
+            self._stats["wait_seconds"] += waited
+            if not ready:
+                self._stats["timeouts"] += 1
+        if not ready:
+            logger.warning("GPU handoff to Forge timed out after %.1fs; rendering anyway", waited)
+        return {"unloaded": [str(model.get("name")) for model in resident], "ready": ready, "waited": round(waited, 2)}
+
+    def acquire_for_llm(self) -> dict[str, Any]:
+        """
+        LLM isinden once cagrilir. GPU Forge'dan LLM'e gecerken Forge bos ve
+        LLM'e yer yoksa checkpoint birakilir; sonraki cagrilar hicbir sey sormaz.
+        """
+        with self._handoff:
+            with self._lock:
+                previous, self.holder = self.holder, "llm"
+            if previous == "llm":
+                return {"released": False, "reason": "llm_holds"}
+            if not self.shared:
+                return self._keep_forge("separate_gpus")
+            if self._sd_busy():
+                return self._keep_forge("sd_busy")
+            vram = self.ollama_vram_mb()
+            if vram:
+                return self._keep_forge("llm_resident")
+            free_mb = self.forge_free_mb()
+            if free_mb is None:
+                return self._keep_forge("unmeasured")
+            if free_mb >= self.llm_required_mb:
+                return self._keep_forge("fits", free_mb=round(free_mb))
+            released = self._forge_post("/sdapi/v1/unload-checkpoint", timeout=_FORGE_UNLOAD_TIMEOUT)
+            if released:
+                with self._lock:
+                    self.forge_released = True
+                    self._stats["forge_releases"] += 1
+                logger.info("Forge checkpoint released for the LLM (%.0f MB free)", free_mb)
+            return {"released": released, "free_mb": round(free_mb)}
+
+    def wait_until_llm_ready(self, timeout: float | None = None) -> bool:
+        """Ollama API'si cevap verene kadar bekler (sabit bekleme yerine)."""
+        ready, _ = self._wait(lambda: self.ollama_models() is not None, None, timeout=timeout)
+        return ready
+
+    # -- helpers ----------------------------------------------------------
+    def _skip(self, reason: str, **extra: Any) -> dict[str, Any]:
+        with self._lock:
+            self._stats["unloads_skipped"] += 1
+        logger.debug("Ollama stays resident before render: %s", reason)
+        return {"unloaded": [], "reason": reason, **extra}
+
+    def _keep_forge(self, reason: str, **extra: Any) -> dict[str, Any]:
+        logger.debug("Forge keeps its checkpoint for the LLM call: %s", reason)
+        return {"released": False, "reason": reason, **extra}
+
+    def _forge_post(self, path: str, *, timeout: float) -> bool:
+        """Tek host'lu backend'e POST; havuzda ya da hata durumunda False."""
+        backend = self._backend()
+        client = getattr(backend, "client", None)
+        if backend.capacity != 1 or client is None:
+            return False
+        try:
+            response = client.post(path, timeout=timeout)
+            response.raise_for_status()
+        except requests.RequestException:
+            logger.warning("Forge request failed during GPU handoff: %s", path, exc_info=True)
+            return False
+        return True
+
+    def _reload_forge(self) -> bool:
+        reloaded = self._forge_post("/sdapi/v1/reload-checkpoint", timeout=_FORGE_RELOAD_TIMEOUT)
+        with self._lock:
+            # Basarisiz olsa da Forge checkpoint'i ilk render'da kendisi yukler.
+            self.forge_released = False
+            if reloaded:
+                self._stats["forge_reloads"] += 1
+        return reloaded
+
+    def _unload(self, model: str) -> None:
+        if not model:
+            return
+        try:
+            response = requests.post(
+                f"{self.ollama_host}/api/generate", json={"model": model, "keep_alive": 0}, timeout=3
+            )
+            response.raise_for_status()
+        except requests.RequestException:
+            logger.warning("Ollama model could not be unloaded: %s", model, exc_info=True)
+
+    def _sd_ready(self) -> bool:
+        vram = self.ollama_vram_mb()
+        if vram is not None and vram > 0:
+            return False
+        free_mb = self.forge_free_mb()
+        return free_mb is None or free_mb >= self.sd_required_mb
+
+    def _wait(
+        self,
+        ready: Callable[[], bool],
+        cancel_checker: Callable[[], bool] | None,
+        *,
+        timeout: float | None = None,
+    ) -> tuple[bool, float]:
+        started = self._clock()
+        deadline = started + (self.timeout if timeout is None else timeout)
+        while True:
+            if ready():
+                return True, self._clock() - started
+            if cancel_checker and cancel_checker():
+                raise CancelledError("Cancelled during GPU handoff")
+            if self._clock() >= deadline:
+                return False, self._clock() - started
+            self._sleep(self.poll_interval)
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["holder"] = self.holder
+            stats["forge_released"] = self.forge_released
+        stats["wait_seconds"] = round(stats["wait_seconds"], 2)
+        return stats
+
+
+_DEFAULT_MANAGER: GpuResidencyManager | None = None
+_DEFAULT_MANAGER_LOCK = threading.Lock()
+
+
+def get_gpu_residency() -> GpuResidencyManager:
+    """Uygulama genelinde paylasilan yonetici."""
+    global _DEFAULT_MANAGER
+    with _DEFAULT_MANAGER_LOCK:
+        if _DEFAULT_MANAGER is None:
+            _DEFAULT_MANAGER = GpuResidencyManager()
+        return _DEFAULT_MANAGER
+
+
+def reset_gpu_residency() -> None:
+    global _DEFAULT_MANAGER
+    with _DEFAULT_MANAGER_LOCK:
+        _DEFAULT_MANAGER = None
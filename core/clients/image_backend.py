@@ -0,0 +1,198 @@
+"""
+Gorsel backend secimi: gercek Forge ya da yerel sahte sunucu.
+
+Onceden sd_client, render_progress ve web backend'i dogrudan ForgeClient /
+SyncForgeFacade tekillerine bagliydi; Forge ayakta degilken hicbir gorsel
+akisi (carousel, video, ajan) calistirilamiyordu.
+
+ImageBackend sd_client'in Forge'dan bekledigi islemleri tanimlar: yetenek
+sorgulari (GET JSON), akisli render POST'u, interrupt ve progress.
+
+- ForgeBackend -> SD_API_URL'deki Forge (varsayilan)
+- ForgePool    -> SD_API_URLS'de birden fazla host varsa; render'lari hostlara
+                  dagitir (bkz. forge_pool)
+- FakeBackend  -> surec icinde baslatilan FakeForgeServer'a ayni istemcilerle
+                  konusur; HTTP yolu birebir ayni oldugu icin yuk testleri
+                  gercek istemci kodunu dener
+
+Secim SD_BACKEND ile yapilir (forge | fake); resim_ciz'i cagiran her yer
+degisiklik olmadan hepsiyle calisir. `lease(payload)` bir render'i tek host'a
+baglar; `capacity` ayni anda kac render calisabilecegini soyler.
+"""
+
+import logging
+import threading
+from collections.abc import Callable, Iterator
+from contextlib import AbstractContextManager, contextmanager
+from typing import Any, Protocol
+
+from core.clients.fake_forge import FakeForgeConfig, FakeForgeServer, parse_errors
+from core.clients.forge_async import AsyncForgeClient, StreamedResponse, SyncForgeFacade, get_forge_facade
+from core.clients.forge_client import ForgeClient, get_forge_client
+from core.clients.forge_pool import ForgePool
+from core.runtime.config import (
+    SD_API_URL,
+    SD_API_URLS,
+    SD_BACKEND,
+    SD_FAKE_ERRORS,
+    SD_FAKE_JITTER,
+    SD_FAKE_LATENCY,
+    SD_FAKE_LATENCY_PER_STEP,
+    SD_FAKE_PORT,
+)
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("forge", "fake")
+
+
+class ImageBackend(Protocol):
+    name: str
+
+    @property
+    def base_url(self) -> str: ...
+
+    @property
+    def capacity(self) -> int: ...
+
+    def lease(self, payload: dict[str, Any] | None = None) -> AbstractContextManager[Any]: ...
+
+    def get_json(self, path: str, *, timeout: float = 3) -> Any | None: ...
+
+    def post_stream(
+        self,
+        path: str,
+        *,
+        json: Any = None,
+        timeout: float,
+        cancel_checker: Callable[[], bool] | None = None,
+    ) -> StreamedResponse: ...
+
+    def interrupt(self, *, timeout: float = 2) -> bool: ...
+
+    def progress(self, *, timeout: float = 2, skip_current_image: bool = False) -> dict[str, Any]: ...
+
+    def snapshot(self) -> dict[str, Any]: ...
+
+    def close(self) -> None: ...
+
+
+class ForgeBackend:
+    """Forge API'si; verilmezse uygulama genelindeki ForgeClient ve async cephe kullanilir."""
+
+    name = "forge"
+
+    def __init__(self, client: ForgeClient | None = None, facade: SyncForgeFacade | None = None):
+        self._client = client
+        self._facade = facade
+
+    @property
+    def client(self) -> ForgeClient:
+        return self._client or get_forge_client()
+
+    @property
+    def facade(self) -> SyncForgeFacade:
+        return self._facade or get_forge_facade()
+
+    @property
+    def base_url(self) -> str:
+        return self.client.base_url
+
+    @property
+    def capacity(self) -> int:
+        return 1
+
+    @contextmanager
+    def lease(self, payload: dict[str, Any] | None = None) -> Iterator["ForgeBackend"]:
+        # Tek host: kiralanacak bir sey yok.
+        yield self
+
+    def get_json(self, path: str, *, timeout: float = 3) -> Any | None:
+        return self.client.get_json(path, timeout=timeout)
+
+    def post_stream(
+        self,
+        path: str,
+        *,
+        json: Any = None,
+        timeout: float,
+        cancel_checker: Callable[[], bool] | None = None,
+    ) -> StreamedResponse:
+        return self.facade.post_stream(path, json=json, timeout=timeout, cancel_checker=cancel_checker)
+
+    def interrupt(self, *, timeout: float = 2) -> bool:
+        return self.client.interrupt(timeout=timeout)
+
+    def progress(self, *, timeout: float = 2, skip_current_image: bool = False) -> dict[str, Any]:
+        return self.client.progress(timeout=timeout, skip_current_image=skip_current_image)
+
+    def snapshot(self) -> dict[str, Any]:
+        return {"backend": self.name, "capacity": self.capacity, "hosts": [{"url": self.base_url}]}
+
+    def close(self) -> None:
+        # Paylasilan tekiller kendi reset_* fonksiyonlariyla kapanir.
+        if self._client is not None:
+            self._client.close()
+        if self._facade is not None:
+            self._facade.close()
+
+
+class FakeBackend(ForgeBackend):
+    """Kendi FakeForgeServer'ini baslatir; istemci tarafi ForgeBackend ile ayni."""
+
+    name = "fake"
+
+    def __init__(self, config: FakeForgeConfig | None = None, *, port: int = 0):
+        self.server = FakeForgeServer(port=port, config=config).start()
+        url = self.server.url
+        super().__init__(
+            client=ForgeClient(url, retries=0),
+            facade=SyncForgeFacade(lambda: AsyncForgeClient(url)),
+        )
+        logger.info("Fake image backend listening on %s", url)
+
+    def close(self) -> None:
+        super().close()
+        self.server.stop()
+
+
+def create_image_backend(name: str = SD_BACKEND, urls: list[str] = SD_API_URLS) -> ImageBackend:
+    if name == "fake":
+        config = FakeForgeConfig(
+            latency=SD_FAKE_LATENCY,
+            latency_per_step=SD_FAKE_LATENCY_PER_STEP,
+            jitter=SD_FAKE_JITTER,
+            errors=parse_errors(SD_FAKE_ERRORS),
+        )
+        return FakeBackend(config, port=SD_FAKE_PORT)
+    if name != "forge":
+        logger.warning("Unknown SD_BACKEND %r; using Forge", name)
+    if len(urls) > 1 or urls[0] != SD_API_URL:
+        return ForgePool(urls)
+    return ForgeBackend()
+
+
+_DEFAULT_BACKEND: ImageBackend | None = None
+_DEFAULT_BACKEND_LOCK = threading.Lock()
+
+
+def get_image_backend() -> ImageBackend:
+    """SD_BACKEND'e gore uygulama genelinde tek backend."""
+    global _DEFAULT_BACKEND
+    with _DEFAULT_BACKEND_LOCK:
+        if _DEFAULT_BACKEND is None:
+            _DEFAULT_BACKEND = create_image_backend()
+        return _DEFAULT_BACKEND
+
+
+def set_image_backend(backend: ImageBackend | None) -> None:
+    """Testler ve yuk testleri icin backend'i degistirir; oncekini kapatir."""
+    global _DEFAULT_BACKEND
+    with _DEFAULT_BACKEND_LOCK:
+        previous, _DEFAULT_BACKEND = _DEFAULT_BACKEND, backend
+    if previous is not None and previous is not backend:
+        previous.close()
+
+
+def reset_image_backend() -> None:
+    set_image_backend(None)
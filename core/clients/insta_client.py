@@ -538,7 +538,7 @@ def generate_caption_with_llama(prompt_text):
     user_input = f"INPUT NEWS:\n{prompt_text}\n\nOUTPUT CAPTION:"
 
     # SYSTEM_PROMPT yerine özel İngilizce prompt gönderiyoruz
-    caption = llm_answer(user_input, system_msg=system_instruction)
+    caption = llm_answer(user_input, system_msg=system_instruction, task="caption")
 
     # ============================================================
     # 🧹TEMİZLİK ROBOTU
@@ -653,9 +653,6 @@ def prepare_insta_caption(prompt_text):
     Sadece caption oluşturur ve döndürür. Yükleme yapmaz.
     UI'da onay göstermek için kullanılır.
     """
-    print(f"{YELLOW}⏳ GPU soğuması ve VRAM takası için bekleniyor...{RESET}")
-    time.sleep(4)
-
     caption = generate_caption_with_llama(prompt_text)
     caption = format_caption_hashtags_bottom(caption)
 
@@ -1,21 +1,28 @@
 import json
 import logging
+import queue
 import subprocess
 import threading
 import time
-from collections.abc import Sequence
+from collections.abc import Callable, Iterator, Sequence
 from typing import Any, Literal
 
 import requests
 
+from core.clients.gpu_residency import get_gpu_residency
+from core.clients.llm_cache import LLMCache, get_llm_cache
+from core.clients.llm_routing import ModelRouter, get_model_router
+from core.clients.llm_schema import get_json_stats, json_schema_for, parse_json_reply
+from core.clients.llm_telemetry import get_llm_telemetry
 from core.errors import CancelledError, LLMResponseError, LLMUnavailableError
+from core.runtime.config import LLM_MODEL, LLM_SCHEMA_FALLBACK_SECONDS, LLM_SCHEMA_FORMAT, OLLAMA_API_HOST
 
 logger = logging.getLogger(__name__)
 
 # ==================================================
 # Ollama Settings
-OLLAMA_URL = "http://localhost:11434/api/chat"
-MODEL = "llama3.1:8b"
+OLLAMA_URL = f"{OLLAMA_API_HOST}/api/chat"
+MODEL = LLM_MODEL
 # ==================================================
 
 SYSTEM_PROMPT = (
@@ -31,6 +38,20 @@ def _clean_llm_text(text: str) -> str:
     return text.replace("```json", "").replace("```", "").strip()
 
 
+def _rejects_schema_format(exc: LLMResponseError) -> bool:
+    """True only for an HTTP 400 whose body blames the "format" field (Ollama before 0.5)."""
+    response = getattr(exc.__cause__, "response", None)
+    if getattr(response, "status_code", None) != 400:
+        return False
+    try:
+        body = response.json()
+        detail = body.get("error") if isinstance(body, dict) else body
+    except (AttributeError, ValueError):
+        detail = getattr(response, "text", "")
+    text = str(detail or "").lower()
+    return "format" in text or "schema" in text
+
+
 _DEFAULT_LLM_SERVICE = None
 
 
@@ -41,7 +62,7 @@ def get_llm_service():
     return _DEFAULT_LLM_SERVICE
 
 
-def llm_answer(msg: str, system_msg: str | None = None) -> str:
+def llm_answer(msg: str, system_msg: str | None = None, *, use_cache: bool = True, task: str = "chat") -> str:
     # 3 kere deneme hakkı veriyoruz
     max_retries = 3
 
@@ -51,15 +72,17 @@ def llm_answer(msg: str, system_msg: str | None = None) -> str:
     for i in range(max_retries):
         try:
             # Timeout süresini artırdık çünkü modelin yüklenmesi uzun sürebilir
-            return get_llm_service().ask(msg, system=final_system_prompt, timeout=180, retries=1)
+            return get_llm_service().ask(
+                msg, system=final_system_prompt, timeout=180, retries=1, use_cache=use_cache, task=task
+            )
 
         except CancelledError:
             return "İstek iptal edildi."
         except LLMUnavailableError:
             logger.exception("Ollama request failed (attempt %s/%s)", i + 1, max_retries)
             if i < max_retries - 1:
-                logger.info("VRAM release is being given 5 seconds before retry")
-                time.sleep(5)
+                # Retry once the server answers again instead of a fixed pause.
+                get_gpu_residency().wait_until_llm_ready(timeout=5)
         except LLMResponseError:
             logger.exception("Ollama returned an unusable response")
             break
@@ -80,8 +103,10 @@ def ollama_warmup():
             stdout=subprocess.DEVNULL,
             stderr=subprocess.DEVNULL,
         )
-        time.sleep(2.5)
-        logger.info("Ollama model warm-up completed")
+        if get_gpu_residency().wait_until_llm_ready():
+            logger.info("Ollama model warm-up completed")
+        else:
+            logger.warning("Ollama did not answer during warm-up")
     except OSError:
         logger.exception("Ollama warm-up could not be started")
 
@@ -120,7 +145,7 @@ def visual_prompt_generator(user_text: str) -> str:
     )
 
     try:
-        prompt_en = get_llm_service().ask(user_text, system=system_msg, timeout=60, retries=1).strip()
+        prompt_en = get_llm_service().ask(user_text, system=system_msg, timeout=60, retries=1, task="prompt").strip()
 
         # Temizlik
         if ":" in prompt_en and len(prompt_en.split(":")[0]) < 20:  # "Detailed prompt: ..." gibi şeyleri temizle
@@ -137,15 +162,207 @@ def visual_prompt_generator(user_text: str) -> str:
 # UNIFIED SERVICE LAYER (For Multi-Agent System)
 # ==================================================
 MessageRole = Literal["system", "user", "assistant"]
+# "json" = any JSON object; a dict is a JSON Schema Ollama constrains decoding to.
+JsonFormat = Literal["json"] | dict[str, Any]
+
+# How often a waiting caller re-checks its cancel flag.
+_CANCEL_POLL_SECONDS = 0.2
+_STREAM_END = object()
+
+
+class ChatStream:
+    """
+    One Ollama chat answer, consumed piece by piece.
+
+    Iterating yields the text of each chunk as it arrives. For a streaming
+    payload a reader thread pulls NDJSON lines off the socket so the caller can
+    poll its cancel flag between chunks; a cancel closes the connection, which
+    stops generation on the Ollama side too. A non-streaming payload yields the
+    whole content once. Timings are filled in while iterating, and a finished
+    answer's Ollama counters go to the LLM telemetry tagged with `task`.
+
+    With a `router` (streams opened by stream_chat) the stream does what chat()
+    does around its own sends: it falls back to the default model if the routed
+    one is not pulled and records the call's latency for the task.
+    """
+
+    def __init__(
+        self,
+        service: "LLMService",
+        payload: dict[str, Any],
+        *,
+        timeout: int,
+        cancel_checker: Callable[[], bool] | None = None,
+        task: str | None = None,
+        router: ModelRouter | None = None,
+    ):
+        self._service = service
+        self.task = task
+        self._router = router
+        self._payload = payload
+        self._timeout = timeout
+        self._cancel_checker = cancel_checker
+        self._response = None
+        self._closed = threading.Event()
+        self._parts: list[str] = []
+        self.first_token_seconds: float | None = None
+        self.total_seconds: float | None = None
+        self.final: dict[str, Any] = {}
+
+    @property
+    def text(self) -> str:
+        return "".join(self._parts)
+
+    def _is_cancelled(self) -> bool:
+        return bool(self._cancel_checker and self._cancel_checker())
+
+    def __iter__(self) -> Iterator[str]:
+        try:
+            if self._router is None:
+                yield from self._read()
+                return
+            while True:
+                model = self._payload.get("model")
+                started = time.monotonic()
+                try:
+                    yield from self._read()
+                except (LLMResponseError, requests.RequestException) as exc:
+                    self._router.record(self.task, model, time.monotonic() - started, failed=True)
+                    status = getattr(getattr(exc, "response", None), "status_code", None)
+                    if self._parts or model == self._service.model or status != 404:
+                        raise
+                    # The routed model is not pulled on this Ollama: fall back to the default.
+                    logger.warning(
+                        "Ollama has no model %s for task %s; using %s", model, self.task, self._service.model
+                    )
+                    self._router.mark_missing(model)
+                    self._payload = {**self._payload, "model": self._service.model}
+                    self._response = None
+                    continue
+                self._router.record(self.task, model, time.monotonic() - started)
+                return
+        finally:
+            self.close()
+
+    def _read(self) -> Iterator[str]:
+        started = time.monotonic()
+        try:
+            for chunk in self._chunks():
+                if not isinstance(chunk, dict):
+                    raise LLMResponseError("Ollama response is not an object")
+                if chunk.get("error"):
+                    raise LLMResponseError(str(chunk["error"]))
+                content = (chunk.get("message") or {}).get("content", "")
+                if not isinstance(content, str):
+                    raise LLMResponseError("Ollama response content is not text")
+                if content:
+                    if self.first_token_seconds is None:
+                        self.first_token_seconds = time.monotonic() - started
+                    self._parts.append(content)
+                    yield content
+                if chunk.get("done", not self._payload.get("stream")):
+                    self.final = chunk
+            if self.final:
+                get_llm_telemetry().record(
+                    self.final,
+                    model=self._payload.get("model"),
+                    task=self.task,
+                    wall_seconds=time.monotonic() - started,
+                )
+        finally:
+            self.total_seconds = time.monotonic() - started
+
+    def _chunks(self) -> Iterator[dict[str, Any]]:
+        if not self._payload.get("stream"):
+            yield self._service._post_with_cancel(self._payload, self._timeout, self._is_cancelled)
+            return
+
+        chunks: queue.Queue = queue.Queue()
+        thread = threading.Thread(target=self._read_lines, args=(chunks,), daemon=True)
+        thread.start()
+        while True:
+            try:
+                item = chunks.get(timeout=_CANCEL_POLL_SECONDS)
+            except queue.Empty:
+                item = None
+            if self._is_cancelled():
+                raise CancelledError("Cancelled during LLM request")
+            if item is None:
+                continue
+            if item is _STREAM_END:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+    def _read_lines(self, chunks: queue.Queue) -> None:
+        try:
+            response = requests.post(self._service.api_url, json=self._payload, timeout=self._timeout, stream=True)
+            self._response = response
+            if self._closed.is_set():
+                response.close()
+                return
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if line:
+                    chunks.put(json.loads(line))
+        except Exception as exc:  # Thread boundary: re-raised on the caller thread.
+            if not self._closed.is_set():
+                chunks.put(exc)
+        finally:
+            chunks.put(_STREAM_END)
+
+    def close(self) -> None:
+        """Drops the connection; an abandoned stream stops reading from Ollama."""
+        self._closed.set()
+        response = self._response
+        if response is not None:
+            try:
+                response.close()
+            except Exception:  # Best-effort cleanup of a socket another thread may be reading.
+                logger.debug("Ollama stream close failed", exc_info=True)
+
+    def stats(self) -> dict[str, Any]:
+        stats: dict[str, Any] = {
+            "first_token_seconds": self.first_token_seconds,
+            "total_seconds": self.total_seconds,
+            "chars": sum(len(part) for part in self._parts),
+        }
+        # Ollama reports its own counters (nanoseconds) on the final chunk.
+        for key in (
+            "eval_count",
+            "prompt_eval_count",
+            "eval_duration",
+            "prompt_eval_duration",
+            "load_duration",
+            "total_duration",
+        ):
+            if key in self.final:
+                stats[key] = self.final[key]
+        return stats
 
 
 class LLMService:
-    def __init__(self, model: str | None = None, host: str = "http://localhost:11434"):
-        # Use existing MODEL constant if none provided
+    def __init__(
+        self,
+        model: str | None = None,
+        host: str = OLLAMA_API_HOST,
+        cache: LLMCache | None = None,
+        router: ModelRouter | None = None,
+    ):
+        # Use existing MODEL constant if none provided; task routes fall back to it
         self.model = model or MODEL
         self.host = host
         self.api_url = f"{host}/api/chat"
         self.cancel_checker = None
+        # None = the shared on-disk cache (LLM_CACHE_*)
+        self.cache = cache
+        # Send agent schemas as Ollama's structured-output "format" (Ollama >= 0.5)
+        self.schema_format = LLM_SCHEMA_FORMAT
+        # Until this monotonic time an Ollama that rejected a schema gets format="json"
+        self._schema_rejected_until = 0.0
+        # None = the shared task -> model table (LLM_MODEL_*)
+        self.router = router
 
     def set_cancel_checker(self, checker):
         self.cancel_checker = checker
@@ -153,7 +370,10 @@ class LLMService:
     def _is_cancelled(self) -> bool:
         return bool(self.cancel_checker and self.cancel_checker())
 
-    def _post_with_cancel(self, payload: dict[str, Any], timeout: int) -> dict[str, Any]:
+    def _post_with_cancel(
+        self, payload: dict[str, Any], timeout: int, cancel_checker: Callable[[], bool] | None = None
+    ) -> dict[str, Any]:
+        is_cancelled = cancel_checker or self._is_cancelled
         result: dict[str, Any] = {}
         done = threading.Event()
 
@@ -170,35 +390,125 @@ class LLMService:
         thread = threading.Thread(target=_worker, daemon=True)
         thread.start()
 
-        while not done.wait(0.2):
-            if self._is_cancelled():
+        while not done.wait(_CANCEL_POLL_SECONDS):
+            if is_cancelled():
                 raise CancelledError("Cancelled during LLM request")
 
         if "error" in result:
             raise result["error"]
         return result["json"]
 
+    def _router(self) -> ModelRouter:
+        return self.router or get_model_router()
+
+    def _chat_payload(
+        self,
+        messages: Sequence[dict[str, str]],
+        *,
+        format: JsonFormat | None,
+        stream: bool,
+        task: str | None = None,
+    ) -> dict[str, Any]:
+        model = self._router().model_for(task, self.model)
+        payload: dict[str, Any] = {"model": model, "messages": list(messages), "stream": stream}
+        if format:
+            payload["format"] = format
+        return payload
+
+    def stream_chat(
+        self,
+        messages: Sequence[dict[str, str]],
+        *,
+        format: JsonFormat | None = None,
+        timeout: int = 60,
+        cancel_checker: Callable[[], bool] | None = None,
+        task: str | None = "chat",
+    ) -> "ChatStream":
+        """
+        Streams the answer: iterate the returned ChatStream for text pieces as
+        Ollama produces them. There is no retry once tokens flow; transport
+        errors surface as the underlying requests exceptions. Like chat(), the
+        stream takes the GPU for the LLM, falls back from a missing routed model
+        and records its latency under `task`.
+        """
+        payload = self._chat_payload(messages, format=format, stream=True, task=task)
+        get_gpu_residency().acquire_for_llm()
+        return ChatStream(
+            self,
+            payload,
+            timeout=timeout,
+            cancel_checker=cancel_checker or self._is_cancelled,
+            task=task,
+            router=self._router(),
+        )
+
     def chat(
         self,
         messages: Sequence[dict[str, str]],
         *,
-        format: Literal["json"] | None = None,
+        format: JsonFormat | None = None,
         timeout: int = 60,
         retries: int = 3,
+        use_cache: bool = True,
+        refresh_cache: bool = False,
+        task: str | None = None,
     ) -> str:
-        payload: dict[str, Any] = {"model": self.model, "messages": list(messages), "stream": False}
-        if format:
-            payload["format"] = format
-
+        """
+        Whole answer as one string, with retries. Identical requests are served
+        from the response cache; use_cache=False skips it for creative calls,
+        refresh_cache=True asks Ollama again and overwrites the stored answer.
+        `task` picks the model (see llm_routing) and labels the latency sample.
+        """
+        # Whole answers stay "stream": false on the wire: a retry cannot resume a
+        # half-read token stream, and one JSON body is cheaper than many chunks.
+        payload = self._chat_payload(messages, format=format, stream=False, task=task)
+        model = payload["model"]
+        router = self._router()
+        cache = (self.cache or get_llm_cache()) if use_cache else None
+        key = cache.key_for(payload) if cache is not None and cache.enabled else None
+        if key and not refresh_cache:
+            cached = cache.get(key)
+            if cached is not None:
+                router.record(task, model, 0.0, cached=True)
+                return cached
+
+        get_gpu_residency().acquire_for_llm()
+        started = time.monotonic()
+        try:
+            content = self._send(payload, timeout=timeout, retries=retries, task=task)
+        except LLMResponseError as exc:
+            router.record(task, model, time.monotonic() - started, failed=True)
+            if model != self.model and getattr(getattr(exc.__cause__, "response", None), "status_code", None) == 404:
+                # The routed model is not pulled on this Ollama: fall back to the default.
+                logger.warning("Ollama has no model %s for task %s; using %s", model, task, self.model)
+                router.mark_missing(model)
+                return self.chat(
+                    messages,
+                    format=format,
+                    timeout=timeout,
+                    retries=retries,
+                    use_cache=use_cache,
+                    refresh_cache=refresh_cache,
+                    task=task,
+                )
+            raise
+        except LLMUnavailableError:
+            router.record(task, model, time.monotonic() - started, failed=True)
+            raise
+        router.record(task, model, time.monotonic() - started)
+        if key and content:
+            cache.put(key, content, model=model)
+        return content
+
+    def _send(self, payload: dict[str, Any], *, timeout: int, retries: int, task: str | None = None) -> str:
         last_exc: requests.RequestException | None = None
         for attempt in range(retries):
             if self._is_cancelled():
                 raise CancelledError("Cancelled during LLM request")
             try:
-                result = self._post_with_cancel(payload, timeout=timeout)
-                content = result.get("message", {}).get("content", "")
-                if not isinstance(content, str):
-                    raise LLMResponseError("Ollama response content is not text")
+                stream = ChatStream(self, payload, timeout=timeout, cancel_checker=self._is_cancelled, task=task)
+                content = "".join(stream)
+                logger.debug("Ollama chat finished: %s", stream.stats())
                 return content
             except CancelledError:
                 raise
@@ -244,20 +554,41 @@ class LLMService:
         system: str | None = None,
         timeout: int = 60,
         retries: int = 3,
-        format: Literal["json"] | None = None,
+        format: JsonFormat | None = None,
+        use_cache: bool = True,
+        refresh_cache: bool = False,
+        task: str | None = None,
     ) -> str:
         messages: list[dict[str, str]] = []
         if system:
             messages.append({"role": "system", "content": system})
         messages.append({"role": "user", "content": prompt})
-        return self.chat(messages, format=format, timeout=timeout, retries=retries)
+        return self.chat(
+            messages,
+            format=format,
+            timeout=timeout,
+            retries=retries,
+            use_cache=use_cache,
+            refresh_cache=refresh_cache,
+            task=task,
+        )
 
-    def ask_english(self, prompt: str, *, timeout: int = 60, retries: int = 3) -> str:
+    def ask_english(
+        self,
+        prompt: str,
+        *,
+        timeout: int = 60,
+        retries: int = 3,
+        use_cache: bool = True,
+        task: str | None = "prompt",
+    ) -> str:
         return self.ask(
             prompt,
             system="You are a creative AI visual director. You MUST write in ENGLISH only.",
             timeout=timeout,
             retries=retries,
+            use_cache=use_cache,
+            task=task,
         )
 
     def generate_json(
@@ -268,27 +599,46 @@ class LLMService:
         system: str | None = None,
         timeout: int = 60,
         retries: int = 3,
+        use_cache: bool = True,
+        task: str | None = None,
     ) -> dict[str, Any]:
         schema_hint = json.dumps(schema, ensure_ascii=False)
         final_prompt = f"{prompt}\n\nIMPORTANT: Return ONLY a valid JSON object matching this schema: {schema_hint}"
 
-        last_exc: json.JSONDecodeError | None = None
+        stats = get_json_stats()
+        stats.count("requests")
+        json_format = self._json_format(schema)
+
+        last_exc: ValueError | None = None
         for attempt in range(retries):
             if self._is_cancelled():
                 raise CancelledError("Cancelled during LLM request")
-            response_text = self.ask(
-                final_prompt,
-                system=system,
-                timeout=timeout,
-                retries=1,
-                format="json",
-            )
+            if attempt:
+                stats.count("regenerations")
+            ask_kwargs = {
+                "system": system,
+                "timeout": timeout,
+                "retries": 1,
+                "use_cache": use_cache,
+                # A cached answer that did not parse must not be served again.
+                "refresh_cache": attempt > 0,
+                "task": task,
+            }
             try:
-                result = json.loads(_clean_llm_text(response_text))
-                if not isinstance(result, dict):
-                    raise LLMResponseError("Ollama JSON response is not an object")
-                return result
-            except json.JSONDecodeError as exc:
+                response_text = self.ask(final_prompt, format=json_format, **ask_kwargs)
+            except LLMResponseError as exc:
+                if json_format == "json" or not _rejects_schema_format(exc):
+                    raise
+                # Ollama before 0.5 rejects a schema in "format"; plain JSON mode still works.
+                # The downgrade expires so an upgraded Ollama gets schemas again.
+                logger.warning("Ollama rejected the JSON schema format; falling back to format=json", exc_info=True)
+                stats.count("schema_fallbacks")
+                self._schema_rejected_until = time.monotonic() + LLM_SCHEMA_FALLBACK_SECONDS
+                json_format = "json"
+                response_text = self.ask(final_prompt, format=json_format, **ask_kwargs)
+            try:
+                return parse_json_reply(response_text, schema)
+            except ValueError as exc:
                 last_exc = exc
                 logger.warning(
                     "Ollama JSON parse attempt %s/%s failed",
@@ -296,10 +646,14 @@ class LLMService:
                     retries,
                     exc_info=True,
                 )
-                if attempt < retries - 1:
-                    time.sleep(1)
+        stats.count("failures")
         raise LLMResponseError(f"Valid JSON was not produced after {retries} attempts") from last_exc
 
+    def _json_format(self, schema: dict[str, Any]) -> JsonFormat:
+        if self.schema_format and schema and time.monotonic() >= self._schema_rejected_until:
+            return json_schema_for(schema)
+        return "json"
+
     def unload(self, *, timeout: int = 3) -> bool:
         endpoints = [f"{self.host}/api/generate", f"{self.host}/api/chat"]
         for url in endpoints:
@@ -322,7 +676,14 @@ class LLMService:
         return False
 
     # Backwards-compat for agent code already using generate_response(prompt, schema=...)
-    def generate_response(self, prompt: str, schema: dict | None = None, retries: int = 3) -> dict[str, Any]:
+    def generate_response(
+        self,
+        prompt: str,
+        schema: dict | None = None,
+        retries: int = 3,
+        use_cache: bool = True,
+        task: str | None = None,
+    ) -> dict[str, Any]:
         if schema:
-            return self.generate_json(prompt, schema=schema, retries=retries)
-        return {"response": self.ask(prompt, retries=retries)}
+            return self.generate_json(prompt, schema=schema, retries=retries, use_cache=use_cache, task=task)
+        return {"response": self.ask(prompt, retries=retries, use_cache=use_cache, task=task)}
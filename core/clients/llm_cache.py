@@ -0,0 +1,199 @@
+"""
+Kalici LLM cevap cache'i (SQLite).
+
+Onceden puanlama, risk analizi, caption ve prompt yazimi ayni girdiyi her
+seferinde Ollama'ya yeniden soruyordu: tekrar denenen pipeline'lar, ayni
+manset farkli kosularda, yeniden planlanan carousel... Her biri 8B modelde
+birkac saniye.
+
+LLMCache `LLMService.chat`'in altinda durur. Anahtar; model, normalize edilmis
+mesajlar (satir sonu ve satir sonu bosluklari), format ve ornekleme
+ayarlarinin (options) kanonik hash'idir. Ayni anahtar tekrar gelirse cevap
+Ollama'ya gitmeden doner; degismemis haberlerle yeniden kosan pipeline
+neredeyse hic LLM cagrisi yapmaz.
+
+- Yas siniri: `LLM_CACHE_MAX_AGE_DAYS`'i gecen kayitlar okunmaz ve silinir.
+- Boyut siniri: kayit sayisi `LLM_CACHE_MAX_ENTRIES`'i asarsa en uzun suredir
+  kullanilmayanlar silinir.
+- `LLM_CACHE_ENABLED=0` ya da cagri basina `use_cache=False` (yaratici,
+  her seferinde farkli olmasi istenen cagrilar) cache'i atlar.
+- Isabet/iska sayaclari `stats()` ile okunur.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from typing import Any
+
+from core.runtime.config import LLM_CACHE_ENABLED, LLM_CACHE_MAX_AGE_DAYS, LLM_CACHE_MAX_ENTRIES, LLM_CACHE_PATH
+
+logger = logging.getLogger(__name__)
+
+
+def _normalize_content(content: Any) -> Any:
+    if not isinstance(content, str):
+        return content
+    lines = content.replace("\r\n", "\n").strip().split("\n")
+    return "\n".join(line.rstrip() for line in lines)
+
+
+class LLMCache:
+    """Istek hash'i -> cevap metni eslemesi; SQLite'ta tutulur."""
+
+    def __init__(
+        self,
+        path: str = LLM_CACHE_PATH,
+        *,
+        max_entries: int = LLM_CACHE_MAX_ENTRIES,
+        max_age_seconds: float = LLM_CACHE_MAX_AGE_DAYS * 86400,
+        enabled: bool = LLM_CACHE_ENABLED,
+    ):
+        self.path = path
+        self.max_entries = max(0, int(max_entries))
+        self.max_age_seconds = max(0.0, float(max_age_seconds))
+        self.enabled = bool(enabled)
+        self._lock = threading.Lock()
+        self._ready = False
+        self._counters = {"hits": 0, "misses": 0, "stores": 0, "evicted": 0, "errors": 0}
+
+    @staticmethod
+    def key_for(payload: dict[str, Any]) -> str:
+        """Model, mesajlar, format ve options'tan kararli hash; stream bayragi anahtara girmez."""
+        messages = [
+            {"role": message.get("role"), "content": _normalize_content(message.get("content"))}
+            for message in payload.get("messages") or []
+        ]
+        material = {
+            "model": payload.get("model"),
+            "messages": messages,
+            "format": payload.get("format"),
+            "options": payload.get("options") or {},
+        }
+        canonical = json.dumps(material, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=5)
+        if not self._ready:
+            parent = os.path.dirname(self.path)
+            if parent:
+                os.makedirs(parent, exist_ok=True)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    model TEXT,
+                    response TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    used_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_used_at ON llm_cache(used_at)")
+            self._ready = True
+        return conn
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counters[name] += amount
+
+    def get(self, key: str) -> str | None:
+        if not self.enabled:
+            return None
+        now = time.time()
+        try:
+            with self._lock, closing(self._connect()) as conn, conn:
+                row = conn.execute("SELECT response, created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+                if row and self.max_age_seconds and now - row[1] > self.max_age_seconds:
+                    conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                    row = None
+                if row:
+                    conn.execute("UPDATE llm_cache SET used_at = ? WHERE key = ?", (now, key))
+        except sqlite3.Error:
+            logger.warning("LLM cache lookup failed: %s", self.path, exc_info=True)
+            self._count("errors")
+            return None
+        self._count("hits" if row else "misses")
+        return row[0] if row else None
+
+    def put(self, key: str, response: str, *, model: str | None = None) -> bool:
+        if not self.enabled:
+            return False
+        now = time.time()
+        try:
+            with self._lock, closing(self._connect()) as conn, conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, model, response, created_at, used_at) VALUES (?, ?, ?, ?, ?)",
+                    (key, model, response, now, now),
+                )
+        except sqlite3.Error:
+            logger.warning("LLM cache entry could not be stored: %s", self.path, exc_info=True)
+            self._count("errors")
+            return False
+        self._count("stores")
+        self.evict()
+        return True
+
+    def evict(self) -> int:
+        """Yas ve kayit sayisi sinirlarini uygular; silinen kayit sayisini dondurur."""
+        if not self.enabled:
+            return 0
+        removed = 0
+        try:
+            with self._lock, closing(self._connect()) as conn, conn:
+                if self.max_age_seconds:
+                    cutoff = time.time() - self.max_age_seconds
+                    removed += conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (cutoff,)).rowcount
+                if self.max_entries:
+                    removed += conn.execute(
+                        "DELETE FROM llm_cache WHERE key IN "
+                        "(SELECT key FROM llm_cache ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+                        (self.max_entries,),
+                    ).rowcount
+        except sqlite3.Error:
+            logger.warning("LLM cache eviction failed: %s", self.path, exc_info=True)
+            self._count("errors")
+            return 0
+        if removed:
+            self._count("evicted", removed)
+        return removed
+
+    def clear(self) -> None:
+        try:
+            with self._lock, closing(self._connect()) as conn, conn:
+                conn.execute("DELETE FROM llm_cache")
+        except sqlite3.Error:
+            logger.warning("LLM cache could not be cleared: %s", self.path, exc_info=True)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            stats: dict[str, Any] = dict(self._counters)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        stats["enabled"] = self.enabled
+        return stats
+
+
+_DEFAULT_CACHE: LLMCache | None = None
+_DEFAULT_CACHE_LOCK = threading.Lock()
+
+
+def get_llm_cache() -> LLMCache:
+    """Uygulama genelinde paylasilan cache."""
+    global _DEFAULT_CACHE
+    with _DEFAULT_CACHE_LOCK:
+        if _DEFAULT_CACHE is None:
+            _DEFAULT_CACHE = LLMCache()
+        return _DEFAULT_CACHE
+
+
+def reset_llm_cache() -> None:
+    global _DEFAULT_CACHE
+    with _DEFAULT_CACHE_LOCK:
+        _DEFAULT_CACHE = None
@@ -0,0 +1,229 @@
+"""
+Sinirli paralellikte LLM cagrilari.
+
+Onceden pipeline'daki her LLM cagrisi sirayla gidiyordu; birbirinden bagimsiz
+olsalar bile: NewsAgent her manseti tek tek puanliyor, RiskAgent her haberi
+tek tek soruyor, gunluk video her baslik icin senaryo + gorsel prompt'u art
+arda yaziyordu. Ollama `OLLAMA_NUM_PARALLEL` kadar istegi ayni anda
+isleyebildigi halde GPU bu sirada bosta kaliyordu.
+
+LLMDispatcher `LLMService`'in ustunde durur:
+
+- Ayni anda en fazla `LLM_MAX_PARALLEL` is calisir (Ollama'nin ayariyla ayni
+  tutulmali; fazlasi Ollama'nin kendi kuyrugunda bekler ve zaman asimina
+  yaklasir).
+- Kuyruk sinirlidir: calisan + bekleyen is `LLM_MAX_PARALLEL + LLM_QUEUE_SIZE`'i
+  gecerse `submit` yer acilana kadar bekler.
+- `map` sonuclari girdi sirasiyla dondurur; ilk hata kalan bekleyen isleri
+  iptal eder ve aynen yukari firlatilir.
+- `cancel_checker` her is baslamadan once ve sonuc beklenirken sorulur;
+  iptalde henuz baslamamis isler hic Ollama'ya gitmez. Calisan istekler
+  LLMService'in kendi iptal kontrolu ile kesilir.
+- Isler cagiranin contextvars baglamiyla calisir (current_job, cagiran
+  agent); islerin slot bekleme suresi LLM telemetrisine yazilir.
+
+`LLM_MAX_PARALLEL=1` (varsayilan) iken isler cagiranin thread'inde sirayla
+calisir; davranis eskisiyle aynidir. Dispatcher isinin icinden yeniden
+`map` cagrilirsa da (ic ice fan-out) kilitlenmemek icin isler yerinde calisir.
+"""
+
+import contextvars
+import logging
+import threading
+import time
+from collections.abc import Callable, Iterable
+from concurrent.futures import FIRST_EXCEPTION, Future, ThreadPoolExecutor, wait
+from typing import Any, TypeVar
+
+from core.clients.llm_telemetry import get_llm_telemetry
+from core.errors import CancelledError
+from core.runtime.config import LLM_MAX_PARALLEL, LLM_QUEUE_SIZE
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# How often a blocked submit / waiting map re-checks its cancel flag.
+_CANCEL_POLL_SECONDS = 0.2
+
+_worker = threading.local()
+
+
+class LLMDispatcher:
+    """Thread-safe; bagimsiz LLM islerini sinirli paralellikte calistirir."""
+
+    def __init__(self, max_parallel: int = LLM_MAX_PARALLEL, queue_size: int = LLM_QUEUE_SIZE):
+        self.max_parallel = max(1, int(max_parallel))
+        self.queue_size = max(0, int(queue_size))
+        self._slots = threading.BoundedSemaphore(self.max_parallel + self.queue_size)
+        self._lock = threading.Lock()
+        self._executor: ThreadPoolExecutor | None = None
+        self._running = 0
+        self._queued = 0
+        self._stats = {"submitted": 0, "completed": 0, "failed": 0, "cancelled": 0, "inline": 0, "peak_running": 0}
+
+    @property
+    def parallel(self) -> bool:
+        return self.max_parallel > 1 and not getattr(_worker, "active", False)
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_parallel, thread_name_prefix="llm-dispatch")
+            return self._executor
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._stats[name] += amount
+
+    def _acquire_slot(self, cancel_checker: Callable[[], bool] | None) -> None:
+        while not self._slots.acquire(timeout=_CANCEL_POLL_SECONDS):
+            if cancel_checker and cancel_checker():
+                raise CancelledError("Cancelled while waiting for an LLM slot")
+
+    def _run(
+        self,
+        fn: Callable[..., R],
+        args: tuple,
+        kwargs: dict,
+        cancel_checker: Callable[[], bool] | None,
+        enqueued: float,
+    ) -> R:
+        get_llm_telemetry().observe_dispatch_wait(time.monotonic() - enqueued)
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+            self._stats["peak_running"] = max(self._stats["peak_running"], self._running)
+        _worker.active = True
+        try:
+            if cancel_checker and cancel_checker():
+                raise CancelledError("Cancelled before the LLM call started")
+            return fn(*args, **kwargs)
+        finally:
+            _worker.active = False
+            with self._lock:
+                self._running -= 1
+
+    def _finished(self, future: Future) -> None:
+        self._slots.release()
+        if future.cancelled():
+            with self._lock:
+                # Never started: _run did not move it out of the queue.
+                self._queued -= 1
+                self._stats["cancelled"] += 1
+            return
+        exc = future.exception()
+        if isinstance(exc, CancelledError):
+            self._count("cancelled")
+        else:
+            self._count("failed" if exc else "completed")
+
+    def submit(
+        self,
+        fn: Callable[..., R],
+        *args: Any,
+        cancel_checker: Callable[[], bool] | None = None,
+        **kwargs: Any,
+    ) -> Future:
+        """Isi kuyruga ekler; kuyruk doluysa yer acilana kadar bekler."""
+        if not self.parallel:
+            future: Future = Future()
+            self._count("inline")
+            try:
+                if cancel_checker and cancel_checker():
+                    raise CancelledError("Cancelled before the LLM call started")
+                future.set_result(fn(*args, **kwargs))
+            except BaseException as exc:
+                future.set_exception(exc)
+            return future
+
+        self._acquire_slot(cancel_checker)
+        with self._lock:
+            self._queued += 1
+            self._stats["submitted"] += 1
+        try:
+            # The caller's context (current job, calling agent) follows the job to the worker.
+            context = contextvars.copy_context()
+            future = self._pool().submit(context.run, self._run, fn, args, kwargs, cancel_checker, time.monotonic())
+        except BaseException:
+            with self._lock:
+                self._queued -= 1
+            self._slots.release()
+            raise
+        future.add_done_callback(self._finished)
+        return future
+
+    def map(
+        self,
+        fn: Callable[[T], R],
+        items: Iterable[T],
+        *,
+        cancel_checker: Callable[[], bool] | None = None,
+    ) -> list[R]:
+        """
+        `fn`'i her elemana uygular; sonuclar girdi sirasiyla doner. Ilk hata
+        (iptal dahil) bekleyen isleri iptal eder ve yukari firlatilir.
+        """
+        items = list(items)
+        if not self.parallel or len(items) <= 1:
+            results = []
+            for item in items:
+                if cancel_checker and cancel_checker():
+                    raise CancelledError("Cancelled between LLM calls")
+                results.append(fn(item))
+            self._count("inline", len(items))
+            return results
+
+        futures: list[Future] = []
+        try:
+            for item in items:
+                futures.append(self.submit(fn, item, cancel_checker=cancel_checker))
+            pending = set(futures)
+            while pending:
+                _, pending = wait(pending, timeout=_CANCEL_POLL_SECONDS, return_when=FIRST_EXCEPTION)
+                failed = next((f for f in futures if f.done() and not f.cancelled() and f.exception()), None)
+                if failed is not None:
+                    raise failed.exception()
+                if cancel_checker and cancel_checker():
+                    raise CancelledError("Cancelled while waiting for LLM calls")
+            return [future.result() for future in futures]
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            stats: dict[str, Any] = dict(self._stats)
+            stats["running"] = self._running
+            stats["queued"] = self._queued
+        stats["max_parallel"] = self.max_parallel
+        stats["queue_size"] = self.queue_size
+        return stats
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+_DEFAULT_DISPATCHER: LLMDispatcher | None = None
+_DEFAULT_DISPATCHER_LOCK = threading.Lock()
+
+
+def get_llm_dispatcher() -> LLMDispatcher:
+    """Uygulama genelinde paylasilan dispatcher."""
+    global _DEFAULT_DISPATCHER
+    with _DEFAULT_DISPATCHER_LOCK:
+        if _DEFAULT_DISPATCHER is None:
+            _DEFAULT_DISPATCHER = LLMDispatcher()
+        return _DEFAULT_DISPATCHER
+
+
+def reset_llm_dispatcher() -> None:
+    global _DEFAULT_DISPATCHER
+    with _DEFAULT_DISPATCHER_LOCK:
+        dispatcher, _DEFAULT_DISPATCHER = _DEFAULT_DISPATCHER, None
+    if dispatcher is not None:
+        dispatcher.shutdown()
@@ -0,0 +1,103 @@
+"""
+Gorev sinifina gore model secimi ve gorev basina gecikme.
+
+Onceden her LLM cagrisi `llama3.1:8b` ile gidiyordu: 0-10 arasi puanlama ve
+risk siniflandirmasi gibi kisa, yapisal isler de. Bu isler 1-3B bir modelle
+birkac kat hizli biter; uzun metin (caption, senaryo, sohbet) ise buyuk
+modelde kalmalidir.
+
+Cagrilar bir gorev sinifi tasir (`TASKS`): scoring, risk, prompt, caption,
+chat. ModelRouter her sinifi `LLM_MODEL_<SINIF>` ile ayarlanan modele
+yonlendirir; ayar bos ya da sinif bilinmiyorsa servisin varsayilan modeli
+(`LLM_MODEL`) kullanilir. Ollama yonlendirilen modeli tanimiyorsa (HTTP 404)
+model "eksik" isaretlenir ve o siniftaki cagrilar varsayilana doner.
+
+Her cagrinin suresi gorev ve model bazinda kaydedilir; yonlendirme tablosu
+`stats()` (ve /api/llm/routing) verisine bakarak ayarlanir.
+"""
+
+import threading
+from typing import Any
+
+from core.runtime.config import LLM_TASK_MODELS
+
+TASKS = ("scoring", "risk", "prompt", "caption", "chat")
+
+
+class ModelRouter:
+    """Thread-safe; gorev sinifi -> model eslemesi ve gecikme sayaclari."""
+
+    def __init__(self, task_models: dict[str, str] | None = None):
+        routes = LLM_TASK_MODELS if task_models is None else task_models
+        self.routes = {task: model for task, model in routes.items() if task in TASKS and model}
+        self._lock = threading.Lock()
+        self._missing: set[str] = set()
+        self._latency: dict[tuple[str, str], dict[str, Any]] = {}
+
+    def model_for(self, task: str | None, default: str) -> str:
+        """Gorevin modeli; ayarlanmamis ya da Ollama'da bulunamamissa `default`."""
+        model = self.routes.get(task or "")
+        with self._lock:
+            if not model or model in self._missing:
+                return default
+        return model
+
+    def mark_missing(self, model: str) -> None:
+        with self._lock:
+            self._missing.add(model)
+
+    def record(
+        self, task: str | None, model: str, seconds: float, *, cached: bool = False, failed: bool = False
+    ) -> None:
+        """Bir cagrinin sonucunu gorev + model satirina ekler."""
+        with self._lock:
+            row = self._latency.setdefault(
+                (task or "default", model),
+                {"calls": 0, "cache_hits": 0, "errors": 0, "total_seconds": 0.0, "max_seconds": 0.0},
+            )
+            if cached:
+                row["cache_hits"] += 1
+                return
+            row["calls"] += 1
+            if failed:
+                row["errors"] += 1
+            row["total_seconds"] += seconds
+            row["max_seconds"] = max(row["max_seconds"], seconds)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            rows = {key: dict(row) for key, row in self._latency.items()}
+            missing = sorted(self._missing)
+        tasks: dict[str, list[dict[str, Any]]] = {}
+        for (task, model), row in sorted(rows.items()):
+            calls = row["calls"]
+            tasks.setdefault(task, []).append(
+                {
+                    "model": model,
+                    "calls": calls,
+                    "cache_hits": row["cache_hits"],
+                    "errors": row["errors"],
+                    "mean_seconds": round(row["total_seconds"] / calls, 3) if calls else 0.0,
+                    "max_seconds": round(row["max_seconds"], 3),
+                }
+            )
+        return {"routes": dict(self.routes), "missing": missing, "tasks": tasks}
+
+
+_DEFAULT_ROUTER: ModelRouter | None = None
+_DEFAULT_ROUTER_LOCK = threading.Lock()
+
+
+def get_model_router() -> ModelRouter:
+    """Uygulama genelinde paylasilan yonlendirici."""
+    global _DEFAULT_ROUTER
+    with _DEFAULT_ROUTER_LOCK:
+        if _DEFAULT_ROUTER is None:
+            _DEFAULT_ROUTER = ModelRouter()
+        return _DEFAULT_ROUTER
+
+
+def reset_model_router() -> None:
+    global _DEFAULT_ROUTER
+    with _DEFAULT_ROUTER_LOCK:
+        _DEFAULT_ROUTER = None
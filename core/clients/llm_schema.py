@@ -0,0 +1,273 @@
+"""
+Agent'larin JSON semalari: Ollama'ya kisit, cevaba tip dogrulamasi ve yerel onarim.
+
+Onceden `generate_json` semayi yalnizca prompt'a metin olarak yapistirip
+`format="json"` gonderiyordu. Parse hatasinda tum uretim 3 kereye kadar
+tekrarlaniyordu (arada 1 sn bekleme ile); CaptionAgent, RiskAgent, NewsAgent ve
+carousel planlayicisi bu bedeli oduyordu.
+
+Agent'larin verdigi ipucu sozlukleri ({"risk_score": "integer (0-10)", ...})
+artik iki seye cevrilir:
+
+- `json_schema_for`: Ollama'nin `format` alanina giden gercek JSON Schema.
+  Ollama >= 0.5 bununla ciktiyi semaya uyacak sekilde kisitlar.
+- `schema_model`: cevabi dogrulayan pydantic modeli. Alanlar zorunlu degildir
+  (agent'lar eksik alana kendi varsayilanini verir), "0-10" gibi araliklar
+  kirpilir, tipi yanlis alan atilir.
+
+`parse_json_reply` once ucuz yerel onarim dener: kod blogu ve cevreleyen
+metin, sondaki virgul, yarida kesilmis string/parantez. Ancak bu da sonuc
+vermezse cagiran tum uretimi tekrarlar. Sayaclar `get_json_stats()` ile okunur.
+"""
+
+import json
+import re
+import threading
+from functools import lru_cache
+from typing import Annotated, Any
+
+from pydantic import AfterValidator, BaseModel, ConfigDict, ValidationError, create_model
+
+from core.errors import LLMResponseError
+
+_RANGE_RE = re.compile(r"(-?\d+)\s*-\s*(-?\d+)")
+_CHOICES_RE = re.compile(r"from:\s*(.+)$")
+_TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+
+
+def _kind(hint: str) -> str:
+    text = hint.lower()
+    if "bool" in text:
+        return "boolean"
+    if re.search(r"\bint", text):
+        return "integer"
+    if "float" in text or "number" in text:
+        return "number"
+    return "string"
+
+
+def _bounds(hint: str) -> tuple[int, int] | None:
+    match = _RANGE_RE.search(hint)
+    if not match:
+        return None
+    low, high = int(match.group(1)), int(match.group(2))
+    return (low, high) if low < high else None
+
+
+def json_schema_for(hint: Any) -> dict[str, Any]:
+    """Ipucu sozlugunden Ollama'nin anladigi JSON Schema; tum alanlar zorunlu."""
+    if isinstance(hint, dict):
+        return {
+            "type": "object",
+            "properties": {key: json_schema_for(value) for key, value in hint.items()},
+            "required": list(hint),
+        }
+    if isinstance(hint, list):
+        return {"type": "array", "items": json_schema_for(hint[0]) if hint else {}}
+    if not isinstance(hint, str):
+        return {}
+
+    kind = _kind(hint)
+    schema: dict[str, Any] = {"type": kind}
+    bounds = _bounds(hint) if kind in ("integer", "number") else None
+    if bounds:
+        schema["minimum"], schema["maximum"] = bounds
+    choices = _CHOICES_RE.search(hint) if kind == "string" else None
+    if choices:
+        schema["enum"] = [choice.strip() for choice in choices.group(1).split(",") if choice.strip()]
+    return schema
+
+
+def _clamp(low: int, high: int):
+    return lambda value: min(max(value, low), high)
+
+
+def _field_type(hint: Any, name: str) -> Any:
+    if isinstance(hint, dict):
+        return _model_for(hint, name)
+    if isinstance(hint, list):
+        return list[_field_type(hint[0], name) if hint else Any]
+    if not isinstance(hint, str):
+        return Any
+
+    kind = _kind(hint)
+    if kind == "boolean":
+        return bool
+    if kind == "string":
+        return str
+    base = int if kind == "integer" else float
+    bounds = _bounds(hint)
+    return Annotated[base, AfterValidator(_clamp(*bounds))] if bounds else base
+
+
+class _Reply(BaseModel):
+    # Extra keys the model adds are kept; agents read what they know.
+    model_config = ConfigDict(extra="allow")
+
+
+def _model_for(hint: dict[str, Any], name: str) -> type[BaseModel]:
+    # Fields default to None without being Optional: an explicit null is
+    # rejected (and dropped), a missing key stays unset.
+    fields = {
+        key: (_field_type(value, f"{name}_{key}"), None)
+        for key, value in hint.items()
+        if key.isidentifier() and not key.startswith("_")
+    }
+    return create_model(name, __base__=_Reply, **fields)
+
+
+@lru_cache(maxsize=64)
+def _cached_model(canonical: str) -> type[BaseModel]:
+    return _model_for(json.loads(canonical), "LLMReply")
+
+
+def schema_model(schema: dict[str, Any]) -> type[BaseModel]:
+    """Ipucu sozlugunun pydantic modeli; ayni sema icin tekrar kurulmaz."""
+    return _cached_model(json.dumps(schema, sort_keys=True))
+
+
+def _strip_fences(text: str) -> str:
+    return text.replace("```json", "").replace("```", "").strip()
+
+
+def _close_truncated(body: str) -> str:
+    """Yarida kesilmis JSON'a eksik tirnak ve parantezleri ekler."""
+    stack: list[str] = []
+    in_string = escaped = False
+    for char in body:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+        elif char in "}]" and stack:
+            stack.pop()
+    if in_string:
+        body += '"'
+    body = body.rstrip().rstrip(",")
+    if body.endswith(":"):
+        body += " null"
+    return body + "".join(reversed(stack))
+
+
+def repair_json(text: str) -> Any:
+    """
+    LLM ciktisindaki yaygin bozulmalari onarir: kod blogu, JSON oncesi/sonrasi
+    metin, sondaki virgul, yarida kalan cikti. Onarilamazsa ValueError.
+    """
+    cleaned = _strip_fences(text)
+    starts = [index for index in (cleaned.find("{"), cleaned.find("[")) if index >= 0]
+    if not starts:
+        raise ValueError("no JSON object in LLM reply")
+    body = _TRAILING_COMMA_RE.sub(r"\1", cleaned[min(starts) :])
+
+    try:
+        value, _ = json.JSONDecoder().raw_decode(body)
+        return value
+    except json.JSONDecodeError:
+        pass
+
+    # Truncated output: close what is open, dropping the last partial member
+    # until the rest parses.
+    candidate = body
+    for _ in range(8):
+        try:
+            value = json.loads(_close_truncated(candidate))
+        except json.JSONDecodeError:
+            cut = candidate.rfind(",")
+            if cut <= 0:
+                break
+            candidate = candidate[:cut]
+            continue
+        # Closing a bare "{" is not a repair; nothing was salvaged.
+        if value:
+            return value
+        break
+    raise ValueError("LLM reply could not be repaired into JSON")
+
+
+def _loc_key(part: Any) -> tuple[int, Any]:
+    return (0, part) if isinstance(part, int) else (1, str(part))
+
+
+def _drop_invalid(data: Any, errors: list[dict[str, Any]]) -> int:
+    dropped = 0
+    # Deepest / last positions first, so list indices stay valid while popping.
+    for loc in sorted(
+        {tuple(error["loc"]) for error in errors}, key=lambda loc: [_loc_key(p) for p in loc], reverse=True
+    ):
+        parent = data
+        try:
+            for part in loc[:-1]:
+                parent = parent[part]
+            if isinstance(parent, dict) and loc[-1] in parent:
+                del parent[loc[-1]]
+                dropped += 1
+            elif isinstance(parent, list) and isinstance(loc[-1], int) and loc[-1] < len(parent):
+                parent.pop(loc[-1])
+                dropped += 1
+        except (KeyError, IndexError, TypeError):
+            continue
+    return dropped
+
+
+def validate_reply(data: Any, schema: dict[str, Any]) -> tuple[dict[str, Any], int]:
+    """Cevabi semaya gore dogrular; tipi yanlis alanlari atar. (sonuc, atilan alan sayisi)"""
+    if not isinstance(data, dict):
+        raise LLMResponseError("Ollama JSON response is not an object")
+    model = schema_model(schema)
+    dropped = 0
+    for _ in range(5):
+        try:
+            return model.model_validate(data).model_dump(exclude_unset=True), dropped
+        except ValidationError as exc:
+            removed = _drop_invalid(data, exc.errors())
+            if not removed:
+                break
+            dropped += removed
+    raise ValueError("LLM reply does not match the schema")
+
+
+def parse_json_reply(text: str, schema: dict[str, Any]) -> dict[str, Any]:
+    """Metni parse eder, gerekirse yerel onarim yapar ve semaya gore dogrular."""
+    stats = get_json_stats()
+    try:
+        data = json.loads(_strip_fences(text))
+    except json.JSONDecodeError:
+        data = repair_json(text)
+        stats.count("repaired")
+    result, dropped = validate_reply(data, schema)
+    if dropped:
+        stats.count("fields_dropped", dropped)
+    return result
+
+
+class JsonStats:
+    """generate_json sayaclari: kac cevap onarildi, kac kez yeniden uretildi."""
+
+    FIELDS = ("requests", "repaired", "fields_dropped", "regenerations", "failures", "schema_fallbacks")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = dict.fromkeys(self.FIELDS, 0)
+
+    def count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counters[name] += amount
+
+    def snapshot(self) -> dict[str, int]:
+        with self._lock:
+            return dict(self._counters)
+
+
+_JSON_STATS = JsonStats()
+
+
+def get_json_stats() -> JsonStats:
+    return _JSON_STATS
@@ -0,0 +1,235 @@
+"""
+Her LLM cagrisinin token ve zaman telemetrisi.
+
+Onceden Ollama'nin cevapta verdigi sayaclar (`prompt_eval_count`,
+`eval_count`, `load_duration`, `prompt_eval_duration`, `eval_duration`,
+`total_duration`) `LLMService.chat` tarafindan atiliyor, yalnizca
+`message.content` okunuyordu. Bir pipeline kosusunda 8B modelin suresinin
+model yuklemeye mi, prompt okumaya mi, uretime mi, yoksa kuyrukta beklemeye
+mi gittigi gorulemiyordu.
+
+LLMTelemetry her cagriyi bir ornek olarak kaydeder ve su etiketleri ekler:
+
+- agent: cagriyi yapan agent (BaseAgent.process `llm_caller` ile baglar);
+- task: gorev sinifi (llm_routing);
+- job_id: o anki is (`current_job()`).
+
+Ornekler uc histograma islenir: uretim hizi (token/sn), model yukleme suresi
+ve kuyruk bekleme. Kuyruk beklemesi iki kaynaktan gelir. Ollama tarafinda
+duvar saati ile `total_duration` arasindaki fark, istegin Ollama'nin
+kuyrugunda (ve agda) gecirdigi suredir. LLMDispatcher tarafinda ise isin
+slot bekledigi sure ayrica olculur.
+
+Ise bagli cagrilar ayrica `Job.llm` ozetine yazilir; is snapshot'i ve
+/api/metrics bu veriyi dondurur.
+"""
+
+import threading
+from collections import deque
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any
+
+from core.runtime.config import LLM_TELEMETRY_SAMPLES
+from core.runtime.jobs import current_job
+
+_NS = 1_000_000_000
+
+TOKENS_PER_SECOND_BOUNDS = (5, 10, 20, 30, 45, 60, 80, 120, 200)
+SECONDS_BOUNDS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60)
+
+# Cagriyi yapan agent. Dispatcher thread'leri baglami kopyaladigi icin paralel
+# cagrilar da dogru agent'a yazilir.
+_CALLER: ContextVar[str | None] = ContextVar("atlas_llm_caller", default=None)
+
+
+@contextmanager
+def llm_caller(name: str | None) -> Iterator[None]:
+    token = _CALLER.set(name)
+    try:
+        yield
+    finally:
+        _CALLER.reset(token)
+
+
+class Histogram:
+    """Sabit sinirli histogram; p50/p95 kova ust sinirindan okunur."""
+
+    def __init__(self, bounds: tuple[float, ...]):
+        self.bounds = tuple(sorted(bounds))
+        self._counts = [0] * (len(self.bounds) + 1)
+        self._count = 0
+        self._sum = 0.0
+        self._min: float | None = None
+        self._max: float | None = None
+
+    def observe(self, value: float) -> None:
+        index = next((i for i, bound in enumerate(self.bounds) if value <= bound), len(self.bounds))
+        self._counts[index] += 1
+        self._count += 1
+        self._sum += value
+        self._min = value if self._min is None else min(self._min, value)
+        self._max = value if self._max is None else max(self._max, value)
+
+    def _quantile(self, q: float) -> float | None:
+        if not self._count:
+            return None
+        rank = q * self._count
+        seen = 0
+        for index, count in enumerate(self._counts):
+            seen += count
+            if seen >= rank and count:
+                return self.bounds[index] if index < len(self.bounds) else self._max
+        return self._max
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "count": self._count,
+            "sum": round(self._sum, 3),
+            "mean": round(self._sum / self._count, 3) if self._count else None,
+            "min": None if self._min is None else round(self._min, 3),
+            "max": None if self._max is None else round(self._max, 3),
+            "p50": self._quantile(0.5),
+            "p95": self._quantile(0.95),
+            "buckets": [
+                {"le": bound, "count": count} for bound, count in zip([*self.bounds, "+Inf"], self._counts, strict=True)
+            ],
+        }
+
+
+def _seconds(final: dict[str, Any], key: str) -> float | None:
+    value = final.get(key)
+    return value / _NS if isinstance(value, int | float) else None
+
+
+def _rate(tokens: Any, seconds: float | None) -> float | None:
+    if not isinstance(tokens, int | float) or not seconds:
+        return None
+    return round(tokens / seconds, 2)
+
+
+def build_sample(
+    final: dict[str, Any], *, model: str | None, task: str | None, wall_seconds: float | None
+) -> dict[str, Any]:
+    """Ollama'nin son parcasindaki sayaclardan tek cagri ornegi."""
+    eval_seconds = _seconds(final, "eval_duration")
+    prompt_seconds = _seconds(final, "prompt_eval_duration")
+    total = _seconds(final, "total_duration")
+    queue = max(0.0, wall_seconds - total) if wall_seconds is not None and total is not None else None
+    job = current_job()
+    return {
+        "agent": _CALLER.get(),
+        "task": task,
+        "job_id": job.id if job is not None else None,
+        "model": model,
+        "prompt_tokens": final.get("prompt_eval_count"),
+        "completion_tokens": final.get("eval_count"),
+        "load_seconds": _seconds(final, "load_duration"),
+        "prompt_eval_seconds": prompt_seconds,
+        "eval_seconds": eval_seconds,
+        "total_seconds": wall_seconds,
+        "queue_seconds": queue,
+        "tokens_per_second": _rate(final.get("eval_count"), eval_seconds),
+        "prompt_tokens_per_second": _rate(final.get("prompt_eval_count"), prompt_seconds),
+    }
+
+
+class LLMTelemetry:
+    """Thread-safe; cagri ornekleri, histogramlar ve is bazinda ozet."""
+
+    HISTOGRAMS = {
+        "tokens_per_second": TOKENS_PER_SECOND_BOUNDS,
+        "load_seconds": SECONDS_BOUNDS,
+        "queue_seconds": SECONDS_BOUNDS,
+        "dispatch_wait_seconds": SECONDS_BOUNDS,
+    }
+
+    def __init__(self, max_samples: int = LLM_TELEMETRY_SAMPLES):
+        self._lock = threading.Lock()
+        self._samples: deque = deque(maxlen=max(1, int(max_samples)))
+        self._histograms = {name: Histogram(bounds) for name, bounds in self.HISTOGRAMS.items()}
+        self._totals = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0}
+        self._by_key: dict[tuple[str, str], dict[str, Any]] = {}
+
+    def record(
+        self,
+        final: dict[str, Any],
+        *,
+        model: str | None = None,
+        task: str | None = None,
+        wall_seconds: float | None = None,
+    ) -> dict[str, Any]:
+        """Bir cagriyi kaydeder; bagli is varsa onun ozetine de yazar."""
+        sample = build_sample(final, model=model, task=task, wall_seconds=wall_seconds)
+        with self._lock:
+            self._samples.append(sample)
+            self._totals["calls"] += 1
+            for key in ("prompt_tokens", "completion_tokens"):
+                self._totals[key] += sample[key] or 0
+            for name in ("tokens_per_second", "load_seconds", "queue_seconds"):
+                if sample[name] is not None:
+                    self._histograms[name].observe(sample[name])
+            _accumulate(self._by_key, (sample["agent"] or "-", task or "default"), sample)
+        job = current_job()
+        if job is not None:
+            job.record_llm(sample)
+        return sample
+
+    def observe_dispatch_wait(self, seconds: float) -> None:
+        with self._lock:
+            self._histograms["dispatch_wait_seconds"].observe(max(0.0, seconds))
+
+    def snapshot(self, *, recent: int = 20) -> dict[str, Any]:
+        with self._lock:
+            histograms = {name: histogram.snapshot() for name, histogram in self._histograms.items()}
+            by_key = {key: dict(row) for key, row in self._by_key.items()}
+            samples = list(self._samples)[-recent:] if recent else []
+            totals = dict(self._totals)
+        breakdown = [{"agent": agent, "task": task, **_finish(row)} for (agent, task), row in sorted(by_key.items())]
+        return {**totals, "histograms": histograms, "by_agent_task": breakdown, "recent": samples}
+
+
+def _accumulate(rows: dict[Any, dict[str, Any]], key: Any, sample: dict[str, Any]) -> None:
+    row = rows.setdefault(
+        key,
+        {
+            "calls": 0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "load_seconds": 0.0,
+            "prompt_eval_seconds": 0.0,
+            "eval_seconds": 0.0,
+            "queue_seconds": 0.0,
+            "total_seconds": 0.0,
+        },
+    )
+    row["calls"] += 1
+    for name in row:
+        if name != "calls":
+            row[name] += sample.get(name) or 0
+
+
+def _finish(row: dict[str, Any]) -> dict[str, Any]:
+    result = {name: round(value, 3) if isinstance(value, float) else value for name, value in row.items()}
+    result["tokens_per_second"] = _rate(row["completion_tokens"], row["eval_seconds"])
+    return result
+
+
+_DEFAULT_TELEMETRY: LLMTelemetry | None = None
+_DEFAULT_TELEMETRY_LOCK = threading.Lock()
+
+
+def get_llm_telemetry() -> LLMTelemetry:
+    """Uygulama genelinde paylasilan telemetri."""
+    global _DEFAULT_TELEMETRY
+    with _DEFAULT_TELEMETRY_LOCK:
+        if _DEFAULT_TELEMETRY is None:
+            _DEFAULT_TELEMETRY = LLMTelemetry()
+        return _DEFAULT_TELEMETRY
+
+
+def reset_llm_telemetry() -> None:
+    global _DEFAULT_TELEMETRY
+    with _DEFAULT_TELEMETRY_LOCK:
+        _DEFAULT_TELEMETRY = None
@@ -0,0 +1,181 @@
+"""
+Benzer prompt'lar icin onceki gorselleri yeniden kullanma.
+
+Onceden haber prompt'lari gunden gune cok benzer olsa da ("photorealistic
+documentary scene of a Mars rover...") resim_ciz her seferinde sifirdan
+ciziyordu; render cache yalnizca birebir ayni payload'i (seed dahil) yakalar.
+
+PromptIndex basarili her render'in prompt'unu kelime shingle'lari (tekli +
+ikili) olarak indeksler. Yeni bir prompt icin ayni gruptaki (checkpoint) en
+az istenen cozunurlukteki kayitlar arasindan en benzerini Jaccard
+benzerligiyle bulur; boylece bir taslak onceki tam kalite gorselle
+karsilanabilir ama tersi olmaz. Dolgu kelimeleri sayilmaz (sd_client kalite
+ankrajini indekslemeden once cikarir).
+
+SD_PROMPT_REUSE:
+
+- off    -> kapali (varsayilan); indeks yine de dolar
+- reuse  -> esik gecilirse onceki gorselin kopyasi doner, Forge'a gidilmez
+- init   -> onceki gorsel img2img baslangici olur (SD_PROMPT_REUSE_DENOISE);
+            adimlarin yalnizca bir kismi calisir
+
+Indeks SD_PROMPT_INDEX_PATH'te JSON olarak tutulur ve SD_PROMPT_INDEX_MAX
+kayitla sinirlidir (en eskiler duser). Dosyasi silinmis gorseller aramada
+atlanir ve indeksten cikarilir.
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any
+
+from core.runtime.config import SD_PROMPT_INDEX_MAX, SD_PROMPT_INDEX_PATH
+
+logger = logging.getLogger(__name__)
+
+REUSE_MODES = ("off", "reuse", "init")
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    {"a", "an", "the", "of", "and", "or", "in", "on", "at", "to", "for", "by", "with", "from", "is", "are"}
+)
+
+
+@dataclass(frozen=True)
+class PromptMatch:
+    prompt: str
+    path: str
+    score: float
+
+
+def shingles(text: str) -> frozenset[str]:
+    """Kucuk harf kelimeler ve ardisik kelime ciftleri; dolgu kelimeleri atlanir."""
+    words = [w for w in _WORD_RE.findall((text or "").lower()) if w not in _STOPWORDS]
+    return frozenset(words) | frozenset(f"{a} {b}" for a, b in zip(words, words[1:], strict=False))
+
+
+def similarity(a: frozenset[str], b: frozenset[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class PromptIndex:
+    """Thread-safe; her eklemede diske yazilir (path=None ise yazilmaz)."""
+
+    def __init__(
+        self,
+        path: str | None = SD_PROMPT_INDEX_PATH,
+        *,
+        max_entries: int = SD_PROMPT_INDEX_MAX,
+    ):
+        self.path = path
+        self.max_entries = max(1, int(max_entries))
+        self._lock = threading.Lock()
+        self._entries: list[dict[str, Any]] = []
+        self._shingles: list[frozenset[str]] = []
+        self._load()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def _load(self) -> None:
+        if not self.path:
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError):
+            logger.warning("Prompt index could not be read: %s", self.path, exc_info=True)
+            return
+        entries = data.get("entries") if isinstance(data, dict) else None
+        for entry in entries or []:
+            if isinstance(entry, dict) and entry.get("prompt") and entry.get("path"):
+                self._append(entry)
+        self._trim()
+
+    def _save(self) -> None:
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"entries": self._entries}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            logger.warning("Prompt index could not be saved: %s", self.path, exc_info=True)
+
+    def _append(self, entry: dict[str, Any]) -> None:
+        self._entries.append(entry)
+        self._shingles.append(shingles(entry["prompt"]))
+
+    def _trim(self) -> None:
+        overflow = len(self._entries) - self.max_entries
+        if overflow > 0:
+            del self._entries[:overflow]
+            del self._shingles[:overflow]
+
+    def _remove(self, positions: list[int]) -> None:
+        for position in sorted(positions, reverse=True):
+            del self._entries[position]
+            del self._shingles[position]
+
+    def add(self, prompt: str, path: str, *, group: str = "", pixels: int = 0) -> None:
+        """Basarili bir render'i kaydeder; ayni dosya tekrar eklenirse eskisi duser."""
+        with self._lock:
+            self._remove([i for i, entry in enumerate(self._entries) if entry["path"] == path])
+            self._append(
+                {"prompt": prompt, "path": path, "group": group, "pixels": int(pixels), "created_at": time.time()}
+            )
+            self._trim()
+            self._save()
+
+    def find(self, prompt: str, *, group: str = "", threshold: float, min_pixels: int = 0) -> PromptMatch | None:
+        """Esigi gecen, en az `min_pixels` cozunurlukteki en benzer (esitlikte en yeni) kayit."""
+        wanted = shingles(prompt)
+        if not wanted:
+            return None
+        with self._lock:
+            best: PromptMatch | None = None
+            missing: list[int] = []
+            for position, (entry, entry_shingles) in enumerate(zip(self._entries, self._shingles, strict=True)):
+                if entry.get("group", "") != group or int(entry.get("pixels") or 0) < min_pixels:
+                    continue
+                score = similarity(wanted, entry_shingles)
+                if score < threshold or (best and score < best.score):
+                    continue
+                if not os.path.isfile(entry["path"]):
+                    missing.append(position)
+                    continue
+                best = PromptMatch(entry["prompt"], entry["path"], score)
+            if missing:
+                self._remove(missing)
+                self._save()
+        return best
+
+
+_DEFAULT_INDEX: PromptIndex | None = None
+_DEFAULT_INDEX_LOCK = threading.Lock()
+
+
+def get_prompt_index() -> PromptIndex:
+    """Uygulama genelinde tek prompt indeksi."""
+    global _DEFAULT_INDEX
+    with _DEFAULT_INDEX_LOCK:
+        if _DEFAULT_INDEX is None:
+            _DEFAULT_INDEX = PromptIndex()
+        return _DEFAULT_INDEX
+
+
+def reset_prompt_index() -> None:
+    global _DEFAULT_INDEX
+    with _DEFAULT_INDEX_LOCK:
+        _DEFAULT_INDEX = None
@@ -0,0 +1,258 @@
+"""
+Sure butcesine gore render profili secimi.
+
+Onceden adim sayisi, hires, ADetailer ve post-upscale import aninda config'ten
+okunan sabitlerdi. "Bu video 4 dakikada bitmeli" gibi bir hedef ifade
+edilemiyordu; yavas bir makinede is ya zaman asimina ugruyor ya da ayarlari
+elle kismak gerekiyordu.
+
+RenderTimings bu makinede olculen surelerden ozellik bazli tahmin tutar
+(ustel hareketli ortalama):
+
+- step       -> ilk gecis, saniye / (adim x megapiksel)
+- hires      -> ikinci gecis, saniye / (hires adimi x hires megapikseli)
+- adetailer  -> render basina ek saniye
+- upscale    -> post-upscale istegi, render basina saniye
+
+Her basarili render'in gercek suresi `record_render` / `record_upscale` ile
+yazilir ve SD_RENDER_TIMINGS_PATH'e kaydedilir; tahminler zamanla makineye
+oturur. Olcum yokken kaba varsayilanlar kullanilir.
+
+`choose_profile(budget)` verilen profilden baslar; butceye sigana kadar
+sirasiyla hires'i, post-upscale'i, ADetailer'i birakir, sonra adimlari
+SD_BUDGET_MIN_STEPS'e kadar azaltir. Hicbiri sigmazsa en ucuz profil doner.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import replace
+from typing import Any
+
+from core.clients.render_profile import FULL_PROFILE, RenderProfile
+from core.runtime.config import (
+    SD_BUDGET_MIN_STEPS,
+    SD_ENABLE_ADDETAILER,
+    SD_ENABLE_HIRES_FIX,
+    SD_ENABLE_POST_UPSCALE,
+    SD_HIRES_SCALE,
+    SD_POST_UPSCALE_FACTOR,
+    SD_RENDER_TIMINGS_PATH,
+)
+
+logger = logging.getLogger(__name__)
+
+# Olcum yokken: orta sinif bir GPU'da SDXL, 1024x1024.
+DEFAULT_ESTIMATES = {"step": 0.5, "hires": 0.9, "adetailer": 6.0, "upscale": 4.0}
+
+
+def _megapixels(width: Any, height: Any) -> float:
+    return float(width or 0) * float(height or 0) / 1_000_000
+
+
+def _has_adetailer(payload: dict[str, Any]) -> bool:
+    return "adetailer" in {str(name).lower() for name in payload.get("alwayson_scripts") or {}}
+
+
+class RenderTimings:
+    """Thread-safe; olcumler her kayitta diske yazilir (path=None ise yazilmaz)."""
+
+    def __init__(
+        self,
+        path: str | None = SD_RENDER_TIMINGS_PATH,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+        alpha: float = 0.3,
+    ):
+        self.path = path
+        self._clock = clock
+        self.alpha = min(1.0, max(0.01, float(alpha)))
+        self._lock = threading.Lock()
+        self._estimates = dict(DEFAULT_ESTIMATES)
+        self._samples = dict.fromkeys(DEFAULT_ESTIMATES, 0)
+        self._load()
+
+    def now(self) -> float:
+        """Sure olcumu icin saat; testler sahte saat verir."""
+        return self._clock()
+
+    def _load(self) -> None:
+        if not self.path:
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError):
+            logger.warning("Render timings could not be read: %s", self.path, exc_info=True)
+            return
+        for name, entry in (data.get("features") or {}).items() if isinstance(data, dict) else ():
+            if name not in self._estimates or not isinstance(entry, dict):
+                continue
+            try:
+                seconds = float(entry["seconds"])
+                samples = int(entry.get("samples") or 0)
+            except (KeyError, TypeError, ValueError):
+                continue
+            if seconds >= 0:
+                self._estimates[name] = seconds
+                self._samples[name] = max(0, samples)
+
+    def _save(self) -> None:
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._dump(), f, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            logger.warning("Render timings could not be saved: %s", self.path, exc_info=True)
+
+    def _dump(self) -> dict[str, Any]:
+        return {
+            "features": {
+                name: {"seconds": round(self._estimates[name], 4), "samples": self._samples[name]}
+                for name in DEFAULT_ESTIMATES
+            }
+        }
+
+    def _update(self, name: str, value: float) -> None:
+        value = max(0.0, value)
+        if self._samples[name] == 0:
+            # Ilk olcum varsayilanin yerine gecer.
+            self._estimates[name] = value
+        else:
+            self._estimates[name] += self.alpha * (value - self._estimates[name])
+        self._samples[name] += 1
+
+    def record_render(self, payload: dict[str, Any], seconds: float) -> None:
+        """Forge'a giden payload ve cevabin gercek suresi (kuyruk beklemesi haric)."""
+        steps = float(payload.get("steps") or 0)
+        if payload.get("init_images"):
+            # img2img adimlarin yalnizca denoise kadarini calistirir.
+            steps *= float(payload.get("denoising_strength") or 1.0)
+        megapixels = _megapixels(payload.get("width"), payload.get("height"))
+        if steps <= 0 or megapixels <= 0 or seconds <= 0:
+            return
+        hires = bool(payload.get("enable_hr"))
+        adetailer = _has_adetailer(payload)
+        hires_units = (
+            float(payload.get("hr_second_pass_steps") or steps)
+            * megapixels
+            * float(payload.get("hr_scale") or 1.0) ** 2
+        )
+
+        with self._lock:
+            base_units = steps * megapixels
+            if not hires and not adetailer:
+                self._update("step", seconds / base_units)
+            else:
+                extra = max(0.0, seconds - self._estimates["step"] * base_units)
+                hires_share = 1.0 if hires else 0.0
+                if hires and adetailer:
+                    # Iki ek gecis tek olcumde: fark mevcut tahminlere gore bolunur.
+                    expected_hires = self._estimates["hires"] * hires_units
+                    total = expected_hires + self._estimates["adetailer"]
+                    hires_share = expected_hires / total if total > 0 else 0.5
+                if hires:
+                    self._update("hires", extra * hires_share / hires_units)
+                if adetailer:
+                    self._update("adetailer", extra * (1.0 - hires_share))
+            self._save()
+
+    def record_upscale(self, seconds: float) -> None:
+        if seconds <= 0:
+            return
+        with self._lock:
+            self._update("upscale", seconds)
+            self._save()
+
+    def estimate(self, profile: RenderProfile) -> float:
+        """Profilin bu makinede tahmini suresi (saniye); kapali ozellikler sayilmaz."""
+        with self._lock:
+            estimates = dict(self._estimates)
+        megapixels = _megapixels(profile.width, profile.height)
+        seconds = estimates["step"] * profile.steps * megapixels
+        if profile.hires and SD_ENABLE_HIRES_FIX:
+            seconds += estimates["hires"] * profile.hires_steps * megapixels * SD_HIRES_SCALE**2
+        if profile.adetailer and SD_ENABLE_ADDETAILER:
+            seconds += estimates["adetailer"]
+        if profile.post_upscale and SD_ENABLE_POST_UPSCALE and SD_POST_UPSCALE_FACTOR > 1.0:
+            seconds += estimates["upscale"]
+        return seconds
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return self._dump()
+
+
+def degrade(base: RenderProfile, *, min_steps: int = SD_BUDGET_MIN_STEPS) -> list[RenderProfile]:
+    """Kaliteden ucuza siralanmis adaylar; ilki `base`."""
+    ladder = [base]
+    profile = base
+    for feature in ("hires", "post_upscale", "adetailer"):
+        if getattr(profile, feature):
+            profile = replace(profile, name="budget", **{feature: False})
+            ladder.append(profile)
+    floor = min(profile.steps, max(1, int(min_steps)))
+    steps = profile.steps
+    while steps > floor:
+        steps = max(floor, steps - max(2, steps // 5))
+        ladder.append(replace(profile, name="budget", steps=steps))
+    return ladder
+
+
+def choose_profile(
+    budget: float,
+    *,
+    base: RenderProfile = FULL_PROFILE,
+    renders: int = 1,
+    timings: RenderTimings | None = None,
+) -> RenderProfile:
+    """`renders` adet render'in `budget` saniyeye sigdigi en kaliteli profil."""
+    timings = timings or get_render_timings()
+    per_render = float(budget) / max(1, int(renders))
+    ladder = degrade(base)
+    for profile in ladder:
+        if timings.estimate(profile) <= per_render:
+            if profile is not base:
+                logger.info(
+                    "Render budget %.0fs/render: steps=%s hires=%s adetailer=%s upscale=%s",
+                    per_render,
+                    profile.steps,
+                    profile.hires,
+                    profile.adetailer,
+                    profile.post_upscale,
+                )
+            return profile
+    logger.warning(
+        "Render budget %.0fs/render is below the cheapest estimate (%.0fs); using the cheapest profile",
+        per_render,
+        timings.estimate(ladder[-1]),
+    )
+    return ladder[-1]
+
+
+_DEFAULT_TIMINGS: RenderTimings | None = None
+_DEFAULT_TIMINGS_LOCK = threading.Lock()
+
+
+def get_render_timings() -> RenderTimings:
+    """Uygulama genelinde tek olcum deposu."""
+    global _DEFAULT_TIMINGS
+    with _DEFAULT_TIMINGS_LOCK:
+        if _DEFAULT_TIMINGS is None:
+            _DEFAULT_TIMINGS = RenderTimings()
+        return _DEFAULT_TIMINGS
+
+
+def reset_render_timings() -> None:
+    global _DEFAULT_TIMINGS
+    with _DEFAULT_TIMINGS_LOCK:
+        _DEFAULT_TIMINGS = None
@@ -0,0 +1,175 @@
+"""
+Icerik adresli txt2img render cache.
+
+Onceden bir is tekrar denendiginde ya da UI yenilendiginde `resim_ciz` ayni
+payload ile yeniden cagriliyor ve her seferinde 30-90 sn GPU harcaniyordu.
+
+RenderCache nihai Forge payload'inin kanonik hash'ini anahtar olarak kullanir
+(prompt, negatif prompt, checkpoint, sampler, adim, boyut, seed, alwayson
+script'ler...). Ayni anahtar tekrar gelirse diskteki PNG'nin yolu aninda
+doner. Seed payload'in parcasi oldugu icin rastgele seed ile cizilen bir
+gorsel asla "yanlislikla" tekrar kullanilmaz.
+
+- Dosyalar `SD_RENDER_CACHE_DIR/<hash>.png` olarak saklanir (generated_images
+  altinda; Graph API ve /images oradan sunar).
+- Yas siniri: kayit zamani (mtime) `SD_RENDER_CACHE_MAX_AGE_DAYS`'i gecen
+  dosyalar silinir.
+- Boyut siniri: toplam `SD_RENDER_CACHE_MAX_MB`'yi asarsa en uzun suredir
+  kullanilmayan (atime) dosyalardan baslanarak silinir.
+- `SD_RENDER_CACHE_ENABLED=0` ya da cagri basina `use_cache=False` cache'i
+  atlar.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from typing import Any
+
+from core.runtime.config import (
+    SD_RENDER_CACHE_DIR,
+    SD_RENDER_CACHE_ENABLED,
+    SD_RENDER_CACHE_MAX_AGE_DAYS,
+    SD_RENDER_CACHE_MAX_MB,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class RenderCache:
+    """Payload hash'i -> PNG dosyasi eslemesi; diskte tutulur."""
+
+    def __init__(
+        self,
+        root: str = SD_RENDER_CACHE_DIR,
+        *,
+        max_bytes: int = SD_RENDER_CACHE_MAX_MB * 1024 * 1024,
+        max_age_seconds: float = SD_RENDER_CACHE_MAX_AGE_DAYS * 86400,
+        enabled: bool = SD_RENDER_CACHE_ENABLED,
+    ):
+        self.root = root
+        self.max_bytes = max(0, int(max_bytes))
+        self.max_age_seconds = max(0.0, float(max_age_seconds))
+        self.enabled = bool(enabled)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key_for(payload: dict[str, Any]) -> str:
+        """Anahtar sirasindan ve bosluklardan bagimsiz, kararli hash."""
+        canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.root, f"{key}.png")
+
+    def owns(self, path: str) -> bool:
+        """Dosya cache dizininde mi? Cagiranlar cache kopyasini silmemeli."""
+        try:
+            return os.path.commonpath([os.path.abspath(path), os.path.abspath(self.root)]) == os.path.abspath(self.root)
+        except ValueError:  # Windows'ta farkli surucu
+            return False
+
+    def get(self, key: str) -> str | None:
+        if not self.enabled:
+            return None
+        path = self.path_for(key)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+
+        now = time.time()
+        if self.max_age_seconds and now - stat.st_mtime > self.max_age_seconds:
+            self._remove(path)
+            return None
+        try:
+            # atime = son kullanim (LRU); mtime = kayit zamani (yas siniri).
+            os.utime(path, (now, stat.st_mtime))
+        except OSError:
+            logger.warning("Render cache entry could not be touched: %s", path, exc_info=True)
+        return path
+
+    def put(self, key: str, source_path: str) -> str | None:
+        """Uretilen PNG'nin kopyasini saklar; cache yolunu dondurur."""
+        if not self.enabled:
+            return None
+        path = self.path_for(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            shutil.copyfile(source_path, tmp_path)
+            os.replace(tmp_path, path)
+        except OSError:
+            logger.warning("Render cache entry could not be stored: %s", path, exc_info=True)
+            self._remove(tmp_path)
+            return None
+        self.evict()
+        return path
+
+    def evict(self) -> int:
+        """Yas ve boyut sinirlarini uygular; silinen dosya sayisini dondurur."""
+        with self._lock:
+            entries = []
+            try:
+                names = os.listdir(self.root)
+            except OSError:
+                return 0
+            for name in names:
+                if not name.endswith(".png"):
+                    continue
+                path = os.path.join(self.root, name)
+                try:
+                    entries.append((path, os.stat(path)))
+                except OSError:
+                    continue
+
+            removed = 0
+            now = time.time()
+            kept = []
+            for path, stat in entries:
+                if self.max_age_seconds and now - stat.st_mtime > self.max_age_seconds:
+                    removed += self._remove(path)
+                else:
+                    kept.append((path, stat))
+
+            total = sum(stat.st_size for _, stat in kept)
+            if self.max_bytes and total > self.max_bytes:
+                for path, stat in sorted(kept, key=lambda item: item[1].st_atime):
+                    if total <= self.max_bytes:
+                        break
+                    removed += self._remove(path)
+                    total -= stat.st_size
+            return removed
+
+    @staticmethod
+    def _remove(path: str) -> int:
+        try:
+            os.remove(path)
+            return 1
+        except FileNotFoundError:
+            return 0
+        except OSError:
+            logger.warning("Render cache entry could not be removed: %s", path, exc_info=True)
+            return 0
+
+
+_DEFAULT_CACHE: RenderCache | None = None
+_DEFAULT_CACHE_LOCK = threading.Lock()
+
+
+def get_render_cache() -> RenderCache:
+    """Uygulama genelinde paylasilan cache."""
+    global _DEFAULT_CACHE
+    with _DEFAULT_CACHE_LOCK:
+        if _DEFAULT_CACHE is None:
+            _DEFAULT_CACHE = RenderCache()
+        return _DEFAULT_CACHE
+
+
+def reset_render_cache() -> None:
+    global _DEFAULT_CACHE
+    with _DEFAULT_CACHE_LOCK:
+        _DEFAULT_CACHE = None
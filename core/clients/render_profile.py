@@ -0,0 +1,45 @@
+"""
+Render kalite profilleri: tam kalite ve hizli taslak.
+
+Onceden carousel ve agent her adayi tam kalitede ciziyordu (1024², 30 adim,
+istege bagli hires, ADetailer, 1.15x post-upscale); reddedilen veya yeniden
+uretilen kareler de ayni bedeli oduyordu.
+
+Taslak profili dusuk cozunurluk ve az adimla, ek gecisler olmadan cizer.
+Onaylanan taslaklar `sd_client.finalize_draft` ile ayni seed'le img2img
+uzerinden tam kaliteye cikarilir.
+"""
+
+from dataclasses import dataclass
+
+from core.runtime.config import SD_DRAFT_SIZE, SD_DRAFT_STEPS, SD_HEIGHT, SD_STEPS, SD_WIDTH
+
+
+@dataclass(frozen=True)
+class RenderProfile:
+    name: str
+    width: int
+    height: int
+    steps: int
+    hires: bool = True
+    adetailer: bool = True
+    post_upscale: bool = True
+
+    @property
+    def hires_steps(self) -> int:
+        """Hires ikinci gecisinin adim sayisi."""
+        return max(8, self.steps // 2)
+
+
+FULL_PROFILE = RenderProfile("full", SD_WIDTH, SD_HEIGHT, SD_STEPS)
+
+DRAFT_PROFILE = RenderProfile(
+    "draft",
+    SD_DRAFT_SIZE,
+    # En-boy orani korunur; Forge 8'in katlarini ister.
+    max(64, round(SD_DRAFT_SIZE * SD_HEIGHT / SD_WIDTH / 8) * 8),
+    SD_DRAFT_STEPS,
+    hires=False,
+    adetailer=False,
+    post_upscale=False,
+)
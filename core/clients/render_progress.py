@@ -0,0 +1,226 @@
+"""
+Render sirasinda Forge ilerlemesini tek noktadan ornekleyen sampler.
+
+Onceden UI `/api/progress`'i yokluyordu ve backend her istekte, her istemci
+icin `/sdapi/v1/progress`'e gidiyordu. Agent/carousel/video isleri ise
+sadece kaba asama yuzdeleri goruyordu; 30 adimlik bir render'in nerede
+oldugu job snapshot'inda yoktu.
+
+ProgressSampler:
+
+- sadece bir render aktifken calisan TEK bir thread (kac render/istemci
+  olursa olsun her Forge host'una saniyede en fazla bir progress istegi)
+- her render kendi kaynagini (`track(source=...)`, ForgePool'da kiralanan
+  host) bildirir; host basina ayri ornek alinir ve her is yalnizca kendi
+  host'unun ornegini gorur
+- her ornegi render'i baslatan isin `Job.render` alanina yazar
+  (adim, toplam adim, ETA, istege bagli kucultulmus onizleme)
+- dinleyiciler (render gozcusu) yalnizca kendi host'unun ham ornegini alir
+- `/api/progress` son ornekleri Forge'a gitmeden dondurur
+"""
+
+import base64
+import io
+import logging
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from typing import Any
+
+from core.clients.forge_client import IDLE_PROGRESS
+from core.clients.image_backend import ImageBackend, get_image_backend
+from core.runtime.config import SD_PROGRESS_INTERVAL, SD_PROGRESS_PREVIEW, SD_PROGRESS_PREVIEW_SIZE
+from core.runtime.jobs import Job, current_job
+
+logger = logging.getLogger(__name__)
+
+Listener = Callable[[dict[str, Any]], None]
+
+
+def _source_key(source: Any) -> Any:
+    # Ayni host'u kiralayan render'lar tek ornegi paylasir; failover'da adres degisebilir.
+    if source is None:
+        return "default"
+    return getattr(source, "base_url", None) or id(source)
+
+
+def downscale_preview(image_b64: str, size: int) -> str | None:
+    """Forge'un tam boy onizlemesini kucuk bir JPEG data URI'ye cevirir."""
+    if not image_b64:
+        return None
+    try:
+        from PIL import Image
+
+        raw = image_b64.split(",", 1)[1] if image_b64.startswith("data:") else image_b64
+        with Image.open(io.BytesIO(base64.b64decode(raw))) as image:
+            image = image.convert("RGB")
+            image.thumbnail((size, size))
+            out = io.BytesIO()
+            image.save(out, format="JPEG", quality=70)
+    except Exception:  # Onizleme kozmetik; render'i asla bozmamali.
+        logger.debug("Live preview could not be downscaled", exc_info=True)
+        return None
+    return "data:image/jpeg;base64," + base64.b64encode(out.getvalue()).decode("ascii")
+
+
+def render_view(sample: dict[str, Any], preview: str | None) -> dict[str, Any]:
+    """Forge progress cevabindan Job.render icin sade bir ozet."""
+    state = sample.get("state") if isinstance(sample.get("state"), dict) else {}
+    eta = sample.get("eta_relative")
+    return {
+        "progress": round(float(sample.get("progress") or 0.0), 4),
+        "step": int(state.get("sampling_step") or 0),
+        "steps": int(state.get("sampling_steps") or 0),
+        "job_no": int(state.get("job_no") or 0),
+        "job_count": int(state.get("job_count") or 0),
+        "eta_seconds": round(float(eta), 1) if isinstance(eta, (int, float)) else None,
+        "preview": preview,
+        "updated_at": time.time(),
+    }
+
+
+class ProgressSampler:
+    """Aktif render'lari kaynaklariyla tutar; en az bir render varken her host'u ornekler."""
+
+    def __init__(
+        self,
+        *,
+        interval: float = SD_PROGRESS_INTERVAL,
+        preview: bool = SD_PROGRESS_PREVIEW,
+        preview_size: int = SD_PROGRESS_PREVIEW_SIZE,
+        client_factory: Callable[[], ImageBackend] = get_image_backend,
+    ):
+        self.interval = max(0.05, float(interval))
+        self.preview = bool(preview)
+        self.preview_size = int(preview_size)
+        self._client_factory = client_factory
+        self._lock = threading.Lock()
+        # token -> (sahip is, progress kaynagi); kaynak None ise backend'in kendisi.
+        self._owners: dict[int, tuple[Job | None, Any]] = {}
+        self._tokens = iter(range(1, 1 << 62))
+        self._thread: threading.Thread | None = None
+        self._wake = threading.Event()
+        self._snapshots: dict[Any, dict[str, Any]] = {}
+        self._listeners: list[tuple[Listener, Any]] = []
+
+    @property
+    def active(self) -> bool:
+        with self._lock:
+            return bool(self._owners)
+
+    def snapshot(self) -> dict[str, Any]:
+        """
+        Son Forge ornegi (Forge cevabiyla ayni sekil); render yoksa bos. Ust
+        seviye alanlar en eski render'in host'undan gelir, `hosts` her aktif
+        host'un ornegini adresine gore verir.
+        """
+        with self._lock:
+            if not self._snapshots:
+                return dict(IDLE_PROGRESS)
+            samples = {str(key): dict(sample) for key, sample in self._snapshots.items()}
+        return {**next(iter(samples.values())), "hosts": samples}
+
+    def add_listener(self, listener: Listener, *, source: Any = None) -> None:
+        """
+        Her ham ornekle (tam boy onizleme dahil) sampler thread'inde cagrilir.
+        `source` verilirse yalnizca o kaynagin host'undan gelen ornekler iletilir.
+        """
+        with self._lock:
+            self._listeners.append((listener, source))
+
+    def remove_listener(self, listener: Listener) -> None:
+        with self._lock:
+            self._listeners = [entry for entry in self._listeners if entry[0] != listener]
+
+    @contextmanager
+    def track(self, job: Job | None = None, *, source: Any = None) -> Iterator[None]:
+        """
+        Blok suresince render aktif sayilir; ornekler `job`a (varsayilan: bagli
+        is) yazilir. `source` render'in kiraladigi host'tur (progress() saglar);
+        verilmezse backend'in kendisi sorulur.
+        """
+        owner = job if job is not None else current_job()
+        with self._lock:
+            token = next(self._tokens)
+            self._owners[token] = (owner, source)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="sd-progress-sampler", daemon=True)
+                self._thread.start()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._owners.pop(token, None)
+                still_owned = any(other is owner for other, _ in self._owners.values())
+                if not self._owners:
+                    self._snapshots = {}
+                    self._wake.set()
+            if owner is not None and not still_owned:
+                owner.set_render(None)
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                if not self._owners:
+                    self._thread = None
+                    return
+                self._wake.clear()
+                tracked = list(self._owners.values())
+                want_image = self.preview or bool(self._listeners)
+            sources: dict[Any, Any] = {}
+            owners: list[tuple[Job | None, Any]] = []
+            for job, source in tracked:
+                key = _source_key(source)
+                sources.setdefault(key, source)
+                owners.append((job, key))
+            samples = {key: self._sample(source, want_image) for key, source in sources.items()}
+            views: dict[Any, dict[str, Any]] = {}
+            snapshots: dict[Any, dict[str, Any]] = {}
+            for key, sample in samples.items():
+                public = dict(sample)
+                preview = public.pop("current_image", None)
+                small = downscale_preview(preview, self.preview_size) if preview and self.preview else None
+                views[key] = render_view(sample, small)
+                public["current_image"] = views[key]["preview"]
+                snapshots[key] = public
+            with self._lock:
+                if not self._owners:
+                    continue
+                self._snapshots = snapshots
+                listeners = list(self._listeners)
+            for job in {id(job): job for job, _ in owners if job is not None}.values():
+                # Bir is birden fazla host'ta render ediyorsa en son baslayaninkini gorur.
+                key = next(key for other, key in reversed(owners) if other is job)
+                job.set_render(views[key])
+            for listener, source in listeners:
+                keys = list(samples) if source is None else [_source_key(source)]
+                for key in keys:
+                    if key not in samples:
+                        continue
+                    try:
+                        listener(samples[key])
+                    except Exception:  # Bir dinleyici sampler'i durdurmamali.
+                        logger.exception("Progress listener failed")
+            self._wake.wait(self.interval)
+
+    def _sample(self, source: Any, want_image: bool) -> dict[str, Any]:
+        try:
+            source = source if source is not None else self._client_factory()
+            return source.progress(skip_current_image=not want_image)
+        except Exception:  # Forge kapaliyken de dongu ayakta kalir.
+            logger.warning("Stable Diffusion progress sample failed", exc_info=True)
+            return dict(IDLE_PROGRESS)
+
+
+_DEFAULT_SAMPLER: ProgressSampler | None = None
+_DEFAULT_SAMPLER_LOCK = threading.Lock()
+
+
+def get_progress_sampler() -> ProgressSampler:
+    """Uygulama genelinde tek sampler."""
+    global _DEFAULT_SAMPLER
+    with _DEFAULT_SAMPLER_LOCK:
+        if _DEFAULT_SAMPLER is None:
+            _DEFAULT_SAMPLER = ProgressSampler()
+        return _DEFAULT_SAMPLER
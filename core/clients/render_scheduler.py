@@ -0,0 +1,228 @@
+"""
+Checkpoint/VAE/hires yakinligina gore txt2img siralayici.
+
+Onceden her render `override_settings_restore_afterwards=True` ile gidiyordu:
+checkpoint override eden bir istek Forge'a modeli yukletiyor, bitince eski
+modeli geri yukletiyordu. Farkli checkpoint'ler arasinda gidip gelmek her
+cagrida cok GB'lik agirlik degisimi demekti.
+
+RenderScheduler txt2img isteklerinin onunde durur:
+
+- Forge'a ayni anda tek istek gider (Forge havuzunda host sayisi kadar);
+  bekleyenler arasinda son calisan isle ayni anahtara (checkpoint + VAE +
+  hires ayarlari) sahip olan once secilir. Aclik olmasin diye ayni anahtar
+  art arda en fazla `max_run` kez one gecer.
+- Forge'un varsayilan checkpoint'i (ilk render'da yetenek onbelleginden
+  okunur) biliniyorsa checkpoint override'lari restore edilmez; model
+  Forge'da kalir ve sonraki istek (override'siz olsa bile) istedigi
+  checkpoint'i acikca belirtir. Ayni modelle ardisik istekler arasinda hic
+  yukleme olmaz. Birden fazla host'ta hangi modelin yuklu oldugu host'a
+  gore degistiginden checkpoint her istekte acikca belirtilir.
+- Eski davranisa gore kac model degisiminin onlendigi `stats()` ile okunur.
+"""
+
+import itertools
+import json
+import threading
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any
+
+from core.runtime.config import SD_SCHEDULER_MAX_RUN
+
+_HIRES_KEYS = ("enable_hr", "hr_upscaler", "hr_scale", "hr_second_pass_steps", "denoising_strength")
+
+
+def _model_of(payload: dict[str, Any]) -> tuple[str, str]:
+    override = payload.get("override_settings") or {}
+    return str(override.get("sd_model_checkpoint") or ""), str(override.get("sd_vae") or "")
+
+
+def group_key(payload: dict[str, Any]) -> str:
+    """Checkpoint, VAE ve hires ayarlari; ayni anahtarli isler arka arkaya calisir."""
+    checkpoint, vae = _model_of(payload)
+    hires = {k: payload.get(k) for k in _HIRES_KEYS} if payload.get("enable_hr") else {}
+    return json.dumps([checkpoint, vae, hires], sort_keys=True, default=str)
+
+
+def _forge_checkpoint() -> str | None:
+    # sd_client bu modulu import ediyor; dongu olmasin diye cagri aninda.
+    from core.clients.sd_client import forge_checkpoint
+
+    return forge_checkpoint()
+
+
+def _backend_capacity() -> int:
+    from core.clients.image_backend import get_image_backend
+
+    return get_image_backend().capacity
+
+
+@dataclass
+class _Ticket:
+    seq: int
+    payload: dict[str, Any]
+    key: str = field(init=False)
+
+    def __post_init__(self):
+        self.key = group_key(self.payload)
+
+
+class RenderScheduler:
+    """Thread-safe; her txt2img istegi `slot()` icinde gonderilir."""
+
+    def __init__(
+        self,
+        *,
+        baseline_checkpoint: Callable[[], str | None] = _forge_checkpoint,
+        max_run: int = SD_SCHEDULER_MAX_RUN,
+        capacity: Callable[[], int] = _backend_capacity,
+    ):
+        self._baseline_source = baseline_checkpoint
+        self._capacity_source = capacity
+        self.max_run = max(1, int(max_run))
+        # Ayni anda calisabilecek render; ilk slot'ta backend'den okunur.
+        self.capacity: int | None = None
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        self._waiting: list[_Ticket] = []
+        self._running = 0
+        self._last_key: str | None = None
+        self._run_length = 0
+        self._baseline: str | None = None
+        # Restore edilmeden Forge'da birakilan checkpoint; None = Forge'un kendi ayari.
+        self._loaded: str | None = None
+        self._stats = {
+            "renders": 0,
+            "model_swaps": 0,
+            "legacy_model_swaps": 0,
+            "restores_skipped": 0,
+            "reordered": 0,
+        }
+
+    def _pick(self) -> _Ticket:
+        if self._last_key is not None and self._run_length < self.max_run:
+            for ticket in self._waiting:
+                if ticket.key == self._last_key:
+                    return ticket
+        return self._waiting[0]
+
+    def _legacy_swaps(self, payload: dict[str, Any]) -> int:
+        """restore_afterwards=True ile bu istegin maliyeti: yukle + geri yukle."""
+        checkpoint, vae = _model_of(payload)
+        changes_checkpoint = bool(checkpoint) and checkpoint != self._baseline
+        return 2 * (int(changes_checkpoint) + int(bool(vae)))
+
+    def _prepare(self, payload: dict[str, Any]) -> dict[str, Any]:
+        """Payload'i Forge'un su anki modeline gore hazirlar; degisim sayaclarini gunceller."""
+        checkpoint, vae = _model_of(payload)
+        if self._baseline is None:
+            # Bir kez okunur: restore edilmeyen override'dan sonra Forge'un
+            # ayarlari artik varsayilani gostermez.
+            self._baseline = self._baseline_source() or None
+        if not self._baseline:
+            # Varsayilan bilinmiyor: eski davranis korunur.
+            self._stats["model_swaps"] += self._legacy_swaps(payload)
+            return payload
+
+        current = self._loaded or self._baseline
+        wanted = checkpoint or self._baseline
+        if (self.capacity or 1) > 1:
+            # Her host farkli model tutuyor olabilir; hangisine gidecegi belli degil.
+            return {
+                **payload,
+                "override_settings": {**(payload.get("override_settings") or {}), "sd_model_checkpoint": wanted},
+                "override_settings_restore_afterwards": bool(vae),
+            }
+        if vae:
+            # Forge'un kendi VAE ayari bilinmiyor; VAE override'i restore ile gider.
+            # Restore istek oncesi duruma (current) doner, _loaded degismez.
+            self._stats["model_swaps"] += 2 * (int(wanted != current) + 1)
+            return {**payload, "override_settings": {**payload["override_settings"], "sd_model_checkpoint": wanted}}
+
+        if wanted != current:
+            self._stats["model_swaps"] += 1
+        if wanted == current and not checkpoint:
+            return payload
+
+        if checkpoint and payload.get("override_settings_restore_afterwards", True):
+            self._stats["restores_skipped"] += 1
+        self._loaded = None if wanted == self._baseline else wanted
+        return {
+            **payload,
+            "override_settings": {**(payload.get("override_settings") or {}), "sd_model_checkpoint": wanted},
+            "override_settings_restore_afterwards": False,
+        }
+
+    @contextmanager
+    def slot(self, payload: dict[str, Any]) -> Iterator[dict[str, Any]]:
+        """Sira gelene kadar bekler; Forge'a gonderilecek payload'i verir."""
+        ticket = _Ticket(next(self._seq), payload)
+        with self._cond:
+            if self.capacity is None:
+                self.capacity = max(1, int(self._capacity_source()))
+            self._stats["legacy_model_swaps"] += self._legacy_swaps(payload)
+            self._waiting.append(ticket)
+            try:
+                while self._running >= self.capacity or self._pick() is not ticket:
+                    self._cond.wait()
+            except BaseException:
+                self._waiting.remove(ticket)
+                self._cond.notify_all()
+                raise
+            if self._waiting[0] is not ticket:
+                self._stats["reordered"] += 1
+            self._waiting.remove(ticket)
+            self._running += 1
+            if self._running < self.capacity and self._waiting:
+                # Bos slot kaldi; siradaki bilet yeniden baksin.
+                self._cond.notify_all()
+            self._run_length = self._run_length + 1 if ticket.key == self._last_key else 1
+            self._last_key = ticket.key
+            self._stats["renders"] += 1
+            prepared = self._prepare(payload)
+        try:
+            yield prepared
+        finally:
+            with self._cond:
+                self._running -= 1
+                self._cond.notify_all()
+
+    def order(self, payloads: list[dict[str, Any]]) -> list[int]:
+        """Toplu isler icin sira: once son calisan anahtar, sonra anahtarlar ilk gorulme sirasiyla."""
+        keys = [group_key(p) for p in payloads]
+        with self._cond:
+            last = self._last_key
+        first_seen: dict[str, int] = {}
+        for i, key in enumerate(keys):
+            first_seen.setdefault(key, i)
+        return sorted(range(len(keys)), key=lambda i: (keys[i] != last, first_seen[keys[i]], i))
+
+    def stats(self) -> dict[str, Any]:
+        with self._cond:
+            stats: dict[str, Any] = dict(self._stats)
+            stats["queued"] = len(self._waiting)
+            stats["running"] = self._running
+            stats["loaded_checkpoint"] = self._loaded or self._baseline
+        stats["swaps_avoided"] = max(0, stats["legacy_model_swaps"] - stats["model_swaps"])
+        return stats
+
+
+_DEFAULT_SCHEDULER: RenderScheduler | None = None
+_DEFAULT_SCHEDULER_LOCK = threading.Lock()
+
+
+def get_render_scheduler() -> RenderScheduler:
+    """Uygulama genelinde tek siralayici."""
+    global _DEFAULT_SCHEDULER
+    with _DEFAULT_SCHEDULER_LOCK:
+        if _DEFAULT_SCHEDULER is None:
+            _DEFAULT_SCHEDULER = RenderScheduler()
+        return _DEFAULT_SCHEDULER
+
+
+def reset_render_scheduler() -> None:
+    global _DEFAULT_SCHEDULER
+    with _DEFAULT_SCHEDULER_LOCK:
+        _DEFAULT_SCHEDULER = None
@@ -0,0 +1,209 @@
+"""
+Forge canli onizlemesinden bozuk render'i erken yakalayan gozcu.
+
+Onceden kotu bir render (siyah kare, kolaj/bolunmus goruntu, yogun gurultu)
+30 adimin tamami + ADetailer + upscale bittikten sonra fark ediliyordu.
+
+RenderWatchdog, ProgressSampler'in her orneginde `current_image` onizlemesini
+kucultup birkac ucuz NumPy olcumu yapar:
+
+- varyans / ortalama parlaklik  -> duz veya siyah kare
+- doygunluk                     -> patlamis renkler
+- kenar yogunlugu               -> gurultu
+- orta dikis + yarilarin benzerligi -> bolunmus / tekrar eden paneller
+  (ikisi birlikte gerekir: simetrik kompozisyonlar ve duz arka planlar
+  dikissiz de benzer yarilar verir)
+
+Ayni sorun art arda SD_WATCHDOG_STRIKES ornekte gorulurse Forge'a interrupt
+gonderilir; resim_ciz basarisiz doner ve cagiran (VisualDirectorAgent) kendi
+yedek prompt yoluna hemen gecer.
+
+Ayni olcumler `inspect_image` ile taslak onayinda da kullanilir.
+
+NumPy opsiyoneldir: kurulu degilse gozcu sessizce devre disi kalir.
+"""
+
+import base64
+import io
+import logging
+import threading
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any
+
+from core.clients.render_progress import ProgressSampler, get_progress_sampler
+from core.runtime.config import SD_RENDER_WATCHDOG, SD_WATCHDOG_MIN_PROGRESS, SD_WATCHDOG_STRIKES
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+ANALYSIS_SIZE = 128
+
+
+@dataclass(frozen=True)
+class WatchdogThresholds:
+    min_std: float = 0.025
+    min_mean: float = 0.04
+    max_saturation: float = 0.85
+    max_edge_density: float = 0.45
+    edge_step: float = 0.15
+    min_seam: float = 0.12
+    seam_ratio: float = 6.0
+    max_half_diff: float = 0.03
+
+
+def available() -> bool:
+    return np is not None
+
+
+def _load_array(source, size: int):
+    from PIL import Image
+
+    with Image.open(source) as image:
+        image = image.convert("RGB")
+        image.thumbnail((size, size))
+        return np.asarray(image, dtype=np.float32) / 255.0
+
+
+def preview_array(image_b64: str, size: int = ANALYSIS_SIZE):
+    """Onizlemeyi [0, 1] araliginda HxWx3 float32 diziye cevirir; okunamazsa None."""
+    if np is None or not image_b64:
+        return None
+    try:
+        raw = image_b64.split(",", 1)[1] if image_b64.startswith("data:") else image_b64
+        return _load_array(io.BytesIO(base64.b64decode(raw)), size)
+    except Exception:
+        logger.debug("Watchdog could not decode preview", exc_info=True)
+        return None
+
+
+def inspect_image(path: str | None, thresholds: WatchdogThresholds = WatchdogThresholds()) -> str | None:
+    """Diskteki bir gorsel (ornegin taslak) icin analyze(); NumPy yoksa veya okunamazsa None."""
+    if np is None or not path:
+        return None
+    try:
+        rgb = _load_array(path, ANALYSIS_SIZE)
+    except Exception:
+        logger.debug("Watchdog could not read image %s", path, exc_info=True)
+        return None
+    return analyze(rgb, thresholds)
+
+
+def _seam_strength(luma, axis: int) -> tuple[float, float]:
+    """Ortadaki komsu satir/sutun farki ve diger komsu farklarin medyani."""
+    diffs = np.abs(np.diff(luma, axis=axis)).mean(axis=1 - axis)
+    if diffs.size < 4:
+        return 0.0, 0.0
+    mid = diffs.size // 2
+    seam = float(diffs[mid - 1 : mid + 1].max())
+    rest = np.delete(diffs, [mid - 1, mid])
+    return seam, float(np.median(rest))
+
+
+def _halves_match(rgb, axis: int, limit: float) -> bool:
+    size = rgb.shape[axis] // 2
+    if size < 4:
+        return False
+    first = np.take(rgb, range(size), axis=axis)
+    second = np.take(rgb, range(rgb.shape[axis] - size, rgb.shape[axis]), axis=axis)
+    return float(np.abs(first - second).mean()) < limit
+
+
+def analyze(rgb, thresholds: WatchdogThresholds = WatchdogThresholds()) -> str | None:
+    """Bozuk goruntu icin kisa bir sebep ("black", "flat", "noise"...), saglamsa None."""
+    luma = rgb[..., 0] * 0.299 + rgb[..., 1] * 0.587 + rgb[..., 2] * 0.114
+    if float(luma.mean()) < thresholds.min_mean:
+        return "black"
+    if float(luma.std()) < thresholds.min_std:
+        return "flat"
+
+    high = rgb.max(axis=2)
+    saturation = np.where(high > 0, (high - rgb.min(axis=2)) / np.maximum(high, 1e-6), 0.0)
+    if float(saturation.mean()) > thresholds.max_saturation:
+        return "oversaturated"
+
+    edges = np.maximum(
+        np.abs(np.diff(luma, axis=0))[:, :-1],
+        np.abs(np.diff(luma, axis=1))[:-1, :],
+    )
+    if float((edges > thresholds.edge_step).mean()) > thresholds.max_edge_density:
+        return "noise"
+
+    for axis in (1, 0):
+        seam, typical = _seam_strength(luma, axis)
+        strong_seam = seam > thresholds.min_seam and seam > typical * thresholds.seam_ratio
+        if strong_seam and _halves_match(rgb, axis, thresholds.max_half_diff):
+            return "split"
+    return None
+
+
+class RenderWatchdog:
+    """Tek bir render icin ornekleri degerlendirir; gerekirse bir kez `on_trip` cagirir."""
+
+    def __init__(
+        self,
+        on_trip: Callable[[], None],
+        *,
+        min_progress: float = SD_WATCHDOG_MIN_PROGRESS,
+        strikes: int = SD_WATCHDOG_STRIKES,
+        thresholds: WatchdogThresholds = WatchdogThresholds(),
+    ):
+        self._on_trip = on_trip
+        self.min_progress = float(min_progress)
+        self.strikes = max(1, int(strikes))
+        self.thresholds = thresholds
+        self._lock = threading.Lock()
+        self._streak: list[str] = []
+        self.tripped: str | None = None
+
+    def observe(self, sample: dict[str, Any]) -> None:
+        with self._lock:
+            if self.tripped:
+                return
+            if float(sample.get("progress") or 0.0) < self.min_progress:
+                return
+            rgb = preview_array(sample.get("current_image") or "")
+            if rgb is None:
+                return
+            reason = analyze(rgb, self.thresholds)
+            if reason is None:
+                self._streak.clear()
+                return
+            self._streak.append(reason)
+            if len(self._streak) < self.strikes:
+                return
+            self.tripped = reason
+        logger.warning("Render watchdog aborted generation: %s", reason)
+        try:
+            self._on_trip()
+        except Exception:
+            logger.warning("Render watchdog could not interrupt generation", exc_info=True)
+
+
+@contextmanager
+def watch_render(
+    on_trip: Callable[[], None],
+    *,
+    source: Any = None,
+    sampler: ProgressSampler | None = None,
+    enabled: bool = SD_RENDER_WATCHDOG,
+) -> Iterator[RenderWatchdog | None]:
+    """
+    Blok suresince sampler orneklerini gozcuye verir; kapaliysa None doner.
+    `source` render'in kiraladigi host'tur; gozcu yalnizca onun onizlemesini gorur.
+    """
+    if not enabled or np is None:
+        yield None
+        return
+    sampler = sampler or get_progress_sampler()
+    watchdog = RenderWatchdog(on_trip)
+    sampler.add_listener(watchdog.observe, source=source)
+    try:
+        yield watchdog
+    finally:
+        sampler.remove_listener(watchdog.observe)
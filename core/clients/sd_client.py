@@ -1,15 +1,31 @@
 import base64
-import binascii
+import contextvars
+import hashlib
+import json
 import logging
 import os
+import random
+import shlex
+import shutil
 import threading
 import time
 from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import Any
 
 import requests
 
+from core.clients.feature_breaker import get_feature_breaker
+from core.clients.forge_stream import remove_quietly, stream_images
+from core.clients.image_backend import get_image_backend
+from core.clients.prompt_index import PromptMatch, get_prompt_index
+from core.clients.render_budget import choose_profile, get_render_timings
+from core.clients.render_cache import RenderCache, get_render_cache
+from core.clients.render_profile import FULL_PROFILE, RenderProfile
+from core.clients.render_progress import get_progress_sampler
+from core.clients.render_scheduler import get_render_scheduler
+from core.clients.render_watchdog import watch_render
 from core.errors import CancelledError
 from core.runtime.config import (
     GREEN,
@@ -19,7 +35,10 @@ from core.runtime.config import (
     SD_ADDETAILER_ENABLE_HANDS,
     SD_ADDETAILER_HUMAN_ONLY,
     SD_ADDETAILER_SKIP_ON_CROWD,
+    SD_API_URL,
     SD_AUTO_BEST_HR_UPSCALER,
+    SD_CAPABILITY_COLD_WAIT,
+    SD_CAPABILITY_TTL,
     SD_CFG_SCALE,
     SD_CONTROLNET_GUIDANCE_END,
     SD_CONTROLNET_GUIDANCE_START,
@@ -29,7 +48,7 @@ from core.runtime.config import (
     SD_ENABLE_HIRES_FIX,
     SD_ENABLE_POST_UPSCALE,
     SD_FACE_RESTORATION_MODEL,
-    SD_HEIGHT,
+    SD_FINALIZE_DENOISE,
     SD_HIRES_DENOISE,
     SD_HIRES_SCALE,
     SD_HIRES_UPSCALER,
@@ -37,10 +56,11 @@ from core.runtime.config import (
     SD_POST_UPSCALE_FACTOR,
     SD_POST_UPSCALER,
     SD_PREFERRED_HR_UPSCALERS,
+    SD_PROMPT_REUSE,
+    SD_PROMPT_REUSE_DENOISE,
+    SD_PROMPT_REUSE_THRESHOLD,
     SD_RESTORE_FACES,
     SD_SAMPLER,
-    SD_STEPS,
-    SD_WIDTH,
     YELLOW,
 )
 
@@ -48,7 +68,9 @@ logger = logging.getLogger(__name__)
 
 # ==================================================
 # Forge (Stable Diffusion) API
-URL = "http://127.0.0.1:7860"
+# Address comes from SD_API_URL; every request goes through the image backend
+# (SD_BACKEND, see image_backend). Kept for callers that still read sd_client.URL.
+URL = SD_API_URL
 
 DEFAULT_NEGATIVE_PROMPT = (
     "cartoon, anime, illustration, painting, drawing, text, watermark, signature, logo, "
@@ -98,39 +120,118 @@ _CAPABILITY_CACHE: dict[str, Any] = {
     "scripts_txt2img": None,
     "face_restorers": None,
     "controlnet_models": None,
+    "checkpoint": None,
+    "extensions": None,
+    "render_checkpoint": None,
     "checked_at": 0.0,
 }
 
 
+IMAGE_BASE_FOLDER = "generated_images"
+
+# Per-folder hint holding the last allocated atlas_NNN number. Uniqueness
+# comes from exclusive file creation; the hint only keeps allocation O(1).
+IMAGE_COUNTER_FILE = ".atlas_counter"
+
+_IMAGE_COUNTER_LOCK = threading.Lock()
+
+
 def get_image_folder():
     """Create date-based output folder."""
-    base_folder = "generated_images"
     today = datetime.now().strftime("%Y-%m-%d")
-    path = os.path.join(base_folder, today)
+    path = os.path.join(IMAGE_BASE_FOLDER, today)
     os.makedirs(path, exist_ok=True)
     return path
 
 
-def save_image_base64(img_base64):
-    """Save base64 image output as PNG."""
-    folder = get_image_folder()
-    existing_files = [f for f in os.listdir(folder) if f.endswith(".png")]
-
-    # Pick next max index, do not rely on file count.
+def _scan_max_image_number(folder: str) -> int:
     max_num = 0
-    for f in existing_files:
+    for f in os.listdir(folder):
+        if not f.endswith(".png"):
+            continue
         try:
             num = int(f.split("_")[1].split(".")[0])
             if num > max_num:
                 max_num = num
         except (IndexError, ValueError):
             logger.warning("Ignoring malformed generated image filename: %s", f, exc_info=True)
+    return max_num
+
+
+def _write_image_counter(folder: str, value: int) -> None:
+    path = os.path.join(folder, IMAGE_COUNTER_FILE)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(str(value))
+        os.replace(tmp_path, path)
+    except OSError:
+        logger.warning("Image counter could not be written: %s", path, exc_info=True)
+
+
+def _read_image_counter(folder: str) -> int:
+    path = os.path.join(folder, IMAGE_COUNTER_FILE)
+    try:
+        with open(path, encoding="utf-8") as f:
+            return int(f.read().strip() or 0)
+    except FileNotFoundError:
+        # Folder written before the counter existed: seed it once from a scan.
+        value = _scan_max_image_number(folder)
+        _write_image_counter(folder, value)
+        return value
+    except (OSError, ValueError):
+        logger.warning("Image counter is unreadable, rescanning %s", folder, exc_info=True)
+        return _scan_max_image_number(folder)
+
+
+def seed_image_counters(base_folder: str = IMAGE_BASE_FOLDER) -> int:
+    """Create counter files for existing date folders; returns how many were seeded."""
+    seeded = 0
+    try:
+        names = os.listdir(base_folder)
+    except FileNotFoundError:
+        return 0
+    for name in names:
+        folder = os.path.join(base_folder, name)
+        if not os.path.isdir(folder) or os.path.exists(os.path.join(folder, IMAGE_COUNTER_FILE)):
+            continue
+        _write_image_counter(folder, _scan_max_image_number(folder))
+        seeded += 1
+    return seeded
+
+
+def _allocate_image_path() -> str:
+    """
+    Reserve the next atlas_NNN.png in today's folder.
+
+    The file is created empty with O_EXCL, so two savers (threads or
+    processes) can never get the same name; a stale hint only costs a retry.
+    """
+    folder = get_image_folder()
+    with _IMAGE_COUNTER_LOCK:
+        number = _read_image_counter(folder)
+        while True:
+            number += 1
+            file_path = os.path.join(folder, f"atlas_{number:03d}.png")
+            try:
+                fd = os.open(file_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                continue
+            os.close(fd)
+            break
+        _write_image_counter(folder, number)
+    return file_path
+
 
-    file_number = max_num + 1
-    filename = f"atlas_{file_number:03d}.png"
-    file_path = os.path.join(folder, filename)
-    with open(file_path, "wb") as f:
-        f.write(base64.b64decode(img_base64))
+def save_image_base64(img_base64):
+    """Save base64 image output as PNG."""
+    file_path = _allocate_image_path()
+    try:
+        with open(file_path, "wb") as f:
+            f.write(base64.b64decode(img_base64))
+    except (OSError, ValueError):
+        remove_quietly(file_path)
+        raise
     return file_path
 
 
@@ -156,52 +257,138 @@ def _apply_quality_anchor(prompt_en: str) -> str:
     return prompt
 
 
-def _safe_get_json(endpoint: str, timeout: int = 3) -> Any | None:
-    try:
-        r = requests.get(endpoint, timeout=timeout)
-        if not r.ok:
-            return None
-        return r.json()
-    except (requests.RequestException, ValueError):
-        logger.warning("Stable Diffusion capability request failed: %s", endpoint, exc_info=True)
+def _safe_get_json(path: str, timeout: int = 3) -> Any | None:
+    return get_image_backend().get_json(path, timeout=timeout)
+
+
+def _names_from_list(data: Any) -> list[str]:
+    names: list[str] = []
+    if isinstance(data, list):
+        for item in data:
+            if isinstance(item, dict) and item.get("name"):
+                names.append(str(item["name"]))
+    return names
+
+
+def _strings_from_key(data: Any, key: str) -> list[str]:
+    if isinstance(data, dict) and isinstance(data.get(key), list):
+        return [str(x) for x in data[key] if x]
+    return []
+
+
+def _enabled_extensions(data: Any) -> list[str]:
+    if not isinstance(data, list):
+        return []
+    return sorted(str(x["name"]) for x in data if isinstance(x, dict) and x.get("name") and x.get("enabled", True))
+
+
+# cache key -> (endpoint, parser). Probed concurrently; one slow endpoint no
+# longer adds its timeout on top of the others.
+_CAPABILITY_PROBES: dict[str, tuple[str, Callable[[Any], Any]]] = {
+    "upscalers": ("/sdapi/v1/upscalers", _names_from_list),
+    "scripts_txt2img": ("/sdapi/v1/scripts", lambda data: _strings_from_key(data, "txt2img")),
+    "face_restorers": ("/sdapi/v1/face-restorers", _names_from_list),
+    "controlnet_models": ("/controlnet/model_list", lambda data: _strings_from_key(data, "model_list")),
+    # Fingerprint inputs: a checkpoint or extension change invalidates the rest.
+    "checkpoint": (
+        "/sdapi/v1/options",
+        lambda data: str(data.get("sd_model_checkpoint") or "") if isinstance(data, dict) else None,
+    ),
+    "extensions": ("/sdapi/v1/extensions", _enabled_extensions),
+}
+
+_CAPABILITY_LOCK = threading.Lock()
+_CAPABILITY_REFRESH: threading.Event | None = None
+
+
+def _fetch_capabilities() -> dict[str, Any] | None:
+    """Probe every capability endpoint in parallel. None if Forge did not answer at all."""
+    with ThreadPoolExecutor(max_workers=len(_CAPABILITY_PROBES), thread_name_prefix="sd-capabilities") as pool:
+        futures = {key: pool.submit(_safe_get_json, path) for key, (path, _) in _CAPABILITY_PROBES.items()}
+        raw = {key: future.result() for key, future in futures.items()}
+    if all(value is None for value in raw.values()):
         return None
+    return {key: parse(raw[key]) for key, (_, parse) in _CAPABILITY_PROBES.items()}
+
+
+def _refresh_capabilities_now() -> None:
+    data = _fetch_capabilities()
+    if data is None:
+        # Keep serving what we had; the next call schedules another attempt.
+        logger.warning("Stable Diffusion capability probes failed; keeping previous values")
+        return
+    with _CAPABILITY_LOCK:
+        previous = (_CAPABILITY_CACHE.get("checkpoint"), _CAPABILITY_CACHE.get("extensions"))
+        if _CAPABILITY_CACHE.get("checked_at") and previous != (data["checkpoint"], data["extensions"]):
+            logger.info("Forge checkpoint or extension set changed; capabilities refreshed")
+        _CAPABILITY_CACHE.update(data)
+        _CAPABILITY_CACHE["checked_at"] = time.time()
+
+
+def _start_background_refresh() -> threading.Event:
+    """Start one refresh thread (or join the one in flight) and return its done-event."""
+    global _CAPABILITY_REFRESH
+    with _CAPABILITY_LOCK:
+        if _CAPABILITY_REFRESH is not None:
+            return _CAPABILITY_REFRESH
+        done = _CAPABILITY_REFRESH = threading.Event()
+
+    def _worker():
+        global _CAPABILITY_REFRESH
+        try:
+            _refresh_capabilities_now()
+        except Exception:
+            logger.exception("Stable Diffusion capability refresh failed")
+        finally:
+            with _CAPABILITY_LOCK:
+                _CAPABILITY_REFRESH = None
+            done.set()
+
+    threading.Thread(target=_worker, name="sd-capability-refresh", daemon=True).start()
+    return done
 
 
 def _refresh_capabilities_if_needed(force: bool = False) -> None:
-    now = time.time()
-    if not force and (now - float(_CAPABILITY_CACHE.get("checked_at") or 0.0) < 120):
+    """
+    Stale-while-revalidate: an expired cache is served as-is while a
+    background thread refreshes it. Only a cold cache (nothing fetched yet)
+    waits, and then at most SD_CAPABILITY_COLD_WAIT seconds.
+    """
+    if force:
+        _refresh_capabilities_now()
         return
+    checked_at = float(_CAPABILITY_CACHE.get("checked_at") or 0.0)
+    if checked_at and time.time() - checked_at < SD_CAPABILITY_TTL:
+        return
+    done = _start_background_refresh()
+    if not checked_at:
+        done.wait(SD_CAPABILITY_COLD_WAIT)
 
-    upscalers_data = _safe_get_json(f"{URL}/sdapi/v1/upscalers")
-    scripts_data = _safe_get_json(f"{URL}/sdapi/v1/scripts")
-    face_restorers_data = _safe_get_json(f"{URL}/sdapi/v1/face-restorers")
-    controlnet_models_data = _safe_get_json(f"{URL}/controlnet/model_list")
 
-    upscalers: list[str] = []
-    if isinstance(upscalers_data, list):
-        for item in upscalers_data:
-            if isinstance(item, dict) and item.get("name"):
-                upscalers.append(str(item["name"]))
+def invalidate_capabilities() -> None:
+    """Mark the cache stale; the next lookup refreshes it in the background."""
+    with _CAPABILITY_LOCK:
+        if _CAPABILITY_CACHE.get("checked_at"):
+            # Keep the values (stale-while-revalidate) but force a refresh.
+            _CAPABILITY_CACHE["checked_at"] = 1.0
 
-    scripts_txt2img: list[str] = []
-    if scripts_data and isinstance(scripts_data.get("txt2img"), list):
-        scripts_txt2img = [str(x) for x in scripts_data["txt2img"] if x]
 
-    face_restorers: list[str] = []
-    if isinstance(face_restorers_data, list):
-        for item in face_restorers_data:
-            if isinstance(item, dict) and item.get("name"):
-                face_restorers.append(str(item["name"]))
+def prefetch_capabilities() -> threading.Event:
+    """Warm the cache off the request path (backend startup, after Forge starts)."""
+    return _start_background_refresh()
+
 
-    controlnet_models: list[str] = []
-    if controlnet_models_data and isinstance(controlnet_models_data.get("model_list"), list):
-        controlnet_models = [str(x) for x in controlnet_models_data["model_list"] if x]
+def forge_checkpoint() -> str | None:
+    """Checkpoint Forge's options reported at the last capability refresh (no request)."""
+    return _CAPABILITY_CACHE.get("checkpoint") or None
 
-    _CAPABILITY_CACHE["upscalers"] = upscalers
-    _CAPABILITY_CACHE["scripts_txt2img"] = scripts_txt2img
-    _CAPABILITY_CACHE["face_restorers"] = face_restorers
-    _CAPABILITY_CACHE["controlnet_models"] = controlnet_models
-    _CAPABILITY_CACHE["checked_at"] = now
+
+def _note_checkpoint(checkpoint: str) -> None:
+    # Capabilities (e.g. compatible ControlNet models) follow the checkpoint.
+    last = _CAPABILITY_CACHE.get("render_checkpoint")
+    _CAPABILITY_CACHE["render_checkpoint"] = checkpoint
+    if last is not None and last != checkpoint:
+        invalidate_capabilities()
 
 
 def _list_upscalers() -> list[str]:
@@ -344,7 +531,7 @@ def _read_image_b64(image_path: str) -> str | None:
         with open(image_path, "rb") as f:
             return base64.b64encode(f.read()).decode("utf-8")
     except OSError:
-        logger.warning("ControlNet image could not be read: %s", image_path, exc_info=True)
+        logger.warning("SD input image could not be read: %s", image_path, exc_info=True)
         return None
 
 
@@ -402,139 +589,160 @@ def _build_controlnet_alwayson(control_image_path: str | None) -> dict[str, Any]
     return {"ControlNet": {"args": units}}
 
 
-def _upscale_image_base64(img_base64: str, *, cancel_checker: Callable[[], bool] | None) -> str:
+def _upscale_image_file(file_path: str, *, cancel_checker: Callable[[], bool] | None) -> None:
+    """
+    Upscale a saved PNG in place. The extras API still takes base64, but the
+    request is built from the bytes on disk and the answer is streamed back
+    to disk, so no decoded copy of the result is held in memory.
+    """
     if not SD_ENABLE_POST_UPSCALE or SD_POST_UPSCALE_FACTOR <= 1.0:
-        return img_base64
+        return
 
     if _is_cancelled(cancel_checker):
         raise CancelledError("Cancelled during SD post-upscale")
 
     upscaler = _pick_post_upscaler()
-    payload = {
-        "image": img_base64,
-        "resize_mode": 0,
-        "upscaling_resize": SD_POST_UPSCALE_FACTOR,
-        "upscaler_1": upscaler,
-        "gfpgan_visibility": 0,
-        "codeformer_visibility": 0,
-        "codeformer_weight": 0,
-    }
+    tmp_path = f"{file_path}.upscale.tmp"
+    timings = get_render_timings()
+    started = timings.now()
     try:
+        with open(file_path, "rb") as f:
+            image_b64 = base64.b64encode(f.read()).decode("ascii")
+        payload = {
+            "image": image_b64,
+            "resize_mode": 0,
+            "upscaling_resize": SD_POST_UPSCALE_FACTOR,
+            "upscaler_1": upscaler,
+            "gfpgan_visibility": 0,
+            "codeformer_visibility": 0,
+            "codeformer_weight": 0,
+        }
         response = _post_with_cancel(
-            endpoint=f"{URL}/sdapi/v1/extra-single-image",
+            path="/sdapi/v1/extra-single-image",
             payload=payload,
             timeout=120,
             cancel_checker=cancel_checker,
         )
-        result = response.json()
-        maybe_image = result.get("image") if isinstance(result, dict) else None
-        if isinstance(maybe_image, str) and maybe_image.strip():
-            return maybe_image
-    except (requests.RequestException, ValueError):
+        del payload  # release the request body before the answer streams in
+        _, paths = stream_images(response, lambda index: tmp_path if index == 0 else None)
+        if paths and paths[0]:
+            os.replace(tmp_path, file_path)
+            timings.record_upscale(timings.now() - started)
+            return
+        logger.warning("Stable Diffusion post-upscale returned no image; using original image")
+    except (requests.RequestException, ValueError, OSError):
         logger.warning("Stable Diffusion post-upscale failed; using original image", exc_info=True)
-    return img_base64
+    remove_quietly(tmp_path)
 
 
 def _is_cancelled(cancel_checker: Callable[[], bool] | None) -> bool:
     return bool(cancel_checker and cancel_checker())
 
 
-def _interrupt_sd_generation() -> None:
-    try:
-        requests.post(f"{URL}/sdapi/v1/interrupt", timeout=2)
-    except requests.RequestException:
-        logger.warning("Stable Diffusion interrupt request failed", exc_info=True)
-
-
 def _post_with_cancel(
     *,
-    endpoint: str,
+    path: str,
     payload: dict,
     timeout: int,
     cancel_checker: Callable[[], bool] | None,
 ):
-    result = {}
-    done = threading.Event()
+    """
+    POST on the shared async client; the answer is returned once the headers
+    arrive and its body streams through iter_content(). A cancel closes the
+    connection and interrupts Forge; no thread is left behind.
+    """
+    return get_image_backend().post_stream(path, json=payload, timeout=timeout, cancel_checker=cancel_checker)
 
-    def _worker():
-        try:
-            response = requests.post(
-                url=endpoint,
-                json=payload,
-                timeout=timeout,
-            )
-            response.raise_for_status()
-            result["response"] = response
-        except Exception as exc:
-            logger.exception("Stable Diffusion request worker failed")
-            result["error"] = exc
-        finally:
-            done.set()
 
-    thread = threading.Thread(target=_worker, daemon=True)
-    thread.start()
+def _prepare_prompt(prompt_en: str) -> str:
+    return _apply_quality_anchor(_sanitize_prompt(prompt_en))
 
-    while not done.wait(0.2):
-        if _is_cancelled(cancel_checker):
-            _interrupt_sd_generation()
-            raise CancelledError("Cancelled during SD generation")
 
-    if "error" in result:
-        raise result["error"]
-    return result["response"]
+# Forge accepts any unsigned 32-bit seed; -1 would mean "pick randomly" and
+# make the payload (and the render cache key) meaningless.
+SEED_MAX = 2**32 - 1
 
 
-def resim_ciz(
-    prompt_en: str,
-    negative_prompt: str | None = None,
-    model_checkpoint: str | None = None,
-    control_image_path: str | None = None,
-    cancel_checker: Callable[[], bool] | None = None,
-    request_timeout: int = 300,
-):
-    """
-    Send prompt directly to Stable Diffusion.
-    Backward-compatible: old callers can still pass only prompt.
-    """
-    print(f"{GREEN}Prompt to draw:{RESET}")
-    print(f"{GREEN}{prompt_en}{RESET}")
+def seed_for(*parts: str) -> int:
+    """Stable seed derived from text, so a retried job renders the same image."""
+    digest = hashlib.sha256("\x1f".join(str(p) for p in parts).encode("utf-8")).digest()
+    return int.from_bytes(digest[:4], "big") % (SEED_MAX + 1)
 
-    prompt_en = _sanitize_prompt(prompt_en)
-    prompt_en = _apply_quality_anchor(prompt_en)
-    if not prompt_en:
-        print(f"{RED}Generation Error: empty prompt.{RESET}")
-        return False, None, None
 
+def random_seed() -> int:
+    return random.randint(0, SEED_MAX)
+
+
+def _render_cache_key(payload: dict[str, Any], *, post_upscale: bool = True) -> str:
+    # The stored PNG is post-upscaled, so the upscale settings are part of it too.
+    return RenderCache.key_for(
+        {
+            "txt2img": payload,
+            "post_upscale": [SD_ENABLE_POST_UPSCALE, SD_POST_UPSCALE_FACTOR, SD_POST_UPSCALER]
+            if post_upscale
+            else None,
+        }
+    )
+
+
+def _cache_lookup(key: str) -> str | None:
+    cached = get_render_cache().get(key)
+    if cached:
+        print(f"{GREEN}Render cache hit: {cached}{RESET}")
+    return cached
+
+
+def _cache_store(key: str, file_path: str) -> None:
+    get_render_cache().put(key, file_path)
+
+
+def _succeeded_cache_key(
+    cache_key: str, payload: dict[str, Any], enhanced_payload: dict[str, Any], *, post_upscale: bool
+) -> str:
+    # A base-payload fallback (no hires, no ADetailer) must not answer the full-quality request.
+    return cache_key if payload is enhanced_payload else _render_cache_key(payload, post_upscale=post_upscale)
+
+
+def _build_txt2img_payloads(
+    prompt_en: str,
+    *,
+    negative_prompt: str | None,
+    model_checkpoint: str | None,
+    control_image_path: str | None,
+    seed: int,
+    profile: RenderProfile = FULL_PROFILE,
+) -> tuple[dict[str, Any], dict[str, Any]]:
+    """Return (enhanced, base) txt2img payloads for an already prepared prompt."""
     effective_negative = (negative_prompt or "").strip() or DEFAULT_NEGATIVE_PROMPT
     effective_checkpoint = (model_checkpoint or "").strip()
 
-    print(f"SD RESOLUTION: {SD_WIDTH} x {SD_HEIGHT}")
-
     base_payload: dict[str, Any] = {
         "prompt": prompt_en,
         "negative_prompt": effective_negative,
-        "steps": SD_STEPS,
+        "steps": profile.steps,
         "sampler_name": SD_SAMPLER,
-        "width": SD_WIDTH,
-        "height": SD_HEIGHT,
+        "width": profile.width,
+        "height": profile.height,
         "cfg_scale": SD_CFG_SCALE,
         "restore_faces": bool(SD_RESTORE_FACES),
         "tiling": False,
+        "seed": int(seed),
     }
 
-    hr_upscaler = _pick_hr_upscaler(SD_HIRES_UPSCALER)
-    if SD_ENABLE_HIRES_FIX:
+    if SD_ENABLE_HIRES_FIX and profile.hires:
+        hr_upscaler = _pick_hr_upscaler(SD_HIRES_UPSCALER)
         base_payload.update(
             {
                 "enable_hr": True,
                 "hr_scale": SD_HIRES_SCALE,
                 "denoising_strength": SD_HIRES_DENOISE,
-                "hr_second_pass_steps": max(8, SD_STEPS // 2),
+                "hr_second_pass_steps": profile.hires_steps,
                 "hr_upscaler": hr_upscaler,
             }
         )
         print(f"{YELLOW}Using hires upscaler: {hr_upscaler}{RESET}")
 
+    _note_checkpoint(effective_checkpoint)
     override_settings: dict[str, Any] = {}
     if effective_checkpoint:
         override_settings["sd_model_checkpoint"] = effective_checkpoint
@@ -551,22 +759,148 @@ def resim_ciz(
     enhanced_payload: dict[str, Any] = dict(base_payload)
     alwayson_scripts: dict[str, Any] = {}
 
-    adetailer_script = _build_adetailer_alwayson(
-        prompt_en=prompt_en,
-        negative_prompt=effective_negative,
+    adetailer_script = (
+        _build_adetailer_alwayson(prompt_en=prompt_en, negative_prompt=effective_negative)
+        if profile.adetailer
+        else None
     )
-    if adetailer_script:
+    if adetailer_script and _feature_allowed("adetailer"):
         alwayson_scripts.update(adetailer_script)
         print(f"{YELLOW}ADetailer enabled for this prompt.{RESET}")
 
     controlnet_script = _build_controlnet_alwayson(control_image_path)
-    if controlnet_script:
+    if controlnet_script and _feature_allowed("controlnet"):
         alwayson_scripts.update(controlnet_script)
         print(f"{YELLOW}ControlNet enabled with control image.{RESET}")
 
     if alwayson_scripts:
         enhanced_payload["alwayson_scripts"] = alwayson_scripts
 
+    return enhanced_payload, base_payload
+
+
+def _feature_allowed(feature: str) -> bool:
+    if get_feature_breaker().allow(feature):
+        return True
+    print(f"{YELLOW}Skipping {feature}: it failed recently (see /api/sd/features).{RESET}")
+    return False
+
+
+def _enhanced_features(payload: dict[str, Any]) -> list[str]:
+    """Feature names the circuit breaker tracks: the payload's alwayson scripts."""
+    return sorted(name.lower() for name in payload.get("alwayson_scripts") or {})
+
+
+def _settle_features(payload: dict[str, Any], blamed: tuple[list[str], str] | None) -> None:
+    """
+    Called once a payload variant succeeded. The enhanced payload's features
+    are only blamed when it failed and a later (base) variant worked, so a
+    Forge outage does not trip every breaker.
+    """
+    breaker = get_feature_breaker()
+    if blamed:
+        breaker.record_failure(blamed[0], blamed[1])
+    breaker.record_success(_enhanced_features(payload))
+
+
+# ==================================================
+# Prompt reuse (see prompt_index): every render is indexed; SD_PROMPT_REUSE
+# decides whether a similar past render is returned or used as img2img init.
+_ANCHOR_WORDS = frozenset(PHOTOREAL_QUALITY_ANCHOR.lower().replace(",", " ").split())
+
+
+def _reuse_text(prompt_en: str) -> str:
+    # The quality anchor is on every prompt; left in, all prompts would look alike.
+    return " ".join(w for w in prompt_en.replace(",", " ").split() if w.lower() not in _ANCHOR_WORDS)
+
+
+def _reuse_group(payload: dict[str, Any]) -> str | None:
+    """The checkpoint; None for ControlNet renders, which the control image shapes."""
+    if "controlnet" in {str(name).lower() for name in payload.get("alwayson_scripts") or {}}:
+        return None
+    return (payload.get("override_settings") or {}).get("sd_model_checkpoint") or ""
+
+
+def _pixels(payload: dict[str, Any]) -> int:
+    return int(payload.get("width") or 0) * int(payload.get("height") or 0)
+
+
+def _remember_render(prompt_en: str, file_path: str, payload: dict[str, Any]) -> None:
+    group = _reuse_group(payload)
+    if group is not None:
+        get_prompt_index().add(_reuse_text(prompt_en), file_path, group=group, pixels=_pixels(payload))
+
+
+def _find_reusable(prompt_en: str, payload: dict[str, Any], mode: str) -> PromptMatch | None:
+    group = _reuse_group(payload) if mode in ("reuse", "init") else None
+    if group is None:
+        return None
+    match = get_prompt_index().find(
+        _reuse_text(prompt_en), group=group, threshold=SD_PROMPT_REUSE_THRESHOLD, min_pixels=_pixels(payload)
+    )
+    if match:
+        print(f"{GREEN}Similar prompt already rendered ({match.score:.2f}): {match.path}{RESET}")
+    return match
+
+
+def _reuse_render(
+    match: PromptMatch,
+    prompt_en: str,
+    *,
+    mode: str,
+    seed: int,
+    negative_prompt: str | None,
+    model_checkpoint: str | None,
+    cancel_checker: Callable[[], bool] | None,
+    request_timeout: int,
+    use_cache: bool,
+    profile: RenderProfile,
+):
+    """A copy of the matched image ("reuse") or an img2img pass over it ("init"); None to render normally."""
+    if mode == "init":
+        result = finalize_draft(
+            match.path,
+            prompt_en,
+            seed=seed,
+            negative_prompt=negative_prompt,
+            model_checkpoint=model_checkpoint,
+            cancel_checker=cancel_checker,
+            request_timeout=request_timeout,
+            use_cache=use_cache,
+            denoise=SD_PROMPT_REUSE_DENOISE,
+            profile=profile,
+        )
+        return result if result[0] else None
+
+    # A copy, so callers that delete their result (discard_draft) keep the original.
+    file_path = _allocate_image_path()
+    try:
+        shutil.copyfile(match.path, file_path)
+    except OSError:
+        logger.warning("Could not reuse image %s", match.path, exc_info=True)
+        remove_quietly(file_path)
+        return None
+    print(f"{GREEN}Image reused: {file_path}{RESET}")
+    return True, file_path, prompt_en
+
+
+def _first_image_only(index: int) -> str | None:
+    # ControlNet appends its detect maps after the render; only the first image is ours.
+    return _allocate_image_path() if index == 0 else None
+
+
+def _render(
+    path: str,
+    enhanced_payload: dict[str, Any],
+    base_payload: dict[str, Any],
+    *,
+    prompt_en: str,
+    cache_key: str | None,
+    cancel_checker: Callable[[], bool] | None,
+    request_timeout: int,
+    post_upscale: bool = True,
+):
+    """Send the enhanced payload, then the base one on failure; shared by txt2img and img2img."""
     print(f"{YELLOW}Starting generation...{RESET}")
     start_time = time.time()
     payloads_to_try: list[dict[str, Any]] = [enhanced_payload]
@@ -574,44 +908,64 @@ def resim_ciz(
         payloads_to_try.append(base_payload)
 
     last_error_text: str | None = None
+    blamed: tuple[list[str], str] | None = None
+    timings = get_render_timings()
     for idx, payload in enumerate(payloads_to_try, start=1):
         enhanced_try = idx == 1 and enhanced_payload != base_payload
         try:
-            response = _post_with_cancel(
-                endpoint=f"{URL}/sdapi/v1/txt2img",
-                payload=payload,
-                timeout=request_timeout,
-                cancel_checker=cancel_checker,
-            )
-            result = response.json()
+            with (
+                get_render_scheduler().slot(payload) as scheduled,
+                get_image_backend().lease(scheduled) as host,
+                get_progress_sampler().track(source=host),
+                watch_render(host.interrupt, source=host) as watchdog,
+            ):
+                started = timings.now()
+                response = _post_with_cancel(
+                    path=path,
+                    payload=scheduled,
+                    timeout=request_timeout,
+                    cancel_checker=cancel_checker,
+                )
+                result, paths = stream_images(response, _first_image_only)
+                duration = timings.now() - started
         except CancelledError:
             raise
-        except (requests.RequestException, ValueError) as exc:
+        except (requests.RequestException, ValueError, OSError) as exc:
             last_error_text = str(exc)
             if enhanced_try:
                 logger.warning(
                     "Enhanced Stable Diffusion request failed; retrying base payload",
                     exc_info=True,
                 )
+                blamed = (_enhanced_features(payload), last_error_text)
                 continue
             logger.exception("Stable Diffusion generation request failed")
             return False, None, None
 
-        if not isinstance(result, dict):
-            logger.error("Stable Diffusion returned a non-object response: %s", type(result).__name__)
+        if watchdog and watchdog.tripped:
+            # Interrupted early: Forge returns the half-finished image; the
+            # caller's fallback prompt is a better use of the GPU than the base payload.
+            for image_path in paths:
+                if image_path:
+                    remove_quietly(image_path)
+            print(f"{YELLOW}Render aborted early by watchdog ({watchdog.tripped}).{RESET}")
             return False, None, None
 
         images = result.get("images")
-        if isinstance(images, list) and images and isinstance(images[0], str):
-            image_base64 = _upscale_image_base64(
-                images[0],
-                cancel_checker=cancel_checker,
-            )
-            try:
-                file_path = save_image_base64(image_base64)
-            except (OSError, ValueError, binascii.Error):
-                logger.exception("Stable Diffusion image could not be saved")
+        if isinstance(images, list) and images:
+            file_path = paths[0] if paths else None
+            if not file_path:
+                logger.error("Stable Diffusion image could not be saved")
                 return False, None, None
+            _settle_features(payload, blamed)
+            timings.record_render(scheduled, duration)
+            _remember_render(prompt_en, file_path, payload)
+            if post_upscale:
+                _upscale_image_file(file_path, cancel_checker=cancel_checker)
+            if cache_key:
+                _cache_store(
+                    _succeeded_cache_key(cache_key, payload, enhanced_payload, post_upscale=post_upscale), file_path
+                )
             elapsed = time.time() - start_time
             print(f"{GREEN}Image saved: {file_path}{RESET}")
             print(f"{YELLOW}Duration: {elapsed:.2f} sec{RESET}")
@@ -622,9 +976,442 @@ def resim_ciz(
             last_error_text = str(err_text)
             if enhanced_try:
                 logger.warning("Enhanced Stable Diffusion payload failed: %s", err_text)
+                blamed = (_enhanced_features(payload), last_error_text)
                 continue
             logger.error("Stable Diffusion returned an error: %s", err_text)
 
     if last_error_text:
         logger.error("Stable Diffusion generation failed: %s", last_error_text)
     return False, None, None
+
+
+def resim_ciz(
+    prompt_en: str,
+    negative_prompt: str | None = None,
+    model_checkpoint: str | None = None,
+    control_image_path: str | None = None,
+    cancel_checker: Callable[[], bool] | None = None,
+    request_timeout: int = 300,
+    seed: int | None = None,
+    use_cache: bool = True,
+    profile: RenderProfile = FULL_PROFILE,
+    budget: float | None = None,
+    reuse: str = SD_PROMPT_REUSE,
+):
+    """
+    Send prompt directly to Stable Diffusion.
+    Backward-compatible: old callers can still pass only prompt.
+
+    The seed is always sent explicitly; None picks a random one. An identical
+    payload (seed included) is served from the render cache unless use_cache
+    is False. DRAFT_PROFILE renders a quick low-resolution candidate without
+    hires, ADetailer or post-upscale; see finalize_draft. A budget (seconds)
+    trims the profile's hires/upscale/ADetailer/steps until the render fits,
+    based on timings measured on this machine. reuse ("off", "reuse", "init")
+    controls whether a similar past prompt's image is returned or refined
+    instead of rendering from scratch.
+    """
+    print(f"{GREEN}Prompt to draw:{RESET}")
+    print(f"{GREEN}{prompt_en}{RESET}")
+
+    prompt_en = _prepare_prompt(prompt_en)
+    if not prompt_en:
+        print(f"{RED}Generation Error: empty prompt.{RESET}")
+        return False, None, None
+
+    if budget is not None:
+        profile = choose_profile(budget, base=profile)
+
+    print(f"SD RESOLUTION: {profile.width} x {profile.height} ({profile.name})")
+
+    seed = random_seed() if seed is None else seed
+    enhanced_payload, base_payload = _build_txt2img_payloads(
+        prompt_en,
+        negative_prompt=negative_prompt,
+        model_checkpoint=model_checkpoint,
+        control_image_path=control_image_path,
+        seed=seed,
+        profile=profile,
+    )
+
+    cache_key = _render_cache_key(enhanced_payload, post_upscale=profile.post_upscale) if use_cache else None
+    if cache_key:
+        cached = _cache_lookup(cache_key)
+        if cached:
+            return True, cached, prompt_en
+
+    match = _find_reusable(prompt_en, enhanced_payload, reuse)
+    reused = (
+        _reuse_render(
+            match,
+            prompt_en,
+            mode=reuse,
+            seed=seed,
+            negative_prompt=negative_prompt,
+            model_checkpoint=model_checkpoint,
+            cancel_checker=cancel_checker,
+            request_timeout=request_timeout,
+            use_cache=use_cache,
+            profile=profile,
+        )
+        if match
+        else None
+    )
+    if reused:
+        return reused
+
+    return _render(
+        "/sdapi/v1/txt2img",
+        enhanced_payload,
+        base_payload,
+        prompt_en=prompt_en,
+        cache_key=cache_key,
+        cancel_checker=cancel_checker,
+        request_timeout=request_timeout,
+        post_upscale=profile.post_upscale,
+    )
+
+
+# txt2img-only keys; img2img has no hires pass and takes its own denoise.
+_HIRES_PAYLOAD_KEYS = ("enable_hr", "hr_scale", "hr_second_pass_steps", "hr_upscaler")
+
+
+def finalize_draft(
+    draft_path: str,
+    prompt_en: str,
+    *,
+    seed: int,
+    negative_prompt: str | None = None,
+    model_checkpoint: str | None = None,
+    cancel_checker: Callable[[], bool] | None = None,
+    request_timeout: int = 300,
+    use_cache: bool = True,
+    denoise: float = SD_FINALIZE_DENOISE,
+    profile: RenderProfile = FULL_PROFILE,
+):
+    """
+    Bring an approved draft to full quality: img2img at the profile's
+    resolution with the draft's seed, ADetailer and post-upscale. Returns the
+    same (success, file_path, used_prompt) tuple as resim_ciz; the draft file
+    is left for the caller (see discard_draft).
+    """
+    prompt_en = _prepare_prompt(prompt_en)
+    init_image = _read_image_b64(draft_path) if prompt_en else None
+    if not init_image:
+        print(f"{RED}Finalize Error: missing prompt or draft image.{RESET}")
+        return False, None, None
+
+    print(f"{GREEN}Finalizing draft: {draft_path}{RESET}")
+    payloads = _build_txt2img_payloads(
+        prompt_en,
+        negative_prompt=negative_prompt,
+        model_checkpoint=model_checkpoint,
+        control_image_path=None,
+        seed=seed,
+        profile=profile,
+    )
+    for payload in payloads:
+        for key in _HIRES_PAYLOAD_KEYS:
+            payload.pop(key, None)
+        payload.update({"init_images": [init_image], "denoising_strength": denoise, "resize_mode": 0})
+    enhanced_payload, base_payload = payloads
+
+    cache_key = _render_cache_key(enhanced_payload, post_upscale=profile.post_upscale) if use_cache else None
+    if cache_key:
+        cached = _cache_lookup(cache_key)
+        if cached:
+            return True, cached, prompt_en
+
+    return _render(
+        "/sdapi/v1/img2img",
+        enhanced_payload,
+        base_payload,
+        prompt_en=prompt_en,
+        cache_key=cache_key,
+        cancel_checker=cancel_checker,
+        request_timeout=request_timeout,
+        post_upscale=profile.post_upscale,
+    )
+
+
+def discard_draft(path: str | None) -> None:
+    """Remove a draft once it was finalized or rejected; render cache copies stay."""
+    if path and not get_render_cache().owns(path):
+        remove_quietly(path)
+
+
+# ==================================================
+# Batch rendering
+# Forge's bundled "Prompts from file or textbox" script renders one job per
+# prompt line inside a single txt2img request, so N prompts that share the
+# same settings cost one round trip and one model warm-up instead of N.
+PROMPT_LIST_SCRIPT = "prompts from file or textbox"
+
+BatchResult = tuple[bool, str | None, str | None]
+
+# Per-line settings the prompt-list script overrides itself.
+_PER_LINE_KEYS = ("prompt", "seed")
+
+
+def _settings_key(payload: dict[str, Any]) -> str:
+    """Everything except prompt and seed; prompts with equal keys can share a request."""
+    shared = {k: v for k, v in payload.items() if k not in _PER_LINE_KEYS}
+    return json.dumps(shared, sort_keys=True, default=str)
+
+
+def _prompt_list_line(prompt: str, seed: int) -> str:
+    # The script parses "--key value" lines with shlex.
+    return f"--prompt {shlex.quote(prompt.replace(chr(10), ' '))} --seed {int(seed)}"
+
+
+def _prompt_list_payload(payload: dict[str, Any], jobs: list[tuple[str, int]]) -> dict[str, Any]:
+    batch_payload = dict(payload)
+    # Each line carries its own prompt; keep the base prompt empty.
+    batch_payload["prompt"] = ""
+    batch_payload["script_name"] = PROMPT_LIST_SCRIPT
+    # checkbox_iterate, checkbox_iterate_batch, prompt_position, prompt_txt
+    batch_payload["script_args"] = [False, False, "start", "\n".join(_prompt_list_line(p, s) for p, s in jobs)]
+    return batch_payload
+
+
+def _request_prompt_list(
+    payloads: list[dict[str, Any]],
+    jobs: list[tuple[str, int]],
+    *,
+    cancel_checker: Callable[[], bool] | None,
+    request_timeout: int,
+) -> tuple[int, list[str | None]] | None:
+    """
+    Send the prompt list with each payload variant until one returns at least
+    one image per prompt. Images are decoded straight to disk as they stream
+    in; the result holds the index of the variant that succeeded and one file
+    path (None if that image was unusable) per prompt. None means the caller
+    should render one by one.
+    """
+    blamed: tuple[list[str], str] | None = None
+    timings = get_render_timings()
+    for variant, payload in enumerate(payloads):
+        try:
+            with (
+                get_render_scheduler().slot(payload) as scheduled,
+                get_image_backend().lease(scheduled) as host,
+                get_progress_sampler().track(source=host),
+            ):
+                started = timings.now()
+                response = _post_with_cancel(
+                    path="/sdapi/v1/txt2img",
+                    payload=_prompt_list_payload(scheduled, jobs),
+                    timeout=request_timeout * len(jobs),
+                    cancel_checker=cancel_checker,
+                )
+                _, paths = stream_images(response, lambda index: _allocate_image_path())
+                duration = timings.now() - started
+        except CancelledError:
+            raise
+        except (requests.RequestException, ValueError, OSError) as exc:
+            logger.warning("Stable Diffusion batch request failed", exc_info=True)
+            if _enhanced_features(payload):
+                blamed = (_enhanced_features(payload), str(exc))
+            continue
+
+        if len(paths) < len(jobs):
+            logger.warning("Stable Diffusion batch returned %s images for %s prompts", len(paths), len(jobs))
+            for path in paths:
+                if path:
+                    remove_quietly(path)
+            continue
+        _settle_features(payload, blamed)
+        # One request for the whole list: record the per-image share.
+        timings.record_render(scheduled, duration / len(jobs))
+        # A grid image, if any, comes first; per-job images are the tail.
+        extra = len(paths) - len(jobs)
+        for path in paths[:extra]:
+            if path:
+                remove_quietly(path)
+        return variant, paths[extra:]
+    return None
+
+
+def _split_evenly(items: list[Any], parts: int) -> list[list[Any]]:
+    """At most `parts` contiguous, non-empty slices whose sizes differ by at most one."""
+    parts = max(1, min(parts, len(items)))
+    size, extra = divmod(len(items), parts)
+    slices, start = [], 0
+    for part in range(parts):
+        end = start + size + (1 if part < extra else 0)
+        slices.append(items[start:end])
+        start = end
+    return slices
+
+
+def _run_in_parallel(fn: Callable[[Any], None], items: list[Any], workers: int) -> None:
+    """
+    Run fn(item) on worker threads. The caller's context (the bound job, see
+    core.runtime.jobs) carries over; the first error is re-raised once the
+    running items have finished and the pending ones are dropped.
+    """
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="sd-batch") as pool:
+        futures = [pool.submit(contextvars.copy_context().run, fn, item) for item in items]
+        try:
+            for future in futures:
+                future.result()
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+
+def resim_ciz_batch(
+    prompts: list[str],
+    negative_prompt: str | None = None,
+    model_checkpoint: str | None = None,
+    cancel_checker: Callable[[], bool] | None = None,
+    request_timeout: int = 300,
+    on_result: Callable[[int, BatchResult], None] | None = None,
+    seeds: list[int | None] | None = None,
+    use_cache: bool = True,
+    profile: RenderProfile = FULL_PROFILE,
+    budget: float | None = None,
+    reuse: str = SD_PROMPT_REUSE,
+) -> list[BatchResult]:
+    """
+    Render several prompts that share the same settings.
+
+    Returns one (success, file_path, used_prompt) tuple per input prompt, in
+    order. Prompts whose payloads only differ in prompt text and seed go to
+    Forge as one request; images are decoded straight to disk as the answer
+    streams in, and a failure to decode one image does not affect the others.
+    When the prompt-list script is missing or the batch request fails, the
+    affected prompts fall back to individual resim_ciz calls. One cancel
+    checker covers the whole batch. Seeds, the render cache and the render
+    profile behave as in resim_ciz; cached prompts are not sent to Forge at all.
+    A budget (seconds) covers all prompts together. Prompt reuse works per
+    prompt as in resim_ciz. With a Forge pool (SD_API_URLS) each group is
+    split across the hosts and the parts render in parallel; on_result is
+    then called from worker threads.
+    """
+    if budget is not None and prompts:
+        profile = choose_profile(budget, base=profile, renders=len(prompts))
+    results: list[BatchResult | None] = [None] * len(prompts)
+    seeds = list(seeds or [])
+    seeds += [None] * (len(prompts) - len(seeds))
+
+    def _finish(index: int, result: BatchResult) -> None:
+        results[index] = result
+        if on_result:
+            on_result(index, result)
+
+    # members: (index, raw_prompt, prompt_en, seed, cache_key, payload variants)
+    groups: dict[str, list[tuple[int, str, str, int, str | None, list[dict[str, Any]]]]] = {}
+    for index, raw_prompt in enumerate(prompts):
+        prompt_en = _prepare_prompt(raw_prompt)
+        if not prompt_en:
+            _finish(index, (False, None, None))
+            continue
+        seed = random_seed() if seeds[index] is None else seeds[index]
+        enhanced_payload, base_payload = _build_txt2img_payloads(
+            prompt_en,
+            negative_prompt=negative_prompt,
+            model_checkpoint=model_checkpoint,
+            control_image_path=None,
+            seed=seed,
+            profile=profile,
+        )
+        cache_key = _render_cache_key(enhanced_payload, post_upscale=profile.post_upscale) if use_cache else None
+        cached = _cache_lookup(cache_key) if cache_key else None
+        if cached:
+            _finish(index, (True, cached, prompt_en))
+            continue
+        match = _find_reusable(prompt_en, enhanced_payload, reuse)
+        reused = (
+            _reuse_render(
+                match,
+                prompt_en,
+                mode=reuse,
+                seed=seed,
+                negative_prompt=negative_prompt,
+                model_checkpoint=model_checkpoint,
+                cancel_checker=cancel_checker,
+                request_timeout=request_timeout,
+                use_cache=use_cache,
+                profile=profile,
+            )
+            if match
+            else None
+        )
+        if reused:
+            _finish(index, reused)
+            continue
+        variants = [enhanced_payload]
+        if enhanced_payload != base_payload:
+            variants.append(base_payload)
+        groups.setdefault(_settings_key(enhanced_payload), []).append(
+            (index, raw_prompt, prompt_en, seed, cache_key, variants)
+        )
+
+    batch_supported = PROMPT_LIST_SCRIPT in [x.lower() for x in _list_txt2img_scripts()] if groups else False
+    start_time = time.time()
+
+    def _render_members(members) -> None:
+        if _is_cancelled(cancel_checker):
+            raise CancelledError("Cancelled during SD batch generation")
+
+        rendered = None
+        if batch_supported and len(members) > 1:
+            print(f"{YELLOW}Starting batch generation ({len(members)} prompts)...{RESET}")
+            rendered = _request_prompt_list(
+                members[0][5],
+                [(prompt_en, seed) for _, _, prompt_en, seed, _, _ in members],
+                cancel_checker=cancel_checker,
+                request_timeout=request_timeout,
+            )
+
+        if rendered is None:
+            for index, raw_prompt, _, seed, _, _ in members:
+                _finish(
+                    index,
+                    resim_ciz(
+                        raw_prompt,
+                        negative_prompt=negative_prompt,
+                        model_checkpoint=model_checkpoint,
+                        cancel_checker=cancel_checker,
+                        request_timeout=request_timeout,
+                        seed=seed,
+                        use_cache=use_cache,
+                        profile=profile,
+                        reuse="off",
+                    ),
+                )
+            return
+
+        variant, images = rendered
+        for (index, _, prompt_en, _, cache_key, variants), file_path in zip(members, images, strict=True):
+            if not file_path:
+                logger.error("Stable Diffusion batch image %s could not be saved", index + 1)
+                _finish(index, (False, None, None))
+                continue
+            if profile.post_upscale:
+                _upscale_image_file(file_path, cancel_checker=cancel_checker)
+            if cache_key:
+                key = _succeeded_cache_key(cache_key, variants[variant], variants[0], post_upscale=profile.post_upscale)
+                _cache_store(key, file_path)
+            _remember_render(prompt_en, file_path, variants[variant])
+            print(f"{GREEN}Image saved: {file_path}{RESET}")
+            _finish(index, (True, file_path, prompt_en))
+
+    # Same checkpoint/VAE/hires groups run back to back, the loaded model first.
+    ordered = list(groups.values())
+    ordered = [ordered[i] for i in get_render_scheduler().order([members[0][5][0] for members in ordered])]
+    capacity = get_image_backend().capacity if ordered else 1
+    if capacity > 1:
+        # Forge pool: each group is split across the hosts and the parts render in parallel.
+        _run_in_parallel(
+            _render_members, [part for members in ordered for part in _split_evenly(members, capacity)], capacity
+        )
+    else:
+        for members in ordered:
+            _render_members(members)
+
+    elapsed = time.time() - start_time
+    print(f"{YELLOW}Batch duration: {elapsed:.2f} sec{RESET}")
+    return [result or (False, None, None) for result in results]
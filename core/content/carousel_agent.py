@@ -1,12 +1,15 @@
 import logging
-import time
 from typing import Any
 
-from core.clients.llm import get_llm_service, unload_ollama
-from core.clients.sd_client import resim_ciz
+from core.clients.gpu_residency import get_gpu_residency
+from core.clients.llm import get_llm_service
+from core.clients.render_profile import DRAFT_PROFILE
+from core.clients.render_watchdog import inspect_image
+from core.clients.sd_client import discard_draft, finalize_draft, resim_ciz, resim_ciz_batch, seed_for
 from core.content.caption_format import format_caption_hashtags_bottom
 from core.content.daily_visual_agent import dunya_gundemini_getir
 from core.errors import LLMResponseError
+from core.runtime.config import SD_DRAFT_FIRST
 
 logger = logging.getLogger(__name__)
 
@@ -303,12 +306,51 @@ def _normalize_slides(
     return normalized
 
 
-def generate_carousel_content(log_callback=print):
+def _render_via_drafts(prompts, seeds, *, log_callback, on_result):
+    """
+    Slide'lar once taslak olarak tek batch'te cizilir. Bozuk taslak bir kez
+    yeni seed'le tekrar denenir; yalnizca onaylanan taslaklar ayni seed'le
+    tam kaliteye cikarilir.
+    """
+    drafts = resim_ciz_batch(
+        prompts,
+        negative_prompt=CAROUSEL_NEGATIVE_PROMPT,
+        seeds=seeds,
+        profile=DRAFT_PROFILE,
+    )
+    results = []
+    for index, (prompt, seed, (success, draft_path, _)) in enumerate(zip(prompts, seeds, drafts)):
+        reason = inspect_image(draft_path) if success else "cizilemedi"
+        if reason:
+            discard_draft(draft_path)
+            log_callback(f"{index + 1}. taslak reddedildi ({reason}), yeni seed ile tekrar ciziliyor...")
+            seed = seed_for(prompt, "redraft")
+            success, draft_path, _ = resim_ciz(
+                prompt,
+                negative_prompt=CAROUSEL_NEGATIVE_PROMPT,
+                seed=seed,
+                profile=DRAFT_PROFILE,
+            )
+            reason = inspect_image(draft_path) if success else "cizilemedi"
+
+        if reason:
+            discard_draft(draft_path)
+            result = (False, None, None)
+        else:
+            result = finalize_draft(draft_path, prompt, seed=seed, negative_prompt=CAROUSEL_NEGATIVE_PROMPT)
+            discard_draft(draft_path)
+        on_result(index, result)
+        results.append(result)
+    return results
+
+
+def generate_carousel_content(log_callback=print, draft_first: bool = SD_DRAFT_FIRST):
     """
     1. Haberleri tarar.
     2. Tek konu + tek sabit ana ozne secer.
     3. Ayni ozneyi 10 farkli tarzda promptlar.
-    4. 10 gorseli sirayla cizer.
+    4. 10 gorseli tek batch isteginde cizer (draft_first: once taslaklar,
+       sonra yalnizca onaylananlar tam kalitede).
     """
 
     log_callback("Global gundem taraniyor (Carousel)...")
@@ -394,35 +436,49 @@ def generate_carousel_content(log_callback=print):
             "#ai #carousel #digitalart #visualstory #stablediffusion",
         )
 
-    unload_ollama()
-    time.sleep(1.5)
+    get_gpu_residency().acquire_for_sd()
 
-    generated_images = []
     log_callback(f"Toplam {CAROUSEL_COUNT} gorsel cizilecek. Baslaniyor...")
 
-    for i, slide in enumerate(parsed_slides):
+    def _on_slide_result(index: int, result) -> None:
+        slide_title = parsed_slides[index]["title"]
+        if result[0]:
+            log_callback(f"LAYER_UPDATE:[{slide_title}] Gorsel {index + 1}/{CAROUSEL_COUNT} hazir.")
+        else:
+            log_callback(f"LAYER_UPDATE:[{slide_title}] Gorsel {index + 1}/{CAROUSEL_COUNT} cizilemedi.")
+
+    # Tum slide'lar ayni ayarlari paylasiyor: tek Forge istegiyle cizilir.
+    # Seed prompttan turetilir; is tekrar edilirse render cache'ten gelir.
+    slide_prompts = [slide["prompt"] for slide in parsed_slides]
+    slide_seeds = [seed_for(p) for p in slide_prompts]
+    if draft_first:
+        results = _render_via_drafts(
+            slide_prompts,
+            slide_seeds,
+            log_callback=log_callback,
+            on_result=_on_slide_result,
+        )
+    else:
+        results = resim_ciz_batch(
+            slide_prompts,
+            negative_prompt=CAROUSEL_NEGATIVE_PROMPT,
+            on_result=_on_slide_result,
+            seeds=slide_seeds,
+        )
+
+    generated_images = []
+    for i, (slide, (success, file_path, _)) in enumerate(zip(parsed_slides, results)):
         current_num = i + 1
         prompt = slide["prompt"]
         slide_title = slide["title"]
 
-        log_callback(f"LAYER_UPDATE:[{slide_title}] Gorsel {current_num}/{CAROUSEL_COUNT} ciziliyor...")
-
-        success = False
-        retry_count = 0
-        file_path = None
-
-        while not success and retry_count < 2:
-            s, path, _ = resim_ciz(
+        if not success and not draft_first:
+            log_callback(f"Cizim hatasi, tekrar deneniyor ({current_num}/{CAROUSEL_COUNT})...")
+            success, file_path, _ = resim_ciz(
                 prompt,
                 negative_prompt=CAROUSEL_NEGATIVE_PROMPT,
+                seed=seed_for(prompt),
             )
-            if s:
-                success = True
-                file_path = path
-            else:
-                retry_count += 1
-                log_callback(f"Cizim hatasi, tekrar deneniyor ({retry_count})...")
-                time.sleep(1)
 
         if success and file_path:
             generated_images.append(
@@ -437,10 +493,6 @@ def generate_carousel_content(log_callback=print):
         else:
             log_callback(f"{current_num}. gorsel cizilemedi.")
 
-        if current_num < CAROUSEL_COUNT:
-            log_callback("Sistem sogutuluyor (5 sn)...")
-            time.sleep(5)
-
     if not generated_images:
         return False, None, "Hicbir gorsel olusturulamadi"
 
@@ -1,11 +1,11 @@
 import difflib
 import logging
 import random
-import time
 
 import feedparser
 
-from core.clients.llm import get_llm_service, unload_ollama
+from core.clients.gpu_residency import get_gpu_residency
+from core.clients.llm import get_llm_service
 from core.clients.sd_client import resim_ciz
 from core.content.news_fetcher import RSS_SOURCES
 from core.content.news_memory import get_used_title_set, mark_used_titles, normalize_title, prune_expired
@@ -156,8 +156,7 @@ def gunluk_instagram_gorseli_uret(log_callback=print):
         log_callback(f"🇬🇧 Prompt: {birlesik_sahne_promptu[:100]}...")
 
     # 4. VRAM Temizliği
-    unload_ollama()
-    time.sleep(1.5)
+    get_gpu_residency().acquire_for_sd()
 
     # 5. Çizim
     log_callback("🎨 Görsel oluşturuluyor...")
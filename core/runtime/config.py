@@ -17,6 +17,52 @@ RESET = "\033[0m"
 
 load_dotenv()
 
+# Forge API baglantisi. Tum istekler core/clients/forge_client.py icindeki
+# havuzlanmis oturumdan gecer; adres ve havuz ayarlari buradan okunur.
+SD_API_URL = os.getenv("SD_API_URL", "http://127.0.0.1:7860").strip().rstrip("/")
+SD_HTTP_POOL_SIZE = int(os.getenv("SD_HTTP_POOL_SIZE", "4"))
+SD_HTTP_RETRIES = int(os.getenv("SD_HTTP_RETRIES", "2"))
+SD_HTTP_BACKOFF = float(os.getenv("SD_HTTP_BACKOFF", "0.5"))
+SD_HTTP_CONNECT_TIMEOUT = float(os.getenv("SD_HTTP_CONNECT_TIMEOUT", "3"))
+
+# Birden fazla GPU makinesi: SD_API_URLS virgulle ayrilmis Forge adresleridir
+# (bos ise tek host, SD_API_URL). Render'lar en az isi olan host'a dagitilir
+# ve ayni anda host sayisi kadar GPU isi calisabilir (bkz. forge_pool).
+# Baglanti kurulamayan host SD_POOL_FAILURE_COOLDOWN saniye atlanir.
+SD_API_URLS = [url.strip().rstrip("/") for url in os.getenv("SD_API_URLS", "").split(",") if url.strip()] or [
+    SD_API_URL
+]
+SD_POOL_HEALTH_INTERVAL = float(os.getenv("SD_POOL_HEALTH_INTERVAL", "30"))
+SD_POOL_FAILURE_COOLDOWN = float(os.getenv("SD_POOL_FAILURE_COOLDOWN", "60"))
+
+# Gorsel backend'i: forge (SD_API_URL) ya da fake (GPU'suz test/yuk testi icin
+# surec icinde baslayan sahte Forge; deterministik PNG, ayarlanabilir gecikme
+# ve hata olasiliklari, ornek SD_FAKE_ERRORS="500:0.05,503:0.02").
+SD_BACKEND = os.getenv("SD_BACKEND", "forge").strip().lower()
+SD_FAKE_LATENCY = float(os.getenv("SD_FAKE_LATENCY", "0.5"))
+SD_FAKE_LATENCY_PER_STEP = float(os.getenv("SD_FAKE_LATENCY_PER_STEP", "0"))
+SD_FAKE_JITTER = float(os.getenv("SD_FAKE_JITTER", "0"))
+SD_FAKE_ERRORS = os.getenv("SD_FAKE_ERRORS", "")
+SD_FAKE_PORT = int(os.getenv("SD_FAKE_PORT", "0"))
+
+# Forge yetenek listesi (upscaler, script, ControlNet modelleri...). Suresi
+# dolan liste arka planda yenilenirken eskisi kullanilir; sadece hic veri
+# yokken en fazla SD_CAPABILITY_COLD_WAIT saniye beklenir.
+SD_CAPABILITY_TTL = float(os.getenv("SD_CAPABILITY_TTL", "120"))
+SD_CAPABILITY_COLD_WAIT = float(os.getenv("SD_CAPABILITY_COLD_WAIT", "3.5"))
+
+# Render sirasinda canli ilerleme: tek sampler thread'i bu aralikla Forge'u
+# yoklar ve sonucu isin snapshot'ina yazar. Onizleme kucultulerek eklenir.
+SD_PROGRESS_INTERVAL = float(os.getenv("SD_PROGRESS_INTERVAL", "1.0"))
+SD_PROGRESS_PREVIEW = os.getenv("SD_PROGRESS_PREVIEW", "1").strip() == "1"
+SD_PROGRESS_PREVIEW_SIZE = int(os.getenv("SD_PROGRESS_PREVIEW_SIZE", "256"))
+
+# Render gozcusu (NumPy gerekir): onizleme siyah/duz/gurultulu/bolunmus
+# gorunurse render erken kesilir ve yedek prompt'a gecilir. Varsayilan kapali.
+SD_RENDER_WATCHDOG = os.getenv("SD_RENDER_WATCHDOG", "0").strip() == "1"
+SD_WATCHDOG_MIN_PROGRESS = float(os.getenv("SD_WATCHDOG_MIN_PROGRESS", "0.3"))
+SD_WATCHDOG_STRIKES = int(os.getenv("SD_WATCHDOG_STRIKES", "2"))
+
 SD_WIDTH = 1024
 SD_HEIGHT = 1024
 
@@ -56,6 +102,56 @@ SD_CONTROLNET_WEIGHT = float(os.getenv("SD_CONTROLNET_WEIGHT", "0.65"))
 SD_CONTROLNET_GUIDANCE_START = float(os.getenv("SD_CONTROLNET_GUIDANCE_START", "0.0"))
 SD_CONTROLNET_GUIDANCE_END = float(os.getenv("SD_CONTROLNET_GUIDANCE_END", "0.85"))
 
+# Taslak modu: adaylar once dusuk cozunurluk/az adimla cizilir, yalnizca
+# onaylananlar ayni seed'le img2img ile tam kaliteye cikarilir.
+SD_DRAFT_FIRST = os.getenv("SD_DRAFT_FIRST", "0").strip() == "1"
+SD_DRAFT_SIZE = int(os.getenv("SD_DRAFT_SIZE", "512"))
+SD_DRAFT_STEPS = int(os.getenv("SD_DRAFT_STEPS", "12"))
+SD_FINALIZE_DENOISE = float(os.getenv("SD_FINALIZE_DENOISE", "0.45"))
+
+# Sure butcesi: resim_ciz(budget=...) adim/hires/ADetailer/upscale ayarlarini
+# bu makinede olculen surelere gore secer; olcumler bu dosyada birikir.
+SD_RENDER_TIMINGS_PATH = os.getenv("SD_RENDER_TIMINGS_PATH", os.path.join("generated_images", "render_timings.json"))
+SD_BUDGET_MIN_STEPS = int(os.getenv("SD_BUDGET_MIN_STEPS", "12"))
+# Haber videosunun tum gorselleri icin toplam sure (sn); 0 = sabit ayarlar.
+SD_VIDEO_RENDER_BUDGET = float(os.getenv("SD_VIDEO_RENDER_BUDGET", "0"))
+
+# Benzer prompt yeniden kullanimi: off | reuse (onceki gorselin kopyasi) |
+# init (onceki gorsel img2img baslangici). Indeks her durumda dolar.
+SD_PROMPT_REUSE = os.getenv("SD_PROMPT_REUSE", "off").strip().lower()
+SD_PROMPT_REUSE_THRESHOLD = float(os.getenv("SD_PROMPT_REUSE_THRESHOLD", "0.8"))
+SD_PROMPT_REUSE_DENOISE = float(os.getenv("SD_PROMPT_REUSE_DENOISE", "0.6"))
+SD_PROMPT_INDEX_PATH = os.getenv("SD_PROMPT_INDEX_PATH", os.path.join("generated_images", "prompt_index.json"))
+SD_PROMPT_INDEX_MAX = int(os.getenv("SD_PROMPT_INDEX_MAX", "2000"))
+
+# ADetailer/ControlNet devre kesicisi: enhanced payload art arda bu kadar
+# hata verip base payload calisirsa ozellik cooldown boyunca atlanir.
+SD_FEATURE_BREAKER_THRESHOLD = int(os.getenv("SD_FEATURE_BREAKER_THRESHOLD", "2"))
+SD_FEATURE_BREAKER_COOLDOWN = float(os.getenv("SD_FEATURE_BREAKER_COOLDOWN", "900"))
+
+# txt2img siralayici: ayni checkpoint/VAE/hires isleri arka arkaya calisir;
+# ayni anahtar bekleyen diger islerin onune en fazla bu kadar art arda gecer.
+SD_SCHEDULER_MAX_RUN = int(os.getenv("SD_SCHEDULER_MAX_RUN", "8"))
+
+# Render cache: ayni payload (seed dahil) tekrar gelirse GPU'ya gitmeden
+# diskteki PNG dondurulur. Dizin generated_images altinda kalmali; Graph API
+# ve /images sadece oradan dosya sunar.
+SD_RENDER_CACHE_ENABLED = os.getenv("SD_RENDER_CACHE_ENABLED", "1").strip() == "1"
+SD_RENDER_CACHE_DIR = os.getenv("SD_RENDER_CACHE_DIR", os.path.join("generated_images", "_cache"))
+SD_RENDER_CACHE_MAX_MB = int(os.getenv("SD_RENDER_CACHE_MAX_MB", "2048"))
+SD_RENDER_CACHE_MAX_AGE_DAYS = float(os.getenv("SD_RENDER_CACHE_MAX_AGE_DAYS", "14"))
+
+# GPU devri (Ollama -> Forge): Ollama yalnizca Forge'un bos VRAM'i
+# GPU_SD_REQUIRED_MB'nin altindaysa bosaltilir. Sabit bekleme yerine Ollama
+# /api/ps ve Forge /sdapi/v1/memory hazir diyene kadar (en fazla
+# GPU_HANDOFF_TIMEOUT sn) beklenir. Ollama ile Forge ayri GPU'lardaysa GPU_SHARED=0.
+GPU_SHARED = os.getenv("GPU_SHARED", "1").strip() == "1"
+GPU_SD_REQUIRED_MB = int(os.getenv("GPU_SD_REQUIRED_MB", "6144"))
+# Ters yon: GPU LLM'e gecerken Forge bossa ve bos VRAM bunun altindaysa Forge'un
+# checkpoint'i birakilir, siradaki render oncesi geri yuklenir. 0 = hic birakma.
+GPU_LLM_REQUIRED_MB = int(os.getenv("GPU_LLM_REQUIRED_MB", "6144"))
+GPU_HANDOFF_TIMEOUT = float(os.getenv("GPU_HANDOFF_TIMEOUT", "15"))
+
 INSTA_USERNAME = os.getenv("INSTA_USERNAME")
 INSTA_SESSIONID = os.getenv("INSTA_SESSIONID")
 
@@ -84,6 +180,55 @@ NEWS_MEMORY_MONGO_COLLECTION = os.getenv("NEWS_MEMORY_MONGO_COLLECTION", "used_n
 
 USED_NEWS_TTL_DAYS = int(os.getenv("USED_NEWS_TTL_DAYS", "7"))
 
+# Haber puanlama: single = haber basina bir LLM cagrisi, batch = adaylar
+# NEWS_SCORE_BATCH_SIZE'lik parcalar halinde tek cagrida puanlanir; cevapta
+# eksik kalan haber tek tek yeniden puanlanir.
+NEWS_SCORING_MODE = os.getenv("NEWS_SCORING_MODE", "single").strip().lower()
+NEWS_SCORE_BATCH_SIZE = int(os.getenv("NEWS_SCORE_BATCH_SIZE", "8"))
+# separate = RiskAgent haberi ayrica LLM'e sorar; combined = puanlama cagrisi
+# risk puani ve kategorileri de dondurur, RiskAgent yalnizca esikleri uygular.
+NEWS_ANALYSIS_MODE = os.getenv("NEWS_ANALYSIS_MODE", "separate").strip().lower()
+
+# Ollama API adresi (LLMService ve GPU devri ayni sunucuyu kullanir)
+OLLAMA_API_HOST = os.getenv("OLLAMA_API_HOST", "http://localhost:11434").rstrip("/")
+
+# Varsayilan LLM ve gorev sinifina gore modeller. Puanlama/risk gibi kisa,
+# yapisal isler kucuk bir modelle (1-3B) birkac kat hizli calisir; bos
+# birakilan gorev LLM_MODEL'i kullanir. Siniflar: scoring, risk, prompt,
+# caption, chat (LLM_MODEL_SCORING, LLM_MODEL_RISK, ...).
+LLM_MODEL = os.getenv("LLM_MODEL", "llama3.1:8b").strip() or "llama3.1:8b"
+LLM_TASK_MODELS = {
+    task: os.getenv(f"LLM_MODEL_{task.upper()}", "").strip()
+    for task in ("scoring", "risk", "prompt", "caption", "chat")
+}
+
+# LLM cevap cache'i: ayni model + mesajlar + format + ornekleme ayarlari tekrar
+# gelirse Ollama'ya gitmeden SQLite'taki cevap doner. Yas ve kayit sayisi sinirli.
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1").strip() == "1"
+_llm_cache_path_raw = os.getenv("LLM_CACHE_PATH", os.path.join("data", "llm_cache.db"))
+LLM_CACHE_PATH = (
+    _llm_cache_path_raw if os.path.isabs(_llm_cache_path_raw) else os.path.join(BASE_DIR, _llm_cache_path_raw)
+)
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+LLM_CACHE_MAX_AGE_DAYS = float(os.getenv("LLM_CACHE_MAX_AGE_DAYS", "7"))
+
+# generate_json semayi Ollama'nin `format` alanina JSON Schema olarak gonderir
+# (Ollama >= 0.5 ciktiyi semaya kisitlar). 0 = eski format="json" davranisi.
+LLM_SCHEMA_FORMAT = os.getenv("LLM_SCHEMA_FORMAT", "1").strip() == "1"
+# Semayi `format` alaninda reddeden (HTTP 400) eski Ollama icin bu kadar saniye
+# format="json" kullanilir; sure dolunca sema yeniden denenir.
+LLM_SCHEMA_FALLBACK_SECONDS = max(0.0, float(os.getenv("LLM_SCHEMA_FALLBACK_SECONDS", "600")))
+
+# Paralel LLM cagrilari (puanlama, risk, video senaryolari): ayni anda Ollama'ya
+# giden istek sayisi Ollama'nin OLLAMA_NUM_PARALLEL ayariyla ayni tutulmali;
+# 1 = eskisi gibi sirayla. LLM_QUEUE_SIZE'i asan isler yer acilana kadar bekler.
+LLM_MAX_PARALLEL = max(1, int(os.getenv("LLM_MAX_PARALLEL", os.getenv("OLLAMA_NUM_PARALLEL", "1"))))
+LLM_QUEUE_SIZE = max(0, int(os.getenv("LLM_QUEUE_SIZE", "32")))
+
+# LLM telemetrisi: /api/metrics'te tutulan son cagri ornegi sayisi (histogramlar
+# ve toplamlar sinirsiz birikir, yalnizca ornek listesi kirpilir).
+LLM_TELEMETRY_SAMPLES = int(os.getenv("LLM_TELEMETRY_SAMPLES", "200"))
+
 # Risk filter controls
 RISK_DEFAULT_THRESHOLD = int(os.getenv("RISK_DEFAULT_THRESHOLD", "4"))
 RISK_WHITELIST_MAX_SCORE = int(os.getenv("RISK_WHITELIST_MAX_SCORE", "6"))
@@ -8,18 +8,28 @@ yaziyor, cancel bayragi yanlis ise uygulaniyor ve log listesi karisiyordu.
 Sorun UI tarafinda navigasyon kilitlenerek gizlenmisti; yani semptom
 bastirilmis, neden durmustu.
 
-Bu modul her isi kendi kimligiyle izler ve "ayni anda tek GPU isi" kuralini
-backend'de zorlar. UI kilidine guvenilmez.
+Bu modul her isi kendi kimligiyle izler ve ayni anda calisan is sayisini
+backend'de sinirlar (tek Forge'da ayni anda tek is; SD_API_URLS ile birden
+fazla host varsa host sayisi kadar). UI kilidine guvenilmez. Sinir yalnizca
+toplam is sayisidir: isler bir host'a baglanmaz, bir isin paralel render'lari
+ForgePool'da bos olan her host'a dagilabilir (diger isler o sirada render
+kuyrugunda bekler).
 """
 
+import functools
 import itertools
 import threading
 import time
 import uuid
 from collections import deque
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
 from dataclasses import dataclass, field
 from typing import Any
 
+from core.runtime.config import SD_API_URLS
+
 # Olusturma sirasi. time.time() cozunurlugu (Windows'ta ~15ms) iki isin ayni
 # damgayi almasina izin veriyor; o durumda "en son is" belirsiz kaliyordu.
 _SEQUENCE = itertools.count()
@@ -41,8 +51,20 @@ JOB_DISPLAY_NAMES = {
 }
 
 
+# Is ozetinde toplanan LLM telemetri alanlari (llm_telemetry ornekleri).
+LLM_SUMMARY_FIELDS = (
+    "prompt_tokens",
+    "completion_tokens",
+    "load_seconds",
+    "prompt_eval_seconds",
+    "eval_seconds",
+    "queue_seconds",
+    "total_seconds",
+)
+
+
 class JobConflict(RuntimeError):
-    """Baska bir GPU isi devam ederken yeni is baslatilmak istendi."""
+    """Butun GPU host'lari doluyken yeni is baslatilmak istendi."""
 
     def __init__(self, active_kind: str, active_job_id: str):
         self.active_kind = active_kind
@@ -69,6 +91,12 @@ class Job:
     seq: int = field(default_factory=lambda: next(_SEQUENCE))
     created_at: float = field(default_factory=time.time)
     finished_at: float | None = None
+    # Render sirasindaki canli ilerleme (adim, ETA, onizleme). sd_client'taki
+    # ProgressSampler yazar; render yokken None.
+    render: dict[str, Any] | None = None
+    # LLM cagrilarinin toplamlari; llm_telemetry yazar (paralel cagrilar icin kilitli).
+    llm: dict[str, Any] = field(default_factory=dict)
+    _llm_lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
     _logs: deque = field(default_factory=lambda: deque(maxlen=MAX_LOG_LINES))
 
     @property
@@ -88,10 +116,32 @@ class Job:
         self.percent = max(0, min(100, int(percent)))
         self.current_task = task
 
+    def set_render(self, render: dict[str, Any] | None) -> None:
+        self.render = dict(render) if render else None
+
+    def record_llm(self, sample: dict[str, Any]) -> None:
+        """Bir LLM cagrisini isin toplamina ve agent dokumune ekler."""
+        agent = sample.get("agent") or sample.get("task") or "-"
+        with self._llm_lock:
+            by_agent = self.llm.setdefault("by_agent", {})
+            for row in (self.llm, by_agent.setdefault(agent, {})):
+                row["calls"] = row.get("calls", 0) + 1
+                for name in LLM_SUMMARY_FIELDS:
+                    row[name] = row.get(name, 0) + (sample.get(name) or 0)
+
+    def llm_summary(self) -> dict[str, Any]:
+        with self._llm_lock:
+            rows = [self.llm, *self.llm.get("by_agent", {}).values()]
+            views = [_llm_view(row) for row in rows]
+        if not self.llm:
+            return {}
+        return {**views[0], "by_agent": dict(zip(self.llm["by_agent"], views[1:], strict=True))}
+
     def finish(self, status: str, *, task: str = "", error: str | None = None, result: Any = None) -> None:
         self.status = status
         self.stage = status
         self.finished_at = time.time()
+        self.render = None
         if status == "done":
             self.percent = 100
         if task:
@@ -113,10 +163,20 @@ class Job:
             "error": self.error,
             "errors": [dict(error) for error in self.errors],
             "cancel_requested": self.cancel_requested,
+            "render": dict(self.render) if self.render else None,
+            "llm": self.llm_summary(),
             "logs": self.logs,
         }
 
 
+def _llm_view(row: dict[str, Any]) -> dict[str, Any]:
+    view = {name: round(value, 3) if isinstance(value, float) else value for name, value in row.items()}
+    view.pop("by_agent", None)
+    eval_seconds = row.get("eval_seconds") or 0
+    view["tokens_per_second"] = round(row.get("completion_tokens", 0) / eval_seconds, 2) if eval_seconds else None
+    return view
+
+
 # Bos kayit icin dondurulen sabit cevap. UI ilk aciliste bunu gorur.
 IDLE_SNAPSHOT: dict[str, Any] = {
     "job_id": None,
@@ -129,34 +189,57 @@ IDLE_SNAPSHOT: dict[str, Any] = {
     "error": None,
     "errors": [],
     "cancel_requested": False,
+    "render": None,
+    "llm": {},
     "logs": [],
 }
 
 
+# Calisan thread'in sahibi olan is. Derin katmanlar (sd_client) ilerlemeyi
+# dogru ise yazabilsin diye job nesnesi parametre olarak tasinmaz.
+_CURRENT_JOB: ContextVar[Job | None] = ContextVar("atlas_current_job", default=None)
+
+
+def current_job() -> Job | None:
+    return _CURRENT_JOB.get()
+
+
+@contextmanager
+def bind_job(job: Job | None) -> Iterator[Job | None]:
+    token = _CURRENT_JOB.set(job)
+    try:
+        yield job
+    finally:
+        _CURRENT_JOB.reset(token)
+
+
 class JobRegistry:
     """
-    Is kayitlarini tutar ve "ayni anda tek GPU isi" kuralini zorlar.
+    Is kayitlarini tutar ve ayni anda en fazla `max_active` is kuralini
+    zorlar. Bu toplam eszamanlilik siniridir; isleri host'lara baglamaz.
 
     Thread-safe: FastAPI BackgroundTasks isleri ayri thread'lerde calistirir.
     """
 
-    def __init__(self, *, ttl_seconds: int = FINISHED_JOB_TTL_SECONDS):
+    def __init__(self, *, ttl_seconds: int = FINISHED_JOB_TTL_SECONDS, max_active: int = 1):
         self._jobs: dict[str, Job] = {}
         self._lock = threading.RLock()
         self._ttl = ttl_seconds
+        self.max_active = max(1, int(max_active))
 
     def create(self, kind: str) -> Job:
         """
         Yeni is olusturur.
 
-        Baska bir is devam ediyorsa JobConflict firlatir; bu kural UI'da degil
-        burada zorlanir, cunku tek GPU'yu iki is paylasamaz.
+        `max_active` is devam ediyorsa en eskisiyle JobConflict firlatir; bu
+        kural UI'da degil burada zorlanir, cunku bir GPU'yu iki is paylasamaz.
         """
         with self._lock:
             self._prune_locked()
-            active = self._active_locked()
-            if active is not None:
-                raise JobConflict(active.kind, active.id)
+            active = [job for job in self._jobs.values() if job.is_active]
+            if len(active) >= self.max_active:
+                oldest = min(active, key=lambda j: j.seq)
+                raise JobConflict(oldest.kind, oldest.id)
 
             job = Job(kind=kind)
             self._jobs[job.id] = job
@@ -234,5 +317,16 @@ class JobRegistry:
         return len(expired)
 
 
-# Uygulama genelinde tek kayit defteri.
-registry = JobRegistry()
+# Uygulama genelinde tek kayit defteri; host sayisi kadar is (host'a bagli degil).
+registry = JobRegistry(max_active=len(SD_API_URLS))
+
+
+def job_task(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """Arka plan is fonksiyonunu (ilk argumani job_id) o ise baglar."""
+
+    @functools.wraps(fn)
+    def wrapper(job_id: str, *args: Any, **kwargs: Any) -> Any:
+        with bind_job(registry.get(job_id)):
+            return fn(job_id, *args, **kwargs)
+
+    return wrapper
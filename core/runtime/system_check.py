@@ -2,8 +2,9 @@ import logging
 import socket
 import subprocess
 import time
+from urllib.parse import urlparse
 
-from core.runtime.config import GREEN, RESET, YELLOW
+from core.runtime.config import GREEN, OLLAMA_API_HOST, RESET, SD_API_URL, SD_API_URLS, SD_BACKEND, YELLOW
 
 logger = logging.getLogger(__name__)
 
@@ -21,8 +22,17 @@ def check_online_status() -> bool:
         return False
 
 
-def is_sd_running(host="127.0.0.1", port=7860) -> bool:
+def _sd_host_port() -> tuple[str, int]:
+    """SD_API_URL'den host/port cikarir (varsayilan 127.0.0.1:7860)."""
+    parsed = urlparse(SD_API_URL)
+    return parsed.hostname or "127.0.0.1", parsed.port or 7860
+
+
+def is_sd_running(host=None, port=None) -> bool:
     """Forge API portu açık mı? (SD çalışıyor mu?)"""
+    default_host, default_port = _sd_host_port()
+    host = host or default_host
+    port = port or default_port
     try:
         with socket.create_connection((host, port), timeout=1) as _:
             return True
@@ -30,8 +40,17 @@ def is_sd_running(host="127.0.0.1", port=7860) -> bool:
         return False
 
 
-def is_ollama_running(host="127.0.0.1", port=11434) -> bool:
+def _ollama_host_port() -> tuple[str, int]:
+    """OLLAMA_API_HOST'tan host/port cikarir (varsayilan 127.0.0.1:11434)."""
+    parsed = urlparse(OLLAMA_API_HOST)
+    return parsed.hostname or "127.0.0.1", parsed.port or 11434
+
+
+def is_ollama_running(host=None, port=None) -> bool:
     """Ollama API portu açık mı?"""
+    default_host, default_port = _ollama_host_port()
+    host = host or default_host
+    port = port or default_port
     try:
         with socket.create_connection((host, port), timeout=1) as _:
             return True
@@ -95,7 +114,23 @@ def start_stable_diffusion():
 def ensure_sd_running(wait_seconds=20, log_callback=print, cancel_checker=None, max_wait_seconds=180):
     """
     SD çalışmıyorsa açar. Açtıktan sonra port gelene kadar bekler.
+    SD_BACKEND=fake ise Forge yerine süreç içi sahte sunucu başlatılır.
+    SD_API_URLS ile birden fazla host varsa uzak Forge'lar açılamaz; en az
+    birinin sağlıklı olması yeterlidir.
     """
+    if SD_BACKEND == "fake":
+        from core.clients.image_backend import get_image_backend
+
+        log_callback(f"🧪 Sahte görsel backend'i kullanılıyor: {get_image_backend().base_url}")
+        return True
+
+    if len(SD_API_URLS) > 1:
+        from core.clients.image_backend import get_image_backend
+
+        healthy = get_image_backend().check_health()
+        log_callback(f"🎨 Forge havuzu: {healthy}/{len(SD_API_URLS)} host hazır.")
+        return healthy > 0
+
     if is_sd_running():
         log_callback("🎨 Stable Diffusion zaten çalışıyor.")
         return True
@@ -39,6 +39,18 @@ os.environ.setdefault("NEWS_MEMORY_BACKEND", "sqlite")
 os.environ["NEWS_MEMORY_DB_PATH"] = str(_TMP / "news_memory.db")
 os.environ["NEWS_MEMORY_JSON_PATH"] = str(_TMP / "news_memory.json")
 
+# Render cache testlerde kapali; acan testler dizini kendisi verir.
+os.environ["SD_RENDER_CACHE_ENABLED"] = "0"
+os.environ["SD_RENDER_CACHE_DIR"] = str(_TMP / "render_cache")
+
+# LLM cevap cache'i de kapali; acan testler kendi veritabanini verir.
+os.environ["LLM_CACHE_ENABLED"] = "0"
+os.environ["LLM_CACHE_PATH"] = str(_TMP / "llm_cache.db")
+
+# Olculen render sureleri ve prompt indeksi gercek generated_images'a yazilmasin
+os.environ["SD_RENDER_TIMINGS_PATH"] = str(_TMP / "render_timings.json")
+os.environ["SD_PROMPT_INDEX_PATH"] = str(_TMP / "prompt_index.json")
+
 # Testlerin bilinen bir token ile calismasi icin
 TEST_API_TOKEN = "pytest-token-0123456789abcdef"
 os.environ["ATLAS_API_TOKEN"] = TEST_API_TOKEN
@@ -128,13 +140,15 @@ class FakeLLM:
         self.responses = list(responses or [])
         self.text_response = text_response
         self.calls = []
+        self.tasks = []
         self.cancel_checker = None
 
     def set_cancel_checker(self, checker):
         self.cancel_checker = checker
 
-    def generate_response(self, prompt, schema=None, retries=3):
+    def generate_response(self, prompt, schema=None, retries=3, task=None):
         self.calls.append(prompt)
+        self.tasks.append(task)
         if not self.responses:
             raise AssertionError("FakeLLM: beklenenden fazla cagri yapildi")
         result = self.responses.pop(0)
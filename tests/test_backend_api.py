@@ -23,6 +23,7 @@ KORUNAN_GET_UCLARI = [
     "/api/imgbb/config",
     "/api/instagram/graph-config",
     "/api/progress",
+    "/api/sd/features",
 ]
 
 KORUNAN_POST_UCLARI = [
@@ -173,3 +174,54 @@ class TestMaskeleme:
 
     def test_none_guvenli(self):
         assert backend._mask_secret(None) == ""
+
+
+class TestChatAkisi:
+    def test_sse_parcalar_ve_sureler(self, client, api_token, monkeypatch):
+        class FakeStream:
+            closed = False
+
+            def __iter__(self):
+                yield from ["Mer", "haba"]
+
+            def stats(self):
+                return {"first_token_seconds": 0.1, "total_seconds": 0.3}
+
+            def close(self):
+                FakeStream.closed = True
+
+        class FakeService:
+            def stream_chat(self, messages, **_kwargs):
+                assert messages[-1] == {"role": "user", "content": "selam"}
+                return FakeStream()
+
+        monkeypatch.setattr(backend, "get_llm_service", lambda: FakeService())
+
+        response = client.post("/api/chat/stream", json={"message": "selam"}, headers={"X-Atlas-Token": api_token})
+
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = [block.split("\n") for block in response.text.strip().split("\n\n")]
+        assert [lines[0] for lines in events] == ["event: token", "event: token", "event: done"]
+        assert events[1][1] == 'data: {"text": "haba"}'
+        assert '"first_token_seconds": 0.1' in events[2][1]
+        assert FakeStream.closed
+
+
+class TestMetrikler:
+    def test_llm_telemetrisi_ve_sayaclar(self, client, api_token):
+        response = client.get("/api/metrics", headers={"X-Atlas-Token": api_token})
+
+        assert response.status_code == 200
+        body = response.json()
+        assert {"llm", "llm_routing", "llm_dispatcher", "llm_cache", "llm_json", "gpu"} <= set(body)
+        assert set(body["llm"]["histograms"]) == {
+            "tokens_per_second",
+            "load_seconds",
+            "queue_seconds",
+            "dispatch_wait_seconds",
+        }
+
+    def test_bilinmeyen_is(self, client, api_token):
+        response = client.get("/api/metrics?job_id=yok", headers={"X-Atlas-Token": api_token})
+
+        assert response.status_code == 404
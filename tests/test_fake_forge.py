@@ -0,0 +1,185 @@
+"""
+core/clients/fake_forge.py ve image_backend.py — GPU'suz sahte Forge.
+
+Onceden sd_client yalnizca gercek Forge'a konusabiliyordu. Bu testler sahte
+sunucunun deterministik PNG urettigini, gecikme/hata ayarlarini uyguladigini
+ve resim_ciz'in SD_BACKEND=fake ile gercek HTTP yolundan calistigini dogrular.
+"""
+
+import base64
+import io
+import threading
+import time
+
+import pytest
+import requests
+from PIL import Image
+
+from core.clients import image_backend, render_scheduler, sd_client
+from core.clients.fake_forge import FAKE_CHECKPOINT, FakeForgeConfig, FakeForgeServer, parse_errors, render_png
+from core.clients.image_backend import FakeBackend, ForgeBackend, create_image_backend, set_image_backend
+from core.clients.render_profile import DRAFT_PROFILE, FULL_PROFILE
+
+
+@pytest.fixture
+def server():
+    with FakeForgeServer(config=FakeForgeConfig(latency=0)) as fake:
+        yield fake
+
+
+def post(server, path, payload):
+    return requests.post(f"{server.url}{path}", json=payload, timeout=10)
+
+
+def size_of(image_b64):
+    with Image.open(io.BytesIO(base64.b64decode(image_b64))) as image:
+        return image.size
+
+
+class TestSahteSunucu:
+    def test_ayni_girdi_ayni_png(self):
+        first = render_png("a quiet harbor", 7, 64, 48)
+        assert first == render_png("a quiet harbor", 7, 64, 48)
+        assert first != render_png("a quiet harbor", 8, 64, 48)
+        with Image.open(io.BytesIO(first)) as image:
+            assert image.size == (64, 48)
+            assert len(image.getcolors(64 * 48)) > 1
+
+    def test_txt2img_istenen_boyutta(self, server):
+        response = post(server, "/sdapi/v1/txt2img", {"prompt": "harbor", "seed": 3, "width": 96, "height": 64})
+
+        body = response.json()
+        assert response.status_code == 200
+        assert size_of(body["images"][0]) == (96, 64)
+        assert base64.b64decode(body["images"][0]) == render_png("harbor", 3, 96, 64)
+
+    def test_prompt_listesi_satir_basina_gorsel(self, server):
+        lines = '--prompt "first scene" --seed 1\n--prompt "second scene" --seed 2'
+        payload = {
+            "width": 32,
+            "height": 32,
+            "script_name": "prompts from file or textbox",
+            "script_args": [False, False, "start", lines],
+        }
+
+        body = post(server, "/sdapi/v1/txt2img", payload).json()
+
+        assert [base64.b64decode(image) for image in body["images"]] == [
+            render_png("first scene", 1, 32, 32),
+            render_png("second scene", 2, 32, 32),
+        ]
+
+    def test_upscale_carpan_kadar_buyutur(self, server):
+        image = base64.b64encode(render_png("harbor", 1, 40, 30)).decode()
+
+        body = post(server, "/sdapi/v1/extra-single-image", {"image": image, "upscaling_resize": 2}).json()
+
+        assert size_of(body["image"]) == (80, 60)
+
+    def test_yetenekler_ve_bilinmeyen_uc(self, server):
+        options = requests.get(f"{server.url}/sdapi/v1/options", timeout=5)
+        missing = requests.get(f"{server.url}/nope", timeout=5)
+
+        assert options.json()["sd_model_checkpoint"] == FAKE_CHECKPOINT
+        assert missing.status_code == 404
+        assert server.stats()["/sdapi/v1/options"] == 1
+
+    def test_hata_orani_seedli_ve_tekrarlanabilir(self):
+        def statuses():
+            config = FakeForgeConfig(latency=0, errors={503: 0.5}, seed=42)
+            with FakeForgeServer(config=config) as fake:
+                codes = [post(fake, "/sdapi/v1/txt2img", {"width": 8, "height": 8}).status_code for _ in range(12)]
+                return codes, fake.stats()
+
+        codes, stats = statuses()
+        assert set(codes) == {200, 503}
+        assert stats["error_503"] == codes.count(503)
+        assert statuses()[0] == codes
+
+    def test_interrupt_bekleyen_render_i_keser(self):
+        with FakeForgeServer(config=FakeForgeConfig(latency=30)) as fake:
+            result = {}
+            worker = threading.Thread(
+                target=lambda: result.update(
+                    response=post(fake, "/sdapi/v1/txt2img", {"steps": 20, "width": 8, "height": 8})
+                )
+            )
+            started = time.monotonic()
+            worker.start()
+            deadline = time.monotonic() + 5
+            while fake.progress()["state"] == {} and time.monotonic() < deadline:
+                time.sleep(0.01)
+
+            progress = requests.get(f"{fake.url}/sdapi/v1/progress", timeout=5).json()
+            post(fake, "/sdapi/v1/interrupt", {})
+            worker.join(timeout=5)
+
+        assert progress["state"]["sampling_steps"] == 20
+        assert 0 <= progress["progress"] < 1
+        assert result["response"].status_code == 200
+        assert time.monotonic() - started < 5
+
+    def test_parse_errors_bozuk_parcalari_atlar(self):
+        assert parse_errors("500:0.05, 503:0.02,abc,429:") == {500: 0.05, 503: 0.02}
+        assert parse_errors("") == {}
+
+
+class TestBackendSecimi:
+    def test_bilinmeyen_isim_forgea_duser(self):
+        backend = create_image_backend("mystery")
+        assert isinstance(backend, ForgeBackend) and backend.name == "forge"
+
+    def test_set_image_backend_oncekini_kapatir(self, monkeypatch):
+        closed = []
+
+        class Dummy:
+            def close(self):
+                closed.append(self)
+
+        monkeypatch.setattr(image_backend, "_DEFAULT_BACKEND", None)
+        first, second = Dummy(), Dummy()
+        set_image_backend(first)
+        set_image_backend(second)
+        set_image_backend(None)
+
+        assert closed == [first, second]
+
+
+@pytest.fixture
+def fake_backend(monkeypatch, tmp_path):
+    """resim_ciz'i surec icindeki sahte Forge'a baglar; yetenekler gercekten sorgulanir."""
+    counter = iter(range(1, 1000))
+    monkeypatch.setattr(
+        sd_client, "_CAPABILITY_CACHE", dict.fromkeys(sd_client._CAPABILITY_CACHE) | {"checked_at": 0.0}
+    )
+    monkeypatch.setattr(sd_client, "_allocate_image_path", lambda: str(tmp_path / f"atlas_{next(counter):03d}.png"))
+    monkeypatch.setattr(render_scheduler, "_DEFAULT_SCHEDULER", None)
+    monkeypatch.setattr(image_backend, "_DEFAULT_BACKEND", None)
+    backend = FakeBackend(FakeForgeConfig(latency=0))
+    set_image_backend(backend)
+    yield backend
+    set_image_backend(None)
+
+
+class TestSahteBackendUcdanUca:
+    def test_resim_ciz_sahte_forge_ile_calisir(self, fake_backend, monkeypatch):
+        monkeypatch.setattr(sd_client, "SD_POST_UPSCALE_FACTOR", 2.0)
+        monkeypatch.setattr(sd_client, "SD_ENABLE_POST_UPSCALE", True)
+
+        ok, path, _ = sd_client.resim_ciz("a quiet harbor at dawn", seed=7, use_cache=False)
+
+        stats = fake_backend.server.stats()
+        assert ok
+        assert stats["/sdapi/v1/txt2img"] == 1
+        assert stats["/sdapi/v1/extra-single-image"] == 1
+        with Image.open(path) as image:
+            assert image.size == (FULL_PROFILE.width * 2, FULL_PROFILE.height * 2)
+        assert sd_client.forge_checkpoint() == FAKE_CHECKPOINT
+
+    def test_sunucu_hatasi_basarisiz_doner(self, fake_backend):
+        fake_backend.server.config.errors = {500: 1.0}
+
+        ok, path, _ = sd_client.resim_ciz("a quiet harbor at dawn", seed=7, use_cache=False, profile=DRAFT_PROFILE)
+
+        assert not ok and path is None
+        assert fake_backend.server.stats()["error_500"] >= 1
@@ -0,0 +1,112 @@
+"""
+core/clients/feature_breaker.py — ADetailer/ControlNet devre kesicisi.
+
+Bozuk bir eklenti her render'da bir basarisiz istek maliyeti cikarmamali;
+bekleme suresi bitince tek bir deneme yapilmali ve durum okunabilmeli.
+"""
+
+import pytest
+
+from core.clients.feature_breaker import FeatureBreaker
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def breaker(clock):
+    return FeatureBreaker(threshold=2, cooldown=60, clock=clock)
+
+
+class TestDevreKesici:
+    def test_esige_kadar_acik_kalmaz(self, breaker):
+        breaker.record_failure(["adetailer"], "boom")
+        assert breaker.allow("adetailer")
+
+    def test_esikte_acilir_ve_atlanir(self, breaker):
+        breaker.record_failure(["adetailer"], "boom")
+        breaker.record_failure(["adetailer"], "boom")
+
+        assert breaker.allow("adetailer") is False
+        assert breaker.allow("controlnet") is True
+
+    def test_bekleme_bitince_tek_deneme(self, breaker, clock):
+        breaker.record_failure(["adetailer"], "boom")
+        breaker.record_failure(["adetailer"], "boom")
+        clock.now += 61
+
+        assert breaker.allow("adetailer")
+        breaker.record_failure(["adetailer"], "still broken")
+        assert breaker.allow("adetailer") is False
+
+    def test_half_openda_yalnizca_bir_render_dener(self, breaker, clock):
+        breaker.record_failure(["adetailer"], "boom")
+        breaker.record_failure(["adetailer"], "boom")
+        clock.now += 61
+
+        assert [breaker.allow("adetailer") for _ in range(3)] == [True, False, False]
+        assert breaker.snapshot()["features"]["adetailer"]["trial_in_flight"] is True
+
+        breaker.record_success(["adetailer"])
+        assert breaker.allow("adetailer") and breaker.allow("adetailer")
+
+    def test_sonucu_gelmeyen_deneme_bekleme_sonrasi_dusurulur(self, breaker, clock):
+        breaker.record_failure(["adetailer"], "boom")
+        breaker.record_failure(["adetailer"], "boom")
+        clock.now += 61
+        assert breaker.allow("adetailer")
+
+        clock.now += 30
+        assert breaker.allow("adetailer") is False
+        clock.now += 31
+        assert breaker.allow("adetailer")
+
+    def test_basari_sifirlar(self, breaker, clock):
+        breaker.record_failure(["adetailer"], "boom")
+        breaker.record_failure(["adetailer"], "boom")
+        clock.now += 61
+        breaker.record_success(["adetailer"])
+
+        breaker.record_failure(["adetailer"], "boom")
+        assert breaker.allow("adetailer")
+
+    def test_elle_sifirlama(self, breaker):
+        breaker.record_failure(["adetailer", "controlnet"], "boom")
+        breaker.record_failure(["adetailer", "controlnet"], "boom")
+
+        breaker.reset("adetailer")
+        assert breaker.allow("adetailer")
+        assert breaker.allow("controlnet") is False
+        breaker.reset()
+        assert breaker.allow("controlnet")
+
+
+class TestDurum:
+    def test_snapshot_nedeni_gosterir(self, breaker, clock):
+        breaker.record_failure(["controlnet"], "model not found")
+        breaker.record_failure(["controlnet"], "model not found")
+        clock.now += 20
+        breaker.allow("controlnet")
+
+        state = breaker.snapshot()["features"]["controlnet"]
+
+        assert state["status"] == "open"
+        assert state["last_error"] == "model not found"
+        assert state["retry_in"] == 40.0
+        assert state["skipped"] == 1
+
+    def test_bekleme_sonrasi_half_open(self, breaker, clock):
+        breaker.record_failure(["controlnet"], "x")
+        breaker.record_failure(["controlnet"], "x")
+        clock.now += 61
+        assert breaker.snapshot()["features"]["controlnet"]["status"] == "half_open"
@@ -0,0 +1,145 @@
+"""
+core/clients/forge_async.py — asyncio tabanli Forge istemcisi ve senkron cephe.
+
+Onceden her Forge cagrisi bir daemon thread aciyordu ve iptal edilen istek
+arkada calismaya devam ediyordu. Bu testler istek basina thread acilmadigini,
+iptalin baglantiyi kapatip interrupt gonderdigini ve hatalarin requests
+karsiliklarina cevrildigini dogrular.
+"""
+
+import asyncio
+import json
+import threading
+import time
+
+import httpx
+import pytest
+import requests
+
+from core.clients.forge_async import AsyncForgeClient, SyncForgeFacade
+from core.clients.forge_stream import stream_images
+from core.errors import CancelledError
+
+
+class FakeForge:
+    """httpx.MockTransport arkasinda calisan Forge; istekleri kaydeder."""
+
+    def __init__(self, body=None, status=200, hang=False):
+        self.body = body if body is not None else {"images": [], "info": "{}"}
+        self.status = status
+        self.hang = hang
+        self.paths = []
+        self.abandoned = threading.Event()
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.paths.append(request.url.path)
+        if request.url.path == "/sdapi/v1/interrupt":
+            return httpx.Response(200, json={})
+        if self.hang:
+            try:
+                await asyncio.sleep(30)
+            except asyncio.CancelledError:
+                self.abandoned.set()
+                raise
+        return httpx.Response(self.status, content=json.dumps(self.body).encode())
+
+
+@pytest.fixture
+def make_facade():
+    facades = []
+
+    def _make(forge):
+        transport = httpx.MockTransport(forge)
+        facade = SyncForgeFacade(lambda: AsyncForgeClient("http://forge.test", transport=transport))
+        facades.append(facade)
+        return facade
+
+    yield _make
+    for facade in facades:
+        facade.close()
+
+
+class TestAkis:
+    def test_govde_parcalar_halinde_okunur(self, make_facade, tmp_path):
+        forge = FakeForge({"images": ["aGVsbG8="], "info": "{}"})
+        facade = make_facade(forge)
+
+        response = facade.post_stream("/sdapi/v1/txt2img", json={"prompt": "x"}, timeout=5)
+        result, paths = stream_images(response, lambda i: str(tmp_path / f"{i}.png"), chunk_size=4)
+
+        assert forge.paths == ["/sdapi/v1/txt2img"]
+        assert result["info"] == "{}"
+        assert open(paths[0], "rb").read() == b"hello"
+        assert response.closed
+
+    def test_istek_basina_thread_acilmaz(self, make_facade):
+        facade = make_facade(FakeForge())
+        before = threading.active_count()
+
+        for _ in range(5):
+            response = facade.post_stream("/sdapi/v1/txt2img", json={}, timeout=5)
+            b"".join(response.iter_content())
+            response.close()
+
+        assert threading.active_count() == before
+
+
+class TestIptal:
+    def test_iptal_baglantiyi_kapatir_ve_interrupt_gonderir(self, make_facade):
+        forge = FakeForge(hang=True)
+        facade = make_facade(forge)
+        cancel_at = time.monotonic() + 0.1
+
+        started = time.monotonic()
+        with pytest.raises(CancelledError):
+            facade.post_stream(
+                "/sdapi/v1/txt2img",
+                json={},
+                timeout=60,
+                cancel_checker=lambda: time.monotonic() >= cancel_at,
+            )
+
+        assert time.monotonic() - started < 1.0
+        assert forge.abandoned.wait(1.0)
+        assert forge.paths == ["/sdapi/v1/txt2img", "/sdapi/v1/interrupt"]
+
+    def test_iptal_yoksa_beklenir(self, make_facade):
+        facade = make_facade(FakeForge())
+        response = facade.post_stream("/sdapi/v1/txt2img", json={}, timeout=5, cancel_checker=lambda: False)
+        assert response.status_code == 200
+        response.close()
+
+
+class TestHataCevirisi:
+    def test_http_hatasi_requests_hatasi_olur(self, make_facade):
+        facade = make_facade(FakeForge(status=500))
+
+        with pytest.raises(requests.HTTPError):
+            facade.post_stream("/sdapi/v1/txt2img", json={}, timeout=5)
+
+    def test_baglanti_hatasi(self, make_facade):
+        def down(request):
+            raise httpx.ConnectError("refused", request=request)
+
+        facade = make_facade(down)
+
+        with pytest.raises(requests.ConnectionError):
+            facade.post_stream("/sdapi/v1/txt2img", json={}, timeout=5)
+
+    def test_timeout(self, make_facade):
+        def slow(request):
+            raise httpx.ReadTimeout("slow", request=request)
+
+        facade = make_facade(slow)
+
+        with pytest.raises(requests.Timeout):
+            facade.post_stream("/sdapi/v1/txt2img", json={}, timeout=5)
+
+
+class TestKapatma:
+    def test_close_loop_threadini_durdurur(self):
+        facade = SyncForgeFacade(
+            lambda: AsyncForgeClient("http://forge.test", transport=httpx.MockTransport(FakeForge()))
+        )
+        facade.close()
+        assert not facade._thread.is_alive()
@@ -0,0 +1,137 @@
+"""
+core/clients/forge_client.py — havuzlanmis Forge oturumu.
+
+Onceden her SD cagrisi ciplak requests.get/post ile yeni bir TCP baglantisi
+aciyordu ve adres koda gomuluydu. Bu testler tek oturumun, retry
+politikasinin ve hata durumunda guvenli varsayilanlarin korunmasini dogrular.
+"""
+
+import pytest
+import requests
+
+from core.clients import forge_client as fc_module
+from core.clients.forge_client import ForgeClient, get_forge_client, reset_forge_client
+
+
+class FakeResponse:
+    def __init__(self, payload=None, status=200):
+        self._payload = payload
+        self.status_code = status
+        self.ok = status < 400
+
+    def json(self):
+        if isinstance(self._payload, Exception):
+            raise self._payload
+        return self._payload
+
+
+class FakeSession:
+    """requests.Session yerine gecer; cagrilari kaydeder."""
+
+    def __init__(self, response=None, error=None):
+        self.response = response or FakeResponse({})
+        self.error = error
+        self.calls = []
+
+    def _call(self, method, url, **kwargs):
+        self.calls.append((method, url, kwargs))
+        if self.error:
+            raise self.error
+        return self.response
+
+    def get(self, url, **kwargs):
+        return self._call("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self._call("POST", url, **kwargs)
+
+    def close(self):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def temiz_istemci():
+    reset_forge_client()
+    yield
+    reset_forge_client()
+
+
+class TestAdres:
+    def test_taban_adres_configden_gelir(self):
+        assert ForgeClient().base_url == fc_module.SD_API_URL
+
+    def test_sondaki_egik_cizgi_kirpilir(self):
+        assert ForgeClient("http://gpu-1:7860/").base_url == "http://gpu-1:7860"
+
+    def test_yol_birlestirilir(self):
+        client = ForgeClient("http://gpu-1:7860")
+        assert client.url("/sdapi/v1/txt2img") == "http://gpu-1:7860/sdapi/v1/txt2img"
+        assert client.url("sdapi/v1/txt2img") == "http://gpu-1:7860/sdapi/v1/txt2img"
+
+
+class TestHavuz:
+    def test_tek_oturum_paylasilir(self):
+        assert get_forge_client() is get_forge_client()
+
+    def test_havuz_boyutu_adaptore_islenir(self):
+        client = ForgeClient("http://x", pool_size=7)
+        adapter = client._session.get_adapter("http://x/")
+
+        assert adapter._pool_maxsize == 7
+
+    def test_post_istekleri_tekrarlanmaz(self):
+        """txt2img pahali: baglanti kopunca ikinci kez GPU'ya gonderilmemeli."""
+        client = ForgeClient("http://x", retries=3)
+        retry = client._session.get_adapter("http://x/").max_retries
+
+        assert retry.total == 3
+        assert "GET" in retry.allowed_methods
+        assert "POST" not in retry.allowed_methods
+
+    def test_timeout_baglanti_ve_okuma_olarak_ayrilir(self):
+        session = FakeSession()
+        client = ForgeClient("http://x", connect_timeout=3, session=session)
+
+        client.post("/sdapi/v1/txt2img", json={}, timeout=300)
+
+        assert session.calls[0][2]["timeout"] == (3, 300)
+
+
+class TestGetJson:
+    def test_basarili_cevap_doner(self):
+        session = FakeSession(FakeResponse([{"name": "4x-UltraSharp"}]))
+        client = ForgeClient("http://x", session=session)
+
+        assert client.get_json("/sdapi/v1/upscalers") == [{"name": "4x-UltraSharp"}]
+
+    def test_hata_kodunda_none(self):
+        client = ForgeClient("http://x", session=FakeSession(FakeResponse({}, status=500)))
+        assert client.get_json("/sdapi/v1/scripts") is None
+
+    def test_baglanti_hatasinda_none(self):
+        client = ForgeClient("http://x", session=FakeSession(error=requests.ConnectionError("yok")))
+        assert client.get_json("/sdapi/v1/scripts") is None
+
+    def test_bozuk_json_none(self):
+        client = ForgeClient("http://x", session=FakeSession(FakeResponse(ValueError("bozuk"))))
+        assert client.get_json("/sdapi/v1/scripts") is None
+
+
+class TestInterruptVeProgress:
+    def test_interrupt_hatasi_yutulur(self):
+        client = ForgeClient("http://x", session=FakeSession(error=requests.ConnectionError("yok")))
+        assert client.interrupt() is False
+
+    def test_interrupt_dogru_uca_gider(self):
+        session = FakeSession()
+        ForgeClient("http://x", session=session).interrupt()
+
+        assert session.calls[0][:2] == ("POST", "http://x/sdapi/v1/interrupt")
+
+    def test_progress_erisilemezse_bos_cevap(self):
+        client = ForgeClient("http://x", session=FakeSession(error=requests.Timeout("yavas")))
+        assert client.progress() == {"progress": 0, "state": {}}
+
+    def test_progress_cevabi_aktarilir(self):
+        client = ForgeClient("http://x", session=FakeSession(FakeResponse({"progress": 0.4, "state": {}})))
+        assert client.progress()["progress"] == 0.4
@@ -0,0 +1,216 @@
+"""
+core/clients/forge_pool.py — birden fazla Forge host'una dagitim.
+
+Onceden tek Forge adresi ve tek GPU isi vardi. Bu testler sahte Forge
+sunuculariyla en az yuklu host'un secildigini, dusen host'un atlanip istegin
+digerine gittigini, yetenek sorgularinin ortak kumeyi dondurdugunu ve
+resim_ciz_batch'in parcalari hostlara paralel dagittigini dogrular.
+"""
+
+import contextvars
+import socket
+from contextlib import ExitStack
+
+import pytest
+
+from core.clients import image_backend, render_scheduler, sd_client
+from core.clients.fake_forge import FAKE_CHECKPOINT, FakeForgeConfig, FakeForgeServer
+from core.clients.forge_pool import ForgePool, common_capabilities
+from core.clients.forge_stream import stream_images
+from core.clients.image_backend import set_image_backend
+from core.clients.render_profile import DRAFT_PROFILE
+from core.runtime.jobs import Job, bind_job
+
+
+@pytest.fixture
+def servers():
+    started = [FakeForgeServer(config=FakeForgeConfig(latency=0)).start() for _ in range(2)]
+    yield started
+    for server in started:
+        server.stop()
+
+
+@pytest.fixture
+def make_pool():
+    pools = []
+
+    def _make(urls, **kwargs):
+        pool = ForgePool(urls, health_interval=0, **kwargs)
+        pools.append(pool)
+        return pool
+
+    yield _make
+    for pool in pools:
+        pool.close()
+
+
+def dead_url():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    return f"http://127.0.0.1:{port}"
+
+
+class TestOrtakYetenekler:
+    def test_listelerde_kesisim(self):
+        first = [{"name": "A"}, {"name": "B"}, {"name": "C"}]
+        second = [{"name": "C"}, {"name": "A"}]
+
+        assert common_capabilities([first, second]) == [{"name": "A"}, {"name": "C"}]
+
+    def test_sozlukte_liste_degerleri_kesisir(self):
+        first = {"txt2img": ["adetailer", "controlnet"], "img2img": []}
+        second = {"txt2img": ["controlnet"], "img2img": ["x"]}
+
+        assert common_capabilities([first, second]) == {"txt2img": ["controlnet"], "img2img": []}
+
+    def test_cevapsiz_host_sayilmaz(self):
+        assert common_capabilities([None, ["a"]]) == ["a"]
+        assert common_capabilities([None, None]) is None
+
+
+class TestDagitim:
+    def test_en_az_yuklu_host_secilir(self, servers, make_pool):
+        pool = make_pool([server.url for server in servers])
+
+        with pool.lease() as first:
+            # Ayni thread'de ic ice lease ayni host'ta kalir.
+            with pool.lease() as nested:
+                assert nested is first
+            other = pool._select({})
+
+        assert first.host is pool.hosts[0]
+        assert other is pool.hosts[1]
+        assert [host["in_flight"] for host in pool.snapshot()["hosts"]] == [0, 0]
+
+    def test_checkpointi_olmayan_host_atlanir(self, servers, make_pool):
+        pool = make_pool([server.url for server in servers])
+        pool.hosts[0].checkpoints = frozenset({"other.safetensors"})
+        pool.hosts[1].checkpoints = frozenset({"wanted.safetensors"})
+
+        body = {"override_settings": {"sd_model_checkpoint": "wanted.safetensors"}}
+        with pool.lease(body) as lease:
+            assert lease.host is pool.hosts[1]
+
+    def test_yuklu_checkpoint_esitlikte_tercih_edilir(self, servers, make_pool):
+        pool = make_pool([server.url for server in servers])
+        pool.hosts[1].loaded_checkpoint = "x.safetensors"
+
+        with pool.lease({"override_settings": {"sd_model_checkpoint": "x.safetensors"}}) as lease:
+            assert lease.host is pool.hosts[1]
+
+    def test_saglik_kontrolu_host_basina_yetenek_tutar(self, servers, make_pool):
+        pool = make_pool([dead_url(), servers[0].url], failure_cooldown=60)
+
+        assert pool.check_health() == 1
+
+        dead, alive = pool.hosts
+        assert not dead.healthy and dead.failures == 1
+        assert alive.loaded_checkpoint == FAKE_CHECKPOINT
+        assert "prompts from file or textbox" in alive.scripts
+        assert pool._select({}) is alive
+        assert pool.base_url == alive.url
+
+
+class TestFailover:
+    def test_baglanamayan_hosttan_digerine_gecer(self, servers, make_pool):
+        pool = make_pool([dead_url(), servers[0].url], failure_cooldown=60)
+
+        response = pool.post_stream(
+            "/sdapi/v1/txt2img", json={"prompt": "harbor", "width": 16, "height": 16}, timeout=10
+        )
+        result, _ = stream_images(response, lambda index: None)
+
+        assert len(result["images"]) == 1
+        assert servers[0].stats()["/sdapi/v1/txt2img"] == 1
+        assert not pool.snapshot()["hosts"][0]["healthy"]
+
+    def test_get_json_tum_hostlarin_ortak_cevabi(self, servers, make_pool):
+        pool = make_pool([server.url for server in servers])
+
+        upscalers = pool.get_json("/sdapi/v1/upscalers")
+
+        assert [item["name"] for item in upscalers] == ["Latent (antialiased)", "4x-UltraSharp"]
+        assert all("/sdapi/v1/upscalers" in host.capabilities for host in pool.hosts)
+
+
+class TestInterrupt:
+    def test_lease_disinda_yalnizca_iptal_edilen_isin_hostu(self, servers, make_pool):
+        pool = make_pool([server.url for server in servers])
+        cancelled, running = Job(kind="video"), Job(kind="carousel")
+        cancelled.cancel_requested = True
+
+        # Ikinci is kendi context'inde (ayri bir thread gibi) kiralar.
+        other_context, other_stack = contextvars.Context(), ExitStack()
+
+        def lease_for_running_job():
+            other_stack.enter_context(bind_job(running))
+            return other_stack.enter_context(pool.lease())
+
+        with bind_job(cancelled), pool.lease() as first:
+            other = other_context.run(lease_for_running_job)
+            assert (first.host, other.host) == (pool.hosts[0], pool.hosts[1])
+            assert contextvars.Context().run(pool.interrupt) is True
+        other_context.run(other_stack.close)
+
+        assert servers[0].stats().get("/sdapi/v1/interrupt") == 1
+        assert "/sdapi/v1/interrupt" not in servers[1].stats()
+
+    def test_sahipsiz_lease_ve_hedefsiz_interrupt_kimseyi_kesmez(self, servers, make_pool):
+        pool = make_pool([server.url for server in servers])
+        running = Job(kind="carousel")
+
+        other_context, other_stack = contextvars.Context(), ExitStack()
+
+        def lease_for_running_job():
+            other_stack.enter_context(bind_job(running))
+            return other_stack.enter_context(pool.lease())
+
+        with pool.lease():
+            other_context.run(lease_for_running_job)
+            assert contextvars.Context().run(pool.interrupt) is False
+        other_context.run(other_stack.close)
+
+        assert all("/sdapi/v1/interrupt" not in server.stats() for server in servers)
+
+    def test_lease_kendi_hostunun_ilerlemesini_verir(self, servers, make_pool):
+        pool = make_pool([server.url for server in servers])
+
+        with pool.lease() as first:
+            other_context, other_stack = contextvars.Context(), ExitStack()
+            second = other_context.run(lambda: other_stack.enter_context(pool.lease()))
+            first.progress()
+            other_context.run(other_stack.close)
+
+        assert (first.base_url, second.base_url) == (servers[0].url, servers[1].url)
+        assert servers[0].stats().get("/sdapi/v1/progress") == 1
+        assert "/sdapi/v1/progress" not in servers[1].stats()
+
+
+@pytest.fixture
+def pooled(monkeypatch, tmp_path, servers):
+    counter = iter(range(1, 1000))
+    monkeypatch.setattr(
+        sd_client, "_CAPABILITY_CACHE", dict.fromkeys(sd_client._CAPABILITY_CACHE) | {"checked_at": 0.0}
+    )
+    monkeypatch.setattr(sd_client, "_allocate_image_path", lambda: str(tmp_path / f"atlas_{next(counter):03d}.png"))
+    monkeypatch.setattr(render_scheduler, "_DEFAULT_SCHEDULER", None)
+    monkeypatch.setattr(image_backend, "_DEFAULT_BACKEND", None)
+    for server in servers:
+        server.config.latency = 0.2
+    pool = ForgePool([server.url for server in servers], health_interval=0)
+    set_image_backend(pool)
+    yield pool
+    set_image_backend(None)
+
+
+class TestToplucizimDagitimi:
+    def test_batch_hostlara_paralel_bolunur(self, pooled, servers):
+        prompts = [f"harbor scene number {i}" for i in range(4)]
+
+        results = sd_client.resim_ciz_batch(prompts, seeds=[1, 2, 3, 4], use_cache=False, profile=DRAFT_PROFILE)
+
+        assert all(ok for ok, _, _ in results)
+        assert len({path for _, path, _ in results}) == 4
+        assert [server.stats()["/sdapi/v1/txt2img"] for server in servers] == [1, 1]
+        assert pooled.snapshot()["capacity"] == 2
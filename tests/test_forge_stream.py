@@ -0,0 +1,121 @@
+"""
+core/clients/forge_stream.py — base64 gorselleri akista dosyaya cozme.
+
+Govde hangi noktadan bolunurse bolunsun ayni sonuc cikmali; gorsel disindaki
+alanlar (error, info, parameters) kaybolmamali.
+"""
+
+import base64
+import json
+
+import pytest
+import requests
+
+from core.clients.forge_stream import ForgeImageStream, stream_images
+
+
+def b64(data: bytes) -> str:
+    return base64.b64encode(data).decode()
+
+
+def decode_in_chunks(body: bytes, tmp_path, size: int):
+    decoder = ForgeImageStream(lambda i: str(tmp_path / f"img_{i}.png"))
+    for i in range(0, len(body), size):
+        decoder.feed(body[i : i + size])
+    return decoder.close(), decoder.paths
+
+
+PAYLOAD = {
+    "images": [b64(b"first image bytes"), b64(b"\x00\xff" * 50)],
+    "parameters": {"prompt": 'a "quoted" \\ prompt', "images": ["not-an-output"], "seed": 7},
+    "info": json.dumps({"seed": 7, "all_prompts": ["x"]}),
+}
+
+
+class TestParcalama:
+    @pytest.mark.parametrize("size", [1, 2, 3, 5, 64, 100000])
+    def test_her_parca_boyunda_ayni_sonuc(self, tmp_path, size):
+        result, paths = decode_in_chunks(json.dumps(PAYLOAD).encode(), tmp_path, size)
+
+        assert [open(p, "rb").read() for p in paths] == [b"first image bytes", b"\x00\xff" * 50]
+        assert result["images"] == ["", ""]
+        assert result["parameters"] == PAYLOAD["parameters"]
+        assert json.loads(result["info"])["seed"] == 7
+
+    def test_kacisli_egik_cizgi_cozulur(self, tmp_path):
+        raw = b"\xfb\xff\xfe" * 20  # base64'te "/" ureten baytlar
+        encoded = b64(raw).replace("/", "\\/")
+        body = ('{"images": ["' + encoded + '"]}').encode()
+
+        _, paths = decode_in_chunks(body, tmp_path, 3)
+
+        assert open(paths[0], "rb").read() == raw
+
+
+class TestTekGorsel:
+    def test_extras_image_alani(self, tmp_path):
+        body = json.dumps({"html_info": "<p>ok</p>", "image": b64(b"upscaled")}).encode()
+        result, paths = decode_in_chunks(body, tmp_path, 4)
+
+        assert open(paths[0], "rb").read() == b"upscaled"
+        assert result["html_info"] == "<p>ok</p>"
+
+    def test_none_yol_gorseli_atlar(self, tmp_path):
+        decoder = ForgeImageStream(lambda i: str(tmp_path / "only.png") if i == 0 else None)
+        decoder.feed(json.dumps({"images": [b64(b"a"), b64(b"b")]}).encode())
+        decoder.close()
+
+        assert decoder.paths == [str(tmp_path / "only.png"), None]
+        assert [p.name for p in tmp_path.iterdir()] == ["only.png"]
+
+
+class TestHatalar:
+    def test_hata_cevabi_okunur(self, tmp_path):
+        result, paths = decode_in_chunks(b'{"error": "OutOfMemoryError", "detail": "CUDA"}', tmp_path, 5)
+
+        assert result["error"] == "OutOfMemoryError"
+        assert paths == []
+
+    def test_bozuk_gorsel_sadece_kendini_kaybeder(self, tmp_path):
+        body = json.dumps({"images": [b64(b"ok-1"), "abc", b64(b"ok-2")]}).encode()
+        _, paths = decode_in_chunks(body, tmp_path, 4)
+
+        assert paths[1] is None
+        assert open(paths[0], "rb").read() == b"ok-1"
+        assert open(paths[2], "rb").read() == b"ok-2"
+        assert not (tmp_path / "img_1.png").exists()
+
+    def test_yarim_govde_dosyalari_siler(self, tmp_path):
+        class Response:
+            closed = False
+
+            def iter_content(self, chunk_size=None):
+                yield b'{"images": ["' + b64(b"complete").encode() + b'", "QUJD'
+
+            def close(self):
+                self.closed = True
+
+        response = Response()
+        with pytest.raises(ValueError):
+            stream_images(response, lambda i: str(tmp_path / f"img_{i}.png"))
+
+        assert response.closed
+        assert list(tmp_path.iterdir()) == []
+
+    def test_baglanti_hatasi_yarim_dosyalari_siler(self, tmp_path):
+        class Response:
+            closed = False
+
+            def iter_content(self, chunk_size=None):
+                yield b'{"images": ["' + b64(b"complete").encode() + b'", "' + b64(b"half").encode()
+                raise requests.ConnectionError("connection reset")
+
+            def close(self):
+                self.closed = True
+
+        response = Response()
+        with pytest.raises(requests.ConnectionError):
+            stream_images(response, lambda i: str(tmp_path / f"atlas_{i:03d}.png"))
+
+        assert response.closed
+        assert list(tmp_path.iterdir()) == []
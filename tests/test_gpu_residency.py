@@ -0,0 +1,230 @@
+"""
+core/clients/gpu_residency.py — Ollama <-> Forge VRAM devri.
+
+Onceden her render oncesi Ollama kosulsuz bosaltilip sabit sure bekleniyordu.
+Bu testler yoneticinin yer yeterliyse modeli birakmadigini, gerektiginde
+bosaltip `/api/ps` bos diyene kadar bekledigini ve zaman asimi/iptal
+durumlarini dogrular.
+"""
+
+import pytest
+import requests
+
+from core.clients import gpu_residency, llm
+from core.clients.gpu_residency import GpuResidencyManager
+from core.errors import CancelledError
+from core.runtime.config import OLLAMA_API_HOST
+
+MB = 1024 * 1024
+
+
+class FakeBackend:
+    def __init__(self, free_mb=None, capacity=1):
+        self.free_mb = free_mb
+        self.capacity = capacity
+        self.client = self
+        self.posts = []
+
+    def get_json(self, path, *, timeout=3):
+        if self.free_mb is None:
+            return None
+        return {"cuda": {"system": {"free": self.free_mb * MB}}}
+
+    def post(self, path, *, timeout=None):
+        self.posts.append(path)
+        return FakeResponse({})
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self._data = data
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self._data
+
+
+class FakeOllama:
+    """`/api/ps` yuklu modelleri, keep_alive=0 ise birkac yoklama sonra bosaltir."""
+
+    def __init__(self, models=None, unload_after=0, reachable=True, backend=None):
+        self.models = list(models or [])
+        self.unload_after = unload_after
+        self.reachable = reachable
+        self.backend = backend
+        self.unloaded = []
+        self._pending = None
+
+    def get(self, url, timeout=None):
+        if not self.reachable:
+            raise requests.ConnectionError("down")
+        if self._pending is not None:
+            if self._pending <= 0:
+                self.models = []
+                if self.backend is not None:
+                    self.backend.free_mb = 12000
+            self._pending -= 1
+        return FakeResponse({"models": self.models})
+
+    def post(self, url, json=None, timeout=None):
+        assert json["keep_alive"] == 0
+        self.unloaded.append(json["model"])
+        self._pending = self.unload_after
+        return FakeResponse({})
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def make_manager(monkeypatch, ollama, backend, **kwargs):
+    monkeypatch.setattr(gpu_residency.requests, "get", ollama.get)
+    monkeypatch.setattr(gpu_residency.requests, "post", ollama.post)
+    clock = FakeClock()
+    options = {"shared": True, "sd_required_mb": 6000, "llm_required_mb": 5000, "timeout": 5, **kwargs}
+    options.setdefault("sd_busy", lambda: False)
+    manager = GpuResidencyManager("http://ollama", backend=lambda: backend, clock=clock, sleep=clock.sleep, **options)
+    return manager, clock
+
+
+LLAMA = {"name": "llama3.1:8b", "size_vram": 5000 * MB}
+
+
+class TestSdDevri:
+    def test_yer_yeterliyse_ollama_bosaltilmaz(self, monkeypatch):
+        backend = FakeBackend(free_mb=9000)
+        ollama = FakeOllama([LLAMA])
+        manager, _ = make_manager(monkeypatch, ollama, backend)
+
+        result = manager.acquire_for_sd()
+
+        assert result["reason"] == "fits"
+        assert ollama.unloaded == []
+        assert manager.holder == "sd"
+
+    def test_yer_yoksa_bosaltir_ve_ps_bosalana_kadar_bekler(self, monkeypatch):
+        backend = FakeBackend(free_mb=2000)
+        ollama = FakeOllama([LLAMA], unload_after=3, backend=backend)
+        manager, clock = make_manager(monkeypatch, ollama, backend)
+
+        result = manager.acquire_for_sd()
+
+        assert ollama.unloaded == ["llama3.1:8b"]
+        assert result["ready"] is True
+        assert 0 < clock.now < 5
+        assert manager.snapshot()["unloads"] == 1
+
+    def test_ollama_kapaliysa_atlanir(self, monkeypatch):
+        manager, _ = make_manager(monkeypatch, FakeOllama(reachable=False), FakeBackend(free_mb=0))
+
+        assert manager.acquire_for_sd()["reason"] == "ollama_unreachable"
+
+    def test_ayri_gpularda_hic_sorulmaz(self, monkeypatch):
+        ollama = FakeOllama([LLAMA])
+        ollama.get = lambda *_a, **_k: pytest.fail("/api/ps should not be polled")
+        manager, _ = make_manager(monkeypatch, ollama, FakeBackend(free_mb=0), shared=False)
+
+        assert manager.acquire_for_sd()["reason"] == "separate_gpus"
+
+    def test_olculemeyen_havuzda_bosaltir(self, monkeypatch):
+        ollama = FakeOllama([LLAMA], unload_after=0)
+        manager, _ = make_manager(monkeypatch, ollama, FakeBackend(capacity=2))
+
+        assert manager.acquire_for_sd()["ready"] is True
+        assert ollama.unloaded == ["llama3.1:8b"]
+
+    def test_zaman_asiminda_yine_de_devam_eder(self, monkeypatch):
+        backend = FakeBackend(free_mb=2000)
+        ollama = FakeOllama([LLAMA], unload_after=10**6)
+        manager, clock = make_manager(monkeypatch, ollama, backend, timeout=2)
+
+        result = manager.acquire_for_sd()
+
+        assert result["ready"] is False
+        assert clock.now >= 2
+        assert manager.snapshot()["timeouts"] == 1
+
+    def test_bekleme_sirasinda_iptal(self, monkeypatch):
+        ollama = FakeOllama([LLAMA], unload_after=10**6)
+        manager, _ = make_manager(monkeypatch, ollama, FakeBackend(free_mb=0))
+
+        with pytest.raises(CancelledError):
+            manager.acquire_for_sd(cancel_checker=lambda: True)
+
+
+class TestLlmDevri:
+    def test_sahiplik_kaydedilir(self, monkeypatch):
+        manager, _ = make_manager(monkeypatch, FakeOllama(), FakeBackend())
+
+        manager.acquire_for_llm()
+
+        assert manager.snapshot()["holder"] == "llm"
+
+    def test_bos_forge_checkpointi_llm_icin_birakir_ve_renderda_geri_yukler(self, monkeypatch):
+        backend = FakeBackend(free_mb=3000)
+        ollama = FakeOllama(unload_after=0, backend=backend)
+        manager, _ = make_manager(monkeypatch, ollama, backend)
+
+        assert manager.acquire_for_llm()["released"] is True
+        assert manager.acquire_for_llm()["reason"] == "llm_holds"
+        assert backend.posts == ["/sdapi/v1/unload-checkpoint"]
+
+        # Ollama modeli yukledi; bos VRAM yeterli gorunse de checkpoint ile sigmaz.
+        ollama.models = [LLAMA]
+        backend.free_mb = 9000
+        result = manager.acquire_for_sd()
+
+        assert ollama.unloaded == ["llama3.1:8b"]
+        assert result["reloaded"] is True
+        assert backend.posts[-1] == "/sdapi/v1/reload-checkpoint"
+        assert manager.snapshot()["forge_released"] is False
+        assert (manager.snapshot()["forge_releases"], manager.snapshot()["forge_reloads"]) == (1, 1)
+
+    def test_render_surerken_forge_birakilmaz(self, monkeypatch):
+        backend = FakeBackend(free_mb=1000)
+        manager, _ = make_manager(monkeypatch, FakeOllama(), backend, sd_busy=lambda: True)
+
+        assert manager.acquire_for_llm()["reason"] == "sd_busy"
+        assert backend.posts == []
+
+    def test_yer_yeterliyse_ya_da_model_yukluyse_birakilmaz(self, monkeypatch):
+        backend = FakeBackend(free_mb=8000)
+        manager, _ = make_manager(monkeypatch, FakeOllama(), backend)
+        assert manager.acquire_for_llm()["reason"] == "fits"
+
+        backend.free_mb = 1000
+        manager, _ = make_manager(monkeypatch, FakeOllama([LLAMA]), backend)
+        assert manager.acquire_for_llm()["reason"] == "llm_resident"
+        assert backend.posts == []
+
+    def test_sunucu_cevap_verene_kadar_bekler(self, monkeypatch):
+        ollama = FakeOllama(reachable=False)
+        manager, clock = make_manager(monkeypatch, ollama, FakeBackend())
+
+        assert manager.wait_until_llm_ready(timeout=1) is False
+        assert clock.now >= 1
+
+        ollama.reachable = True
+        assert manager.wait_until_llm_ready(timeout=1) is True
+
+
+class TestOllamaAdresi:
+    def test_varsayilan_adres_configten_gelir(self, monkeypatch):
+        urls = []
+        monkeypatch.setattr(
+            gpu_residency.requests, "get", lambda url, timeout=None: urls.append(url) or FakeResponse({})
+        )
+
+        GpuResidencyManager(backend=lambda: FakeBackend()).ollama_models()
+
+        assert urls == [f"{OLLAMA_API_HOST}/api/ps"]
+        assert llm.OLLAMA_URL == f"{OLLAMA_API_HOST}/api/chat"
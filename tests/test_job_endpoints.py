@@ -158,6 +158,7 @@ class TestAgentHataAktarimi:
 
         monkeypatch.setattr(system_check, "ensure_ollama_running", lambda **_kwargs: True)
         monkeypatch.setattr(system_check, "ensure_sd_running", lambda **_kwargs: True)
+        monkeypatch.setattr(backend, "prefetch_capabilities", lambda: None)
 
         state = PipelineState()
         state.add_error(
@@ -238,3 +239,28 @@ class TestIptal:
         client.post(f"/api/agent/cancel/{job_id}", headers=auth)
 
         assert calls == [1]
+
+    def test_iptal_edilen_video_kalan_basliklari_llme_gondermez(
+        self, client, auth, no_background, monkeypatch, tmp_path
+    ):
+        import video_generator
+
+        monkeypatch.chdir(tmp_path)
+        job_id = client.post("/api/news/video_generate", headers=auth).json()["job_id"]
+        job = jobs.registry.get(job_id)
+        prepared = []
+
+        def prepare(title):
+            prepared.append(title)
+            job.cancel_requested = True
+            return "senaryo", "prompt"
+
+        monkeypatch.setattr(video_generator, "get_top_3_separate_news", lambda: ["a", "b", "c"])
+        monkeypatch.setattr(video_generator, "mark_used_titles", lambda *_a, **_k: None)
+        monkeypatch.setattr(video_generator, "_resolve_video_tts_paths", lambda: ("m", "c", "english"))
+        monkeypatch.setattr(video_generator, "_prepare_headline", prepare)
+
+        backend.run_video_generation_task(job_id)
+
+        assert prepared == ["a"]
+        assert job.status == "cancelled"
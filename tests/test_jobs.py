@@ -127,6 +127,18 @@ class TestTekIsKurali:
         with pytest.raises(JobConflict, match="Carousel"):
             registry.create("agent")
 
+    def test_host_basina_bir_is(self):
+        registry = JobRegistry(max_active=2)
+        first = registry.create("carousel")
+        registry.create("video")
+
+        with pytest.raises(JobConflict) as exc:
+            registry.create("agent")
+        assert exc.value.active_job_id == first.id
+
+        first.finish("done")
+        assert registry.create("agent").kind == "agent"
+
 
 class TestDurumIzolasyonu:
     def test_isler_birbirinin_durumunu_bozmaz(self, registry):
@@ -288,3 +300,26 @@ class TestEsZamanlilik:
 
         assert len(created) == 1
         assert len(errors) == 19
+
+
+class TestJobBaglami:
+    def test_job_task_isi_baglar(self, monkeypatch, registry):
+        monkeypatch.setattr(jobs, "registry", registry)
+        job = registry.create("agent")
+        seen = []
+
+        @jobs.job_task
+        def task(job_id):
+            seen.append(jobs.current_job())
+
+        task(job.id)
+
+        assert seen == [job]
+        assert jobs.current_job() is None
+
+    def test_render_alani_bitiste_temizlenir(self):
+        job = Job(kind="agent")
+        job.set_render({"step": 3, "steps": 30})
+        assert job.to_dict()["render"] == {"step": 3, "steps": 30}
+        job.finish("done")
+        assert job.render is None
@@ -0,0 +1,137 @@
+"""
+core/clients/llm_cache.py — kalici LLM cevap cache'i.
+
+Onceden ayni haber her kosuda Ollama'ya yeniden soruluyordu. Bu testler
+anahtarin model/mesaj/format/options'a gore ayrildigini, yas ve kayit sayisi
+sinirlarinin uygulandigini ve LLMService'in tekrar eden istegi Ollama'ya
+gondermedigini dogrular.
+"""
+
+import pytest
+
+from core.clients import llm as llm_module
+from core.clients.llm import LLMService
+from core.clients.llm_cache import LLMCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return LLMCache(str(tmp_path / "llm_cache.db"), max_entries=100, max_age_seconds=3600, enabled=True)
+
+
+def payload(content="haber", **extra):
+    return {"model": "m", "messages": [{"role": "user", "content": content}], "stream": False, **extra}
+
+
+class TestAnahtar:
+    def test_stream_ve_satir_sonu_bosluklari_anahtari_degistirmez(self):
+        base = LLMCache.key_for(payload("satir 1\nsatir 2"))
+
+        assert LLMCache.key_for(payload("  satir 1   \r\nsatir 2\n", stream=True)) == base
+
+    def test_model_format_ve_options_ayirir(self):
+        base = LLMCache.key_for(payload())
+
+        assert LLMCache.key_for({**payload(), "model": "other"}) != base
+        assert LLMCache.key_for(payload(format="json")) != base
+        assert LLMCache.key_for(payload(options={"temperature": 0.2})) != base
+
+
+class TestSaklama:
+    def test_isabet_ve_iska_sayilir(self, cache):
+        key = cache.key_for(payload())
+
+        assert cache.get(key) is None
+        cache.put(key, "cevap", model="m")
+        assert cache.get(key) == "cevap"
+
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"], stats["stores"]) == (1, 1, 1)
+        assert stats["hit_rate"] == 0.5
+
+    def test_yasi_gecen_kayit_okunmaz(self, cache, monkeypatch):
+        key = cache.key_for(payload())
+        cache.put(key, "eski")
+
+        monkeypatch.setattr("core.clients.llm_cache.time.time", lambda: 10**12)
+
+        assert cache.get(key) is None
+
+    def test_kayit_siniri_en_eski_kullanilani_siler(self, tmp_path, monkeypatch):
+        clock = iter(range(1000, 2000))
+        monkeypatch.setattr("core.clients.llm_cache.time.time", lambda: next(clock))
+        small = LLMCache(str(tmp_path / "small.db"), max_entries=2, max_age_seconds=0, enabled=True)
+        keys = [small.key_for(payload(str(i))) for i in range(3)]
+        small.put(keys[0], "0")
+        small.put(keys[1], "1")
+        small.get(keys[0])
+        small.put(keys[2], "2")
+
+        assert [small.get(key) for key in keys] == ["0", None, "2"]
+        assert small.stats()["evicted"] == 1
+
+    def test_kapaliyken_hicbir_sey_yazmaz(self, tmp_path):
+        off = LLMCache(str(tmp_path / "off.db"), enabled=False)
+
+        assert off.put("k", "v") is False
+        assert off.get("k") is None
+        assert not (tmp_path / "off.db").exists()
+
+
+class FakeResponse:
+    def __init__(self, content):
+        self.status_code = 200
+        self._content = content
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {"message": {"content": self._content}}
+
+
+@pytest.fixture
+def ollama(monkeypatch):
+    calls = []
+    replies = []
+
+    def fake_post(url, json=None, timeout=None):
+        calls.append(json)
+        return FakeResponse(replies.pop(0) if replies else "cevap")
+
+    monkeypatch.setattr(llm_module.requests, "post", fake_post)
+    monkeypatch.setattr(llm_module.time, "sleep", lambda *_a, **_k: None)
+    return calls, replies
+
+
+class TestServisCache:
+    def test_ayni_istek_ollamaya_tekrar_gitmez(self, cache, ollama):
+        calls, _ = ollama
+        service = LLMService(model="m", cache=cache)
+
+        first = service.ask("haber puanla", system="s")
+        second = service.ask("haber puanla", system="s")
+
+        assert first == second == "cevap"
+        assert len(calls) == 1
+        assert cache.stats()["hits"] == 1
+
+    def test_use_cache_false_her_seferinde_sorar(self, cache, ollama):
+        calls, _ = ollama
+        service = LLMService(model="m", cache=cache)
+
+        service.ask("sohbet", use_cache=False)
+        service.ask("sohbet", use_cache=False)
+
+        assert len(calls) == 2
+        assert cache.stats()["stores"] == 0
+
+    def test_bozuk_json_cacheden_tekrar_sunulmaz(self, cache, ollama):
+        calls, replies = ollama
+        replies.extend(["bozuk{", '{"score": 7}'])
+        service = LLMService(model="m", cache=cache)
+
+        assert service.generate_json("puanla", schema={}) == {"score": 7}
+        # Ikinci kosu duzeltilmis cevabi cache'ten alir.
+        assert service.generate_json("puanla", schema={}) == {"score": 7}
+        assert len(calls) == 2
@@ -0,0 +1,175 @@
+"""
+core/clients/llm_dispatcher.py — sinirli paralellikte LLM cagrilari.
+
+Onceden bagimsiz LLM cagrilari bile sirayla gidiyordu. Bu testler ayni anda
+calisan is sayisinin siniri asmadigini, sonuclarin girdi sirasiyla
+dondugunu, kuyrugun dolunca beklettigini ve iptal/hata durumunda bekleyen
+islerin Ollama'ya hic gitmedigini dogrular.
+"""
+
+import threading
+import time
+
+import pytest
+
+from core.agents.news_agent import NewsAgent
+from core.agents.risk_agent import RiskAgent
+from core.clients.llm_dispatcher import LLMDispatcher
+from core.errors import CancelledError, LLMUnavailableError
+from core.pipeline.state import PipelineState
+
+
+class Tracker:
+    """Ayni anda kac isin calistigini olcer."""
+
+    def __init__(self, delay=0.02):
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.running = 0
+        self.peak = 0
+        self.started = []
+
+    def __call__(self, value):
+        with self.lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+            self.started.append(value)
+        try:
+            # Once baslayanlar daha gec biter: sira korunmazsa sonuc karisir.
+            time.sleep(self.delay * (5 - value % 5))
+            return value * 10
+        finally:
+            with self.lock:
+                self.running -= 1
+
+
+class TestDagitim:
+    def test_sonuclar_girdi_sirasiyla_doner(self):
+        dispatcher = LLMDispatcher(max_parallel=4)
+
+        assert dispatcher.map(Tracker(), range(8)) == [value * 10 for value in range(8)]
+
+    def test_paralellik_siniri_asilmaz(self):
+        tracker = Tracker()
+        dispatcher = LLMDispatcher(max_parallel=3)
+
+        dispatcher.map(tracker, range(9))
+
+        assert tracker.peak == 3
+        assert dispatcher.stats()["peak_running"] == 3
+        assert dispatcher.stats()["completed"] == 9
+
+    def test_tek_slotta_cagiranin_threadinde_sirayla(self):
+        threads = []
+        dispatcher = LLMDispatcher(max_parallel=1)
+
+        result = dispatcher.map(lambda value: threads.append(threading.current_thread()) or value, [1, 2])
+
+        assert result == [1, 2]
+        assert threads == [threading.current_thread()] * 2
+        assert dispatcher.stats()["inline"] == 2
+
+    def test_ic_ice_map_kilitlenmez(self):
+        dispatcher = LLMDispatcher(max_parallel=2, queue_size=0)
+
+        result = dispatcher.map(lambda value: sum(dispatcher.map(lambda x: x + value, [1, 2])), [10, 20, 30])
+
+        assert result == [23, 43, 63]
+
+
+class TestKuyruk:
+    def test_kuyruk_doluysa_submit_bekler(self):
+        release = threading.Event()
+        dispatcher = LLMDispatcher(max_parallel=2, queue_size=0)
+        held = [dispatcher.submit(release.wait, 2) for _ in range(2)]
+        submitted = threading.Event()
+
+        thread = threading.Thread(target=lambda: (dispatcher.submit(lambda: None), submitted.set()))
+        thread.start()
+
+        assert not submitted.wait(0.3)
+        release.set()
+        assert submitted.wait(2)
+        thread.join(2)
+        assert all(future.result() for future in held)
+
+    def test_bekleyen_is_iptal_edilince_baslamaz(self):
+        tracker = Tracker(delay=0.05)
+        cancelled = threading.Event()
+        dispatcher = LLMDispatcher(max_parallel=2)
+
+        def cancel_after_first(value):
+            cancelled.set()
+            return tracker(value)
+
+        with pytest.raises(CancelledError):
+            dispatcher.map(cancel_after_first, range(6), cancel_checker=cancelled.is_set)
+
+        assert len(tracker.started) <= 2
+        deadline = time.time() + 2
+        while dispatcher.stats()["cancelled"] < 4 and time.time() < deadline:
+            time.sleep(0.01)
+        assert dispatcher.stats()["cancelled"] >= 4
+
+    def test_ilk_hata_firlatilir_ve_kalanlar_iptal_edilir(self):
+        tracker = Tracker(delay=0.05)
+        dispatcher = LLMDispatcher(max_parallel=2)
+
+        def fail_first(value):
+            if value == 0:
+                raise LLMUnavailableError("down")
+            return tracker(value)
+
+        with pytest.raises(LLMUnavailableError):
+            dispatcher.map(fail_first, range(8))
+
+        assert len(tracker.started) < 7
+
+
+class PromptLLM:
+    """Cevabi prompt'taki basliga gore veren, thread-safe sahte LLM."""
+
+    def __init__(self, answers):
+        self.answers = answers
+        self.calls = []
+
+    def set_cancel_checker(self, checker):
+        pass
+
+    def generate_response(self, prompt, schema=None, retries=3, task=None):
+        self.calls.append(prompt)
+        time.sleep(0.01)
+        for title, answer in self.answers.items():
+            if f"Title: {title}" in prompt:
+                return answer
+        raise AssertionError(f"unexpected prompt: {prompt}")
+
+
+class TestAjanlar:
+    def test_news_agent_paralel_puanlar_sirayi_korur(self):
+        titles = [f"Haber {i}" for i in range(6)]
+        llm = PromptLLM({title: {"emotional_score": i, "viral_potential": i} for i, title in enumerate(titles)})
+        agent = NewsAgent(llm, rss_urls=["http://example"])
+        agent.dispatcher = LLMDispatcher(max_parallel=3)
+
+        scored = agent._score_news([{"title": title, "summary": ""} for title in titles])
+
+        assert [item["title"] for item in scored] == titles
+        assert agent.dispatcher.stats()["peak_running"] > 1
+
+    def test_risk_agent_paralel_rapor_sirasi(self):
+        titles = ["Uzay gorevi", "Secim tartismasi", "Yeni robot"]
+        answers = {
+            "Uzay gorevi": {"risk_score": 1, "categories": []},
+            "Secim tartismasi": {"risk_score": 8, "categories": ["politics"]},
+            "Yeni robot": {"risk_score": 2, "categories": []},
+        }
+        agent = RiskAgent(PromptLLM(answers))
+        agent.dispatcher = LLMDispatcher(max_parallel=3)
+        state = PipelineState()
+        state.news_items = [{"title": title, "summary": ""} for title in titles]
+
+        state = agent._execute(state)
+
+        assert [item["title"] for item in state.safe_news_items] == ["Uzay gorevi", "Yeni robot"]
+        assert list(state.risk_analysis) == titles
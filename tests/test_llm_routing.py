@@ -0,0 +1,181 @@
+"""
+core/clients/llm_routing.py — gorev sinifina gore model secimi.
+
+Onceden puanlama ve risk siniflandirmasi da 8B modelle gidiyordu. Bu testler
+gorevin ayarlanan modele yonlendirildigini, ayarsiz ya da Ollama'da olmayan
+modelde varsayilana donuldugunu, gecikmenin gorev bazinda kaydedildigini ve
+agent'larin gorev sinifini bildirdigini dogrular.
+"""
+
+import json
+
+import pytest
+import requests
+
+from core.agents.caption_agent import CaptionAgent
+from core.agents.news_agent import NewsAgent
+from core.agents.risk_agent import RiskAgent
+from core.agents.visual_agent import VisualDirectorAgent
+from core.clients import llm as llm_module
+from core.clients.llm import LLMService
+from core.clients.llm_cache import LLMCache
+from core.clients.llm_routing import ModelRouter
+from core.errors import LLMUnavailableError
+
+
+class FakeResponse:
+    def __init__(self, content, status=200):
+        self.status_code = status
+        self._content = content
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"HTTP {self.status_code}", response=self)
+
+    def json(self):
+        return {"message": {"content": self._content}}
+
+
+@pytest.fixture
+def ollama(monkeypatch):
+    """Gonderilen modelleri kaydeder; `missing` icindeki modeller icin 404 doner."""
+    sent = []
+    missing = set()
+
+    def fake_post(url, json=None, timeout=None):
+        sent.append(json["model"])
+        if json["model"] in missing:
+            return FakeResponse("", status=404)
+        return FakeResponse(f"cevap:{json['model']}")
+
+    monkeypatch.setattr(llm_module.requests, "post", fake_post)
+    return sent, missing
+
+
+class TestYonlendirme:
+    def test_ayarli_gorev_kendi_modeline_gider(self):
+        router = ModelRouter({"scoring": "llama3.2:3b", "chat": ""})
+
+        assert router.model_for("scoring", "llama3.1:8b") == "llama3.2:3b"
+        assert router.model_for("chat", "llama3.1:8b") == "llama3.1:8b"
+        assert router.model_for(None, "llama3.1:8b") == "llama3.1:8b"
+
+    def test_bilinmeyen_gorev_sinifi_yok_sayilir(self):
+        router = ModelRouter({"ozet": "tiny"})
+
+        assert router.routes == {}
+        assert router.model_for("ozet", "base") == "base"
+
+    def test_servis_gorevin_modelini_gonderir(self, ollama):
+        sent, _ = ollama
+        service = LLMService(model="base", router=ModelRouter({"risk": "small"}))
+
+        assert service.ask("x", task="risk", use_cache=False) == "cevap:small"
+        assert service.ask("x", use_cache=False) == "cevap:base"
+        assert sent == ["small", "base"]
+
+    def test_ollamada_olmayan_model_varsayilana_duser(self, ollama):
+        sent, missing = ollama
+        missing.add("small")
+        router = ModelRouter({"scoring": "small"})
+        service = LLMService(model="base", router=router)
+
+        assert service.ask("x", task="scoring", use_cache=False) == "cevap:base"
+        assert service.ask("y", task="scoring", use_cache=False) == "cevap:base"
+        # Eksik model bir kez denenir, sonra dogrudan varsayilan kullanilir.
+        assert sent == ["small", "base", "base"]
+        assert router.stats()["missing"] == ["small"]
+
+
+class StreamResponse(FakeResponse):
+    def iter_lines(self):
+        yield json.dumps({"message": {"content": self._content}, "done": True}).encode()
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def ollama_stream(monkeypatch):
+    """`ollama` fiksturunun stream=True karsiligi."""
+    sent = []
+    missing = set()
+
+    def fake_post(url, json=None, timeout=None, stream=False):
+        sent.append(json["model"])
+        if json["model"] in missing:
+            return StreamResponse("", status=404)
+        return StreamResponse(f"cevap:{json['model']}")
+
+    monkeypatch.setattr(llm_module.requests, "post", fake_post)
+    return sent, missing
+
+
+class TestAkisYonlendirme:
+    def test_akista_olmayan_model_varsayilana_duser(self, ollama_stream):
+        sent, missing = ollama_stream
+        missing.add("small")
+        router = ModelRouter({"chat": "small"})
+        service = LLMService(model="base", router=router)
+
+        assert "".join(service.stream_chat([{"role": "user", "content": "x"}])) == "cevap:base"
+        assert sent == ["small", "base"]
+        assert router.stats()["missing"] == ["small"]
+
+    def test_akis_gecikmesi_kaydedilir(self, ollama_stream):
+        _, missing = ollama_stream
+        router = ModelRouter({"chat": "small"})
+        service = LLMService(model="base", router=router)
+
+        "".join(service.stream_chat([{"role": "user", "content": "x"}]))
+        missing.add("base")
+        with pytest.raises(requests.HTTPError):
+            "".join(service.stream_chat([{"role": "user", "content": "x"}], task=None))
+
+        tasks = router.stats()["tasks"]
+        assert (tasks["chat"][0]["model"], tasks["chat"][0]["calls"], tasks["chat"][0]["errors"]) == ("small", 1, 0)
+        assert (tasks["default"][0]["model"], tasks["default"][0]["errors"]) == ("base", 1)
+
+
+class TestGecikme:
+    def test_gorev_ve_model_bazinda_kaydedilir(self, ollama, tmp_path):
+        cache = LLMCache(str(tmp_path / "c.db"), enabled=True)
+        router = ModelRouter({"scoring": "small"})
+        service = LLMService(model="base", router=router, cache=cache)
+
+        service.ask("a", task="scoring")
+        service.ask("a", task="scoring")
+        service.ask("b", task="caption")
+
+        tasks = router.stats()["tasks"]
+        scoring = tasks["scoring"][0]
+        assert (scoring["model"], scoring["calls"], scoring["cache_hits"], scoring["errors"]) == ("small", 1, 1, 0)
+        assert scoring["max_seconds"] >= scoring["mean_seconds"] >= 0
+        assert tasks["caption"][0]["model"] == "base"
+
+    def test_hatali_cagri_sayilir(self, monkeypatch):
+        monkeypatch.setattr(
+            llm_module.requests, "post", lambda *_a, **_k: (_ for _ in ()).throw(requests.ConnectionError("down"))
+        )
+        router = ModelRouter({})
+        service = LLMService(model="base", router=router)
+
+        with pytest.raises(LLMUnavailableError):
+            service.ask("x", task="chat", retries=1, use_cache=False)
+
+        assert router.stats()["tasks"]["chat"][0]["errors"] == 1
+
+
+class TestAjanGorevleri:
+    def test_agentlar_gorev_sinifini_bildirir(self):
+        assert NewsAgent.task == "scoring"
+        assert RiskAgent.task == "risk"
+        assert VisualDirectorAgent.task == "prompt"
+        assert CaptionAgent.task == "caption"
+
+    def test_puanlama_cagrisi_gorevi_tasir(self, fake_llm):
+        llm = fake_llm(responses=[{"emotional_score": 5, "viral_potential": 5}])
+
+        NewsAgent(llm, rss_urls=["http://example"])._score_news([{"title": "T", "summary": ""}])
+
+        assert llm.tasks == ["scoring"]
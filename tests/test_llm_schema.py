@@ -0,0 +1,142 @@
+"""
+core/clients/llm_schema.py — sema kisitli JSON ciktisi ve yerel onarim.
+
+Onceden bozuk JSON her seferinde tum uretimi tekrarlatiyordu. Bu testler
+ajan ipucu sozluklerinin JSON Schema'ya ve pydantic modeline dogru
+cevrildigini, yaygin bozulmalarin yeniden uretim olmadan onarildigini ve
+sayaclarin tuttugunu dogrular.
+"""
+
+import pytest
+
+from core.clients import llm as llm_module
+from core.clients.llm import LLMService
+from core.clients.llm_schema import get_json_stats, json_schema_for, parse_json_reply, repair_json, validate_reply
+from core.errors import LLMResponseError
+
+RISK = {
+    "risk_score": "integer (0-10, 0=Safe, 10=Dangerous)",
+    "categories": ["list of strings from: violence, politics, drugs"],
+    "safe_to_post": "boolean",
+}
+
+CAPTIONS = {
+    "captions": [{"text": "string (the caption)", "engagement_score": "integer (0-10 prediction)"}],
+    "hashtags": "string (space separated list)",
+}
+
+
+class TestJsonSchema:
+    def test_tipler_araliklar_ve_secenekler(self):
+        schema = json_schema_for(RISK)
+
+        assert schema["required"] == ["risk_score", "categories", "safe_to_post"]
+        assert schema["properties"]["risk_score"] == {"type": "integer", "minimum": 0, "maximum": 10}
+        assert schema["properties"]["categories"]["items"]["enum"] == ["violence", "politics", "drugs"]
+        assert schema["properties"]["safe_to_post"] == {"type": "boolean"}
+
+    def test_ic_ice_liste_nesneleri(self):
+        items = json_schema_for(CAPTIONS)["properties"]["captions"]["items"]
+
+        assert items["type"] == "object"
+        assert items["properties"]["engagement_score"]["maximum"] == 10
+
+
+class TestDogrulama:
+    def test_tip_donusumu_ve_kirpma(self):
+        result, dropped = validate_reply({"risk_score": "14", "categories": [], "safe_to_post": "true"}, RISK)
+
+        assert result == {"risk_score": 10, "categories": [], "safe_to_post": True}
+        assert dropped == 0
+
+    def test_yanlis_alan_atilir_digerleri_kalir(self):
+        result, dropped = validate_reply({"risk_score": "yuksek", "categories": ["politics"]}, RISK)
+
+        assert result == {"categories": ["politics"]}
+        assert dropped == 1
+
+    def test_listedeki_bozuk_eleman_alani_atilir(self):
+        data = {"captions": [{"text": "a", "engagement_score": 7}, {"text": "b", "engagement_score": "cok"}]}
+
+        result, _ = validate_reply(data, CAPTIONS)
+
+        assert result["captions"] == [{"text": "a", "engagement_score": 7}, {"text": "b"}]
+
+    def test_fazladan_alanlar_korunur(self):
+        result, _ = validate_reply({"risk_score": 1, "note": "x"}, RISK)
+
+        assert result == {"risk_score": 1, "note": "x"}
+
+    def test_nesne_olmayan_cevap(self):
+        with pytest.raises(LLMResponseError, match="not an object"):
+            validate_reply([1, 2], RISK)
+
+
+class TestOnarim:
+    def test_cevreleyen_metin_ve_sondaki_virgul(self):
+        text = 'Here you go:\n```json\n{"risk_score": 2, "categories": ["politics",],}\n```\nHope it helps!'
+
+        assert repair_json(text) == {"risk_score": 2, "categories": ["politics"]}
+
+    def test_yarida_kesilen_cikti(self):
+        text = '{"captions": [{"text": "first", "engagement_score": 8}, {"text": "sec'
+
+        assert repair_json(text) == {"captions": [{"text": "first", "engagement_score": 8}, {"text": "sec"}]}
+
+    def test_yarim_kalan_anahtar_atilir(self):
+        assert repair_json('{"risk_score": 3, "categ') == {"risk_score": 3}
+
+    def test_kurtarilacak_bir_sey_yoksa_hata(self):
+        with pytest.raises(ValueError):
+            repair_json("cevap veremiyorum {")
+        with pytest.raises(ValueError):
+            repair_json("hic json yok")
+
+    def test_onarim_sayaci(self):
+        before = get_json_stats().snapshot()["repaired"]
+
+        assert parse_json_reply('{"risk_score": 1,', RISK) == {"risk_score": 1}
+        assert get_json_stats().snapshot()["repaired"] == before + 1
+
+
+class FakeResponse:
+    def __init__(self, content):
+        self.status_code = 200
+        self._content = content
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {"message": {"content": self._content}}
+
+
+class TestServisIle:
+    def test_onarilan_cevap_yeniden_uretilmez(self, monkeypatch):
+        calls = []
+
+        def fake_post(url, json=None, timeout=None):
+            calls.append(json)
+            return FakeResponse('{"risk_score": 4, "categories": ["drugs"], "safe_to')
+
+        monkeypatch.setattr(llm_module.requests, "post", fake_post)
+        before = get_json_stats().snapshot()
+
+        result = LLMService().generate_json("analiz", schema=RISK)
+
+        after = get_json_stats().snapshot()
+        assert result == {"risk_score": 4, "categories": ["drugs"]}
+        assert len(calls) == 1
+        assert after["regenerations"] == before["regenerations"]
+        assert after["requests"] == before["requests"] + 1
+
+    def test_yeniden_uretim_ve_basarisizlik_sayilir(self, monkeypatch):
+        monkeypatch.setattr(llm_module.requests, "post", lambda *_a, **_k: FakeResponse("json yok"))
+        before = get_json_stats().snapshot()
+
+        with pytest.raises(LLMResponseError):
+            LLMService().generate_json("x", schema=RISK, retries=3)
+
+        after = get_json_stats().snapshot()
+        assert after["regenerations"] == before["regenerations"] + 2
+        assert after["failures"] == before["failures"] + 1
@@ -1,11 +1,14 @@
 """core/clients/llm.py — LLMService: JSON uretimi, retry, iptal."""
 
+import json
+import time
+
 import pytest
 import requests
 
 from core.clients import llm as llm_module
 from core.clients.llm import LLMService, _clean_llm_text
-from core.errors import LLMResponseError, LLMUnavailableError
+from core.errors import CancelledError, LLMResponseError, LLMUnavailableError
 
 
 @pytest.fixture(autouse=True)
@@ -165,7 +168,7 @@ class TestGenerateJson:
         with pytest.raises(LLMResponseError, match="Valid JSON was not produced"):
             LLMService().generate_json("x", schema={}, retries=2)
 
-    def test_format_json_olarak_gonderilir(self, monkeypatch):
+    def test_sema_format_olarak_gonderilir(self, monkeypatch):
         captured = {}
 
         def fake_post(url, json=None, timeout=None):
@@ -175,8 +178,85 @@ class TestGenerateJson:
         monkeypatch.setattr(llm_module.requests, "post", fake_post)
         LLMService().generate_json("x", schema={"a": "int"})
 
+        assert captured.get("format") == {"type": "object", "properties": {"a": {"type": "integer"}}, "required": ["a"]}
+
+    def test_sema_formati_kapaliysa_format_json(self, monkeypatch):
+        captured = {}
+
+        def fake_post(url, json=None, timeout=None):
+            captured.update(json or {})
+            return FakeResponse(ollama_reply('{"a": 1}'))
+
+        monkeypatch.setattr(llm_module.requests, "post", fake_post)
+        service = LLMService()
+        service.schema_format = False
+        service.generate_json("x", schema={"a": "int"})
+
         assert captured.get("format") == "json"
 
+    def test_semayi_reddeden_eski_ollama_json_moduna_duser(self, monkeypatch):
+        formats = []
+
+        def fake_post(url, json=None, timeout=None):
+            formats.append(json["format"])
+            if isinstance(json["format"], dict):
+                response = FakeResponse({"error": "invalid format"}, status=400)
+                response.raise_for_status = lambda: (_ for _ in ()).throw(requests.HTTPError(response=response))
+                return response
+            return FakeResponse(ollama_reply('{"a": 1}'))
+
+        monkeypatch.setattr(llm_module.requests, "post", fake_post)
+        service = LLMService()
+
+        assert service.generate_json("x", schema={"a": "int"}) == {"a": 1}
+        assert formats[-1] == "json" and isinstance(formats[0], dict)
+        # The downgrade is temporary; the configured flag stays on.
+        assert service.schema_format is True
+        assert service._json_format({"a": "int"}) == "json"
+
+    def test_sema_dususu_suresi_dolunca_biter(self, monkeypatch):
+        now = [1000.0]
+        monkeypatch.setattr(llm_module.time, "monotonic", lambda: now[0])
+        monkeypatch.setattr(llm_module, "LLM_SCHEMA_FALLBACK_SECONDS", 60)
+        formats = []
+
+        def fake_post(url, json=None, timeout=None):
+            formats.append(json["format"])
+            if isinstance(json["format"], dict) and len(formats) == 1:
+                response = FakeResponse({"error": "invalid format"}, status=400)
+                response.raise_for_status = lambda: (_ for _ in ()).throw(requests.HTTPError(response=response))
+                return response
+            return FakeResponse(ollama_reply('{"a": 1}'))
+
+        monkeypatch.setattr(llm_module.requests, "post", fake_post)
+        service = LLMService()
+
+        service.generate_json("x", schema={"a": "int"}, use_cache=False)
+        service.generate_json("y", schema={"a": "int"}, use_cache=False)
+        now[0] += 61
+        service.generate_json("z", schema={"a": "int"}, use_cache=False)
+
+        assert [isinstance(value, dict) for value in formats] == [True, False, False, True]
+
+    def test_format_disi_hata_yutulmaz_ve_bayrak_degismez(self, monkeypatch):
+        formats = []
+
+        def fake_post(url, json=None, timeout=None):
+            formats.append(json["format"])
+            response = FakeResponse({"error": "model 'x' not found"}, status=404)
+            response.raise_for_status = lambda: (_ for _ in ()).throw(requests.HTTPError(response=response))
+            return response
+
+        monkeypatch.setattr(llm_module.requests, "post", fake_post)
+        service = LLMService()
+
+        with pytest.raises(LLMResponseError):
+            service.generate_json("x", schema={"a": "int"}, use_cache=False)
+
+        assert len(formats) == 1
+        assert service.schema_format is True
+        assert isinstance(service._json_format({"a": "int"}), dict)
+
     def test_sema_prompta_eklenir(self, monkeypatch):
         captured = {}
 
@@ -278,3 +358,104 @@ class TestUnload:
         )
 
         assert LLMService().unload() is False
+
+
+class StreamResponse:
+    """Ollama'nin stream=True cevabi: satir basina bir NDJSON parcasi."""
+
+    def __init__(self, chunks, status=200, delay=0.0):
+        self._lines = [json.dumps(chunk).encode() for chunk in chunks]
+        self.status_code = status
+        self.delay = delay
+        self.closed = False
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"HTTP {self.status_code}", response=self)
+
+    def iter_lines(self):
+        for line in self._lines:
+            if self.closed:
+                raise requests.ConnectionError("kapatildi")
+            time.sleep(self.delay)
+            yield line
+
+    def close(self):
+        self.closed = True
+
+
+def stream_chunks(*pieces):
+    chunks = [{"message": {"content": piece}, "done": False} for piece in pieces]
+    chunks.append({"message": {"content": ""}, "done": True, "eval_count": len(pieces)})
+    return chunks
+
+
+class TestAkis:
+    def test_parcalar_sirayla_gelir(self, monkeypatch):
+        captured = {}
+
+        def fake_post(url, json=None, timeout=None, stream=False):
+            captured.update(json or {}, http_stream=stream)
+            return StreamResponse(stream_chunks("Mer", "ha", "ba"))
+
+        monkeypatch.setattr(llm_module.requests, "post", fake_post)
+
+        stream = LLMService().stream_chat([{"role": "user", "content": "selam"}])
+
+        assert list(stream) == ["Mer", "ha", "ba"]
+        assert stream.text == "Merhaba"
+        assert captured["stream"] is True and captured["http_stream"] is True
+
+    def test_sure_ve_ollama_sayaclari(self, monkeypatch):
+        monkeypatch.setattr(llm_module.requests, "post", lambda *_a, **_k: StreamResponse(stream_chunks("a", "b")))
+
+        stream = LLMService().stream_chat([{"role": "user", "content": "x"}])
+        "".join(stream)
+
+        stats = stream.stats()
+        assert 0 <= stats["first_token_seconds"] <= stats["total_seconds"]
+        assert stats["eval_count"] == 2 and stats["chars"] == 2
+
+    def test_iptal_akisi_keser_ve_baglantiyi_kapatir(self, monkeypatch):
+        response = StreamResponse(stream_chunks(*"abcdefgh"), delay=0.05)
+        monkeypatch.setattr(llm_module.requests, "post", lambda *_a, **_k: response)
+        seen = []
+
+        stream = LLMService().stream_chat([{"role": "user", "content": "x"}], cancel_checker=lambda: len(seen) >= 2)
+        with pytest.raises(CancelledError, match="Cancelled during LLM request"):
+            for piece in stream:
+                seen.append(piece)
+
+        assert seen == ["a", "b"]
+        assert response.closed
+
+    def test_akis_gpuyu_llm_icin_alir(self, monkeypatch):
+        acquired = []
+
+        class Residency:
+            def acquire_for_llm(self):
+                acquired.append("llm")
+
+        monkeypatch.setattr(llm_module, "get_gpu_residency", Residency)
+        monkeypatch.setattr(llm_module.requests, "post", lambda *_a, **_k: StreamResponse(stream_chunks("a")))
+
+        stream = LLMService().stream_chat([{"role": "user", "content": "x"}])
+
+        assert acquired == ["llm"]
+        assert list(stream) == ["a"]
+
+    def test_ollama_hata_parcasi(self, monkeypatch):
+        monkeypatch.setattr(
+            llm_module.requests, "post", lambda *_a, **_k: StreamResponse([{"error": "model not found"}])
+        )
+
+        with pytest.raises(LLMResponseError, match="model not found"):
+            list(LLMService().stream_chat([{"role": "user", "content": "x"}]))
+
+    def test_chat_ayni_yoldan_sureleri_tutar(self, monkeypatch, caplog):
+        monkeypatch.setattr(llm_module.requests, "post", lambda *_a, **_k: FakeResponse(ollama_reply("tamam")))
+
+        with caplog.at_level("DEBUG", logger=llm_module.__name__):
+            assert LLMService().chat([{"role": "user", "content": "x"}]) == "tamam"
+
+        assert "first_token_seconds" in caplog.text
@@ -0,0 +1,137 @@
+"""
+core/clients/llm_telemetry.py — LLM cagrilarinin token ve zaman telemetrisi.
+
+Onceden Ollama'nin cevaptaki sayaclari atiliyordu. Bu testler sayaclarin her
+cagrida okundugunu, agent/gorev/is etiketlerinin (paralel cagrilarda da)
+dogru eklendigini, histogramlarin ve is ozetinin tuttugunu dogrular.
+"""
+
+import pytest
+
+from core.clients import llm as llm_module
+from core.clients import llm_telemetry
+from core.clients.llm import LLMService
+from core.clients.llm_cache import LLMCache
+from core.clients.llm_dispatcher import LLMDispatcher
+from core.clients.llm_telemetry import Histogram, LLMTelemetry, llm_caller
+from core.runtime.jobs import Job, bind_job
+
+NS = 1_000_000_000
+
+COUNTERS = {
+    "prompt_eval_count": 200,
+    "eval_count": 60,
+    "load_duration": int(1.5 * NS),
+    "prompt_eval_duration": int(0.5 * NS),
+    "eval_duration": 2 * NS,
+    "total_duration": 4 * NS,
+}
+
+
+class FakeResponse:
+    status_code = 200
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {"message": {"content": "cevap"}, "done": True, **COUNTERS}
+
+
+@pytest.fixture
+def telemetry(monkeypatch):
+    fresh = LLMTelemetry(max_samples=50)
+    monkeypatch.setattr(llm_telemetry, "_DEFAULT_TELEMETRY", fresh)
+    monkeypatch.setattr(llm_module.requests, "post", lambda *_a, **_k: FakeResponse())
+    return fresh
+
+
+class TestOrnek:
+    def test_ollama_sayaclari_okunur(self):
+        sample = llm_telemetry.build_sample(COUNTERS, model="m", task="scoring", wall_seconds=4.25)
+
+        assert sample["prompt_tokens"] == 200
+        assert sample["completion_tokens"] == 60
+        assert sample["tokens_per_second"] == 30.0
+        assert sample["prompt_tokens_per_second"] == 400.0
+        assert sample["load_seconds"] == 1.5
+        assert sample["queue_seconds"] == pytest.approx(0.25)
+
+    def test_eksik_sayaclar_none_kalir(self):
+        sample = llm_telemetry.build_sample({}, model="m", task=None, wall_seconds=1.0)
+
+        assert sample["tokens_per_second"] is None
+        assert sample["queue_seconds"] is None
+
+
+class TestServis:
+    def test_her_cagri_agent_gorev_ve_is_ile_kaydedilir(self, telemetry):
+        job = Job(kind="agent")
+
+        with bind_job(job), llm_caller("NewsAgent"):
+            LLMService(model="m").ask("puanla", task="scoring", use_cache=False)
+
+        sample = telemetry.snapshot()["recent"][-1]
+        assert (sample["agent"], sample["task"], sample["job_id"], sample["model"]) == (
+            "NewsAgent",
+            "scoring",
+            job.id,
+            "m",
+        )
+        summary = job.to_dict()["llm"]
+        assert summary["calls"] == 1
+        assert summary["completion_tokens"] == 60
+        assert summary["tokens_per_second"] == 30.0
+        assert summary["by_agent"]["NewsAgent"]["prompt_tokens"] == 200
+
+    def test_histogramlar_dolar(self, telemetry):
+        service = LLMService(model="m")
+
+        service.ask("a", use_cache=False)
+        service.ask("b", use_cache=False)
+
+        histograms = telemetry.snapshot()["histograms"]
+        assert histograms["tokens_per_second"]["count"] == 2
+        assert histograms["load_seconds"]["p50"] == 2
+        assert histograms["queue_seconds"]["count"] == 2
+
+    def test_cache_isabeti_ornek_uretmez(self, telemetry, tmp_path):
+        service = LLMService(model="m", cache=LLMCache(str(tmp_path / "c.db"), enabled=True))
+
+        service.ask("ayni")
+        service.ask("ayni")
+
+        assert telemetry.snapshot()["calls"] == 1
+
+    def test_paralel_cagrilar_baglami_tasir(self, telemetry):
+        job = Job(kind="agent")
+        service = LLMService(model="m")
+        dispatcher = LLMDispatcher(max_parallel=3)
+
+        with bind_job(job), llm_caller("RiskAgent"):
+            dispatcher.map(lambda prompt: service.ask(prompt, task="risk", use_cache=False), ["a", "b", "c"])
+
+        samples = telemetry.snapshot()["recent"]
+        assert [(s["agent"], s["job_id"]) for s in samples] == [("RiskAgent", job.id)] * 3
+        assert job.to_dict()["llm"]["calls"] == 3
+        assert telemetry.snapshot()["histograms"]["dispatch_wait_seconds"]["count"] == 3
+
+
+class TestHistogram:
+    def test_kovalar_ve_yuzdelikler(self):
+        histogram = Histogram((1, 5, 10))
+        for value in (0.5, 2, 3, 4, 20):
+            histogram.observe(value)
+
+        snapshot = histogram.snapshot()
+        assert [bucket["count"] for bucket in snapshot["buckets"]] == [1, 3, 0, 1]
+        assert snapshot["buckets"][-1]["le"] == "+Inf"
+        assert snapshot["p50"] == 5
+        assert snapshot["p95"] == 20
+        assert snapshot["mean"] == 5.9
+
+    def test_bos_histogram(self):
+        snapshot = Histogram((1,)).snapshot()
+
+        assert snapshot["count"] == 0
+        assert snapshot["p50"] is None
@@ -12,7 +12,7 @@ import pytest
 
 from core.agents import news_agent as na_module
 from core.agents.news_agent import NewsAgent, _find_keyword_hit
-from core.errors import LLMUnavailableError
+from core.errors import LLMResponseError, LLMUnavailableError
 from core.pipeline.state import PipelineState
 
 
@@ -195,3 +195,122 @@ class TestExecute:
         state = agent._execute(PipelineState())
 
         assert state.news_items == []
+
+
+def batch_reply(*scores):
+    return {
+        "items": [
+            {"id": number, "emotional_score": emotional, "viral_potential": viral, "reason": f"r{number}"}
+            for number, emotional, viral in scores
+        ]
+    }
+
+
+class TestTopluSkorlama:
+    def test_parca_basina_tek_cagri(self, fake_llm):
+        llm = fake_llm(responses=[batch_reply((1, 2, 2), (2, 8, 8), (3, 5, 5)), batch_reply((1, 9, 9))])
+        agent = NewsAgent(llm, rss_urls=[], scoring_mode="batch", batch_size=3)
+        items = [{"title": f"H{i}", "summary": ""} for i in range(4)]
+
+        scored = agent._score_news(items)
+
+        assert len(llm.calls) == 2
+        assert [i["title"] for i in scored] == ["H0", "H1", "H2", "H3"]
+        assert scored[1]["final_score"] == pytest.approx(8.0)
+        assert scored[3]["analysis_reason"] == "r1"
+        assert "[2] Title: H1" in llm.calls[0]
+
+    def test_cevapta_eksik_haber_tek_tek_puanlanir(self, fake_llm):
+        llm = fake_llm(
+            responses=[
+                batch_reply((1, 4, 4), (7, 9, 9)),
+                {"emotional_score": 6, "viral_potential": 6, "reason": "tekil"},
+            ]
+        )
+        agent = NewsAgent(llm, rss_urls=[], scoring_mode="batch", batch_size=5)
+
+        scored = agent._score_news([{"title": "A", "summary": ""}, {"title": "B", "summary": ""}])
+
+        assert [(i["title"], i["final_score"]) for i in scored] == [("A", 4.0), ("B", 6.0)]
+        assert "Title: B" in llm.calls[1] and "[1]" not in llm.calls[1]
+
+    def test_bozuk_toplu_cevap_tekil_yola_duser(self, fake_llm):
+        llm = fake_llm(
+            responses=[
+                ValueError("JSON yok"),
+                {"emotional_score": 1, "viral_potential": 1, "reason": ""},
+                {"emotional_score": 2, "viral_potential": 2, "reason": ""},
+            ]
+        )
+        agent = NewsAgent(llm, rss_urls=[], scoring_mode="batch")
+
+        scored = agent._score_news([{"title": "A", "summary": ""}, {"title": "B", "summary": ""}])
+
+        assert [i["final_score"] for i in scored] == [pytest.approx(1.0), pytest.approx(2.0)]
+        assert len(llm.calls) == 3
+
+    def test_gecersiz_json_hatasi_tekil_yola_duser(self, fake_llm):
+        llm = fake_llm(
+            responses=[
+                LLMResponseError("LLM yaniti gecerli JSON degil"),
+                {"emotional_score": 3, "viral_potential": 3, "reason": ""},
+                {"emotional_score": 7, "viral_potential": 7, "reason": ""},
+            ]
+        )
+        agent = NewsAgent(llm, rss_urls=[], scoring_mode="batch")
+
+        scored = agent._score_news([{"title": "A", "summary": ""}, {"title": "B", "summary": ""}])
+
+        assert [i["final_score"] for i in scored] == [pytest.approx(3.0), pytest.approx(7.0)]
+        assert len(llm.calls) == 3
+        assert "[1] Title: A" in llm.calls[0]
+
+    def test_varsayilan_mod_haber_basina_cagri(self, fake_llm):
+        llm = fake_llm(responses=[{"emotional_score": 1, "viral_potential": 1, "reason": ""}] * 2)
+        agent = NewsAgent(llm, rss_urls=[])
+
+        agent._score_news([{"title": "A", "summary": ""}, {"title": "B", "summary": ""}])
+
+        assert agent.scoring_mode == "single"
+        assert len(llm.calls) == 2
+
+
+class TestBirlesikAnaliz:
+    def test_risk_alanlari_habere_yazilir(self, fake_llm):
+        llm = fake_llm(
+            responses=[{"emotional_score": 5, "viral_potential": 5, "reason": "", "risk_score": 2, "categories": []}]
+        )
+        agent = NewsAgent(llm, rss_urls=[], analysis_mode="combined")
+
+        scored = agent._score_news([{"title": "T", "summary": "S"}])
+
+        assert scored[0]["risk_analysis"] == {"risk_score": 2, "categories": []}
+        assert "Brand Safety" in llm.calls[0]
+
+    def test_risk_alani_eksikse_riskagente_birakilir(self, fake_llm):
+        llm = fake_llm(responses=[{"emotional_score": 5, "viral_potential": 5, "reason": ""}])
+        agent = NewsAgent(llm, rss_urls=[], analysis_mode="combined")
+
+        scored = agent._score_news([{"title": "T", "summary": "S"}])
+
+        assert "risk_analysis" not in scored[0]
+
+    def test_toplu_modda_da_risk_doner(self, fake_llm):
+        reply = batch_reply((1, 3, 3), (2, 4, 4))
+        reply["items"][0].update(risk_score=1, categories=["politics"])
+        reply["items"][1].update(risk_score=8, categories=[])
+        agent = NewsAgent(fake_llm(responses=[reply]), rss_urls=[], scoring_mode="batch", analysis_mode="combined")
+
+        scored = agent._score_news([{"title": "A", "summary": ""}, {"title": "B", "summary": ""}])
+
+        assert [i["risk_analysis"]["risk_score"] for i in scored] == [1, 8]
+
+    def test_ayri_modda_risk_yazilmaz(self, fake_llm):
+        llm = fake_llm(
+            responses=[{"emotional_score": 5, "viral_potential": 5, "reason": "", "risk_score": 2, "categories": []}]
+        )
+
+        scored = NewsAgent(llm, rss_urls=[])._score_news([{"title": "T", "summary": "S"}])
+
+        assert "risk_analysis" not in scored[0]
+        assert "Brand Safety" not in llm.calls[0]
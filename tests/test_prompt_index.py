@@ -0,0 +1,117 @@
+"""
+core/clients/prompt_index.py — benzer prompt'larin onceki gorsellerini bulma.
+
+Gunden gune tekrar eden haber prompt'lari esigin ustunde eslesmeli; farkli
+checkpoint, dusuk cozunurluk veya silinmis dosya asla onerilmemeli.
+"""
+
+import json
+
+import pytest
+
+from core.clients.prompt_index import PromptIndex, shingles, similarity
+
+MARS = "photorealistic documentary scene of a Mars rover crossing red dunes at dusk"
+MARS_AGAIN = "photorealistic documentary scene of the Mars rover crossing red dunes at dusk, wide shot"
+HARBOR = "quiet fishing harbor at dawn with wooden boats and fog"
+
+
+@pytest.fixture
+def image(tmp_path):
+    counter = iter(range(1000))
+
+    def _make():
+        path = tmp_path / f"img_{next(counter)}.png"
+        path.write_bytes(b"png")
+        return str(path)
+
+    return _make
+
+
+class TestBenzerlik:
+    def test_dolgu_kelimeleri_sayilmaz(self):
+        assert shingles("the rover of Mars") == shingles("rover Mars")
+
+    def test_ikili_kelimeler_sirayi_tasir(self):
+        assert similarity(shingles("red dunes"), shingles("dunes red")) < 1.0
+
+    def test_bos_prompt(self):
+        assert similarity(shingles(""), shingles(MARS)) == 0.0
+
+
+class TestArama:
+    def test_benzer_prompt_bulunur(self, image):
+        index = PromptIndex(None)
+        path = image()
+        index.add(MARS, path)
+        index.add(HARBOR, image())
+
+        match = index.find(MARS_AGAIN, threshold=0.6)
+
+        assert match.path == path
+        assert 0.6 <= match.score < 1.0
+
+    def test_esik_altinda_eslesme_yok(self, image):
+        index = PromptIndex(None)
+        index.add(MARS, image())
+
+        assert index.find(HARBOR, threshold=0.3) is None
+
+    def test_esitlikte_en_yeni(self, image):
+        index = PromptIndex(None)
+        index.add(MARS, image())
+        newest = image()
+        index.add(MARS, newest)
+
+        assert index.find(MARS, threshold=0.9).path == newest
+
+    def test_grup_ve_cozunurluk_filtreler(self, image):
+        index = PromptIndex(None)
+        index.add(MARS, image(), group="sdxl", pixels=512 * 512)
+
+        assert index.find(MARS, group="flux", threshold=0.5) is None
+        assert index.find(MARS, group="sdxl", threshold=0.5, min_pixels=1024 * 1024) is None
+        assert index.find(MARS, group="sdxl", threshold=0.5, min_pixels=512 * 512) is not None
+
+    def test_silinmis_dosya_atlanir_ve_duser(self, image, tmp_path):
+        index = PromptIndex(None)
+        gone = image()
+        index.add(MARS, gone)
+        (tmp_path / gone.rsplit("/", 1)[-1]).unlink()
+
+        assert index.find(MARS, threshold=0.5) is None
+        assert len(index) == 0
+
+
+class TestKalicilik:
+    def test_diske_yazilir_ve_geri_okunur(self, image, tmp_path):
+        store = tmp_path / "index.json"
+        path = image()
+        PromptIndex(str(store)).add(MARS, path, group="sdxl", pixels=100)
+
+        assert json.loads(store.read_text())["entries"][0]["path"] == path
+        assert PromptIndex(str(store)).find(MARS, group="sdxl", threshold=0.9).path == path
+
+    def test_kayit_siniri_en_eskiyi_duser(self, image):
+        index = PromptIndex(None, max_entries=2)
+        first = image()
+        index.add(MARS, first)
+        index.add(HARBOR, image())
+        index.add("city skyline at night", image())
+
+        assert len(index) == 2
+        assert index.find(MARS, threshold=0.9) is None
+
+    def test_ayni_dosya_tekrar_eklenince_guncellenir(self, image):
+        index = PromptIndex(None)
+        path = image()
+        index.add(MARS, path)
+        index.add(HARBOR, path)
+
+        assert len(index) == 1
+        assert index.find(HARBOR, threshold=0.9).path == path
+
+    def test_bozuk_dosya_bos_baslar(self, tmp_path):
+        store = tmp_path / "index.json"
+        store.write_text("[bozuk")
+        assert len(PromptIndex(str(store))) == 0
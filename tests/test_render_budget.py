@@ -0,0 +1,141 @@
+"""
+core/clients/render_budget.py — olculen surelerle butceye gore profil secimi.
+
+Tahminler gercek render surelerinden ogrenilmeli, diske yazilip geri
+okunmali ve butce kuculdukce once ek gecisler, sonra adimlar birakilmali.
+"""
+
+import json
+
+import pytest
+
+from core.clients import render_budget
+from core.clients.render_budget import DEFAULT_ESTIMATES, RenderTimings, choose_profile, degrade
+from core.clients.render_profile import RenderProfile
+
+MP = 1024 * 1024 / 1_000_000
+
+
+def payload(steps=30, *, hires=False, adetailer=False, **extra):
+    body = {"steps": steps, "width": 1024, "height": 1024, **extra}
+    if hires:
+        body.update({"enable_hr": True, "hr_scale": 1.5, "hr_second_pass_steps": 15})
+    if adetailer:
+        body["alwayson_scripts"] = {"ADetailer": {"args": []}}
+    return body
+
+
+@pytest.fixture(autouse=True)
+def all_features(monkeypatch):
+    monkeypatch.setattr(render_budget, "SD_ENABLE_HIRES_FIX", True)
+    monkeypatch.setattr(render_budget, "SD_ENABLE_ADDETAILER", True)
+    monkeypatch.setattr(render_budget, "SD_ENABLE_POST_UPSCALE", True)
+    monkeypatch.setattr(render_budget, "SD_POST_UPSCALE_FACTOR", 1.15)
+    monkeypatch.setattr(render_budget, "SD_HIRES_SCALE", 1.5)
+
+
+def profile(steps=30, **kw):
+    return RenderProfile("full", 1024, 1024, steps, **kw)
+
+
+class TestOlcum:
+    def test_ilk_olcum_varsayilanin_yerine_gecer(self):
+        timings = RenderTimings(None)
+        timings.record_render(payload(30), 30 * MP * 0.2)
+
+        assert timings.snapshot()["features"]["step"] == {"seconds": 0.2, "samples": 1}
+
+    def test_sonraki_olcumler_ortalamaya_katilir(self):
+        timings = RenderTimings(None, alpha=0.5)
+        timings.record_render(payload(10), 10 * MP * 0.2)
+        timings.record_render(payload(10), 10 * MP * 0.4)
+
+        assert timings.snapshot()["features"]["step"]["seconds"] == pytest.approx(0.3)
+
+    def test_ek_sure_ozellige_yazilir(self):
+        timings = RenderTimings(None)
+        timings.record_render(payload(30), 30 * MP * 0.2)
+        timings.record_render(payload(30, adetailer=True), 30 * MP * 0.2 + 9.0)
+
+        features = timings.snapshot()["features"]
+        assert features["adetailer"]["seconds"] == pytest.approx(9.0)
+        assert features["step"]["samples"] == 1
+
+    def test_img2img_denoise_kadar_adim_sayilir(self):
+        timings = RenderTimings(None)
+        timings.record_render(payload(30, init_images=["x"], denoising_strength=0.5), 15 * MP * 0.2)
+
+        assert timings.snapshot()["features"]["step"]["seconds"] == pytest.approx(0.2)
+
+    def test_gecersiz_olcum_yok_sayilir(self):
+        timings = RenderTimings(None)
+        timings.record_render({"steps": 0}, 5.0)
+        timings.record_render(payload(30), 0.0)
+        timings.record_upscale(-1)
+
+        assert all(entry["samples"] == 0 for entry in timings.snapshot()["features"].values())
+
+    def test_diske_yazilir_ve_geri_okunur(self, tmp_path):
+        path = tmp_path / "timings.json"
+        RenderTimings(str(path)).record_upscale(3.5)
+
+        assert json.loads(path.read_text())["features"]["upscale"] == {"seconds": 3.5, "samples": 1}
+        assert RenderTimings(str(path)).snapshot()["features"]["upscale"]["seconds"] == 3.5
+
+    def test_bozuk_dosya_varsayilanlarla_baslar(self, tmp_path):
+        path = tmp_path / "timings.json"
+        path.write_text("{bozuk")
+
+        features = RenderTimings(str(path)).snapshot()["features"]
+        assert {name: entry["seconds"] for name, entry in features.items()} == DEFAULT_ESTIMATES
+
+
+class TestTahmin:
+    def test_kapali_ozellikler_sayilmaz(self, monkeypatch):
+        timings = RenderTimings(None)
+        full = timings.estimate(profile())
+        monkeypatch.setattr(render_budget, "SD_ENABLE_HIRES_FIX", False)
+        monkeypatch.setattr(render_budget, "SD_ENABLE_POST_UPSCALE", False)
+
+        assert timings.estimate(profile()) < full
+        assert timings.estimate(profile()) == timings.estimate(profile(hires=False, post_upscale=False))
+
+
+class TestProfilSecimi:
+    @pytest.fixture
+    def timings(self):
+        timings = RenderTimings(None)
+        timings.record_render(payload(30), 30 * MP * 0.5)  # 15 sn ilk gecis
+        timings.record_render(payload(30, hires=True), 30 * MP * 0.5 + 20.0)  # +20 sn hires
+        timings.record_render(payload(30, adetailer=True), 30 * MP * 0.5 + 6.0)  # +6 sn ADetailer
+        timings.record_upscale(4.0)
+        return timings
+
+    def test_genis_butcede_tam_kalite(self, timings):
+        base = profile()
+        assert choose_profile(60, base=base, timings=timings) is base
+
+    def test_once_ek_gecisler_birakilir(self, timings):
+        chosen = choose_profile(22, base=profile(), timings=timings)
+
+        assert (chosen.hires, chosen.post_upscale, chosen.adetailer) == (False, False, True)
+        assert chosen.steps == 30
+        assert chosen.name == "budget"
+
+    def test_sonra_adimlar_azalir(self, timings):
+        chosen = choose_profile(10, base=profile(), timings=timings)
+
+        assert not (chosen.hires or chosen.post_upscale or chosen.adetailer)
+        assert 12 <= chosen.steps < 30
+        assert timings.estimate(chosen) <= 10
+
+    def test_butce_render_sayisina_bolunur(self, timings):
+        alone = choose_profile(60, base=profile(), timings=timings)
+        shared = choose_profile(60, base=profile(), renders=4, timings=timings)
+
+        assert timings.estimate(shared) <= 15 < timings.estimate(alone)
+
+    def test_sigmayan_butcede_en_ucuz_profil(self, timings):
+        chosen = choose_profile(1, base=profile(), timings=timings)
+        assert chosen == degrade(profile())[-1]
+        assert chosen.steps == render_budget.SD_BUDGET_MIN_STEPS
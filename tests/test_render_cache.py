@@ -0,0 +1,91 @@
+"""
+core/clients/render_cache.py — icerik adresli txt2img cache.
+
+Ayni payload (seed dahil) tekrar cizilmemeli; farkli seed ya da ayar yeni
+anahtar uretmeli. Yas ve boyut siniri eski/az kullanilan dosyalari siler.
+"""
+
+import os
+import time
+
+import pytest
+
+from core.clients.render_cache import RenderCache
+
+
+@pytest.fixture
+def png(tmp_path):
+    def _make(name="src.png", size=100):
+        path = tmp_path / name
+        path.write_bytes(b"\x89PNG" + b"0" * (size - 4))
+        return str(path)
+
+    return _make
+
+
+def make_cache(tmp_path, **kwargs):
+    kwargs.setdefault("enabled", True)
+    return RenderCache(str(tmp_path / "cache"), **kwargs)
+
+
+class TestAnahtar:
+    def test_anahtar_sirasi_onemsiz(self):
+        a = RenderCache.key_for({"prompt": "x", "seed": 1, "steps": 30})
+        b = RenderCache.key_for({"steps": 30, "seed": 1, "prompt": "x"})
+        assert a == b
+
+    def test_seed_anahtari_degistirir(self):
+        assert RenderCache.key_for({"prompt": "x", "seed": 1}) != RenderCache.key_for({"prompt": "x", "seed": 2})
+
+    def test_ic_ice_scriptler_anahtara_girer(self):
+        base = {"prompt": "x", "alwayson_scripts": {"ADetailer": {"args": [True]}}}
+        other = {"prompt": "x", "alwayson_scripts": {"ADetailer": {"args": [False]}}}
+        assert RenderCache.key_for(base) != RenderCache.key_for(other)
+
+
+class TestOkumaYazma:
+    def test_kaydedilen_dosya_geri_doner(self, tmp_path, png):
+        cache = make_cache(tmp_path)
+        stored = cache.put("abc", png())
+
+        assert cache.get("abc") == stored
+        assert os.path.exists(stored)
+
+    def test_olmayan_anahtar_none(self, tmp_path):
+        assert make_cache(tmp_path).get("yok") is None
+
+    def test_kapaliyken_hicbir_sey_saklanmaz(self, tmp_path, png):
+        cache = make_cache(tmp_path, enabled=False)
+
+        assert cache.put("abc", png()) is None
+        assert cache.get("abc") is None
+
+    def test_kaynak_dosya_yoksa_hata_yutulur(self, tmp_path):
+        cache = make_cache(tmp_path)
+        assert cache.put("abc", str(tmp_path / "yok.png")) is None
+
+
+class TestTahliye:
+    def test_eski_kayit_suresi_dolunca_silinir(self, tmp_path, png):
+        cache = make_cache(tmp_path, max_age_seconds=60)
+        stored = cache.put("abc", png())
+        old = time.time() - 120
+        os.utime(stored, (old, old))
+
+        assert cache.get("abc") is None
+        assert not os.path.exists(stored)
+
+    def test_boyut_asilinca_en_az_kullanilan_silinir(self, tmp_path, png):
+        cache = make_cache(tmp_path, max_bytes=250)
+        first = cache.put("a", png("a.png"))
+        second = cache.put("b", png("b.png"))
+        now = time.time()
+        os.utime(first, (now - 100, now))
+        os.utime(second, (now - 50, now))
+        cache.get("a")  # a yeniden kullanildi -> b en eski
+
+        cache.put("c", png("c.png"))
+
+        assert os.path.exists(first)
+        assert not os.path.exists(second)
+        assert cache.get("c")
@@ -0,0 +1,238 @@
+"""
+core/clients/render_progress.py — tek sampler, job'a yazilan canli ilerleme.
+
+Kac render/istemci olursa olsun tek thread Forge'u yoklamali; ornek render'i
+baslatan isin snapshot'ina gitmeli ve render bitince temizlenmeli.
+"""
+
+import base64
+import io
+import threading
+import time
+
+import pytest
+
+from core.clients.forge_client import IDLE_PROGRESS
+from core.clients.render_progress import ProgressSampler, downscale_preview, render_view
+from core.runtime.jobs import Job, bind_job
+
+
+def png_b64(size=(64, 48)) -> str:
+    from PIL import Image
+
+    out = io.BytesIO()
+    Image.new("RGB", size, (200, 40, 40)).save(out, format="PNG")
+    return base64.b64encode(out.getvalue()).decode()
+
+
+class FakeForge:
+    def __init__(self, current_image=None):
+        self.calls = 0
+        self.skip_flags = []
+        self.threads = set()
+        self.current_image = current_image
+
+    def progress(self, *, timeout=2, skip_current_image=False):
+        self.calls += 1
+        self.skip_flags.append(skip_current_image)
+        self.threads.add(threading.current_thread().name)
+        return {
+            "progress": 0.4,
+            "eta_relative": 3.25,
+            "state": {"sampling_step": 12, "sampling_steps": 30, "job_no": 0, "job_count": 1},
+            "current_image": None if skip_current_image else self.current_image,
+        }
+
+
+def wait_until(predicate, timeout=2.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+@pytest.fixture
+def forge():
+    return FakeForge()
+
+
+def make_sampler(forge, **kw):
+    kw.setdefault("interval", 0.05)
+    kw.setdefault("preview", False)
+    return ProgressSampler(client_factory=lambda: forge, **kw)
+
+
+class TestJobIlerlemesi:
+    def test_bagli_ise_yazilir_ve_bitince_temizlenir(self, forge):
+        sampler = make_sampler(forge)
+        job = Job(kind="agent")
+
+        with bind_job(job), sampler.track():
+            assert wait_until(lambda: job.render is not None)
+            assert job.render["step"] == 12
+            assert job.render["steps"] == 30
+            assert job.render["eta_seconds"] == 3.2
+            assert job.to_dict()["render"]["progress"] == 0.4
+
+        assert job.render is None
+        assert job.to_dict()["render"] is None
+
+    def test_acik_job_parametresi(self, forge):
+        sampler = make_sampler(forge)
+        job = Job(kind="video")
+
+        with sampler.track(job):
+            assert wait_until(lambda: job.render is not None)
+
+        assert job.render is None
+
+    def test_bagli_is_yoksa_sadece_snapshot(self, forge):
+        sampler = make_sampler(forge)
+
+        with sampler.track():
+            assert wait_until(lambda: sampler.snapshot()["progress"] == 0.4)
+
+        assert sampler.snapshot() == IDLE_PROGRESS
+
+
+class TestTekThread:
+    def test_ic_ice_renderlar_tek_thread(self, forge):
+        sampler = make_sampler(forge)
+
+        with sampler.track(), sampler.track():
+            assert wait_until(lambda: forge.calls >= 3)
+            assert sampler.active
+
+        assert forge.threads == {"sd-progress-sampler"}
+        assert wait_until(lambda: sampler._thread is None)
+        assert sampler.active is False
+
+    def test_render_yokken_forge_yoklanmaz(self, forge):
+        sampler = make_sampler(forge)
+        with sampler.track():
+            assert wait_until(lambda: forge.calls >= 1)
+        assert wait_until(lambda: sampler._thread is None)
+
+        calls = forge.calls
+        time.sleep(0.15)
+        assert forge.calls == calls
+
+    def test_forge_hatasi_donguyu_durdurmaz(self):
+        class Broken:
+            def progress(self, **kw):
+                raise RuntimeError("down")
+
+        sampler = ProgressSampler(interval=0.05, client_factory=lambda: Broken())
+        with sampler.track():
+            time.sleep(0.1)
+            assert sampler.snapshot()["progress"] == 0
+
+
+class TestOnizleme:
+    def test_onizleme_kucultulur(self):
+        forge = FakeForge(current_image=png_b64((800, 600)))
+        sampler = make_sampler(forge, preview=True, preview_size=64)
+        job = Job(kind="agent")
+
+        with sampler.track(job):
+            assert wait_until(lambda: job.render is not None)
+            preview = job.render["preview"]
+            assert sampler.snapshot()["current_image"] == preview
+
+        from PIL import Image
+
+        raw = base64.b64decode(preview.split(",", 1)[1])
+        assert preview.startswith("data:image/jpeg;base64,")
+        assert max(Image.open(io.BytesIO(raw)).size) == 64
+
+    def test_onizleme_kapaliyken_istenmez(self, forge):
+        sampler = make_sampler(forge, preview=False)
+        with sampler.track():
+            assert wait_until(lambda: forge.calls >= 1)
+        assert set(forge.skip_flags) == {True}
+
+    def test_bozuk_onizleme_none(self):
+        assert downscale_preview("bozuk-veri", 64) is None
+
+    def test_eksik_alanlar_sifir(self):
+        view = render_view({"progress": None, "state": None}, None)
+        assert (view["step"], view["steps"], view["eta_seconds"]) == (0, 0, None)
+
+
+class TestDinleyiciler:
+    def test_dinleyici_ham_ornegi_alir(self):
+        forge = FakeForge(current_image="ham-onizleme")
+        sampler = make_sampler(forge, preview=False)
+        seen = []
+        sampler.add_listener(seen.append)
+
+        with sampler.track():
+            assert wait_until(lambda: seen)
+
+        assert seen[0]["current_image"] == "ham-onizleme"
+        assert sampler.snapshot() == IDLE_PROGRESS
+
+    def test_hatali_dinleyici_sampleri_durdurmaz(self, forge):
+        sampler = make_sampler(forge)
+
+        def broken(sample):
+            raise RuntimeError("boom")
+
+        sampler.add_listener(broken)
+        with sampler.track():
+            assert wait_until(lambda: forge.calls >= 2)
+        sampler.remove_listener(broken)
+        assert sampler._listeners == []
+
+
+class Host(FakeForge):
+    """Lease gibi: kendi adresi ve kendi ilerlemesi olan host."""
+
+    def __init__(self, url, progress):
+        super().__init__(current_image=url)
+        self.base_url = url
+        self.value = progress
+
+    def progress(self, *, timeout=2, skip_current_image=False):
+        return {**super().progress(skip_current_image=skip_current_image), "progress": self.value}
+
+
+class TestHostBasina:
+    def test_her_is_kendi_hostunun_ornegini_gorur(self, forge):
+        sampler = make_sampler(forge)
+        first, second = Host("http://gpu-a", 0.2), Host("http://gpu-b", 0.7)
+        job_a, job_b = Job(kind="video"), Job(kind="carousel")
+
+        with sampler.track(job_a, source=first), sampler.track(job_b, source=second):
+            assert wait_until(lambda: job_a.render is not None and job_b.render is not None)
+            assert (job_a.render["progress"], job_b.render["progress"]) == (0.2, 0.7)
+            snapshot = sampler.snapshot()
+            assert snapshot["progress"] == 0.2
+            assert {url: sample["progress"] for url, sample in snapshot["hosts"].items()} == {
+                "http://gpu-a": 0.2,
+                "http://gpu-b": 0.7,
+            }
+
+        assert forge.calls == 0
+
+    def test_dinleyici_yalnizca_kendi_hostunu_alir(self, forge):
+        sampler = make_sampler(forge)
+        first, second = Host("http://gpu-a", 0.2), Host("http://gpu-b", 0.7)
+        seen = []
+        sampler.add_listener(seen.append, source=second)
+
+        with sampler.track(source=first), sampler.track(source=second):
+            assert wait_until(lambda: len(seen) >= 2)
+
+        assert {sample["current_image"] for sample in seen} == {"http://gpu-b"}
+
+    def test_ayni_hosttaki_renderlar_tek_ornek_paylasir(self, forge):
+        sampler = make_sampler(forge, interval=0.2)
+        host = Host("http://gpu-a", 0.5)
+
+        with sampler.track(source=host), sampler.track(source=Host("http://gpu-a", 0.5)):
+            assert wait_until(lambda: host.calls >= 1)
+            time.sleep(0.05)
+            assert host.calls == 1
@@ -0,0 +1,177 @@
+"""
+core/clients/render_scheduler.py — checkpoint yakinligina gore siralama.
+
+Ayni modelli isler arka arkaya calismali, ardisik ayni model istekleri
+arasinda restore (model geri yukleme) olmamali ve onlenen degisimler
+sayilmali.
+"""
+
+import threading
+import time
+
+import pytest
+
+from core.clients.render_scheduler import RenderScheduler, group_key
+
+
+def payload(checkpoint=None, vae=None, **extra):
+    body = {"prompt": "p", "seed": 1, **extra}
+    override = {"face_restoration_model": "GFPGAN"}
+    if checkpoint:
+        override["sd_model_checkpoint"] = checkpoint
+    if vae:
+        override["sd_vae"] = vae
+    body["override_settings"] = override
+    body["override_settings_restore_afterwards"] = True
+    return body
+
+
+@pytest.fixture
+def scheduler():
+    return RenderScheduler(baseline_checkpoint=lambda: "base.safetensors", max_run=8)
+
+
+def send(scheduler, body):
+    with scheduler.slot(body) as sent:
+        return sent
+
+
+class TestRestore:
+    def test_ayni_model_ardisik_isteklerde_restore_yok(self, scheduler):
+        first = send(scheduler, payload("x.safetensors"))
+        second = send(scheduler, payload("x.safetensors"))
+
+        assert first["override_settings_restore_afterwards"] is False
+        assert second["override_settings"]["sd_model_checkpoint"] == "x.safetensors"
+        stats = scheduler.stats()
+        assert stats["model_swaps"] == 1
+        assert stats["legacy_model_swaps"] == 4
+        assert stats["swaps_avoided"] == 3
+        assert stats["loaded_checkpoint"] == "x.safetensors"
+
+    def test_override_siz_istek_varsayilani_acikca_ister(self, scheduler):
+        send(scheduler, payload("x.safetensors"))
+        plain = send(scheduler, payload())
+
+        assert plain["override_settings"]["sd_model_checkpoint"] == "base.safetensors"
+        assert plain["override_settings"]["face_restoration_model"] == "GFPGAN"
+        assert scheduler.stats()["loaded_checkpoint"] == "base.safetensors"
+        # Forge varsayilanina dondu; sonraki override'siz istek dokunulmadan gider.
+        untouched = payload()
+        assert send(scheduler, untouched) is untouched
+
+    def test_varsayilan_bilinmiyorsa_eski_davranis(self):
+        scheduler = RenderScheduler(baseline_checkpoint=lambda: None)
+        body = payload("x.safetensors")
+
+        assert send(scheduler, body) is body
+        assert scheduler.stats()["swaps_avoided"] == 0
+
+    def test_vae_override_restore_ile_gider(self, scheduler):
+        sent = send(scheduler, payload(vae="other.vae"))
+
+        assert sent["override_settings_restore_afterwards"] is True
+        assert sent["override_settings"]["sd_model_checkpoint"] == "base.safetensors"
+        assert scheduler.stats()["loaded_checkpoint"] == "base.safetensors"
+
+
+def hold_slot(scheduler, body):
+    """Slot'u tutan bir thread; release.set() ile birakir."""
+    entered, release = threading.Event(), threading.Event()
+
+    def run():
+        with scheduler.slot(body):
+            entered.set()
+            release.wait(2)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    assert entered.wait(2)
+    return thread, release
+
+
+def enqueue(scheduler, body, name, order):
+    def run():
+        with scheduler.slot(body):
+            order.append(name)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    deadline = time.time() + 2
+    while scheduler.stats()["queued"] < enqueue.expected and time.time() < deadline:
+        time.sleep(0.005)
+    return thread
+
+
+class TestSiralama:
+    def run_queue(self, scheduler, running, queued):
+        order = []
+        holder, release = hold_slot(scheduler, running)
+        threads = []
+        for i, (name, body) in enumerate(queued, start=1):
+            enqueue.expected = i
+            threads.append(enqueue(scheduler, body, name, order))
+        release.set()
+        for thread in [holder, *threads]:
+            thread.join(2)
+        return order
+
+    def test_yuklu_model_one_gecer(self, scheduler):
+        order = self.run_queue(
+            scheduler,
+            payload("x.safetensors"),
+            [("y", payload("y.safetensors")), ("x", payload("x.safetensors"))],
+        )
+
+        assert order == ["x", "y"]
+        assert scheduler.stats()["reordered"] == 1
+
+    def test_art_arda_siniri_acligi_onler(self):
+        scheduler = RenderScheduler(baseline_checkpoint=lambda: "base", max_run=2)
+        order = self.run_queue(
+            scheduler,
+            payload("x"),
+            [("y", payload("y")), ("x1", payload("x")), ("x2", payload("x"))],
+        )
+
+        assert order == ["x1", "y", "x2"]
+
+    def test_toplu_sira_yuklu_modelle_baslar(self, scheduler):
+        send(scheduler, payload("x"))
+        bodies = [payload("y"), payload("x"), payload("y"), payload("z"), payload("x")]
+
+        assert scheduler.order(bodies) == [1, 4, 0, 2, 3]
+
+    def test_hires_ayarlari_anahtara_girer(self):
+        low = payload("x", enable_hr=True, hr_scale=1.3)
+        high = payload("x", enable_hr=True, hr_scale=2.0)
+        assert group_key(low) != group_key(high)
+        assert group_key(payload("x", hr_scale=2.0)) == group_key(payload("x"))
+
+
+class TestKapasite:
+    def test_host_sayisi_kadar_paralel_slot(self):
+        scheduler = RenderScheduler(baseline_checkpoint=lambda: "base", capacity=lambda: 2)
+        entered = threading.Event()
+
+        def third():
+            with scheduler.slot(payload("z")):
+                entered.set()
+
+        with scheduler.slot(payload("x")), scheduler.slot(payload("y")):
+            assert scheduler.stats()["running"] == 2
+            thread = threading.Thread(target=third, daemon=True)
+            thread.start()
+            assert not entered.wait(0.1)
+        thread.join(2)
+
+        assert entered.is_set()
+        assert scheduler.stats()["running"] == 0
+
+    def test_havuzda_checkpoint_her_istekte_acik(self):
+        scheduler = RenderScheduler(baseline_checkpoint=lambda: "base", capacity=lambda: 2)
+        send(scheduler, payload("x"))
+        plain = send(scheduler, payload())
+
+        assert plain["override_settings"]["sd_model_checkpoint"] == "base"
+        assert plain["override_settings_restore_afterwards"] is False
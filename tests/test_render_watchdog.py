@@ -0,0 +1,139 @@
+"""
+core/clients/render_watchdog.py — bozuk onizlemede render'i erken kesme.
+
+Siyah, duz, gurultulu veya ortadan bolunmus onizlemeler yakalanmali; normal
+bir goruntu ve erken adimlardaki onizlemeler render'i kesmemeli.
+"""
+
+import base64
+import io
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from core.clients.render_progress import ProgressSampler  # noqa: E402
+from core.clients.render_watchdog import RenderWatchdog, analyze, inspect_image, watch_render  # noqa: E402
+
+
+def scene(size=96, seed=3):
+    """Yumusak gecisli, dokulu 'normal' bir sahne."""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:size, 0:size] / size
+    base = np.stack([0.3 + 0.4 * x, 0.25 + 0.5 * y * (1 - x), 0.5 - 0.3 * y], axis=-1)
+    blobs = 0.08 * np.sin(x[..., None] * 9 + y[..., None] * 5 + np.array([0, 1, 2]))
+    return np.clip(base + blobs + rng.normal(0, 0.01, base.shape), 0, 1).astype(np.float32)
+
+
+def as_b64(rgb) -> str:
+    from PIL import Image
+
+    out = io.BytesIO()
+    Image.fromarray((rgb * 255).astype(np.uint8)).save(out, format="PNG")
+    return base64.b64encode(out.getvalue()).decode()
+
+
+class TestAnaliz:
+    def test_normal_sahne_gecer(self):
+        assert analyze(scene()) is None
+
+    def test_siyah_kare(self):
+        assert analyze(np.zeros((64, 64, 3), dtype=np.float32)) == "black"
+
+    def test_duz_kare(self):
+        assert analyze(np.full((64, 64, 3), 0.5, dtype=np.float32)) == "flat"
+
+    def test_gurultu(self):
+        rng = np.random.default_rng(0)
+        noise = rng.random((64, 64, 1)).repeat(3, axis=2).astype(np.float32)
+        assert analyze(noise) == "noise"
+
+    def test_ortadan_bolunmus(self):
+        # Soldan saga kararan ayni panel iki kez: ortada sert dikis, yarilar ayni.
+        half = np.clip(scene(size=48) * np.linspace(1.4, 0.5, 48)[None, :, None], 0, 1).astype(np.float32)
+        assert analyze(np.concatenate([half, half], axis=1)) == "split"
+
+    def test_simetrik_sahne_bolunmus_sayilmaz(self):
+        """Ortalanmis ozne + duz arka plan: yarilar benzer ama dikis yok."""
+        y, x = np.mgrid[0:96, 0:96] / 96
+        background = np.stack([0.2 + 0.5 * y, 0.3 + 0.3 * y, 0.6 - 0.3 * y], axis=-1)
+        subject = np.exp(-((x - 0.5) ** 2 + (y - 0.55) ** 2) / 0.005)[..., None] * np.array([0.5, 0.3, 0.1])
+        rgb = np.clip(background + subject, 0, 1).astype(np.float32)
+
+        assert analyze(rgb) is None
+
+    def test_farkli_yarilar_tek_basina_bolunme_degil(self):
+        left, right = scene(seed=1)[:, :48], scene(seed=2)[:, 48:] * 0.35
+        assert analyze(np.concatenate([left, right], axis=1)) is None
+
+    def test_tekrar_eden_paneller(self):
+        half = scene(size=48)
+        panel = np.concatenate([half, half], axis=1)
+        assert analyze(np.concatenate([panel, panel], axis=0)) == "split"
+
+
+def sample(rgb, progress=0.6):
+    return {"progress": progress, "state": {}, "current_image": as_b64(rgb)}
+
+
+class TestGozcu:
+    def test_art_arda_sorunda_bir_kez_keser(self):
+        calls = []
+        watchdog = RenderWatchdog(lambda: calls.append(1), min_progress=0.3, strikes=2)
+        black = np.zeros((64, 64, 3), dtype=np.float32)
+
+        watchdog.observe(sample(black))
+        assert calls == []
+        watchdog.observe(sample(black))
+        watchdog.observe(sample(black))
+
+        assert calls == [1]
+        assert watchdog.tripped == "black"
+
+    def test_saglam_ornek_seriyi_sifirlar(self):
+        calls = []
+        watchdog = RenderWatchdog(lambda: calls.append(1), min_progress=0.0, strikes=2)
+        black = np.zeros((64, 64, 3), dtype=np.float32)
+
+        for rgb in (black, scene(), black, scene()):
+            watchdog.observe(sample(rgb))
+
+        assert calls == []
+        assert watchdog.tripped is None
+
+    def test_erken_adimlar_degerlendirilmez(self):
+        calls = []
+        watchdog = RenderWatchdog(lambda: calls.append(1), min_progress=0.5, strikes=1)
+        watchdog.observe(sample(np.zeros((64, 64, 3), dtype=np.float32), progress=0.2))
+        assert calls == []
+
+    def test_onizleme_yoksa_bir_sey_yapmaz(self):
+        watchdog = RenderWatchdog(lambda: None, min_progress=0.0, strikes=1)
+        watchdog.observe({"progress": 0.9, "current_image": None})
+        assert watchdog.tripped is None
+
+    def test_blok_bitince_dinleyici_kalkar(self):
+        sampler = ProgressSampler(client_factory=lambda: None)
+        with watch_render(lambda: None, sampler=sampler, enabled=True) as watchdog:
+            assert watchdog is not None
+            assert len(sampler._listeners) == 1
+        assert sampler._listeners == []
+
+    def test_kapaliyken_none(self):
+        with watch_render(lambda: None, enabled=False) as watchdog:
+            assert watchdog is None
+
+
+class TestTaslakDenetimi:
+    def test_diskteki_siyah_kare_reddedilir(self, tmp_path):
+        from PIL import Image
+
+        black = tmp_path / "black.png"
+        Image.new("RGB", (256, 256), (0, 0, 0)).save(black)
+        assert inspect_image(str(black)) == "black"
+
+    def test_okunamayan_dosya_onaylanir(self, tmp_path):
+        broken = tmp_path / "broken.png"
+        broken.write_bytes(b"not-a-png")
+        assert inspect_image(str(broken)) is None
+        assert inspect_image(None) is None
@@ -184,6 +184,34 @@ class TestHataDurumu:
             agent._execute(make_state([news("Some ordinary headline")]))
 
 
+class TestOncedenAnaliz:
+    """NewsAgent combined modunda risk puani habere yazilir; RiskAgent LLM'e sormaz."""
+
+    def test_hazir_analiz_varsa_llm_cagrilmaz(self, fake_llm):
+        llm = fake_llm(responses=[])
+        item = {**news("Parliament debates budget"), "risk_analysis": {"risk_score": 2, "categories": ["Politics"]}}
+
+        state = RiskAgent(llm)._execute(make_state([item]))
+
+        assert llm.calls == []
+        assert len(state.safe_news_items) == 1
+        assert state.risk_analysis["Parliament debates budget"] == {"score": 2, "reason": ["politics"]}
+
+    def test_hazir_analizde_de_kategori_esigi_uygulanir(self, fake_llm):
+        item = {**news("Celebrity gossip"), "risk_analysis": {"risk_score": 3, "categories": ["adult"]}}
+
+        state = RiskAgent(fake_llm(responses=[]))._execute(make_state([item]))
+
+        assert state.safe_news_items == []
+
+    def test_hazir_analiz_blacklisti_atlatamaz(self, fake_llm):
+        item = {**news("Bomb threat at airport"), "risk_analysis": {"risk_score": 0, "categories": []}}
+
+        state = RiskAgent(fake_llm(responses=[]))._execute(make_state([item]))
+
+        assert state.safe_news_items == []
+
+
 def test_bos_haber_listesi_cokmez(fake_llm):
     agent = RiskAgent(fake_llm(responses=[]))
     state = agent._execute(make_state([]))
@@ -0,0 +1,703 @@
+"""
+core/clients/sd_client.py — toplu txt2img (resim_ciz_batch).
+
+Carousel ve video eskiden her gorsel icin ayri bir txt2img istegi atiyordu.
+Bu testler ayni ayarlara sahip promptlarin tek istekte gittigini, script
+yoksa tek tek cizime dusuldugunu ve bir gorselin hatasinin digerlerini
+etkilemedigini dogrular. Forge'a gercek istek atilmaz; cevaplar akisla
+(iter_content) dosyaya cozulur.
+"""
+
+import base64
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from core.clients import prompt_index, render_budget, sd_client
+from core.clients.feature_breaker import FeatureBreaker
+from core.clients.prompt_index import PromptIndex
+from core.clients.render_budget import RenderTimings
+from core.clients.render_cache import RenderCache
+from core.clients.render_profile import DRAFT_PROFILE, FULL_PROFILE
+from core.clients.render_scheduler import RenderScheduler
+
+
+class StreamResponse:
+    """stream=True ile alinmis requests cevabi gibi davranir."""
+
+    def __init__(self, payload, chunk=7):
+        self._body = json.dumps(payload).encode()
+        self._chunk = chunk
+        self.closed = False
+
+    def iter_content(self, chunk_size=None):
+        for i in range(0, len(self._body), self._chunk):
+            yield self._body[i : i + self._chunk]
+
+    def close(self):
+        self.closed = True
+
+
+def b64(text):
+    return base64.b64encode(text.encode()).decode()
+
+
+@pytest.fixture
+def forge(monkeypatch, tmp_path):
+    """Yetenek onbellegini doldurur, POST ve kaydetme adimlarini kaydeder."""
+    state = {"scripts": [sd_client.PROMPT_LIST_SCRIPT], "posts": [], "single": [], "upscaled": []}
+    counter = iter(range(1, 1000))
+
+    monkeypatch.setitem(sd_client._CAPABILITY_CACHE, "checked_at", time.time())
+    monkeypatch.setitem(sd_client._CAPABILITY_CACHE, "upscalers", [])
+    monkeypatch.setitem(sd_client._CAPABILITY_CACHE, "face_restorers", [])
+    monkeypatch.setitem(sd_client._CAPABILITY_CACHE, "controlnet_models", [])
+    monkeypatch.setattr(sd_client, "_list_txt2img_scripts", lambda: list(state["scripts"]))
+
+    def fake_post(*, path, payload, timeout, cancel_checker, stream=False):
+        state["posts"].append(payload)
+        lines = payload["script_args"][3].split("\n")
+        images = [b64(f"img-{i}") for i in range(len(lines))]
+        for i in state.get("broken", ()):
+            images[i] = "abc"  # gecersiz base64 dolgusu
+        return StreamResponse({"images": images, "info": "{}"})
+
+    def fake_single(prompt_en, **kwargs):
+        state["single"].append(prompt_en)
+        return True, f"/tmp/single-{len(state['single'])}.png", prompt_en
+
+    monkeypatch.setattr(sd_client, "_post_with_cancel", fake_post)
+    monkeypatch.setattr(sd_client, "_allocate_image_path", lambda: str(tmp_path / f"atlas_{next(counter):03d}.png"))
+    monkeypatch.setattr(sd_client, "_upscale_image_file", lambda path, **kw: state["upscaled"].append(path))
+    monkeypatch.setattr(sd_client, "resim_ciz", fake_single)
+    return state
+
+
+def read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+PROMPTS = ["a quiet harbor at dawn", "a mountain road in fog", "an empty library hall"]
+
+
+class TestTopluIstek:
+    def test_ayni_ayarlar_tek_istekte_gider(self, forge):
+        results = sd_client.resim_ciz_batch(PROMPTS)
+
+        assert len(forge["posts"]) == 1
+        assert forge["posts"][0]["script_name"] == sd_client.PROMPT_LIST_SCRIPT
+        assert forge["posts"][0]["prompt"] == ""
+        assert [read(r[1]) for r in results] == [b"img-0", b"img-1", b"img-2"]
+        assert all(r[0] for r in results)
+
+    def test_her_gorsel_upscale_edilir(self, forge):
+        results = sd_client.resim_ciz_batch(PROMPTS)
+        assert forge["upscaled"] == [r[1] for r in results]
+
+    def test_sonuc_sirasi_ve_geri_cagirim(self, forge):
+        seen = []
+        sd_client.resim_ciz_batch(PROMPTS, on_result=lambda i, r: seen.append(i))
+
+        assert seen == [0, 1, 2]
+
+    def test_izgara_gorseli_atlanir(self, forge, monkeypatch, tmp_path):
+        def with_grid(*, path, payload, timeout, cancel_checker, stream=False):
+            return StreamResponse({"images": [b64("grid"), b64("img-0"), b64("img-1"), b64("img-2")]})
+
+        monkeypatch.setattr(sd_client, "_post_with_cancel", with_grid)
+        results = sd_client.resim_ciz_batch(PROMPTS)
+
+        assert [read(r[1]) for r in results] == [b"img-0", b"img-1", b"img-2"]
+        assert len(list(tmp_path.glob("atlas_*.png"))) == 3
+
+
+class TestGeriDusme:
+    def test_script_yoksa_tek_tek_cizilir(self, forge):
+        forge["scripts"] = []
+        results = sd_client.resim_ciz_batch(PROMPTS)
+
+        assert forge["posts"] == []
+        assert forge["single"] == PROMPTS
+        assert all(r[0] for r in results)
+
+    def test_eksik_gorsel_donerse_tek_tek_cizilir(self, forge, monkeypatch, tmp_path):
+        monkeypatch.setattr(
+            sd_client,
+            "_post_with_cancel",
+            lambda **kw: StreamResponse({"images": [b64("img-0")]}),
+        )
+        sd_client.resim_ciz_batch(PROMPTS)
+
+        assert forge["single"] == PROMPTS
+        assert list(tmp_path.glob("atlas_*.png")) == []
+
+    def test_yarim_cevap_tek_tek_cizime_duser(self, forge, monkeypatch):
+        class Truncated(StreamResponse):
+            def iter_content(self, chunk_size=None):
+                yield self._body[: len(self._body) // 2]
+
+        monkeypatch.setattr(
+            sd_client,
+            "_post_with_cancel",
+            lambda **kw: Truncated({"images": [b64("img-0"), b64("img-1"), b64("img-2")]}),
+        )
+        sd_client.resim_ciz_batch(PROMPTS)
+
+        assert forge["single"] == PROMPTS
+
+    def test_tek_prompt_toplu_istek_acmaz(self, forge):
+        sd_client.resim_ciz_batch(PROMPTS[:1])
+
+        assert forge["posts"] == []
+        assert forge["single"] == PROMPTS[:1]
+
+
+class TestHataIzolasyonu:
+    def test_cozulemeyen_gorsel_digerlerini_bozmaz(self, forge):
+        forge["broken"] = {1}
+        results = sd_client.resim_ciz_batch(PROMPTS)
+
+        assert [r[0] for r in results] == [True, False, True]
+
+    def test_bos_prompt_basarisiz_doner(self, forge):
+        results = sd_client.resim_ciz_batch(["", *PROMPTS[:2]])
+
+        assert results[0] == (False, None, None)
+        assert results[1][0] and results[2][0]
+
+
+class TestSeedVeCache:
+    def test_seed_satir_bazinda_gonderilir(self, forge):
+        sd_client.resim_ciz_batch(PROMPTS[:2], seeds=[11, 22])
+
+        lines = forge["posts"][0]["script_args"][3].split("\n")
+        assert lines[0].endswith("--seed 11")
+        assert lines[1].endswith("--seed 22")
+        assert lines[0].startswith("--prompt '")
+
+    def test_farkli_seedler_ayni_istekte_kalir(self, forge):
+        sd_client.resim_ciz_batch(PROMPTS, seeds=[1, 2, 3])
+        assert len(forge["posts"]) == 1
+
+    def test_seed_for_kararli(self):
+        assert sd_client.seed_for("harbor") == sd_client.seed_for("harbor")
+        assert sd_client.seed_for("harbor") != sd_client.seed_for("road")
+        assert 0 <= sd_client.seed_for("harbor") <= sd_client.SEED_MAX
+
+    def test_ayni_istek_ikinci_kez_cachetan_gelir(self, forge, monkeypatch, tmp_path):
+        cache = RenderCache(str(tmp_path / "cache"), enabled=True)
+        monkeypatch.setattr(sd_client, "get_render_cache", lambda: cache)
+
+        first = sd_client.resim_ciz_batch(PROMPTS[:2], seeds=[5, 6])
+        second = sd_client.resim_ciz_batch(PROMPTS[:2], seeds=[5, 6])
+
+        assert len(forge["posts"]) == 1
+        assert all(r[0] for r in second)
+        assert [r[1] for r in second] != [r[1] for r in first]
+        assert all(r[1].startswith(cache.root) for r in second)
+
+    def test_cache_atlanabilir(self, forge, monkeypatch, tmp_path):
+        cache = RenderCache(str(tmp_path / "cache"), enabled=True)
+        monkeypatch.setattr(sd_client, "get_render_cache", lambda: cache)
+
+        sd_client.resim_ciz_batch(PROMPTS[:2], seeds=[5, 6])
+        sd_client.resim_ciz_batch(PROMPTS[:2], seeds=[5, 6], use_cache=False)
+
+        assert len(forge["posts"]) == 2
+
+
+@pytest.fixture
+def upscale_on(monkeypatch):
+    monkeypatch.setattr(sd_client, "SD_ENABLE_POST_UPSCALE", True)
+    monkeypatch.setattr(sd_client, "SD_POST_UPSCALE_FACTOR", 1.5)
+    monkeypatch.setattr(sd_client, "_pick_post_upscaler", lambda: "4x-UltraSharp")
+
+
+class TestUpscaleDosyasi:
+    def test_upscale_ayni_dosyanin_yerine_yazilir(self, upscale_on, monkeypatch, tmp_path):
+        target = tmp_path / "atlas_001.png"
+        target.write_bytes(b"raw")
+        sent = {}
+
+        def fake_post(*, path, payload, timeout, cancel_checker, stream=False):
+            sent["image"] = payload["image"]
+            return StreamResponse({"image": b64("upscaled"), "html_info": ""})
+
+        monkeypatch.setattr(sd_client, "_post_with_cancel", fake_post)
+        sd_client._upscale_image_file(str(target), cancel_checker=None)
+
+        assert base64.b64decode(sent["image"]) == b"raw"
+        assert target.read_bytes() == b"upscaled"
+        assert list(tmp_path.glob("*.tmp")) == []
+
+    def test_upscale_hatasinda_orijinal_kalir(self, upscale_on, monkeypatch, tmp_path):
+        target = tmp_path / "atlas_001.png"
+        target.write_bytes(b"raw")
+
+        monkeypatch.setattr(sd_client, "_post_with_cancel", lambda **kw: StreamResponse({"error": "oom"}))
+        sd_client._upscale_image_file(str(target), cancel_checker=None)
+
+        assert target.read_bytes() == b"raw"
+        assert list(tmp_path.glob("*.tmp")) == []
+
+
+class TestTekCizim:
+    def test_sadece_ilk_gorsel_yazilir(self, monkeypatch, tmp_path):
+        """ControlNet detect map'leri images listesinin sonuna ekler."""
+        monkeypatch.setitem(sd_client._CAPABILITY_CACHE, "checked_at", time.time())
+        monkeypatch.setattr(sd_client, "_allocate_image_path", lambda: str(tmp_path / "atlas_001.png"))
+        monkeypatch.setattr(sd_client, "_upscale_image_file", lambda path, **kw: None)
+        monkeypatch.setattr(
+            sd_client,
+            "_post_with_cancel",
+            lambda **kw: StreamResponse({"images": [b64("render"), b64("detect-map")], "info": "{}"}),
+        )
+
+        ok, path, _ = sd_client.resim_ciz("a quiet harbor at dawn", seed=1)
+
+        assert ok
+        assert read(path) == b"render"
+        assert [p.name for p in tmp_path.iterdir()] == ["atlas_001.png"]
+
+    def test_gozcu_keserse_basarisiz_doner_ve_dosya_silinir(self, monkeypatch, tmp_path):
+        """Yarim kalan gorsel saklanmaz; base payload denenmez, cagiran yedek prompt'a gecer."""
+        import contextlib
+
+        posts = []
+
+        class Tripped:
+            tripped = "black"
+
+        monkeypatch.setitem(sd_client._CAPABILITY_CACHE, "checked_at", time.time())
+        monkeypatch.setattr(sd_client, "_allocate_image_path", lambda: str(tmp_path / "atlas_001.png"))
+        monkeypatch.setattr(sd_client, "watch_render", lambda on_trip, **_kw: contextlib.nullcontext(Tripped()))
+        monkeypatch.setattr(
+            sd_client,
+            "_post_with_cancel",
+            lambda **kw: posts.append(kw) or StreamResponse({"images": [b64("partial")], "info": "{}"}),
+        )
+
+        assert sd_client.resim_ciz("a quiet harbor at dawn", seed=1) == (False, None, None)
+        assert len(posts) == 1
+        assert list(tmp_path.iterdir()) == []
+
+    def test_checkpoint_override_siralayicidan_gecer(self, monkeypatch, tmp_path):
+        posts = []
+        scheduler = RenderScheduler(baseline_checkpoint=lambda: "base.safetensors")
+        monkeypatch.setitem(sd_client._CAPABILITY_CACHE, "checked_at", time.time())
+        monkeypatch.setattr(sd_client, "get_render_scheduler", lambda: scheduler)
+        monkeypatch.setattr(sd_client, "_note_checkpoint", lambda checkpoint: None)
+        monkeypatch.setattr(sd_client, "_allocate_image_path", lambda: str(tmp_path / f"atlas_{len(posts)}.png"))
+        monkeypatch.setattr(sd_client, "_upscale_image_file", lambda path, **kw: None)
+        monkeypatch.setattr(
+            sd_client,
+            "_post_with_cancel",
+            lambda **kw: posts.append(kw["payload"]) or StreamResponse({"images": [b64("r")], "info": "{}"}),
+        )
+
+        sd_client.resim_ciz("a quiet harbor", model_checkpoint="x.safetensors", seed=1, use_cache=False)
+        sd_client.resim_ciz("a quiet harbor", seed=1, use_cache=False)
+
+        assert posts[0]["override_settings_restore_afterwards"] is False
+        assert posts[1]["override_settings"]["sd_model_checkpoint"] == "base.safetensors"
+        assert scheduler.stats()["model_swaps"] == 2
+
+
+@pytest.fixture
+def single(monkeypatch, tmp_path):
+    """Tek gorsellik POST'lari kaydeder; her cevap bir PNG dosyasina yazilir."""
+    state = {"posts": [], "upscaled": []}
+    counter = iter(range(1, 1000))
+    monkeypatch.setitem(sd_client._CAPABILITY_CACHE, "checked_at", time.time())
+    monkeypatch.setattr(sd_client, "_build_adetailer_alwayson", lambda **kw: {"ADetailer": {"args": []}})
+    monkeypatch.setattr(sd_client, "_allocate_image_path", lambda: str(tmp_path / f"atlas_{next(counter):03d}.png"))
+    monkeypatch.setattr(sd_client, "_upscale_image_file", lambda path, **kw: state["upscaled"].append(path))
+
+    def fake_post(*, path, payload, timeout, cancel_checker, stream=False):
+        state["posts"].append((path, payload))
+        return StreamResponse({"images": [b64(f"render-{len(state['posts'])}")], "info": "{}"})
+
+    monkeypatch.setattr(sd_client, "_post_with_cancel", fake_post)
+    return state
+
+
+class TestTaslakModu:
+    def test_taslak_hizli_ve_eksiz(self, single):
+        ok, path, _ = sd_client.resim_ciz("a quiet harbor", seed=7, profile=DRAFT_PROFILE)
+
+        endpoint, payload = single["posts"][0]
+        assert ok and endpoint == "/sdapi/v1/txt2img"
+        assert (payload["width"], payload["steps"]) == (DRAFT_PROFILE.width, DRAFT_PROFILE.steps)
+        assert "alwayson_scripts" not in payload
+        assert "enable_hr" not in payload
+        assert single["upscaled"] == []
+
+    def test_tam_kalite_varsayilan(self, single):
+        sd_client.resim_ciz("a quiet harbor", seed=7)
+
+        _, payload = single["posts"][0]
+        assert (payload["width"], payload["steps"]) == (FULL_PROFILE.width, FULL_PROFILE.steps)
+        assert "ADetailer" in payload["alwayson_scripts"]
+        assert len(single["upscaled"]) == 1
+
+    def test_finalize_ayni_seedle_img2img(self, single, monkeypatch):
+        monkeypatch.setattr(sd_client, "SD_ENABLE_HIRES_FIX", True)
+        _, draft, _ = sd_client.resim_ciz("a quiet harbor", seed=7, profile=DRAFT_PROFILE)
+
+        ok, final, _ = sd_client.finalize_draft(draft, "a quiet harbor", seed=7)
+
+        endpoint, payload = single["posts"][-1]
+        assert ok and final != draft
+        assert endpoint == "/sdapi/v1/img2img"
+        assert payload["seed"] == 7
+        assert payload["init_images"] == [base64.b64encode(read(draft)).decode()]
+        assert payload["width"] == FULL_PROFILE.width
+        assert payload["denoising_strength"] == sd_client.SD_FINALIZE_DENOISE
+        assert "enable_hr" not in payload
+        assert "ADetailer" in payload["alwayson_scripts"]
+        assert single["upscaled"] == [final]
+
+    def test_taslak_dosyasi_yoksa_finalize_basarisiz(self, single, tmp_path):
+        assert sd_client.finalize_draft(str(tmp_path / "yok.png"), "a harbor", seed=1) == (False, None, None)
+        assert single["posts"] == []
+
+    def test_discard_cache_kopyasini_silmez(self, monkeypatch, tmp_path):
+        cache = RenderCache(str(tmp_path / "cache"), max_bytes=10**6, max_age_seconds=0, enabled=True)
+        monkeypatch.setattr(sd_client, "get_render_cache", lambda: cache)
+        cached = tmp_path / "cache" / "abc.png"
+        cached.parent.mkdir()
+        cached.write_bytes(b"x")
+        draft = tmp_path / "atlas_001.png"
+        draft.write_bytes(b"y")
+
+        sd_client.discard_draft(str(cached))
+        sd_client.discard_draft(str(draft))
+
+        assert cached.exists()
+        assert not draft.exists()
+
+
+class TestSureButcesi:
+    @pytest.fixture
+    def timed(self, single, monkeypatch):
+        """Sahte saat: her Forge istegi 20 sn, her upscale 5 sn surer."""
+        clock = {"now": 0.0}
+        timings = RenderTimings(None, clock=lambda: clock["now"])
+        monkeypatch.setattr(render_budget, "_DEFAULT_TIMINGS", timings)
+        monkeypatch.setattr(render_budget, "SD_ENABLE_ADDETAILER", True)
+        monkeypatch.setattr(render_budget, "SD_ENABLE_POST_UPSCALE", True)
+        monkeypatch.setattr(render_budget, "SD_POST_UPSCALE_FACTOR", 1.15)
+        post = sd_client._post_with_cancel
+
+        def slow_post(**kwargs):
+            clock["now"] += 20.0
+            return post(**kwargs)
+
+        def slow_upscale(path, **kwargs):
+            clock["now"] += 5.0
+            timings.record_upscale(5.0)
+            single["upscaled"].append(path)
+
+        monkeypatch.setattr(sd_client, "_post_with_cancel", slow_post)
+        monkeypatch.setattr(sd_client, "_upscale_image_file", slow_upscale)
+        return timings
+
+    def test_gercek_sureler_kaydedilir(self, single, timed):
+        sd_client.resim_ciz("a quiet harbor", seed=1, profile=DRAFT_PROFILE)
+
+        step = timed.snapshot()["features"]["step"]
+        megapixels = DRAFT_PROFILE.width * DRAFT_PROFILE.height / 1_000_000
+        assert step["samples"] == 1
+        assert step["seconds"] == pytest.approx(20.0 / (DRAFT_PROFILE.steps * megapixels), abs=1e-3)
+
+    def test_butce_olcumlere_gore_profili_kisar(self, single, timed):
+        sd_client.resim_ciz("a quiet harbor", seed=1, profile=DRAFT_PROFILE)
+        sd_client.resim_ciz("a quiet harbor", seed=2)  # ADetailer + upscale olculur
+
+        sd_client.resim_ciz("a quiet harbor", seed=3, budget=timed.estimate(FULL_PROFILE) + 1)
+        sd_client.resim_ciz("a quiet harbor", seed=4, budget=timed.estimate(FULL_PROFILE) / 2)
+
+        roomy, tight = single["posts"][-2][1], single["posts"][-1][1]
+        assert roomy["steps"] == FULL_PROFILE.steps and "alwayson_scripts" in roomy
+        assert tight["steps"] < FULL_PROFILE.steps and "alwayson_scripts" not in tight
+        assert len(single["upscaled"]) == 2
+
+    def test_toplu_butce_tum_promptlara_bolunur(self, single, timed, monkeypatch):
+        monkeypatch.setattr(sd_client, "_list_txt2img_scripts", lambda: [])
+        sd_client.resim_ciz("a quiet harbor", seed=1, profile=DRAFT_PROFILE)
+
+        sd_client.resim_ciz_batch(PROMPTS, budget=timed.estimate(FULL_PROFILE))
+
+        assert all(payload["steps"] < FULL_PROFILE.steps for _, payload in single["posts"][1:])
+
+
+class TestPromptYenidenKullanimi:
+    MARS = "photorealistic documentary scene of a Mars rover crossing red dunes at dusk"
+    MARS_AGAIN = "photorealistic documentary scene of the Mars rover crossing red dunes at dusk, wide shot"
+
+    @pytest.fixture
+    def index(self, monkeypatch):
+        index = PromptIndex(None)
+        monkeypatch.setattr(prompt_index, "_DEFAULT_INDEX", index)
+        monkeypatch.setattr(sd_client, "SD_PROMPT_REUSE_THRESHOLD", 0.6)
+        return index
+
+    def test_kapaliyken_yine_cizer_ama_indeksler(self, single, index):
+        sd_client.resim_ciz(self.MARS, seed=1)
+        sd_client.resim_ciz(self.MARS_AGAIN, seed=2)
+
+        assert len(single["posts"]) == 2
+        assert len(index) == 2
+
+    def test_kalite_ankraji_indekse_girmez(self, single, index):
+        sd_client.resim_ciz(self.MARS, seed=1)
+        assert index.find("balanced exposure clean background continuity", threshold=0.2) is None
+
+    def test_reuse_onceki_gorselin_kopyasini_doner(self, single, index):
+        _, original, _ = sd_client.resim_ciz(self.MARS, seed=1)
+
+        ok, path, _ = sd_client.resim_ciz(self.MARS_AGAIN, seed=2, reuse="reuse")
+
+        assert ok and path != original
+        assert read(path) == read(original)
+        assert len(single["posts"]) == 1
+
+    def test_init_img2img_baslangici_olur(self, single, index):
+        _, original, _ = sd_client.resim_ciz(self.MARS, seed=1)
+
+        ok, path, _ = sd_client.resim_ciz(self.MARS_AGAIN, seed=2, reuse="init")
+
+        endpoint, payload = single["posts"][-1]
+        assert ok and path != original
+        assert endpoint == "/sdapi/v1/img2img"
+        assert payload["init_images"] == [base64.b64encode(read(original)).decode()]
+        assert payload["denoising_strength"] == sd_client.SD_PROMPT_REUSE_DENOISE
+        assert payload["seed"] == 2
+
+    def test_taslak_tam_kaliteyle_karsilanir_tersi_olmaz(self, single, index):
+        sd_client.resim_ciz(self.MARS, seed=1, profile=DRAFT_PROFILE)
+        sd_client.resim_ciz(self.MARS_AGAIN, seed=2, reuse="reuse")
+        assert len(single["posts"]) == 2
+
+        sd_client.resim_ciz(self.MARS, seed=3, profile=DRAFT_PROFILE, reuse="reuse")
+        assert len(single["posts"]) == 2
+
+    def test_toplu_cizimde_eslesen_prompt_gonderilmez(self, single, index, monkeypatch):
+        monkeypatch.setattr(sd_client, "_list_txt2img_scripts", lambda: [])
+        sd_client.resim_ciz(self.MARS, seed=1)
+
+        results = sd_client.resim_ciz_batch([self.MARS_AGAIN, "a quiet fishing harbor at dawn"], reuse="reuse")
+
+        assert all(ok for ok, _, _ in results)
+        assert len(single["posts"]) == 2
+
+
+class TestOzellikDevreKesici:
+    @pytest.fixture
+    def enhanced(self, monkeypatch, tmp_path):
+        """ADetailer'li payload hep hata verir, base payload calisir."""
+        state = {"posts": [], "breaker": FeatureBreaker(threshold=2, cooldown=600)}
+        counter = iter(range(1, 1000))
+        monkeypatch.setitem(sd_client._CAPABILITY_CACHE, "checked_at", time.time())
+        monkeypatch.setattr(sd_client, "get_feature_breaker", lambda: state["breaker"])
+        monkeypatch.setattr(sd_client, "_build_adetailer_alwayson", lambda **kw: {"ADetailer": {"args": []}})
+        monkeypatch.setattr(sd_client, "_allocate_image_path", lambda: str(tmp_path / f"atlas_{next(counter):03d}.png"))
+        monkeypatch.setattr(sd_client, "_upscale_image_file", lambda path, **kw: None)
+
+        def fake_post(*, path, payload, timeout, cancel_checker, stream=False):
+            state["posts"].append(payload)
+            if "alwayson_scripts" in payload and state.get("broken", True):
+                return StreamResponse({"error": "ADetailer crashed"})
+            return StreamResponse({"images": [b64("render")], "info": "{}"})
+
+        monkeypatch.setattr(sd_client, "_post_with_cancel", fake_post)
+        return state
+
+    def test_bozuk_ozellik_esikten_sonra_atlanir(self, enhanced):
+        for i in range(2):
+            assert sd_client.resim_ciz(f"a quiet harbor {i}", seed=1)[0]
+        assert len(enhanced["posts"]) == 4
+
+        assert sd_client.resim_ciz("a quiet harbor 3", seed=1)[0]
+
+        assert len(enhanced["posts"]) == 5
+        assert "alwayson_scripts" not in enhanced["posts"][-1]
+        state = enhanced["breaker"].snapshot()["features"]["adetailer"]
+        assert state["status"] == "open"
+        assert state["last_error"] == "ADetailer crashed"
+
+    def test_forge_tamamen_cokerse_ozellik_suclanmaz(self, enhanced, monkeypatch):
+        def down(**kw):
+            enhanced["posts"].append(kw["payload"])
+            raise sd_client.requests.ConnectionError("refused")
+
+        monkeypatch.setattr(sd_client, "_post_with_cancel", down)
+        for i in range(3):
+            assert sd_client.resim_ciz(f"a quiet harbor {i}", seed=1)[0] is False
+
+        assert enhanced["breaker"].snapshot()["features"] == {}
+
+    def test_basarili_enhanced_sayaci_sifirlar(self, enhanced):
+        sd_client.resim_ciz("a quiet harbor", seed=1)
+        enhanced["broken"] = False
+        sd_client.resim_ciz("a quiet harbor again", seed=1)
+
+        assert enhanced["breaker"].snapshot()["features"]["adetailer"]["failures"] == 0
+
+    def test_base_yedegi_tam_kalite_istegine_cache_olarak_donmez(self, enhanced, monkeypatch, tmp_path):
+        cache = RenderCache(str(tmp_path / "cache"), enabled=True)
+        monkeypatch.setattr(sd_client, "get_render_cache", lambda: cache)
+
+        assert sd_client.resim_ciz("a quiet harbor", seed=1, reuse="off")[0]
+        enhanced["broken"] = False
+        ok, path, _ = sd_client.resim_ciz("a quiet harbor", seed=1, reuse="off")
+
+        assert ok and not path.startswith(cache.root)
+        assert len(enhanced["posts"]) == 3
+        assert "alwayson_scripts" in enhanced["posts"][-1]
+
+
+@pytest.fixture
+def image_folder(monkeypatch, tmp_path):
+    folder = tmp_path / "2026-01-01"
+    folder.mkdir()
+    monkeypatch.setattr(sd_client, "get_image_folder", lambda: str(folder))
+    return folder
+
+
+class TestDosyaAdiAyirma:
+    def test_sirali_isimler(self, image_folder):
+        first = sd_client._allocate_image_path()
+        second = sd_client._allocate_image_path()
+
+        assert os.path.basename(first) == "atlas_001.png"
+        assert os.path.basename(second) == "atlas_002.png"
+        assert (image_folder / sd_client.IMAGE_COUNTER_FILE).read_text() == "2"
+
+    def test_sayac_yoksa_mevcut_dosyalardan_tohumlanir(self, image_folder):
+        (image_folder / "atlas_007.png").write_bytes(b"x")
+        (image_folder / "atlas_bozuk.png").write_bytes(b"x")
+
+        assert os.path.basename(sd_client._allocate_image_path()) == "atlas_008.png"
+
+    def test_eski_sayac_cakismada_atlar(self, image_folder):
+        (image_folder / sd_client.IMAGE_COUNTER_FILE).write_text("1")
+        (image_folder / "atlas_002.png").write_bytes(b"baska surec")
+
+        assert os.path.basename(sd_client._allocate_image_path()) == "atlas_003.png"
+        assert (image_folder / "atlas_002.png").read_bytes() == b"baska surec"
+
+    def test_klasor_listelenmez(self, image_folder, monkeypatch):
+        sd_client._allocate_image_path()
+        monkeypatch.setattr(sd_client.os, "listdir", lambda *a: pytest.fail("listdir cagrildi"))
+
+        assert os.path.basename(sd_client._allocate_image_path()) == "atlas_002.png"
+
+    def test_paralel_ayirmada_isimler_essiz(self, image_folder):
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            paths = list(pool.map(lambda _: sd_client._allocate_image_path(), range(40)))
+
+        assert len(set(paths)) == 40
+
+    def test_gocte_butun_klasorler_tohumlanir(self, tmp_path):
+        for name, files in (("2025-01-01", ["atlas_003.png"]), ("2025-01-02", [])):
+            (tmp_path / name).mkdir()
+            for f in files:
+                (tmp_path / name / f).write_bytes(b"x")
+
+        assert sd_client.seed_image_counters(str(tmp_path)) == 2
+        assert (tmp_path / "2025-01-01" / sd_client.IMAGE_COUNTER_FILE).read_text() == "3"
+        assert sd_client.seed_image_counters(str(tmp_path)) == 0
+
+
+FORGE_ANSWERS = {
+    "/sdapi/v1/upscalers": [{"name": "4x-UltraSharp"}],
+    "/sdapi/v1/scripts": {"txt2img": ["ADetailer"]},
+    "/sdapi/v1/face-restorers": [{"name": "GFPGAN"}],
+    "/controlnet/model_list": {"model_list": ["canny"]},
+    "/sdapi/v1/options": {"sd_model_checkpoint": "juggernaut"},
+    "/sdapi/v1/extensions": [{"name": "adetailer", "enabled": True}],
+}
+
+
+@pytest.fixture
+def capabilities(monkeypatch):
+    """Bos yetenek onbellegi + kayit tutan sahte Forge GET'i."""
+    cache = {"checked_at": 0.0}
+    state = {"calls": [], "answers": dict(FORGE_ANSWERS), "gate": None, "delay": 0.0}
+
+    def fake_get(path, timeout=3):
+        state["calls"].append(path)
+        if state["gate"] is not None:
+            state["gate"].wait(5)
+        time.sleep(state["delay"])
+        return state["answers"].get(path)
+
+    monkeypatch.setattr(sd_client, "_CAPABILITY_CACHE", cache)
+    monkeypatch.setattr(sd_client, "_safe_get_json", fake_get)
+    state["cache"] = cache
+    return state
+
+
+class TestYetenekOnbellegi:
+    def test_problar_paralel_calisir(self, capabilities):
+        capabilities["delay"] = 0.3
+        started = time.monotonic()
+        sd_client._refresh_capabilities_now()
+
+        assert time.monotonic() - started < 0.3 * 3
+        assert len(capabilities["calls"]) == len(sd_client._CAPABILITY_PROBES)
+
+    def test_soguk_onbellek_ilk_cevabi_bekler(self, capabilities):
+        assert sd_client._list_upscalers() == ["4x-UltraSharp"]
+        assert sd_client._list_txt2img_scripts() == ["ADetailer"]
+        assert capabilities["cache"]["checkpoint"] == "juggernaut"
+
+    def test_suresi_dolan_onbellek_beklemeden_doner(self, capabilities):
+        cache = capabilities["cache"]
+        cache.update({"upscalers": ["eski"], "checked_at": time.time() - 10_000})
+        capabilities["gate"] = threading.Event()
+
+        started = time.monotonic()
+        assert sd_client._list_upscalers() == ["eski"]
+        assert time.monotonic() - started < 0.5
+
+        done = sd_client._start_background_refresh()
+        capabilities["gate"].set()
+        assert done.wait(5)
+        assert sd_client._list_upscalers() == ["4x-UltraSharp"]
+
+    def test_forge_cevap_vermezse_eski_degerler_kalir(self, capabilities):
+        cache = capabilities["cache"]
+        cache.update({"upscalers": ["eski"], "checked_at": 5.0})
+        capabilities["answers"] = {}
+
+        sd_client._refresh_capabilities_now()
+
+        assert cache["upscalers"] == ["eski"]
+        assert cache["checked_at"] == 5.0
+
+    def test_checkpoint_degisince_onbellek_eskir(self, capabilities):
+        cache = capabilities["cache"]
+        cache["checked_at"] = time.time()
+        sd_client._note_checkpoint("juggernaut")
+        assert cache["checked_at"] > 1.0
+
+        sd_client._note_checkpoint("realvis")
+
+        assert cache["checked_at"] == 1.0
+
+    def test_tek_seferde_tek_yenileme(self, capabilities):
+        capabilities["gate"] = threading.Event()
+        first = sd_client._start_background_refresh()
+        second = sd_client._start_background_refresh()
+        capabilities["gate"].set()
+
+        assert first is second
+        assert first.wait(5)
+        assert len(capabilities["calls"]) == len(sd_client._CAPABILITY_PROBES)
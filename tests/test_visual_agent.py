@@ -1,5 +1,7 @@
 """core/agents/visual_agent.py — SD prompt normalizasyonu."""
 
+import types
+
 import pytest
 
 from core.agents.visual_agent import VisualDirectorAgent
@@ -134,3 +136,60 @@ class TestGuvenliHaberYoksa:
         state = agent._execute(PipelineState())
 
         assert state.generated_images == []
+
+
+class TestTaslakOnce:
+    @pytest.fixture
+    def sd(self, monkeypatch):
+        from core.clients import render_watchdog, sd_client
+
+        state = {"calls": [], "reject": set()}
+
+        def fake_resim_ciz(prompt, **kwargs):
+            profile = kwargs.get("profile")
+            state["calls"].append(("draft" if profile else "full", prompt))
+            return True, f"/tmp/{len(state['calls'])}.png", prompt
+
+        def fake_finalize(draft_path, prompt, **kwargs):
+            state["calls"].append(("finalize", prompt))
+            return True, "/tmp/final.png", prompt
+
+        monkeypatch.setattr(sd_client, "resim_ciz", fake_resim_ciz)
+        monkeypatch.setattr(sd_client, "finalize_draft", fake_finalize)
+        monkeypatch.setattr(sd_client, "discard_draft", lambda path: state["calls"].append(("discard", path)))
+        monkeypatch.setattr(
+            render_watchdog,
+            "inspect_image",
+            lambda path: "black" if len(state["reject"]) and path in state["reject"] else None,
+        )
+        monkeypatch.setattr(
+            "core.agents.visual_agent.get_gpu_residency",
+            lambda: types.SimpleNamespace(acquire_for_sd=lambda **_k: {}),
+        )
+        return state
+
+    def run(self, fake_llm, draft_first):
+        agent = VisualDirectorAgent(
+            fake_llm(text_response="a wide documentary shot of a quiet harbor at dawn"), draft_first=draft_first
+        )
+        return agent._execute(PipelineState(safe_news_items=[{"title": "Harbor", "summary": "Ozet"}]))
+
+    def test_onaylanan_taslak_tamamlanir(self, fake_llm, sd):
+        state = self.run(fake_llm, draft_first=True)
+
+        assert [c[0] for c in sd["calls"]] == ["draft", "finalize", "discard"]
+        assert state.generated_images == ["/tmp/final.png"]
+
+    def test_reddedilen_taslak_yedek_prompta_gecer(self, fake_llm, sd):
+        sd["reject"].add("/tmp/1.png")
+        state = self.run(fake_llm, draft_first=True)
+
+        kinds = [c[0] for c in sd["calls"]]
+        assert kinds == ["draft", "discard", "draft", "finalize", "discard"]
+        assert "Harbor" in sd["calls"][2][1]
+        assert state.generated_images == ["/tmp/final.png"]
+
+    def test_kapaliyken_dogrudan_tam_kalite(self, fake_llm, sd):
+        self.run(fake_llm, draft_first=False)
+
+        assert [c[0] for c in sd["calls"]] == ["full"]
@@ -1,3 +1,4 @@
+import json
 import logging
 import os
 import shutil
@@ -17,7 +18,7 @@ import requests
 import uvicorn
 from fastapi import BackgroundTasks, FastAPI, File, HTTPException, Response, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 
@@ -49,10 +50,21 @@ except ImportError as e:
 
 
 try:
+    from core.clients.feature_breaker import get_feature_breaker
+    from core.clients.gpu_residency import get_gpu_residency
+    from core.clients.image_backend import get_image_backend
     from core.clients.insta_client import login_and_upload, login_and_upload_album, prepare_insta_caption
-    from core.clients.llm import llm_answer, ollama_warmup, visual_prompt_generator
-    from core.clients.sd_client import resim_ciz
+    from core.clients.llm import SYSTEM_PROMPT, get_llm_service, llm_answer, ollama_warmup, visual_prompt_generator
+    from core.clients.llm_cache import get_llm_cache
+    from core.clients.llm_dispatcher import get_llm_dispatcher
+    from core.clients.llm_routing import get_model_router
+    from core.clients.llm_schema import get_json_stats
+    from core.clients.llm_telemetry import get_llm_telemetry
+    from core.clients.render_progress import get_progress_sampler
+    from core.clients.render_scheduler import get_render_scheduler
+    from core.clients.sd_client import prefetch_capabilities, resim_ciz, seed_image_counters
     from core.content.daily_visual_agent import gunluk_instagram_gorseli_uret
+    from core.errors import AtlasError, CancelledError, LLMUnavailableError
     from core.runtime.system_check import ensure_sd_running
 
     # We will implement custom TTS logic here to avoid playing on server
@@ -274,10 +286,42 @@ def robots_txt():
 
 @app.post("/api/chat")
 async def chat_endpoint(req: ChatRequest):
-    response = llm_answer(req.message)
+    # Conversation, not pipeline work: a repeated message should not get a canned reply.
+    response = llm_answer(req.message, use_cache=False)
     return {"response": response}
 
 
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.post("/api/chat/stream")
+def chat_stream_endpoint(req: ChatRequest):
+    """
+    Same answer as /api/chat, sent as Server-Sent Events while Ollama generates:
+    "token" events carry text pieces, "done" carries time-to-first-token and
+    total duration, "error" a user-safe message. A client that disconnects
+    closes the Ollama connection, which stops generation.
+    """
+    messages = [{"role": "system", "content": SYSTEM_PROMPT}, {"role": "user", "content": req.message}]
+    stream = get_llm_service().stream_chat(messages, timeout=180)
+
+    def events():
+        try:
+            for text in stream:
+                yield _sse("token", {"text": text})
+            yield _sse("done", stream.stats())
+        except AtlasError as exc:
+            yield _sse("error", {"code": exc.code, "message": exc.user_message})
+        except requests.RequestException:
+            logger.warning("Ollama stream failed", exc_info=True)
+            yield _sse("error", {"code": LLMUnavailableError.code, "message": LLMUnavailableError.user_message})
+        finally:
+            stream.close()
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
 @app.post("/api/image")
 def image_endpoint(req: ImageRequest):
     try:
@@ -315,17 +359,75 @@ def image_endpoint(req: ImageRequest):
 
 
 @app.get("/api/progress")
-async def progress_endpoint():
-    try:
-        # Proxy to SD Forge progress API
-        r = requests.get("http://127.0.0.1:7860/sdapi/v1/progress", timeout=2)
-        if r.status_code == 200:
-            data = r.json()
-            return data
-        return {"progress": 0, "state": {}}
-    except (requests.RequestException, ValueError):
-        logger.warning("Stable Diffusion progress request failed", exc_info=True)
-        return {"progress": 0, "state": {}}
+def progress_endpoint():
+    # Latest sample from the shared progress sampler; idle payload when no render runs
+    return get_progress_sampler().snapshot()
+
+
+@app.get("/api/sd/features")
+def sd_features_endpoint():
+    """Circuit breaker state of optional SD features (ADetailer, ControlNet)."""
+    return get_feature_breaker().snapshot()
+
+
+@app.get("/api/sd/scheduler")
+def sd_scheduler_endpoint():
+    """Render scheduler counters: renders, model swaps and swaps avoided by grouping."""
+    return get_render_scheduler().stats()
+
+
+@app.get("/api/sd/hosts")
+def sd_hosts_endpoint():
+    """Image backend hosts: health, in-flight renders and loaded checkpoint per Forge host."""
+    return get_image_backend().snapshot()
+
+
+@app.get("/api/llm/cache")
+def llm_cache_endpoint():
+    """LLM response cache counters: hits, misses, stores and evictions since startup."""
+    return get_llm_cache().stats()
+
+
+@app.get("/api/llm/json")
+def llm_json_endpoint():
+    """Structured-output counters: local repairs, dropped fields, regenerations and failures."""
+    return get_json_stats().snapshot()
+
+
+@app.get("/api/llm/routing")
+def llm_routing_endpoint():
+    """Task -> model routes and per-task latency, for tuning LLM_MODEL_* from data."""
+    return get_model_router().stats()
+
+
+@app.get("/api/metrics")
+def metrics_endpoint(job_id: str = None):
+    """
+    LLM telemetry (tokens/s, load time and queue wait histograms, per agent/task
+    totals) next to the cache, routing, dispatcher and GPU handoff counters.
+    With job_id, that job's LLM summary is included.
+    """
+    metrics = {
+        "llm": get_llm_telemetry().snapshot(),
+        "llm_routing": get_model_router().stats(),
+        "llm_dispatcher": get_llm_dispatcher().stats(),
+        "llm_cache": get_llm_cache().stats(),
+        "llm_json": get_json_stats().snapshot(),
+        "gpu": get_gpu_residency().snapshot(),
+    }
+    if job_id:
+        job = jobs.registry.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="İş bulunamadı.")
+        metrics["job"] = {"job_id": job.id, "kind": job.kind, "llm": job.llm_summary()}
+    return metrics
+
+
+@app.post("/api/sd/features/reset")
+def sd_features_reset_endpoint(feature: str = None):
+    """Re-enable a skipped feature (or all of them) after fixing the extension."""
+    get_feature_breaker().reset(feature)
+    return get_feature_breaker().snapshot()
 
 
 @app.post("/api/news/generate")
@@ -376,7 +478,7 @@ def _start_job(kind: str):
     """
     Yeni is olusturur. Baska bir is devam ediyorsa (409) hata sozlugu doner.
 
-    "Ayni anda tek GPU isi" kurali burada zorlanir; UI kilidine guvenilmez.
+    "GPU host'u basina tek is" kurali burada zorlanir; UI kilidine guvenilmez.
     """
     try:
         return jobs.registry.create(kind), None
@@ -394,6 +496,7 @@ def video_progress_endpoint(job_id: str = None):
     return jobs.registry.snapshot(job_id, kind="video")
 
 
+@jobs.job_task
 def run_video_generation_task(job_id: str):
     job = jobs.registry.get(job_id)
     if job is None:
@@ -422,7 +525,7 @@ def run_video_generation_task(job_id: str):
             job.current_task = msg
             job.log(msg)
 
-        success, result = process_daily_news_video(progress_callback)
+        success, result = process_daily_news_video(progress_callback, cancel_checker=lambda: job.cancel_requested)
 
         if success:
             # Result is absolute path: .../generated_videos/YYYY-MM-DD/filename.mp4
@@ -433,6 +536,8 @@ def run_video_generation_task(job_id: str):
         else:
             job.finish("error", task=f"Hata: {result}", error=str(result))
 
+    except CancelledError:
+        job.finish("cancelled", task="İptal edildi.")
     except Exception:  # Background task boundary: the job must reach a terminal state.
         logger.exception("Background video generation failed")
         job.finish(
@@ -453,6 +558,7 @@ async def news_video_generate_endpoint(background_tasks: BackgroundTasks):
 # --- AGENT LOGIC ---
 
 
+@jobs.job_task
 def run_agent_task(job_id: str, live_mode: bool = False):
     job = jobs.registry.get(job_id)
     if job is None:
@@ -512,6 +618,8 @@ def run_agent_task(job_id: str, live_mode: bool = False):
             return
         if cancel_guard("servis_kontrol"):
             return
+        # Forge may have just been (re)started: warm its capability list while the LLM works.
+        prefetch_capabilities()
 
         # 2. Initialize
         set_stage("init", 10, "Ajanlar hazırlanıyor...")
@@ -595,10 +703,7 @@ def run_agent_task(job_id: str, live_mode: bool = False):
 
 def _interrupt_stable_diffusion():
     """Bloke eden bir SD cizimini hizlica uyandirmak icin en iyi cabayla dener."""
-    try:
-        requests.post("http://127.0.0.1:7860/sdapi/v1/interrupt", timeout=2)
-    except requests.RequestException:
-        pass
+    get_image_backend().interrupt()
 
 
 @app.post("/api/agent/cancel")
@@ -639,6 +744,7 @@ def agent_progress_endpoint(job_id: str = None):
 # --- CAROUSEL LOGIC ---
 
 
+@jobs.job_task
 def run_carousel_generation_task(job_id: str):
     job = jobs.registry.get(job_id)
     if job is None:
@@ -1201,10 +1307,16 @@ async def startup_event():
     # 1.5 Setup Safe Piper (Tmp Dir)
     setup_safe_piper()
 
+    # 1.6 Seed image counters for date folders written by older versions
+    seeded = seed_image_counters()
+    if seeded:
+        logger.info("Seeded image counters for %s folder(s)", seeded)
+
     # 2. Start/Check Stable Diffusion
     logger.info("Checking Stable Diffusion")
     try:
-        ensure_sd_running(log_callback=logger.info)
+        if ensure_sd_running(log_callback=logger.info):
+            prefetch_capabilities()
     except OSError:
         logger.exception("Stable Diffusion could not be started during backend startup")
 
@@ -4,16 +4,17 @@ import os
 import re
 import subprocess
 import textwrap
-import time
 import uuid
 from pathlib import Path
 
-from core.clients.llm import get_llm_service, unload_ollama
-from core.clients.sd_client import resim_ciz
+from core.clients.gpu_residency import get_gpu_residency
+from core.clients.llm import get_llm_service
+from core.clients.llm_dispatcher import get_llm_dispatcher
+from core.clients.sd_client import resim_ciz_batch, seed_for
 from core.content.news_fetcher import get_top_3_separate_news
 from core.content.news_memory import mark_used_titles
 from core.errors import LLMResponseError, LLMUnavailableError
-from core.runtime.config import SD_HEIGHT, SD_WIDTH
+from core.runtime.config import SD_HEIGHT, SD_VIDEO_RENDER_BUDGET, SD_WIDTH
 from core.runtime.tts_config import (
     PIPER_BIN,
     PIPER_CONFIG,
@@ -111,6 +112,7 @@ def generate_news_script(news_title: str) -> str:
             system="You are an English TV news anchor. Write concise spoken narration.",
             timeout=60,
             retries=1,
+            task="caption",
         )
         return _enforce_word_window(text, SCRIPT_WORD_MIN, SCRIPT_WORD_MAX, news_title)
     except LLMUnavailableError:
@@ -161,6 +163,10 @@ def generate_visual_prompt(news_title: str) -> str:
         )
 
 
+def _prepare_headline(news_title: str) -> tuple[str, str]:
+    return generate_news_script(news_title), generate_visual_prompt(news_title)
+
+
 def sanitize_text(text: str) -> str:
     # Keep printable chars and normalize whitespace.
     text = "".join(ch for ch in str(text or "") if ch.isprintable())
@@ -715,7 +721,7 @@ def concat_videos_ffmpeg(video_paths, output_path: Path) -> bool:
     return os.path.exists(output_path)
 
 
-def process_daily_news_video(progress_callback=print):
+def process_daily_news_video(progress_callback=print, cancel_checker=None):
     temp_dir = Path("temp")
     temp_dir.mkdir(exist_ok=True)
 
@@ -739,25 +745,47 @@ def process_daily_news_video(progress_callback=print):
         )
     _report(progress_callback, "Using English voice model for narration.", 8)
 
-    scripts = []
-    prompts = []
-    for i, news in enumerate(news_items):
-        idx = i + 1
-        prep_percent = 10 + int((idx / max(1, len(news_items))) * 18)
-        _report(progress_callback, f"Writing script and prompt {idx}/{len(news_items)}...", prep_percent)
-        scripts.append(generate_news_script(news))
-        prompts.append(generate_visual_prompt(news))
+    # Headlines are independent: their script + prompt pairs run in parallel up to LLM_MAX_PARALLEL.
+    _report(progress_callback, f"Writing scripts and prompts for {len(news_items)} headlines...", 10)
+    # A cancelled job stops submitting headlines that are still queued.
+    prepared = get_llm_dispatcher().map(_prepare_headline, news_items, cancel_checker=cancel_checker)
+    scripts = [script for script, _ in prepared]
+    prompts = [prompt for _, prompt in prepared]
+    _report(progress_callback, "Scripts and prompts ready.", 28)
 
     _report(progress_callback, "Releasing LLM memory...", 30)
-    unload_ollama()
-    time.sleep(1.5)
+    get_gpu_residency().acquire_for_sd()
+
+    # All headlines share the same SD settings: one batched Forge request.
+    _report(progress_callback, f"Generating {len(news_items)} images...", 32)
+
+    def _on_image(index: int, result) -> None:
+        state = "ready" if result[0] else "failed"
+        _report(
+            progress_callback,
+            f"Image {index + 1}/{len(news_items)} {state}.",
+            32 + int((index + 1) * 18 / len(news_items)),
+        )
+
+    image_results = resim_ciz_batch(
+        prompts,
+        negative_prompt=VIDEO_NEGATIVE_PROMPT,
+        on_result=_on_image,
+        seeds=[seed_for(p) for p in prompts],
+        budget=SD_VIDEO_RENDER_BUDGET or None,
+    )
 
     clip_paths = []
     total_audio_seconds = 0.0
 
     for i, news in enumerate(news_items):
         idx = i + 1
-        base = 32 + (i * 20)
+        base = 50 + (i * 14)
+
+        success, image_path, _ = image_results[i]
+        if not success or not image_path:
+            _report(progress_callback, f"Image failed for item {idx}. Skipping.", base + 2)
+            continue
 
         _report(progress_callback, f"Generating audio {idx}/{len(news_items)}...", base + 2)
         audio_path = temp_dir / f"news_audio_{uuid.uuid4()}.wav"
@@ -774,16 +802,7 @@ def process_daily_news_video(progress_callback=print):
         audio_seconds = get_media_duration_seconds(audio_path)
         total_audio_seconds += audio_seconds
 
-        _report(progress_callback, f"Generating image {idx}/{len(news_items)}...", base + 8)
-        success, image_path, _ = resim_ciz(
-            prompts[i],
-            negative_prompt=VIDEO_NEGATIVE_PROMPT,
-        )
-        if not success or not image_path:
-            _report(progress_callback, f"Image failed for item {idx}.", base + 12)
-            continue
-
-        _report(progress_callback, f"Building clip {idx}/{len(news_items)}...", base + 15)
+        _report(progress_callback, f"Building clip {idx}/{len(news_items)}...", base + 8)
         clip_path = temp_dir / f"clip_{uuid.uuid4()}.mp4"
         if create_video_clip_ffmpeg(
             image_path,
@@ -793,7 +812,7 @@ def process_daily_news_video(progress_callback=print):
             subtitle_text=scripts[i],
         ):
             clip_paths.append(clip_path)
-            _report(progress_callback, f"Clip {idx}/{len(news_items)} ready.", base + 19)
+            _report(progress_callback, f"Clip {idx}/{len(news_items)} ready.", base + 13)
 
     if not clip_paths:
         return False, "No clips generated."